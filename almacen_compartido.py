@@ -0,0 +1,523 @@
+import atexit
+import contextlib
+import os
+import signal
+import sys
+import threading
+import time
+import weakref
+
+from almacenamiento import (
+    aplicar_operacion, calcular_progreso, nueva_operacion, operacion_aplicable, reconstruir_contadores
+)
+
+def crear_indice(nombre):
+    """
+    Crea un índice derivado vacío por su nombre
+
+    Cada módulo se importa solo al crear su índice: la consola no carga los
+    que no consulta y analitica, que necesita numpy y pandas, solo se
+    importa al abrir las estadísticas.
+
+    Args:
+        nombre: "fechas", "busqueda", "analitica", "pendientes" o "vencimientos"
+    """
+    if nombre in ("fechas", "analitica"):
+        # El calendario y las estadísticas incluyen también lo archivado
+        from archivado import obtener_archivo
+        if nombre == "fechas":
+            from indice_fechas import IndiceFechas
+            return IndiceFechas(archivo=obtener_archivo())
+        from analitica import IndiceAnalitica
+        return IndiceAnalitica(archivo=obtener_archivo())
+    if nombre == "busqueda":
+        from busqueda import IndiceBusqueda
+        return IndiceBusqueda()
+    if nombre == "pendientes":
+        from pendientes import IndicePendientes
+        return IndicePendientes()
+    if nombre == "vencimientos":
+        from vencimientos import IndiceVencimientos
+        return IndiceVencimientos()
+    raise KeyError(nombre)
+
+# Índices que la aplicación mantiene desde la carga; los demás se crean en la primera consulta
+INDICES_POR_DEFECTO = ("fechas", "busqueda", "pendientes", "vencimientos")
+
+def _indices_por_defecto():
+    return {nombre: crear_indice(nombre) for nombre in INDICES_POR_DEFECTO}
+
+# Campos de un proyecto que solo son contadores derivados de sus tareas
+_CONTADORES = {"completadas", "total", "progreso"}
+
+def _claves(operacion):
+    """
+    Registros que lee o escribe una operación, para saber si dos operaciones conmutan
+
+    Returns:
+        Tupla (registros modificados, proyectos que deben seguir existiendo)
+    """
+    coleccion = operacion["coleccion"]
+    if coleccion == "proyectos":
+        if operacion["op"] == "actualizar" and set(operacion["valor"]) <= _CONTADORES:
+            # Los contadores se recalculan al fusionar: no generan conflicto
+            return set(), set()
+        return {("proyectos", operacion["clave"])}, set()
+    clave = operacion["valor"]["id"] if operacion["op"] == "anadir" else operacion["clave"]
+    if coleccion == "tareas_proyecto":
+        return {(coleccion, clave)}, {("proyectos", operacion["proyecto"])}
+    return {(coleccion, clave)}, set()
+
+def _proyectos_afectados(operaciones):
+    proyectos = set()
+    for operacion in operaciones:
+        if operacion["coleccion"] == "proyectos":
+            proyectos.add(operacion["clave"])
+        elif operacion["coleccion"] == "tareas_proyecto":
+            proyectos.add(operacion["proyecto"])
+    return proyectos
+
+class AlmacenCompartido:
+    """
+    Copia única en memoria de los datos, compartida por todas las sesiones del proceso
+
+    Las sesiones leen siempre el mismo diccionario y todas las modificaciones
+    pasan por aplicar(), de modo que cada sesión ve el estado de las demás sin
+    volver a leer el archivo. Si otro proceso modifica los archivos (cambia su
+    fecha de modificación o su tamaño), los datos se recargan en el mismo
+    diccionario para que las referencias existentes sigan siendo válidas.
+    Cuando el backend lo permite, en lugar de recargar se aplican solo las
+    operaciones que los otros procesos han añadido al registro.
+
+    Las modificaciones se hacen dentro del bloqueo entre procesos del
+    backend y después de incorporar los cambios ajenos, así que dos
+    procesos que modifican registros distintos no se pisan y los valores
+    derivados (contadores de proyecto) se calculan sobre el estado más
+    reciente.
+
+    Con escritura diferida (espera > 0) las modificaciones solo cambian la
+    memoria y quedan pendientes; un hilo en segundo plano las escribe juntas
+    cuando pasa la espera sin cambios nuevos, o como mucho latencia_maxima
+    segundos después de la primera. Si mientras tanto otro proceso ha
+    escrito, las pendientes se fusionan con lo suyo antes de escribirlas.
+    Al salir del proceso (atexit, SIGTERM) se escribe lo pendiente.
+
+    Los índices derivados se reconstruyen en cada carga y se actualizan con
+    cada operación mediante antes_de_aplicar/despues_de_aplicar. Los que no
+    se crean al principio se crean la primera vez que se consultan.
+    """
+
+    def __init__(self, backend, indices=None, espera=0, latencia_maxima=None):
+        """
+        Args:
+            backend: Módulo de almacenamiento
+            indices: Índices derivados iniciales (por defecto los de INDICES_POR_DEFECTO)
+            espera: Segundos sin cambios antes de escribir (0 = escribir en cada cambio)
+            latencia_maxima: Segundos que puede esperar como mucho un cambio (por defecto 10 x espera)
+        """
+        self.backend = backend
+        self.cerrojo = threading.RLock()
+        self._datos = None
+        self._firma = None
+        # Operaciones aplicadas dentro de lote() que aún no se han persistido
+        self._lote = None
+        self.indices = _indices_por_defecto() if indices is None else indices
+        # Escritura diferida: operaciones aplicadas en memoria que aún no están en disco
+        self.espera = espera
+        self.latencia_maxima = latencia_maxima if latencia_maxima is not None else espera * 10
+        self._pendientes = []
+        self._aviso = threading.Condition()
+        self._primer_pendiente = None
+        self._ultimo_cambio = None
+        self._hilo = None
+        self._metricas = {"volcados": 0, "operaciones_volcadas": 0, "ultimo_volcado": 0.0,
+                          "antiguedad_maxima": 0.0, "fusiones": 0, "descartadas": 0, "error": None}
+
+    def _firma_actual(self):
+        firma = []
+        for ruta in self.backend.rutas_vigiladas():
+            try:
+                estado = os.stat(ruta)
+                firma.append((estado.st_mtime_ns, estado.st_size))
+            except FileNotFoundError:
+                firma.append(None)
+        return tuple(firma)
+
+    def datos(self):
+        """Devuelve el diccionario compartido, recargándolo si los archivos cambiaron"""
+        with self.cerrojo:
+            if self._datos is None:
+                self._recargar()
+            elif self._firma_actual() != self._firma:
+                with self.backend.bloqueo():
+                    self._incorporar_cambios_ajenos()
+            return self._datos
+
+    def _recargar(self):
+        firma = self._firma_actual()
+        nuevos = self.backend.cargar_datos()
+        reconstruir_contadores(nuevos)
+        if self._datos is None:
+            self._datos = nuevos
+        else:
+            self._datos.clear()
+            self._datos.update(nuevos)
+        self._firma = firma
+        for indice in self.indices.values():
+            indice.reconstruir(self._datos)
+
+    def _incorporar_cambios_ajenos(self):
+        # Se llama con el cerrojo y el bloqueo entre procesos
+        ajenas = self.backend.operaciones_nuevas()
+        pendientes = self._pendientes
+        if ajenas == []:
+            self._firma = self._firma_actual()
+            return
+        if not pendientes:
+            if ajenas is None:
+                self._recargar()
+            else:
+                for operacion in ajenas:
+                    self._aplicar_en_memoria(operacion)
+                self._firma = self._firma_actual()
+            return
+        self._metricas["fusiones"] += 1
+        if ajenas is not None and not self._hay_conflicto(pendientes, ajenas):
+            # Tocan registros distintos: el orden no importa
+            for operacion in ajenas:
+                self._aplicar_en_memoria(operacion)
+            self._firma = self._firma_actual()
+        else:
+            # En disco quedarán las ajenas y después las pendientes: se reproduce ese orden
+            # y se descartan las pendientes cuyo registro ya no existe
+            self._recargar()
+            self._pendientes = []
+            for operacion in pendientes:
+                if operacion_aplicable(self._datos, operacion):
+                    self._aplicar_en_memoria(operacion)
+                    self._pendientes.append(operacion)
+                else:
+                    self._metricas["descartadas"] += 1
+        # Los contadores pendientes se calcularon sin las tareas de los demás
+        self._pendientes.extend(self._corregir_contadores(_proyectos_afectados(pendientes + (ajenas or []))))
+
+    @staticmethod
+    def _hay_conflicto(pendientes, ajenas):
+        modificados, necesarios = set(), set()
+        for operacion in pendientes:
+            claves, dependencias = _claves(operacion)
+            modificados |= claves
+            necesarios |= dependencias
+        for operacion in ajenas:
+            claves, dependencias = _claves(operacion)
+            if claves & (modificados | necesarios) or dependencias & modificados:
+                return True
+        return False
+
+    def _corregir_contadores(self, proyectos):
+        correcciones = []
+        for nombre in proyectos:
+            proyecto = self._datos["proyectos"].get(nombre)
+            if proyecto is None:
+                continue
+            completadas = sum(1 for tarea in proyecto["tareas"].values() if tarea.get("completada", False))
+            total = len(proyecto["tareas"])
+            if proyecto.get("completadas") != completadas or proyecto.get("total") != total:
+                operacion = nueva_operacion("actualizar", "proyectos", nombre, {
+                    "completadas": completadas, "total": total, "progreso": calcular_progreso(completadas, total)})
+                self._aplicar_en_memoria(operacion)
+                correcciones.append(operacion)
+        return correcciones
+
+    def indice(self, nombre):
+        """
+        Devuelve un índice derivado, actualizado con el estado en disco
+
+        Un índice que el almacén no tiene (los de la consola, analitica) se
+        crea en la primera consulta y desde entonces se mantiene como los demás.
+        """
+        with self.cerrojo:
+            datos = self.datos()
+            if nombre not in self.indices:
+                indice = crear_indice(nombre)
+                indice.reconstruir(datos)
+                self.indices[nombre] = indice
+            return self.indices[nombre]
+
+    def _aplicar_en_memoria(self, operacion):
+        datos = self._datos
+        for indice in self.indices.values():
+            indice.antes_de_aplicar(datos, operacion)
+        aplicar_operacion(datos, operacion)
+        for indice in self.indices.values():
+            indice.despues_de_aplicar(datos, operacion)
+
+    def actualizar(self, construir):
+        """
+        Calcula operaciones a partir del estado más reciente y las persiste
+
+        Todo el ciclo leer-modificar-escribir ocurre dentro del bloqueo entre
+        procesos, después de incorporar los cambios de los demás procesos.
+        Las operaciones se persisten juntas, como un lote atómico; dentro de
+        lote() se acumulan hasta el final del bloque. Con escritura diferida
+        solo se aplican en memoria y la llamada no espera al disco.
+
+        Args:
+            construir: Función que recibe los datos y devuelve una operación,
+                una lista de operaciones o None si no hay nada que cambiar
+
+        Returns:
+            Lista de operaciones aplicadas
+        """
+        with self.cerrojo, self._bloqueo_escritura():
+            operaciones = construir(self.datos())
+            if operaciones is None:
+                return []
+            if isinstance(operaciones, dict):
+                operaciones = [operaciones]
+            for operacion in operaciones:
+                self._aplicar_en_memoria(operacion)
+            if self._lote is not None:
+                self._lote.extend(operaciones)
+            else:
+                self._persistir(operaciones)
+            return operaciones
+
+    def _bloqueo_escritura(self):
+        # Con escritura diferida no se escribe nada hasta el volcado, que toma el bloqueo
+        return contextlib.nullcontext() if self.espera > 0 else self.backend.bloqueo()
+
+    def _persistir(self, operaciones):
+        if not operaciones:
+            return
+        if self.espera <= 0:
+            self.backend.registrar_operaciones(operaciones)
+            # Los archivos cambiaron por nuestra propia escritura: no hay que recargar
+            self._firma = self._firma_actual()
+            return
+        self._pendientes.extend(operaciones)
+        ahora = time.monotonic()
+        with self._aviso:
+            if self._primer_pendiente is None:
+                self._primer_pendiente = ahora
+            self._ultimo_cambio = ahora
+            self._aviso.notify()
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._escribir_en_segundo_plano, name="escritura-diferida",
+                                          daemon=True)
+            self._hilo.start()
+            _volcar_al_salir(self)
+
+    def _escribir_en_segundo_plano(self):
+        while True:
+            with self._aviso:
+                if self._primer_pendiente is None:
+                    self._aviso.wait()
+                    continue
+                limite = min(self._ultimo_cambio + self.espera, self._primer_pendiente + self.latencia_maxima)
+                restante = limite - time.monotonic()
+                if restante > 0:
+                    self._aviso.wait(restante)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                # Los cambios siguen pendientes en memoria; se reintenta más tarde
+                self._metricas["error"] = f"{type(e).__name__}: {e}"
+                with self._aviso:
+                    self._aviso.wait(max(self.latencia_maxima, self.espera))
+
+    def _marcar_escritas(self):
+        self._pendientes = []
+        with self._aviso:
+            if self._primer_pendiente is not None:
+                antiguedad = time.monotonic() - self._primer_pendiente
+                self._metricas["antiguedad_maxima"] = max(self._metricas["antiguedad_maxima"], antiguedad)
+            self._primer_pendiente = None
+
+    def flush(self):
+        """
+        Escribe ya las operaciones pendientes de la escritura diferida
+
+        Vuelve cuando están en disco. Sin escritura diferida no hace nada.
+        """
+        with self.cerrojo, self.backend.bloqueo():
+            if not self._pendientes:
+                self._marcar_escritas()
+                return
+            # Fusiona con lo que otros procesos hayan escrito desde la última vez
+            self.datos()
+            operaciones = self._pendientes
+            inicio = time.perf_counter()
+            self.backend.registrar_operaciones(operaciones)
+            self._firma = self._firma_actual()
+            self._marcar_escritas()
+            self._metricas["volcados"] += 1
+            self._metricas["operaciones_volcadas"] += len(operaciones)
+            self._metricas["ultimo_volcado"] = time.perf_counter() - inicio
+            self._metricas["error"] = None
+
+    def metricas_escritura(self):
+        """
+        Estado de la escritura diferida
+
+        Returns:
+            Diccionario con las operaciones pendientes, la antigüedad (segundos)
+            del cambio pendiente más antiguo, los volcados hechos, la duración
+            del último, la antigüedad máxima alcanzada, las fusiones con cambios
+            de otros procesos, las operaciones descartadas por conflicto y el
+            último error de escritura (o None)
+        """
+        with self._aviso:
+            primero = self._primer_pendiente
+        metricas = dict(self._metricas)
+        metricas["pendientes"] = len(self._pendientes)
+        metricas["antiguedad"] = time.monotonic() - primero if primero is not None else 0.0
+        return metricas
+
+    @contextlib.contextmanager
+    def lote(self):
+        """
+        Agrupa las modificaciones del bloque en una sola escritura
+
+        Dentro del bloque, aplicar() y actualizar() modifican los datos en
+        memoria (las consultas ya ven los cambios) y al salir se persisten
+        todas juntas como un lote atómico. Durante el bloque se mantiene el
+        bloqueo entre procesos. Si el bloque termina con una excepción, lo
+        ya aplicado también se persiste para que memoria y disco coincidan.
+        Los lotes anidados se unen al exterior.
+        """
+        with self.cerrojo, self._bloqueo_escritura():
+            if self._lote is not None:
+                yield
+                return
+            self.datos()
+            self._lote = []
+            try:
+                yield
+            finally:
+                operaciones, self._lote = self._lote, None
+                self._persistir(operaciones)
+
+    def aplicar_y_guardar(self, construir):
+        """
+        Aplica una secuencia de operaciones (puede ser enorme) y escribe una instantánea
+
+        Pensado para importaciones: las operaciones se consumen de una en
+        una (un generador puede consultar los datos, que ya incluyen las
+        anteriores), no pasan por el registro de cambios ni por los índices,
+        que se reconstruyen al final, y se persisten todas con una única
+        instantánea, así que una importación interrumpida no deja nada a
+        medias. Los contadores de los proyectos afectados se recalculan.
+
+        Args:
+            construir: Función que recibe los datos y devuelve un iterable
+                de operaciones creadas con nueva_operacion
+
+        Returns:
+            Número de operaciones aplicadas
+        """
+        with self.cerrojo, self.backend.bloqueo():
+            self.flush()
+            datos = self.datos()
+            aplicadas = 0
+            proyectos = set()
+            try:
+                for operacion in construir(datos):
+                    aplicar_operacion(datos, operacion)
+                    aplicadas += 1
+                    if operacion["coleccion"] == "tareas_proyecto":
+                        proyectos.add(operacion["proyecto"])
+            except BaseException:
+                # Lo aplicado no ha llegado a disco: se vuelve al estado guardado
+                self._recargar()
+                raise
+            for indice in self.indices.values():
+                indice.reconstruir(datos)
+            self._corregir_contadores(proyectos)
+            self.guardar()
+            return aplicadas
+
+    def aplicar(self, operacion):
+        """Aplica una operación en memoria y la persiste con el backend"""
+        self.actualizar(lambda datos: operacion)
+
+    def guardar(self):
+        """Escribe la instantánea completa de los datos compartidos"""
+        with self.cerrojo, self.backend.bloqueo():
+            datos = self.datos()
+            if self._lote:
+                # La instantánea incluye el lote en curso: ya no hace falta registrarlo
+                self._lote.clear()
+            self.backend.guardar_datos(datos)
+            self._firma = self._firma_actual()
+            # Y también las operaciones pendientes de la escritura diferida
+            self._marcar_escritas()
+
+# Almacenes con escritura diferida: lo pendiente se escribe al terminar el proceso
+_diferidos = weakref.WeakSet()
+_manejadores_anteriores = {}
+
+def _volcar_pendientes():
+    for almacen in list(_diferidos):
+        try:
+            almacen.flush()
+        except Exception as e:
+            print(f"No se pudieron guardar los cambios pendientes: {e}", file=sys.stderr)
+
+def _manejador_senal(senal, marco):
+    _volcar_pendientes()
+    anterior = _manejadores_anteriores.get(senal)
+    if callable(anterior):
+        anterior(senal, marco)
+    elif anterior != signal.SIG_IGN:
+        # Comportamiento por defecto: terminar con la misma señal
+        signal.signal(senal, signal.SIG_DFL)
+        os.kill(os.getpid(), senal)
+
+def _volcar_al_salir(almacen):
+    """
+    Registra el almacén para escribir lo pendiente al salir
+
+    atexit cubre la salida normal. SIGTERM (y SIGHUP) terminan el proceso
+    sin pasar por atexit, así que se instalan manejadores que escriben y
+    después encadenan el anterior. Python solo permite instalarlos desde el
+    hilo principal; Streamlit ejecuta los scripts en otro hilo, pero ya
+    convierte SIGTERM en una salida ordenada que pasa por atexit.
+    """
+    primero = not _diferidos
+    _diferidos.add(almacen)
+    if not primero:
+        return
+    atexit.register(_volcar_pendientes)
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for nombre in ("SIGTERM", "SIGHUP"):
+        senal = getattr(signal, nombre, None)
+        if senal is not None:
+            _manejadores_anteriores[senal] = signal.getsignal(senal)
+            signal.signal(senal, _manejador_senal)
+
+# Instancia única por proceso (los módulos importados sobreviven a los reruns de Streamlit)
+_cerrojo = threading.Lock()
+_almacen = None
+
+def obtener_almacen(backend=None):
+    """
+    Devuelve el almacén compartido del proceso, creándolo la primera vez
+
+    La escritura diferida se configura con ESPERA_ESCRITURA_MS y
+    LATENCIA_MAXIMA_ESCRITURA_MS (configuracion.py).
+
+    Args:
+        backend: Módulo de almacenamiento (solo se usa al crear el almacén)
+    """
+    global _almacen
+    with _cerrojo:
+        if _almacen is None:
+            from configuracion import ESPERA_ESCRITURA_MS, LATENCIA_MAXIMA_ESCRITURA_MS
+            if backend is None:
+                import almacenamiento as backend
+            _almacen = AlmacenCompartido(backend, espera=ESPERA_ESCRITURA_MS / 1000,
+                                         latencia_maxima=LATENCIA_MAXIMA_ESCRITURA_MS / 1000)
+        return _almacen
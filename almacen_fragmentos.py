@@ -0,0 +1,546 @@
+"""
+Backend de almacenamiento repartido en fragmentos
+
+En lugar de un único tareas.json, el journal es un directorio con:
+
+    manifiesto.json         secuencia, fragmentos, proyectos y tareas recurrentes (unos pocos KB)
+    diarias/AAAA-MM.jsonl   tareas diarias de un mes, un registro por línea
+    bitacora/AAAA-MM.jsonl  entradas de bitácora de un mes
+    proyectos/<nombre>.json cada proyecto con sus tareas
+
+Al cargar se leen el manifiesto, los proyectos, el mes actual y los meses
+que aún tienen tareas diarias pendientes; el resto de meses se lee cuando
+algo lo pide (el calendario o la bitácora al navegar a ese mes, o una
+consulta que necesita todo el historial). Cada modificación reescribe solo
+los fragmentos que toca y después el manifiesto.
+
+El manifiesto guarda, por fragmento, el número de registros y (en las
+diarias) de pendientes o (en la bitácora) las categorías usadas, así que
+se puede saber qué hay en un mes sin leerlo.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date
+from urllib.parse import quote
+
+import almacenamiento
+from configuracion import RUTA_FRAGMENTOS
+from registros import a_json, a_registro
+
+MANIFIESTO = "manifiesto.json"
+
+# Colecciones repartidas por mes (el mes sale de su campo "fecha")
+COLECCIONES_MENSUALES = ("diarias", "bitacora")
+
+# Fragmento de los registros sin fecha o con la fecha mal formada
+SIN_FECHA = "sin-fecha"
+
+FORMATO = 1
+
+_cerrojo = threading.RLock()
+# Secuencia del manifiesto que conoce este proceso, por directorio (ruta absoluta)
+_secuencias = {}
+# Fragmento en que está cada registro ya leído: directorio -> {(colección, id): fragmento}
+_ubicaciones = {}
+
+def clave_fragmento(registro):
+    """Fragmento ("AAAA-MM" o SIN_FECHA) al que pertenece una tarea diaria o entrada de bitácora"""
+    clave = (registro.get("fecha") or "")[:7]
+    if len(clave) == 7 and clave[4] == "-" and clave[:4].isdigit() and clave[5:].isdigit():
+        return clave
+    return SIN_FECHA
+
+def _manifiesto_vacio():
+    return {"formato": FORMATO, "secuencia": 0, "diarias": {}, "bitacora": {}, "proyectos": {}, "recurrentes": {}}
+
+def _ruta_manifiesto(ruta):
+    return os.path.join(ruta, MANIFIESTO)
+
+def _ruta_fragmento(ruta, coleccion, clave):
+    return os.path.join(ruta, coleccion, clave + ".jsonl")
+
+def _archivo_proyecto(nombre):
+    # Cualquier nombre de proyecto da un nombre de archivo válido y distinto
+    return "proyectos/" + quote(nombre, safe="") + ".json"
+
+def _leer_manifiesto(ruta):
+    try:
+        with open(_ruta_manifiesto(ruta), "r", encoding="utf-8") as file:
+            manifiesto = json.load(file)
+    except FileNotFoundError:
+        return _manifiesto_vacio()
+    # Los manifiestos anteriores a las tareas recurrentes no tienen la colección
+    manifiesto.setdefault("recurrentes", {})
+    return manifiesto
+
+def _leer_proyecto(ruta, archivo):
+    """Proyecto con sus tareas indexadas, o None si su archivo no llegó a escribirse"""
+    try:
+        with open(os.path.join(ruta, archivo), "r", encoding="utf-8") as file:
+            proyecto = json.load(file)
+    except FileNotFoundError:
+        return None
+    proyecto["tareas"], _ = almacenamiento.indexar_por_id(proyecto.get("tareas", []), "tareas_proyecto")
+    return proyecto
+
+def _leer_fragmento(ruta_archivo):
+    """Registros de un fragmento mensual; un fragmento que no existe está vacío"""
+    try:
+        with open(ruta_archivo, "rb") as file:
+            return [json.loads(linea) for linea in file if linea.strip()]
+    except FileNotFoundError:
+        return []
+
+def _anotar_ubicaciones(ruta, coleccion, clave, registros):
+    ubicaciones = _ubicaciones.setdefault(os.path.abspath(ruta), {})
+    for registro in registros:
+        ubicaciones[(coleccion, registro["id"])] = clave
+
+def _escribir_atomico(ruta_archivo, contenido, tipo="fragmento"):
+    """Escribe un archivo con temporal, fsync y renombrado; el directorio se sincroniza aparte"""
+    inicio = time.perf_counter()
+    os.makedirs(os.path.dirname(ruta_archivo), exist_ok=True)
+    temporal = ruta_archivo + ".tmp"
+    with open(temporal, "wb") as file:
+        file.write(contenido)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporal, ruta_archivo)
+    almacenamiento._notificar_escritura(tipo, ruta_archivo, len(contenido), inicio)
+
+def _codificar_fragmento(registros):
+    codificar = json.JSONEncoder(default=a_json).encode
+    return "".join(codificar(registro) + "\n" for registro in registros).encode()
+
+def _codificar_proyecto(proyecto):
+    return json.dumps(dict(proyecto, tareas=list(proyecto["tareas"].values())), default=a_json).encode()
+
+def _metadatos(coleccion, registros):
+    """Resumen de un fragmento que se guarda en el manifiesto"""
+    if coleccion == "diarias":
+        return {"registros": len(registros),
+                "pendientes": sum(1 for tarea in registros if not tarea.get("completada", False))}
+    return {"registros": len(registros), "categorias": sorted({entrada.get("categoria") or "" for entrada in registros})}
+
+class SeccionFragmentada(dict):
+    """
+    Tareas diarias o bitácora repartidas por mes, leídas cuando hacen falta
+
+    Se comporta como el diccionario id -> registro de la colección. Contiene
+    los registros de los fragmentos ya leídos (y los añadidos en memoria);
+    buscar un id que no está, recorrerla o contarla lee antes los que falten.
+    cargar_fragmentos() lee solo los meses pedidos y registros_cargados()
+    recorre lo ya leído sin leer nada más.
+
+    Las funciones de al_cargar reciben (colección, registros) cada vez que se
+    leen fragmentos nuevos, para que los índices derivados los incorporen.
+    """
+
+    def __init__(self, coleccion, metadatos, leer):
+        super().__init__()
+        self.coleccion = coleccion
+        self.al_cargar = []
+        self._metadatos = dict(metadatos)
+        self._sin_cargar = set(metadatos)
+        # Fragmentos de los registros añadidos en memoria que aún no están en el manifiesto
+        self._nuevos = set()
+        self._leer = leer
+        self._cerrojo_carga = threading.RLock()
+
+    @property
+    def completa(self):
+        """True cuando ya se han leído todos los fragmentos"""
+        return not self._sin_cargar
+
+    def fragmentos(self):
+        """Claves de todos los fragmentos ("AAAA-MM" o SIN_FECHA), leídos o no, ordenadas"""
+        return sorted(self._metadatos.keys() | self._nuevos)
+
+    def metadatos(self, clave):
+        """Resumen del fragmento en el manifiesto al cargar ({} si no estaba)"""
+        return self._metadatos.get(clave, {})
+
+    def cargado(self, clave):
+        return clave not in self._sin_cargar
+
+    def registros_cargados(self):
+        """Registros de los fragmentos ya leídos, sin leer ninguno más"""
+        return dict.values(self)
+
+    def cargar_fragmentos(self, claves):
+        """
+        Lee los fragmentos indicados que aún no se han leído
+
+        Un registro que ya está en memoria no se sustituye por el del disco:
+        el de memoria puede tener cambios que aún no se han escrito.
+
+        Returns:
+            Lista de registros leídos
+        """
+        with self._cerrojo_carga:
+            leidos = []
+            for clave in sorted(self._sin_cargar.intersection(claves)):
+                for registro in self._leer(clave):
+                    if not dict.__contains__(self, registro["id"]):
+                        registro = a_registro(self.coleccion, registro)
+                        dict.__setitem__(self, registro["id"], registro)
+                        leidos.append(registro)
+                self._sin_cargar.discard(clave)
+        if leidos:
+            for funcion in list(self.al_cargar):
+                funcion(self.coleccion, leidos)
+        return leidos
+
+    def materializar(self):
+        """Lee todos los fragmentos que faltan"""
+        if self._sin_cargar:
+            self.cargar_fragmentos(list(self._sin_cargar))
+
+    def __bool__(self):
+        if dict.__len__(self):
+            return True
+        return any(self._metadatos[clave].get("registros", 0) for clave in self._sin_cargar)
+
+    def __setitem__(self, clave, registro):
+        self._nuevos.add(clave_fragmento(registro))
+        dict.__setitem__(self, clave, registro)
+
+    def clear(self):
+        with self._cerrojo_carga:
+            self._sin_cargar.clear()
+            dict.clear(self)
+
+def _leyendo_si_falta(nombre):
+    metodo = getattr(dict, nombre)
+
+    def envoltura(self, clave, *args):
+        if self._sin_cargar and not dict.__contains__(self, clave):
+            self.materializar()
+        return metodo(self, clave, *args)
+    envoltura.__name__ = nombre
+    return envoltura
+
+def _leyendo_todo(nombre):
+    metodo = getattr(dict, nombre)
+
+    def envoltura(self, *args, **kwargs):
+        if self._sin_cargar:
+            self.materializar()
+        return metodo(self, *args, **kwargs)
+    envoltura.__name__ = nombre
+    return envoltura
+
+for _nombre in ("__getitem__", "__contains__", "__delitem__", "get", "pop"):
+    setattr(SeccionFragmentada, _nombre, _leyendo_si_falta(_nombre))
+for _nombre in ("__iter__", "__len__", "__eq__", "__ne__", "__repr__", "__reversed__", "keys", "values",
+                "items", "popitem", "setdefault", "copy"):
+    setattr(SeccionFragmentada, _nombre, _leyendo_todo(_nombre))
+
+def _fragmentos_iniciales(coleccion, metadatos, hoy):
+    """Fragmentos que se leen al cargar: el mes actual y, en las diarias, los meses con pendientes"""
+    iniciales = {hoy.strftime("%Y-%m")}
+    if coleccion == "diarias":
+        iniciales.update(clave for clave, resumen in metadatos.items() if resumen.get("pendientes"))
+    return iniciales
+
+def rutas_vigiladas(ruta=RUTA_FRAGMENTOS):
+    """Archivos cuyo cambio indica que los datos en disco han cambiado"""
+    # Toda modificación termina reescribiendo el manifiesto
+    return (_ruta_manifiesto(ruta),)
+
+def bloqueo(ruta=RUTA_FRAGMENTOS):
+    """Bloqueo exclusivo entre procesos sobre el directorio del journal"""
+    os.makedirs(ruta, exist_ok=True)
+    return almacenamiento.bloqueo(_ruta_manifiesto(ruta))
+
+def operaciones_nuevas(ruta=RUTA_FRAGMENTOS):
+    """
+    Los fragmentos no guardan las operaciones: si otro proceso ha escrito
+    (la secuencia del manifiesto no es la conocida), hay que recargar
+
+    Returns:
+        [] si nadie más ha escrito, o None (hay que recargar con cargar_datos)
+    """
+    with _cerrojo:
+        conocida = _secuencias.get(os.path.abspath(ruta))
+        return [] if conocida == _leer_manifiesto(ruta)["secuencia"] else None
+
+def cargar_datos(ruta=RUTA_FRAGMENTOS, hoy=None):
+    """
+    Carga el manifiesto, los proyectos y los fragmentos del mes actual
+
+    Las tareas diarias y la bitácora se devuelven como SeccionFragmentada;
+    de las diarias se leen también los meses con tareas pendientes, de modo
+    que todas las pendientes están siempre en memoria.
+
+    Args:
+        ruta: Directorio del journal
+        hoy: Fecha que decide el mes actual (por defecto, hoy)
+
+    Returns:
+        Diccionario con las tareas
+    """
+    hoy = hoy or date.today()
+    with _cerrojo:
+        manifiesto = _leer_manifiesto(ruta)
+        _secuencias[os.path.abspath(ruta)] = manifiesto["secuencia"]
+        datos = {"proyectos": {}}
+        # Las reglas recurrentes son pocas y pequeñas: viven en el propio manifiesto
+        datos["recurrentes"], _ = almacenamiento.indexar_por_id(dict(manifiesto["recurrentes"]), "recurrentes")
+        for nombre, archivo in manifiesto["proyectos"].items():
+            proyecto = _leer_proyecto(ruta, archivo)
+            if proyecto is not None:
+                datos["proyectos"][nombre] = proyecto
+    for coleccion in COLECCIONES_MENSUALES:
+        def leer(clave, coleccion=coleccion):
+            registros = _leer_fragmento(_ruta_fragmento(ruta, coleccion, clave))
+            with _cerrojo:
+                _anotar_ubicaciones(ruta, coleccion, clave, registros)
+            return registros
+
+        seccion = SeccionFragmentada(coleccion, manifiesto[coleccion], leer)
+        seccion.cargar_fragmentos(_fragmentos_iniciales(coleccion, manifiesto[coleccion], hoy))
+        datos[coleccion] = seccion
+    return datos
+
+class _Cambios:
+    """
+    Fragmentos y proyectos que modifica un lote de operaciones
+
+    Lee de disco solo los fragmentos que las operaciones tocan, les aplica
+    las operaciones y al final los escribe junto con el manifiesto.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.manifiesto = _leer_manifiesto(ruta)
+        self.ubicaciones = _ubicaciones.setdefault(os.path.abspath(ruta), {})
+        # (colección, fragmento) -> {id: registro}; solo se escriben los modificados
+        self.fragmentos = {}
+        self.modificados = set()
+        # nombre -> proyecto, o None si se elimina
+        self.proyectos = {}
+
+    def fragmento(self, coleccion, clave):
+        registros = self.fragmentos.get((coleccion, clave))
+        if registros is None:
+            leidos = _leer_fragmento(_ruta_fragmento(self.ruta, coleccion, clave))
+            _anotar_ubicaciones(self.ruta, coleccion, clave, leidos)
+            registros = self.fragmentos[(coleccion, clave)] = {
+                registro["id"]: a_registro(coleccion, registro) for registro in leidos}
+        return registros
+
+    def localizar(self, coleccion, id_registro):
+        """Fragmento que contiene el registro, o None si no existe"""
+        clave = self.ubicaciones.get((coleccion, id_registro))
+        if clave is not None and id_registro in self.fragmento(coleccion, clave):
+            return clave
+        # Ubicación desconocida o cambiada por otro proceso: se buscan los más recientes primero
+        for clave in sorted(self.manifiesto[coleccion].keys() | {c for col, c in self.fragmentos if col == coleccion},
+                            reverse=True):
+            if id_registro in self.fragmento(coleccion, clave):
+                return clave
+        return None
+
+    def proyecto(self, nombre):
+        if nombre not in self.proyectos:
+            archivo = self.manifiesto["proyectos"].get(nombre)
+            self.proyectos[nombre] = _leer_proyecto(self.ruta, archivo) if archivo is not None else None
+        return self.proyectos[nombre]
+
+    def aplicar(self, operacion):
+        coleccion = operacion["coleccion"]
+        op = operacion["op"]
+        if coleccion in COLECCIONES_MENSUALES:
+            self._aplicar_mensual(coleccion, op, operacion)
+        elif coleccion == "recurrentes":
+            # El manifiesto se reescribe siempre al final: basta con cambiarlo en él
+            reglas = self.manifiesto["recurrentes"]
+            if op == "anadir":
+                reglas[operacion["valor"]["id"]] = dict(operacion["valor"])
+            elif operacion["clave"] in reglas:
+                if op == "eliminar":
+                    del reglas[operacion["clave"]]
+                else:
+                    reglas[operacion["clave"]].update(operacion["valor"])
+        elif coleccion == "proyectos":
+            nombre = operacion["clave"]
+            if op == "anadir":
+                contenedor = {}
+                almacenamiento.aplicar_operacion({"proyectos": contenedor}, operacion)
+                self.proyectos[nombre] = contenedor[nombre]
+            elif self.proyecto(nombre) is not None:
+                if op == "eliminar":
+                    self.proyectos[nombre] = None
+                else:
+                    self.proyectos[nombre].update(operacion["valor"])
+        else:
+            proyecto = self.proyecto(operacion["proyecto"])
+            # Una operación sin destino (otro proceso lo eliminó) no cambia nada, como en memoria
+            if proyecto is not None and almacenamiento.operacion_aplicable({"proyectos": {operacion["proyecto"]: proyecto}},
+                                                                          operacion):
+                almacenamiento.aplicar_operacion({"proyectos": {operacion["proyecto"]: proyecto}}, operacion)
+
+    def _aplicar_mensual(self, coleccion, op, operacion):
+        if op == "anadir":
+            valor = operacion["valor"]
+            if "id" not in valor:
+                valor["id"] = almacenamiento.nuevo_id()
+            clave = clave_fragmento(valor)
+            self.fragmento(coleccion, clave)[valor["id"]] = a_registro(coleccion, valor)
+            self.modificados.add((coleccion, clave))
+            self.ubicaciones[(coleccion, valor["id"])] = clave
+            return
+        id_registro = operacion["clave"]
+        clave = self.localizar(coleccion, id_registro)
+        if clave is None:
+            return
+        registros = self.fragmento(coleccion, clave)
+        self.modificados.add((coleccion, clave))
+        if op == "eliminar":
+            del registros[id_registro]
+            self.ubicaciones.pop((coleccion, id_registro), None)
+            return
+        registro = registros[id_registro]
+        registro.update(operacion["valor"])
+        nueva = clave_fragmento(registro)
+        if nueva != clave:
+            # Al cambiar de mes, el registro pasa a otro fragmento
+            del registros[id_registro]
+            self.fragmento(coleccion, nueva)[id_registro] = registro
+            self.modificados.add((coleccion, nueva))
+            self.ubicaciones[(coleccion, id_registro)] = nueva
+
+    def escribir(self):
+        """Escribe los fragmentos y proyectos modificados y después el manifiesto"""
+        manifiesto = self.manifiesto
+        nuevos = [(coleccion, clave) for coleccion, clave in self.modificados
+                  if clave not in manifiesto[coleccion] and self.fragmentos[(coleccion, clave)]]
+        nuevos_proyectos = {nombre: _archivo_proyecto(nombre) for nombre, proyecto in self.proyectos.items()
+                            if proyecto is not None and nombre not in manifiesto["proyectos"]}
+        if nuevos or nuevos_proyectos:
+            # Los archivos nuevos se anuncian antes de escribirlos: si el proceso muere
+            # entre medias, el manifiesto apunta a un archivo que falta (un mes vacío)
+            # y no a datos escritos que nadie encuentra
+            for coleccion, clave in nuevos:
+                manifiesto[coleccion][clave] = {"registros": 0}
+            manifiesto["proyectos"].update(nuevos_proyectos)
+            self._escribir_manifiesto()
+        vaciados = []
+        escritos = []
+        for coleccion, clave in sorted(self.modificados):
+            registros = self.fragmentos[(coleccion, clave)]
+            ruta_archivo = _ruta_fragmento(self.ruta, coleccion, clave)
+            if registros:
+                _escribir_atomico(ruta_archivo, _codificar_fragmento(registros.values()))
+                escritos.append(ruta_archivo)
+                manifiesto[coleccion][clave] = _metadatos(coleccion, list(registros.values()))
+            elif clave in manifiesto[coleccion]:
+                del manifiesto[coleccion][clave]
+                vaciados.append(ruta_archivo)
+        for nombre, proyecto in self.proyectos.items():
+            if proyecto is not None:
+                ruta_archivo = os.path.join(self.ruta, manifiesto["proyectos"][nombre])
+                _escribir_atomico(ruta_archivo, _codificar_proyecto(proyecto))
+                escritos.append(ruta_archivo)
+            elif nombre in manifiesto["proyectos"]:
+                vaciados.append(os.path.join(self.ruta, manifiesto["proyectos"].pop(nombre)))
+        # Los renombrados son duraderos antes de que el manifiesto los dé por hechos
+        for ruta_archivo in {os.path.dirname(ruta): ruta for ruta in escritos}.values():
+            almacenamiento._sincronizar_directorio(ruta_archivo)
+        manifiesto["secuencia"] += 1
+        self._escribir_manifiesto()
+        # Los archivos vacíos se borran cuando el manifiesto ya no los menciona
+        for ruta_archivo in vaciados:
+            if os.path.exists(ruta_archivo):
+                os.remove(ruta_archivo)
+        _secuencias[os.path.abspath(self.ruta)] = manifiesto["secuencia"]
+
+    def _escribir_manifiesto(self):
+        ruta_manifiesto = _ruta_manifiesto(self.ruta)
+        _escribir_atomico(ruta_manifiesto, json.dumps(self.manifiesto, ensure_ascii=False).encode())
+        almacenamiento._sincronizar_directorio(ruta_manifiesto)
+
+def registrar_operacion(operacion, ruta=RUTA_FRAGMENTOS):
+    """
+    Aplica una operación sobre los fragmentos que toca
+
+    Args:
+        operacion: Operación creada con almacenamiento.nueva_operacion
+        ruta: Directorio del journal
+    """
+    registrar_operaciones([operacion], ruta)
+
+def registrar_operaciones(operaciones, ruta=RUTA_FRAGMENTOS):
+    """
+    Aplica un lote de operaciones y reescribe solo los fragmentos afectados
+
+    Cada archivo se sustituye de forma atómica y el manifiesto se escribe el
+    último; el coste depende del tamaño de los meses y proyectos tocados, no
+    del tamaño del journal.
+
+    Args:
+        operaciones: Lista de operaciones creadas con almacenamiento.nueva_operacion
+        ruta: Directorio del journal
+    """
+    if not operaciones:
+        return
+    with bloqueo(ruta), _cerrojo:
+        cambios = _Cambios(ruta)
+        for operacion in operaciones:
+            cambios.aplicar(operacion)
+        cambios.escribir()
+
+def guardar_datos(datos, ruta=RUTA_FRAGMENTOS):
+    """
+    Escribe todos los fragmentos a partir de los datos (lee antes los que falten)
+
+    Args:
+        datos: Diccionario con todas las tareas
+        ruta: Directorio del journal
+    """
+    with bloqueo(ruta), _cerrojo:
+        anterior = _leer_manifiesto(ruta)
+        cambios = _Cambios(ruta)
+        # Todos los fragmentos y proyectos anteriores se reescriben o se vacían
+        for coleccion in COLECCIONES_MENSUALES:
+            for clave in anterior[coleccion]:
+                cambios.fragmentos[(coleccion, clave)] = {}
+            for registro in datos[coleccion].values():
+                clave = clave_fragmento(registro)
+                cambios.fragmentos.setdefault((coleccion, clave), {})[registro["id"]] = registro
+        cambios.modificados.update(cambios.fragmentos)
+        for nombre in anterior["proyectos"]:
+            cambios.proyectos[nombre] = None
+        cambios.proyectos.update(datos["proyectos"])
+        cambios.manifiesto["recurrentes"] = {id_regla: dict(regla) for id_regla, regla in datos.get("recurrentes", {}).items()}
+        _ubicaciones.pop(os.path.abspath(ruta), None)
+        cambios.ubicaciones = _ubicaciones.setdefault(os.path.abspath(ruta), {})
+        for (coleccion, clave), registros in cambios.fragmentos.items():
+            _anotar_ubicaciones(ruta, coleccion, clave, registros.values())
+        cambios.escribir()
+
+def migrar_desde_json(ruta_json=almacenamiento.RUTA_DATOS, ruta_log=almacenamiento.RUTA_LOG, ruta=RUTA_FRAGMENTOS):
+    """
+    Reparte de una vez tareas.json (y su registro de cambios) en fragmentos
+
+    Returns:
+        Diccionario migrado
+    """
+    datos = almacenamiento.cargar_datos(ruta_json, ruta_log)
+    guardar_datos(datos, ruta)
+    return datos
+
+if __name__ == "__main__":
+    # python almacen_fragmentos.py migrar [tareas.json] [tareas.d]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrar":
+        print("Uso: python almacen_fragmentos.py migrar [ruta_json] [directorio]")
+        sys.exit(1)
+    ruta_json = sys.argv[2] if len(sys.argv) > 2 else almacenamiento.RUTA_DATOS
+    ruta_fragmentos = sys.argv[3] if len(sys.argv) > 3 else RUTA_FRAGMENTOS
+    datos = migrar_desde_json(ruta_json, almacenamiento.RUTA_LOG, ruta_fragmentos)
+    print(f"Migradas {len(datos['diarias'])} tareas diarias, {len(datos['proyectos'])} proyectos "
+          f"y {len(datos['bitacora'])} entradas de bitácora a {ruta_fragmentos}")
@@ -0,0 +1,470 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+import almacenamiento
+from configuracion import RUTA_SQLITE
+from registros import a_registro
+
+# Columnas de cada tabla; los campos que no aparecen aquí se guardan en "extra".
+# La columna "uid" guarda el campo "id" de los registros ("id" es la clave de la fila)
+COLUMNAS = {
+    "diarias": ("uid", "descripcion", "fecha", "completada", "tipo"),
+    "proyectos": ("progreso", "fecha_creacion", "fecha_limite"),
+    "tareas_proyecto": ("uid", "descripcion", "fecha_creacion", "fecha_limite", "completada", "prioridad", "tipo"),
+    "bitacora": ("uid", "titulo", "contenido", "fecha", "categoria", "tarea_relacionada", "editado"),
+    "recurrentes": ("uid", "descripcion", "regla", "inicio"),
+}
+
+# Tablas cuyos registros se direccionan por id
+TABLAS_CON_ID = ("diarias", "tareas_proyecto", "bitacora", "recurrentes")
+
+# Columnas que solo existen en algunos registros (NULL = campo ausente)
+OPCIONALES = {"editado"}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS diarias (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid TEXT, descripcion TEXT, fecha TEXT, completada INTEGER, tipo TEXT, extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_diarias_fecha ON diarias(fecha);
+CREATE INDEX IF NOT EXISTS idx_diarias_completada ON diarias(completada, fecha);
+
+CREATE TABLE IF NOT EXISTS proyectos (
+    nombre TEXT PRIMARY KEY,
+    progreso REAL, fecha_creacion TEXT, fecha_limite TEXT, extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_proyectos_fecha_limite ON proyectos(fecha_limite);
+
+CREATE TABLE IF NOT EXISTS tareas_proyecto (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    proyecto TEXT NOT NULL, uid TEXT,
+    descripcion TEXT, fecha_creacion TEXT, fecha_limite TEXT, completada INTEGER,
+    prioridad TEXT, tipo TEXT, extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tareas_proyecto ON tareas_proyecto(proyecto, completada);
+CREATE INDEX IF NOT EXISTS idx_tareas_proyecto_fecha ON tareas_proyecto(fecha_limite);
+
+CREATE TABLE IF NOT EXISTS bitacora (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid TEXT, titulo TEXT, contenido TEXT, fecha TEXT, categoria TEXT,
+    tarea_relacionada TEXT, editado TEXT, extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bitacora_categoria ON bitacora(categoria, fecha);
+CREATE INDEX IF NOT EXISTS idx_bitacora_fecha ON bitacora(fecha);
+
+CREATE TABLE IF NOT EXISTS recurrentes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid TEXT, descripcion TEXT, regla TEXT, inicio TEXT, extra TEXT
+);
+"""
+
+# Una conexión por base de datos, compartida por los hilos del proceso
+_cerrojo = threading.Lock()
+_conexiones = {}
+
+# Tamaño de la cabecera del WAL y de la de cada marco (https://www.sqlite.org/fileformat.html#the_write_ahead_log)
+_CABECERA_WAL = 32
+_CABECERA_MARCO = 24
+# Último final del WAL leído por base de datos: ruta -> (sales de la cabecera, posición)
+_finales_wal = {}
+
+def _conexion(ruta):
+    with _cerrojo:
+        if ruta not in _conexiones:
+            conexion = sqlite3.connect(ruta, check_same_thread=False)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.executescript(ESQUEMA)
+            _migrar_ids(conexion)
+            _conexiones[ruta] = conexion
+        return _conexiones[ruta]
+
+def _migrar_ids(conexion):
+    """Añade la columna uid a las bases de datos antiguas y asigna ids a las filas sin él"""
+    with conexion:
+        for tabla in TABLAS_CON_ID:
+            columnas = [fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")]
+            if "uid" not in columnas:
+                conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN uid TEXT")
+            conexion.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{tabla}_uid ON {tabla}(uid)")
+            sin_id = [fila[0] for fila in conexion.execute(f"SELECT id FROM {tabla} WHERE uid IS NULL")]
+            conexion.executemany(f"UPDATE {tabla} SET uid = ? WHERE id = ?",
+                                 [(almacenamiento.nuevo_id(), id_fila) for id_fila in sin_id])
+
+def _fin_wal(ruta, conocido=None):
+    """
+    Sales de la cabecera del WAL y posición tras su último marco válido
+
+    Los marcos escritos desde que se reinició el WAL llevan sus mismas sales.
+
+    Args:
+        ruta: Ruta de la base de datos
+        conocido: (sales, posición) de una lectura anterior; si el WAL no se ha reiniciado se sigue desde ahí
+    """
+    try:
+        with open(ruta + "-wal", "rb") as file:
+            cabecera = file.read(_CABECERA_WAL)
+            if len(cabecera) < _CABECERA_WAL:
+                return None, 0
+            tamano_marco = _CABECERA_MARCO + int.from_bytes(cabecera[8:12], "big")
+            sales = cabecera[16:24]
+            posicion = conocido[1] if conocido is not None and conocido[0] == sales else _CABECERA_WAL
+            while True:
+                file.seek(posicion)
+                marco = file.read(_CABECERA_MARCO)
+                if len(marco) < _CABECERA_MARCO or marco[8:16] != sales:
+                    return sales, posicion
+                posicion += tamano_marco
+    except FileNotFoundError:
+        return None, 0
+
+def _antes_de_escribir(ruta):
+    """Final del WAL antes de una transacción, o None si nadie observa las escrituras"""
+    if not almacenamiento.observadores_escritura:
+        return None
+    return _fin_wal(ruta, _finales_wal.get(ruta))
+
+def _notificar_escritura(ruta, antes, inicio):
+    """Avisa a almacenamiento.observadores_escritura de los bytes que la transacción añadió al WAL"""
+    if antes is None:
+        return
+    final = _finales_wal[ruta] = _fin_wal(ruta, antes)
+    # Si el WAL se reinició (sales nuevas), la transacción lo escribió desde el principio
+    tamano = final[1] - antes[1] if final[0] == antes[0] else final[1]
+    almacenamiento._notificar_escritura("sqlite", ruta, tamano, inicio)
+
+def rutas_vigiladas(ruta=RUTA_SQLITE):
+    """Archivos cuyo cambio indica que los datos en disco han cambiado"""
+    return (ruta, ruta + "-wal")
+
+def bloqueo(ruta=RUTA_SQLITE):
+    """
+    Bloqueo exclusivo entre procesos para los ciclos leer-modificar-escribir
+
+    SQLite ya serializa cada escritura; este bloqueo cubre además la
+    lectura previa del almacén compartido (por ejemplo, recalcular los
+    contadores de un proyecto a partir del estado más reciente).
+    """
+    return almacenamiento.bloqueo(ruta)
+
+def operaciones_nuevas(ruta=RUTA_SQLITE):
+    """
+    SQLite no guarda un registro de operaciones que leer: los cambios de
+    otros procesos siempre se incorporan recargando
+
+    Returns:
+        None (hay que recargar con cargar_datos)
+    """
+    return None
+
+def _a_fila(tabla, registro):
+    """Convierte un registro en los valores de sus columnas más el JSON de extras"""
+    valores = []
+    for columna in COLUMNAS[tabla]:
+        valor = registro.get("id" if columna == "uid" else columna)
+        if columna == "completada" and valor is not None:
+            valor = int(valor)
+        valores.append(valor)
+    extra = {k: v for k, v in registro.items() if k not in COLUMNAS[tabla] and k not in ("id", "tareas")}
+    valores.append(json.dumps(extra) if extra else None)
+    return valores
+
+def _a_registro(tabla, fila):
+    """Inverso de _a_fila: reconstruye el diccionario con el esquema de tareas.json"""
+    registro = {}
+    for columna, valor in zip(COLUMNAS[tabla], fila):
+        if valor is None and columna in OPCIONALES:
+            continue
+        if columna == "completada" and valor is not None:
+            valor = bool(valor)
+        registro["id" if columna == "uid" else columna] = valor
+    extra = fila[len(COLUMNAS[tabla])]
+    if extra:
+        registro.update(json.loads(extra))
+    return registro
+
+def _insertar(conexion, tabla, registro, clave=None):
+    columnas = COLUMNAS[tabla] + ("extra",)
+    valores = _a_fila(tabla, registro)
+    if tabla == "proyectos":
+        columnas = ("nombre",) + columnas
+        valores = [clave] + valores
+    elif tabla == "tareas_proyecto":
+        columnas = ("proyecto",) + columnas
+        valores = [clave] + valores
+    conexion.execute(
+        f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+        valores
+    )
+
+def _id_fila(conexion, operacion):
+    """Traduce el id (o el índice posicional de los registros antiguos) al id de la fila"""
+    if not isinstance(operacion["clave"], int):
+        fila = conexion.execute(
+            f"SELECT id FROM {operacion['coleccion']} WHERE uid = ?", (operacion["clave"],)
+        ).fetchone()
+        if fila is None:
+            raise KeyError(f"No existe el registro {operacion['clave']} en {operacion['coleccion']}")
+        return fila[0]
+    if operacion["coleccion"] == "tareas_proyecto":
+        fila = conexion.execute(
+            "SELECT id FROM tareas_proyecto WHERE proyecto = ? ORDER BY id LIMIT 1 OFFSET ?",
+            (operacion["proyecto"], operacion["clave"])
+        ).fetchone()
+    else:
+        fila = conexion.execute(
+            f"SELECT id FROM {operacion['coleccion']} ORDER BY id LIMIT 1 OFFSET ?",
+            (operacion["clave"],)
+        ).fetchone()
+    if fila is None:
+        raise IndexError(f"No existe el registro {operacion['clave']} en {operacion['coleccion']}")
+    return fila[0]
+
+def _actualizar(conexion, tabla, condicion, parametros, cambios):
+    columnas = [c for c in cambios if c in COLUMNAS[tabla]]
+    extra = {k: v for k, v in cambios.items() if k not in COLUMNAS[tabla]}
+    if columnas:
+        valores = [int(cambios[c]) if c == "completada" else cambios[c] for c in columnas]
+        conexion.execute(
+            f"UPDATE {tabla} SET {', '.join(c + ' = ?' for c in columnas)} WHERE {condicion}",
+            valores + list(parametros)
+        )
+    if extra:
+        fila = conexion.execute(f"SELECT extra FROM {tabla} WHERE {condicion}", parametros).fetchone()
+        actual = json.loads(fila[0]) if fila and fila[0] else {}
+        actual.update(extra)
+        conexion.execute(f"UPDATE {tabla} SET extra = ? WHERE {condicion}", [json.dumps(actual)] + list(parametros))
+
+def registrar_operacion(operacion, ruta=RUTA_SQLITE):
+    """
+    Traduce una operación del registro de cambios a SQL
+
+    Args:
+        operacion: Operación creada con almacenamiento.nueva_operacion
+        ruta: Ruta de la base de datos
+    """
+    registrar_operaciones([operacion], ruta)
+
+def registrar_operaciones(operaciones, ruta=RUTA_SQLITE):
+    """
+    Traduce un lote de operaciones a SQL en una sola transacción
+
+    Args:
+        operaciones: Lista de operaciones creadas con almacenamiento.nueva_operacion
+        ruta: Ruta de la base de datos
+    """
+    conexion = _conexion(ruta)
+    inicio = time.perf_counter()
+    antes = _antes_de_escribir(ruta)
+    with _cerrojo, conexion:
+        for operacion in operaciones:
+            _ejecutar(conexion, operacion)
+    _notificar_escritura(ruta, antes, inicio)
+
+def _ejecutar(conexion, operacion):
+    tabla = operacion["coleccion"]
+    op = operacion["op"]
+    if tabla == "proyectos":
+        nombre = operacion["clave"]
+        if op == "anadir":
+            _insertar(conexion, "proyectos", operacion["valor"], nombre)
+            for tarea in operacion["valor"].get("tareas", {}).values():
+                _insertar(conexion, "tareas_proyecto", tarea, nombre)
+        elif op == "actualizar":
+            _actualizar(conexion, "proyectos", "nombre = ?", (nombre,), operacion["valor"])
+        elif op == "eliminar":
+            conexion.execute("DELETE FROM tareas_proyecto WHERE proyecto = ?", (nombre,))
+            conexion.execute("DELETE FROM proyectos WHERE nombre = ?", (nombre,))
+        return
+    if op == "anadir":
+        _insertar(conexion, tabla, operacion["valor"], operacion.get("proyecto"))
+        return
+    id_fila = _id_fila(conexion, operacion)
+    if op == "actualizar":
+        _actualizar(conexion, tabla, "id = ?", (id_fila,), operacion["valor"])
+    elif op == "eliminar":
+        conexion.execute(f"DELETE FROM {tabla} WHERE id = ?", (id_fila,))
+    else:
+        raise ValueError(f"Operación desconocida: {op}")
+
+def cargar_datos(ruta=RUTA_SQLITE):
+    """
+    Carga todas las tareas desde SQLite con el esquema de tareas.json
+
+    Args:
+        ruta: Ruta de la base de datos
+
+    Returns:
+        Diccionario con todas las tareas
+    """
+    conexion = _conexion(ruta)
+    datos = almacenamiento.estructura_vacia()
+    with _cerrojo:
+        for fila in conexion.execute(f"SELECT {', '.join(COLUMNAS['diarias'])}, extra FROM diarias ORDER BY id"):
+            tarea = a_registro("diarias", _a_registro("diarias", fila))
+            datos["diarias"][tarea["id"]] = tarea
+        for fila in conexion.execute(f"SELECT nombre, {', '.join(COLUMNAS['proyectos'])}, extra FROM proyectos ORDER BY rowid"):
+            proyecto = {"tareas": {}}
+            proyecto.update(_a_registro("proyectos", fila[1:]))
+            datos["proyectos"][fila[0]] = proyecto
+        for fila in conexion.execute(f"SELECT proyecto, {', '.join(COLUMNAS['tareas_proyecto'])}, extra FROM tareas_proyecto ORDER BY id"):
+            if fila[0] in datos["proyectos"]:
+                tarea = a_registro("tareas_proyecto", _a_registro("tareas_proyecto", fila[1:]))
+                datos["proyectos"][fila[0]]["tareas"][tarea["id"]] = tarea
+        for fila in conexion.execute(f"SELECT {', '.join(COLUMNAS['bitacora'])}, extra FROM bitacora ORDER BY id"):
+            entrada = a_registro("bitacora", _a_registro("bitacora", fila))
+            datos["bitacora"][entrada["id"]] = entrada
+        for fila in conexion.execute(f"SELECT {', '.join(COLUMNAS['recurrentes'])}, extra FROM recurrentes ORDER BY id"):
+            regla = a_registro("recurrentes", _a_registro("recurrentes", fila))
+            datos["recurrentes"][regla["id"]] = regla
+    return datos
+
+def guardar_datos(datos, ruta=RUTA_SQLITE):
+    """
+    Sustituye todo el contenido de la base de datos en una sola transacción
+
+    Args:
+        datos: Diccionario con todas las tareas
+        ruta: Ruta de la base de datos
+    """
+    conexion = _conexion(ruta)
+    inicio = time.perf_counter()
+    antes = _antes_de_escribir(ruta)
+    with _cerrojo, conexion:
+        for tabla in COLUMNAS:
+            conexion.execute(f"DELETE FROM {tabla}")
+        for tarea in datos["diarias"].values():
+            _insertar(conexion, "diarias", tarea)
+        for nombre, proyecto in datos["proyectos"].items():
+            _insertar(conexion, "proyectos", proyecto, nombre)
+            for tarea in proyecto["tareas"].values():
+                _insertar(conexion, "tareas_proyecto", tarea, nombre)
+        for entrada in datos["bitacora"].values():
+            _insertar(conexion, "bitacora", entrada)
+        for regla in datos.get("recurrentes", {}).values():
+            _insertar(conexion, "recurrentes", regla)
+    _notificar_escritura(ruta, antes, inicio)
+
+def _rango_mes(mes, anio):
+    inicio = f"{anio:04d}-{mes:02d}-01"
+    fin = f"{anio + 1:04d}-01-01" if mes == 12 else f"{anio:04d}-{mes + 1:02d}-01"
+    return inicio, fin
+
+def tareas_del_mes(mes, anio, ruta=RUTA_SQLITE):
+    """
+    Equivalente indexado de calendario.recopilar_tareas_del_mes
+
+    Cada tabla se consulta por rango de fechas sobre su índice, así que el
+    coste depende de lo que contiene el mes y no de todo el historial.
+
+    Args:
+        mes: Número del mes (1-12)
+        anio: Año
+        ruta: Ruta de la base de datos
+
+    Returns:
+        Diccionario con las tareas organizadas por día del mes
+    """
+    conexion = _conexion(ruta)
+    inicio, fin = _rango_mes(mes, anio)
+    tareas_del_mes = {}
+
+    def agregar(fecha, tarea):
+        tareas_del_mes.setdefault(int(fecha[8:10]), []).append(tarea)
+
+    with _cerrojo:
+        for fecha, descripcion, completada in conexion.execute(
+                "SELECT fecha, descripcion, completada FROM diarias WHERE fecha >= ? AND fecha < ? ORDER BY id",
+                (inicio, fin)):
+            agregar(fecha, {"descripcion": descripcion, "tipo": "diaria", "completada": bool(completada)})
+        for nombre, fecha in conexion.execute(
+                "SELECT nombre, fecha_limite FROM proyectos WHERE fecha_limite >= ? AND fecha_limite < ?",
+                (inicio, fin)):
+            agregar(fecha, {"descripcion": f"Fecha límite: {nombre}", "tipo": "deadline-proyecto", "completada": False})
+        for proyecto, fecha, descripcion, prioridad, completada in conexion.execute(
+                "SELECT proyecto, fecha_limite, descripcion, prioridad, completada FROM tareas_proyecto "
+                "WHERE fecha_limite >= ? AND fecha_limite < ? ORDER BY id", (inicio, fin)):
+            agregar(fecha, {
+                "descripcion": f"{descripcion} ({proyecto})",
+                "tipo": f"tarea-proyecto: {prioridad}",
+                "completada": bool(completada)
+            })
+        for fecha, titulo in conexion.execute(
+                "SELECT fecha, titulo FROM bitacora WHERE fecha >= ? AND fecha < ? ORDER BY id", (inicio, fin)):
+            agregar(fecha, {"descripcion": f"Nota: {titulo}", "tipo": "bitacora", "completada": False})
+    return tareas_del_mes
+
+def categorias_bitacora(ruta=RUTA_SQLITE):
+    """Devuelve las categorías usadas en la bitácora (consulta sobre el índice)"""
+    conexion = _conexion(ruta)
+    with _cerrojo:
+        return [fila[0] for fila in conexion.execute("SELECT DISTINCT categoria FROM bitacora ORDER BY categoria")]
+
+def entradas_bitacora(categoria=None, recientes_primero=True, ruta=RUTA_SQLITE):
+    """
+    Devuelve las entradas de la bitácora filtradas por categoría y ordenadas por fecha
+
+    Args:
+        categoria: Categoría a filtrar (None para todas)
+        recientes_primero: Orden descendente por fecha
+        ruta: Ruta de la base de datos
+
+    Returns:
+        Lista de entradas con el esquema de tareas.json
+    """
+    conexion = _conexion(ruta)
+    orden = "DESC" if recientes_primero else "ASC"
+    consulta = f"SELECT {', '.join(COLUMNAS['bitacora'])}, extra FROM bitacora"
+    parametros = ()
+    if categoria is not None:
+        consulta += " WHERE categoria = ?"
+        parametros = (categoria,)
+    consulta += f" ORDER BY fecha {orden}"
+    with _cerrojo:
+        return [_a_registro("bitacora", fila) for fila in conexion.execute(consulta, parametros)]
+
+def tareas_proyecto(proyecto, completada=None, ruta=RUTA_SQLITE):
+    """
+    Devuelve las tareas de un proyecto filtradas por estado
+
+    Args:
+        proyecto: Nombre del proyecto
+        completada: True/False para filtrar por estado, None para todas
+        ruta: Ruta de la base de datos
+
+    Returns:
+        Lista de tareas con el esquema de tareas.json
+    """
+    conexion = _conexion(ruta)
+    consulta = f"SELECT {', '.join(COLUMNAS['tareas_proyecto'])}, extra FROM tareas_proyecto WHERE proyecto = ?"
+    parametros = (proyecto,)
+    if completada is not None:
+        consulta += " AND completada = ?"
+        parametros += (int(completada),)
+    consulta += " ORDER BY id"
+    with _cerrojo:
+        return [_a_registro("tareas_proyecto", fila) for fila in conexion.execute(consulta, parametros)]
+
+def migrar_desde_json(ruta_json=almacenamiento.RUTA_DATOS, ruta_log=almacenamiento.RUTA_LOG, ruta=RUTA_SQLITE):
+    """
+    Migra de una vez tareas.json (y su registro de cambios) a SQLite
+
+    Returns:
+        Diccionario migrado
+    """
+    datos = almacenamiento.cargar_datos(ruta_json, ruta_log)
+    guardar_datos(datos, ruta)
+    return datos
+
+if __name__ == "__main__":
+    # python almacen_sqlite.py migrar [tareas.json] [tareas.db]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrar":
+        print("Uso: python almacen_sqlite.py migrar [ruta_json] [ruta_sqlite]")
+        sys.exit(1)
+    ruta_json = sys.argv[2] if len(sys.argv) > 2 else almacenamiento.RUTA_DATOS
+    ruta_sqlite = sys.argv[3] if len(sys.argv) > 3 else RUTA_SQLITE
+    datos = migrar_desde_json(ruta_json, almacenamiento.RUTA_LOG, ruta_sqlite)
+    print(f"Migradas {len(datos['diarias'])} tareas diarias, {len(datos['proyectos'])} proyectos "
+          f"y {len(datos['bitacora'])} entradas de bitácora a {ruta_sqlite}")
@@ -0,0 +1,1014 @@
+import contextlib
+import itertools
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: bloqueo de rango con msvcrt
+    fcntl = None
+    import msvcrt
+
+from lector_json import LectorJSON, elementos_por_lineas
+from registros import a_json, a_registro
+
+# Rutas por defecto de la instantánea completa y del registro de cambios
+RUTA_DATOS = "tareas.json"
+RUTA_LOG = "tareas.log"
+
+# Tamaño (en bytes) a partir del cual el registro se compacta en segundo plano
+UMBRAL_COMPACTACION = 1024 * 1024
+
+# Sufijo del registro que se está compactando
+SUFIJO_COMPACTANDO = ".compactando"
+
+# Sufijo del índice de secciones de la instantánea (posición de cada sección en bytes)
+SUFIJO_INDICE = ".indice"
+
+# Secciones que se decodifican la primera vez que se usan y no al cargar
+SECCIONES_DIFERIDAS = ("diarias", "bitacora")
+
+# Sufijo del archivo que bloquean los procesos que escriben en el mismo directorio de datos
+SUFIJO_BLOQUEO = ".lock"
+
+# Estado del registro compartido por todas las escrituras del proceso
+_cerrojo = threading.Lock()
+_secuencia = 0
+_secuencia_instantanea = 0
+_hilo_compactacion = None
+
+# Funciones a las que se avisa de cada escritura: fn(tipo, ruta, bytes, segundos),
+# con tipo "instantanea" o "registro" (instrumentacion.py mide así los bytes por guardado)
+observadores_escritura = []
+_lineas_pendientes = []
+_tamano_log = 0
+
+# Versión en disco que conoce este proceso: la secuencia es la versión y la
+# posición indica hasta dónde se ha leído (o escrito) el registro actual.
+# Corresponde a un único journal (ruta absoluta de la instantánea)
+_ruta_version = None
+_posicion_log = 0
+_identidad_log = None
+_firma_instantanea = None
+# Se han incorporado a la versión cambios ajenos que nadie ha aplicado en memoria
+_desincronizado = False
+
+class ConflictoVersion(RuntimeError):
+    """Otro proceso ha sustituido la instantánea: hay que recargar antes de escribir"""
+
+# Bloqueos entre procesos abiertos por este proceso: ruta -> [archivo, usos]
+_bloqueos = {}
+_cerrojo_bloqueos = threading.Lock()
+
+def _bloquear(archivo):
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+        return
+    archivo.seek(0)
+    while True:
+        try:
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK se rinde tras diez segundos; se sigue esperando
+            continue
+
+def _desbloquear(archivo):
+    if fcntl is not None:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+    else:
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextlib.contextmanager
+def bloqueo(ruta_datos=RUTA_DATOS):
+    """
+    Bloqueo exclusivo entre procesos sobre los archivos del journal
+
+    Se toma sobre un archivo .lock junto a la instantánea, así que lo
+    respetan todos los procesos que comparten el directorio de datos. Los
+    hilos de un mismo proceso lo comparten (entre ellos se coordinan con
+    los cerrojos del módulo) y se puede anidar.
+
+    Args:
+        ruta_datos: Ruta de la instantánea cuyo journal se bloquea
+    """
+    ruta = os.path.abspath(ruta_datos + SUFIJO_BLOQUEO)
+    with _cerrojo_bloqueos:
+        estado = _bloqueos.get(ruta)
+        if estado is None:
+            archivo = open(ruta, "a+b")
+            try:
+                _bloquear(archivo)
+            except BaseException:
+                archivo.close()
+                raise
+            estado = _bloqueos[ruta] = [archivo, 0]
+        estado[1] += 1
+    try:
+        yield
+    finally:
+        with _cerrojo_bloqueos:
+            estado[1] -= 1
+            if estado[1] == 0:
+                del _bloqueos[ruta]
+                try:
+                    _desbloquear(estado[0])
+                finally:
+                    estado[0].close()
+
+class _EscrituraAgrupada:
+    """
+    Agrupa solicitudes de escritura concurrentes en una sola escritura duradera
+
+    El primer hilo que llega ejecuta la escritura; los que llegan mientras
+    tanto esperan y son atendidos juntos por la siguiente. Cada llamada
+    vuelve cuando una escritura iniciada después de su solicitud ha terminado.
+    """
+
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._solicitadas = 0
+        self._completadas = 0
+        self._escribiendo = False
+
+    def solicitar(self, escribir):
+        with self._condicion:
+            self._solicitadas += 1
+            turno = self._solicitadas
+            while self._completadas < turno:
+                if self._escribiendo:
+                    self._condicion.wait()
+                    continue
+                self._escribiendo = True
+                objetivo = self._solicitadas
+                self._condicion.release()
+                try:
+                    escribir()
+                finally:
+                    self._condicion.acquire()
+                    self._escribiendo = False
+                    self._condicion.notify_all()
+                self._completadas = objetivo
+
+_escritura_log = _EscrituraAgrupada()
+_escritura_instantanea = _EscrituraAgrupada()
+_instantanea_pendiente = None
+
+def rutas_vigiladas(ruta_datos=RUTA_DATOS, ruta_log=RUTA_LOG):
+    """Archivos cuyo cambio indica que los datos en disco han cambiado"""
+    return (ruta_datos, ruta_log, ruta_log + SUFIJO_COMPACTANDO)
+
+def estructura_vacia():
+    """Devuelve la estructura de datos vacía del bullet journal"""
+    return {"diarias": {}, "proyectos": {}, "bitacora": {}, "recurrentes": {}}
+
+def nuevo_id():
+    """Genera el identificador estable de un registro"""
+    # Lo mismo que secrets.token_hex(8), sin importar secrets (hmac, hashlib, random) al arrancar
+    return os.urandom(8).hex()
+
+def id_determinista(*partes):
+    """
+    Id de un registro antiguo que no tenía
+
+    Depende solo de dónde está el registro (colección, proyecto, posición en
+    el archivo o secuencia del registro de cambios), así que todos los
+    procesos que leen el mismo archivo le dan el mismo id sin tener que
+    reescribirlo: basta con que el id se guarde con el siguiente cambio.
+    """
+    # Solo se usa con archivos antiguos: hashlib no se importa al arrancar
+    import hashlib
+    return hashlib.blake2b("\0".join(map(str, partes)).encode(), digest_size=8).hexdigest()
+
+def indexar_por_id(registros, coleccion, contexto=""):
+    """
+    Convierte una lista de registros (esquema de tareas.json) en un diccionario id -> registro
+
+    En memoria cada colección es un diccionario ordenado por inserción, de
+    modo que buscar, actualizar y eliminar por id cuesta O(1), y cada
+    registro es el registro compacto de su colección (registros.py). Los
+    registros antiguos sin id reciben uno según su posición (id_determinista).
+
+    Args:
+        registros: Lista de registros, o diccionario id -> registro
+        coleccion: "diarias", "tareas_proyecto", "bitacora" o "recurrentes"
+        contexto: Lo que distingue la lista dentro de la colección (el nombre del proyecto)
+
+    Returns:
+        Tupla (diccionario, número de ids asignados)
+    """
+    if isinstance(registros, SeccionDiferida):
+        return registros, 0
+    if isinstance(registros, dict):
+        for clave, registro in registros.items():
+            registros[clave] = a_registro(coleccion, registro)
+        return registros, 0
+    por_id = {}
+    asignados = 0
+    for posicion, registro in enumerate(registros):
+        if "id" not in registro:
+            registro["id"] = id_determinista(coleccion, contexto, posicion)
+            asignados += 1
+        por_id[registro["id"]] = a_registro(coleccion, registro)
+    return por_id, asignados
+
+def _indexar_proyecto(proyecto, nombre=""):
+    proyecto["tareas"], asignados = indexar_por_id(proyecto.get("tareas", []), "tareas_proyecto", nombre)
+    return asignados
+
+def indexar_datos(datos):
+    """
+    Pasa todas las colecciones de listas a diccionarios indexados por id
+
+    Returns:
+        Número de ids asignados a registros que no tenían
+    """
+    datos["diarias"], asignados_diarias = indexar_por_id(datos.get("diarias", []), "diarias")
+    datos["bitacora"], asignados_bitacora = indexar_por_id(datos.get("bitacora", []), "bitacora")
+    # Los archivos anteriores a las tareas recurrentes no tienen la colección
+    datos["recurrentes"], _ = indexar_por_id(datos.get("recurrentes", []), "recurrentes")
+    datos.setdefault("proyectos", {})
+    asignados = asignados_diarias + asignados_bitacora
+    for nombre, proyecto in datos["proyectos"].items():
+        asignados += _indexar_proyecto(proyecto, nombre)
+    return asignados
+
+def nueva_operacion(op, coleccion, clave=None, valor=None, proyecto=None):
+    """
+    Construye una operación del registro de cambios
+
+    Args:
+        op: "anadir", "actualizar" o "eliminar"
+        coleccion: "diarias", "bitacora", "proyectos", "tareas_proyecto" o "recurrentes"
+        clave: Id del registro (o nombre, para "proyectos")
+        valor: Registro nuevo ("anadir") o campos modificados ("actualizar")
+        proyecto: Proyecto al que pertenece la tarea (solo "tareas_proyecto")
+
+    Returns:
+        Diccionario serializable con la operación
+    """
+    operacion = {"op": op, "coleccion": coleccion}
+    if clave is not None:
+        operacion["clave"] = clave
+    if valor is not None:
+        operacion["valor"] = valor
+    if proyecto is not None:
+        operacion["proyecto"] = proyecto
+    return operacion
+
+def calcular_progreso(completadas, total):
+    """Porcentaje de tareas completadas, redondeado a un decimal"""
+    return round((completadas / total) * 100, 1) if total > 0 else 0
+
+def cambios_contadores(proyecto, delta_completadas=0, delta_total=0):
+    """
+    Campos a actualizar en un proyecto al añadir, completar o eliminar una tarea
+
+    Los contadores se ajustan en O(1) en lugar de recorrer todas las tareas.
+
+    Args:
+        proyecto: Diccionario del proyecto
+        delta_completadas: Variación de tareas completadas
+        delta_total: Variación del número de tareas
+
+    Returns:
+        Diccionario con "completadas", "total" y "progreso"
+    """
+    completadas = proyecto.get("completadas", 0) + delta_completadas
+    total = proyecto.get("total", 0) + delta_total
+    return {"completadas": completadas, "total": total, "progreso": calcular_progreso(completadas, total)}
+
+def reconstruir_contadores(datos):
+    """
+    Recalcula los contadores de todos los proyectos a partir de sus tareas
+
+    Se ejecuta al cargar los datos para corregir contadores ausentes (archivos
+    antiguos) o inconsistentes.
+
+    Returns:
+        Lista de proyectos cuyos contadores se han corregido
+    """
+    corregidos = []
+    for nombre, proyecto in datos["proyectos"].items():
+        completadas = sum(1 for tarea in proyecto["tareas"].values() if tarea.get("completada", False))
+        total = len(proyecto["tareas"])
+        if proyecto.get("completadas") != completadas or proyecto.get("total") != total:
+            corregidos.append(nombre)
+        proyecto["completadas"] = completadas
+        proyecto["total"] = total
+        proyecto["progreso"] = calcular_progreso(completadas, total)
+    return corregidos
+
+def _contenedor(datos, operacion):
+    coleccion = operacion["coleccion"]
+    if coleccion == "tareas_proyecto":
+        return datos["proyectos"][operacion["proyecto"]]["tareas"]
+    return datos[coleccion]
+
+def _clave(contenedor, operacion):
+    clave = operacion["clave"]
+    # Los registros de cambios anteriores a los ids usaban índices posicionales
+    if isinstance(clave, int) and operacion["coleccion"] != "proyectos":
+        clave = operacion["clave"] = list(contenedor)[clave]
+    return clave
+
+def aplicar_operacion(datos, operacion):
+    """
+    Aplica una operación del registro sobre el diccionario de datos
+
+    Todas las colecciones son diccionarios (por id, o por nombre en el caso
+    de los proyectos), así que cada operación cuesta O(1). Sobre una sección
+    que aún no se ha decodificado, la operación se guarda y se aplica al
+    decodificarla.
+
+    Args:
+        datos: Diccionario con todas las tareas
+        operacion: Operación creada con nueva_operacion
+    """
+    contenedor = _contenedor(datos, operacion)
+    if isinstance(contenedor, SeccionDiferida) and contenedor.diferir(operacion):
+        return
+    _aplicar_en(contenedor, operacion)
+
+def operacion_aplicable(datos, operacion):
+    """
+    Indica si la operación encuentra su destino en los datos
+
+    Una modificación o eliminación necesita que el registro siga existiendo
+    y una tarea de proyecto, que exista el proyecto. Sirve para descartar
+    operaciones que otro proceso ha dejado sin destino.
+    """
+    coleccion = operacion["coleccion"]
+    if coleccion == "proyectos":
+        return operacion["op"] == "anadir" or operacion["clave"] in datos["proyectos"]
+    if coleccion == "tareas_proyecto":
+        proyecto = datos["proyectos"].get(operacion["proyecto"])
+        if proyecto is None:
+            return False
+        contenedor = proyecto["tareas"]
+    else:
+        contenedor = datos[coleccion]
+    return operacion["op"] == "anadir" or operacion["clave"] in contenedor
+
+def _aplicar_en(contenedor, operacion):
+    op = operacion["op"]
+    if op == "anadir":
+        valor = operacion["valor"]
+        if operacion["coleccion"] == "proyectos":
+            # Copia: la operación puede estar aún pendiente de escribirse (lotes)
+            # y no debe recoger las tareas que se añadan después al proyecto
+            proyecto = dict(valor)
+            tareas = proyecto.get("tareas", [])
+            proyecto["tareas"] = dict(tareas) if isinstance(tareas, dict) else list(tareas)
+            _indexar_proyecto(proyecto, operacion["clave"])
+            contenedor[operacion["clave"]] = proyecto
+        else:
+            if "id" not in valor:
+                valor["id"] = nuevo_id()
+            contenedor[valor["id"]] = a_registro(operacion["coleccion"], valor)
+    elif op == "actualizar":
+        contenedor[_clave(contenedor, operacion)].update(operacion["valor"])
+    elif op == "eliminar":
+        del contenedor[_clave(contenedor, operacion)]
+    else:
+        raise ValueError(f"Operación desconocida: {op}")
+
+class SeccionDiferida(dict):
+    """
+    Colección de la instantánea que se decodifica la primera vez que se usa
+
+    Se comporta como el diccionario id -> registro de la colección. Hasta
+    que algo la consulta o la modifica no ocupa memoria: solo recuerda de qué
+    bytes de la instantánea sale y las operaciones del registro de cambios
+    que hay que aplicarle después de decodificarla.
+    """
+
+    def __init__(self, cargar, coleccion):
+        super().__init__()
+        self._cargar = cargar
+        self._coleccion = coleccion
+        self._operaciones = []
+        self._cerrojo_carga = threading.Lock()
+
+    @property
+    def pendiente(self):
+        """True mientras la sección no se ha decodificado"""
+        return self._cargar is not None
+
+    def diferir(self, operacion):
+        """Guarda la operación para aplicarla al decodificar; False si ya está decodificada"""
+        with self._cerrojo_carga:
+            if self._cargar is None:
+                return False
+            self._operaciones.append(operacion)
+            return True
+
+    def materializar(self):
+        """Decodifica la sección y aplica las operaciones diferidas"""
+        with self._cerrojo_carga:
+            if self._cargar is None:
+                return
+            # Se llena un diccionario aparte: los demás hilos esperan en el cerrojo
+            registros = {}
+            coleccion = self._coleccion
+            for registro in self._cargar():
+                if "id" not in registro:
+                    registro["id"] = nuevo_id()
+                registros[registro["id"]] = a_registro(coleccion, registro)
+            for operacion in self._operaciones:
+                _aplicar_en(registros, operacion)
+            dict.update(self, registros)
+            self._cargar = None
+            self._operaciones = []
+
+def _materializando(nombre):
+    metodo = getattr(dict, nombre)
+
+    def envoltura(self, *args, **kwargs):
+        if self._cargar is not None:
+            self.materializar()
+        return metodo(self, *args, **kwargs)
+    envoltura.__name__ = nombre
+    return envoltura
+
+for _nombre in ("__getitem__", "__setitem__", "__delitem__", "__contains__", "__iter__", "__len__",
+                "__eq__", "__ne__", "__repr__", "__reversed__", "get", "keys", "values", "items", "pop",
+                "popitem", "setdefault", "update", "clear", "copy"):
+    setattr(SeccionDiferida, _nombre, _materializando(_nombre))
+
+def _firma_archivo(ruta):
+    estado = os.stat(ruta)
+    return estado.st_size, estado.st_mtime_ns
+
+def _firma_abierto(archivo):
+    estado = os.fstat(archivo.fileno())
+    return estado.st_size, estado.st_mtime_ns
+
+def _leer_indice(ruta_datos):
+    """Índice de secciones de la instantánea, o None si falta o no corresponde al archivo"""
+    try:
+        with open(ruta_datos + SUFIJO_INDICE, "r") as file:
+            indice = json.load(file)
+        if (indice["tamano"], indice["mtime_ns"]) != _firma_archivo(ruta_datos):
+            return None
+        return indice
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _leer_seccion(archivo, inicio, fin):
+    """Recorre los registros de una sección de la instantánea sin leerla entera"""
+    with archivo:
+        archivo.seek(inicio)
+        yield from elementos_por_lineas(archivo, fin)
+
+def _leer_instantanea(ruta_datos, diferir=False):
+    """
+    Lee la instantánea por bloques y devuelve (datos, secuencia, ids asignados)
+
+    El archivo se decodifica por partes, sin cargar antes todo el texto en
+    memoria. Si el índice de secciones corresponde al archivo, las tareas
+    diarias y la bitácora se leen por bloques de líneas y, con diferir=True,
+    quedan como SeccionDiferida hasta que se usan.
+
+    Cada sección diferida conserva abierto el archivo que se cargó, así que
+    sigue leyendo esta versión aunque otro proceso sustituya después la
+    instantánea. En Windows un archivo abierto no se puede sustituir, de
+    modo que allí no se difiere.
+    """
+    if not os.path.exists(ruta_datos):
+        return estructura_vacia(), 0, 0
+    diferir = diferir and os.name != "nt"
+    indice = _leer_indice(ruta_datos)
+    archivos = {}
+    if indice is not None:
+        archivos = {seccion: open(ruta_datos, "rb") for seccion in SECCIONES_DIFERIDAS}
+        firma = (indice["tamano"], indice["mtime_ns"])
+        if any(_firma_abierto(archivo) != firma for archivo in archivos.values()):
+            # La instantánea cambió después de leer el índice: se lee entera
+            for archivo in archivos.values():
+                archivo.close()
+            indice, archivos = None, {}
+    datos = {}
+    with open(ruta_datos, "rb") as file:
+        for clave, lector in LectorJSON(file).miembros():
+            if indice is not None and clave in SECCIONES_DIFERIDAS:
+                # La secuencia, los proyectos y las recurrentes se escriben antes que las secciones diferidas
+                break
+            if clave in SECCIONES_DIFERIDAS:
+                datos[clave] = list(lector.elementos())
+            else:
+                datos[clave] = lector.valor()
+    secuencia = datos.pop("secuencia", 0)
+    if indice is not None:
+        for seccion in SECCIONES_DIFERIDAS:
+            inicio, fin = indice["secciones"][seccion]
+            diferida = SeccionDiferida(
+                lambda archivo=archivos[seccion], inicio=inicio, fin=fin: _leer_seccion(archivo, inicio, fin),
+                seccion)
+            if not diferir:
+                diferida.materializar()
+            datos[seccion] = diferida
+    # Asegurar que existe la estructura para proyectos y bitácora
+    asignados = indexar_datos(datos)
+    return datos, secuencia, asignados
+
+def _sincronizar_directorio(ruta):
+    # El renombrado solo es duradero cuando se sincroniza el directorio
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    descriptor = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+def _escribir_json(file, datos, secuencia):
+    """
+    Escribe la instantánea con el esquema de tareas.json en un archivo binario
+
+    La secuencia, los proyectos y las tareas recurrentes van primero y las
+    secciones diferidas después, un registro por línea (sin construir el texto completo) para
+    que lector_json.elementos_por_lineas las lea por bloques.
+
+    Returns:
+        Diccionario sección -> [inicio, fin] con la posición en bytes de cada sección diferida
+    """
+    codificar = json.JSONEncoder(default=a_json).encode
+    proyectos = {
+        nombre: dict(proyecto, tareas=list(proyecto["tareas"].values()))
+        for nombre, proyecto in datos["proyectos"].items()
+    }
+    file.write(f'{{"secuencia": {secuencia}, "proyectos": {codificar(proyectos)}'.encode())
+    file.write(f', "recurrentes": {codificar(list(datos.get("recurrentes", {}).values()))}'.encode())
+    secciones = {}
+    for seccion in SECCIONES_DIFERIDAS:
+        file.write(f', "{seccion}": '.encode())
+        inicio = file.tell()
+        file.write(b"[\n")
+        registros = iter(datos[seccion].values())
+        separador = b""
+        while True:
+            lote = ",\n".join(map(codificar, itertools.islice(registros, 1000)))
+            if not lote:
+                break
+            file.write(separador + lote.encode())
+            separador = b",\n"
+        file.write(b"\n]")
+        secciones[seccion] = [inicio, file.tell()]
+    file.write(b"}")
+    return secciones
+
+def _notificar_escritura(tipo, ruta, tamano, inicio):
+    if observadores_escritura:
+        segundos = time.perf_counter() - inicio
+        for observador in observadores_escritura:
+            observador(tipo, ruta, tamano, segundos)
+
+def _crear_temporal(ruta):
+    """
+    Crea un temporal vacío junto a ruta, con los permisos de un archivo nuevo
+
+    A diferencia de tempfile.mkstemp (siempre 0600), los permisos salen de la
+    umask del proceso, sin tener que leerla: cambiarla para leerla afectaría
+    a los archivos que creen a la vez otros hilos.
+
+    Returns:
+        Tupla (descriptor, ruta del temporal)
+    """
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    while True:
+        temporal = os.path.join(directorio, f"{os.path.basename(ruta)}.{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+                           0o666), temporal
+        except FileExistsError:
+            continue
+
+def _volcar_temporal(ruta_datos, datos, secuencia):
+    """
+    Escribe la instantánea en un temporal sincronizado
+
+    Returns:
+        Tupla (ruta del temporal, índice de secciones)
+    """
+    inicio = time.perf_counter()
+    descriptor, temporal = _crear_temporal(ruta_datos)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            # El temporal conserva los permisos del archivo que sustituye
+            try:
+                os.chmod(temporal, os.stat(ruta_datos).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            secciones = _escribir_json(file, datos, secuencia)
+            file.flush()
+            os.fsync(file.fileno())
+        tamano, mtime_ns = _firma_archivo(temporal)
+    except BaseException:
+        os.remove(temporal)
+        raise
+    _notificar_escritura("instantanea", ruta_datos, tamano, inicio)
+    return temporal, {"tamano": tamano, "mtime_ns": mtime_ns, "secciones": secciones}
+
+def _publicar_instantanea(temporal, ruta_datos, secuencia, indice):
+    """Sustituye atómicamente la instantánea por el temporal ya sincronizado"""
+    global _secuencia_instantanea, _firma_instantanea, _ruta_version
+    os.replace(temporal, ruta_datos)
+    _sincronizar_directorio(ruta_datos)
+    _ruta_version = os.path.abspath(ruta_datos)
+    _secuencia_instantanea = secuencia
+    _firma_instantanea = (indice["tamano"], indice["mtime_ns"])
+    # El índice de secciones se puede perder sin riesgo: si no corresponde se lee todo
+    with open(ruta_datos + SUFIJO_INDICE + ".tmp", "w") as file:
+        json.dump(indice, file)
+    os.replace(ruta_datos + SUFIJO_INDICE + ".tmp", ruta_datos + SUFIJO_INDICE)
+
+def _escribir_instantanea(ruta_datos, datos, secuencia):
+    """
+    Escribe la instantánea de forma atómica: temporal, fsync y renombrado
+
+    Si el proceso muere a mitad de la escritura, el archivo anterior queda
+    intacto y solo sobra un temporal.
+    """
+    temporal, indice = _volcar_temporal(ruta_datos, datos, secuencia)
+    _publicar_instantanea(temporal, ruta_datos, secuencia, indice)
+
+def _es_legado(operacion):
+    """Operación escrita antes de los ids (índice posicional o registro sin id)"""
+    if operacion["coleccion"] == "proyectos":
+        return False
+    if operacion["op"] == "anadir":
+        return "id" not in operacion["valor"]
+    return isinstance(operacion["clave"], int)
+
+def _operaciones_de(registro):
+    """Operaciones de una línea del registro: una sola o un lote que se aplica entero"""
+    if "operaciones" in registro:
+        return registro["operaciones"]
+    return (registro["operacion"],)
+
+def _reproducir(datos, ruta_log, secuencia):
+    """
+    Aplica sobre los datos las operaciones del registro posteriores a la secuencia
+
+    Las operaciones ya incluidas en la instantánea (secuencia menor o igual)
+    se ignoran, así que reproducir dos veces el mismo registro es inocuo.
+    Una última línea incompleta (escritura interrumpida o en curso en otro
+    proceso) también se ignora.
+
+    Returns:
+        Tupla (última secuencia aplicada, si había operaciones sin ids,
+        bytes leídos hasta la última línea completa)
+    """
+    legado = False
+    posicion = 0
+    if not os.path.exists(ruta_log):
+        return secuencia, legado, posicion
+    with open(ruta_log, "rb") as file:
+        for linea in file:
+            if not linea.endswith(b"\n"):
+                break
+            try:
+                registro = json.loads(linea)
+            except json.JSONDecodeError:
+                break
+            posicion += len(linea)
+            if registro["seq"] <= secuencia:
+                continue
+            for numero, operacion in enumerate(_operaciones_de(registro)):
+                if _es_legado(operacion):
+                    legado = True
+                    if operacion["op"] == "anadir":
+                        operacion["valor"]["id"] = id_determinista("registro", registro["seq"], numero)
+                aplicar_operacion(datos, operacion)
+            secuencia = registro["seq"]
+    return secuencia, legado, posicion
+
+def _identidad(ruta):
+    """(dispositivo, inodo) del archivo, o None si no existe"""
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return estado.st_dev, estado.st_ino
+
+def _leer_cola(ruta_log, desde):
+    """
+    Registros completos del registro de cambios a partir de una posición
+
+    Returns:
+        Tupla (lista de registros {"seq", "operacion"}, posición tras la última línea completa)
+    """
+    registros = []
+    with open(ruta_log, "rb") as file:
+        file.seek(desde)
+        for linea in file:
+            if not linea.endswith(b"\n"):
+                break
+            try:
+                registros.append(json.loads(linea))
+            except json.JSONDecodeError:
+                break
+            desde += len(linea)
+    return registros, desde
+
+def _leer_novedades(ruta_datos, ruta_log):
+    """
+    Operaciones escritas por otros procesos después de la versión conocida
+
+    Si la instantánea es la que este proceso leyó o escribió y el registro
+    solo ha crecido, basta con leer lo añadido al final. Si otro proceso ha
+    sustituido la instantánea o el registro (guardado o compactación), las
+    novedades ya no se pueden obtener del registro.
+
+    Returns:
+        Lista de operaciones (ya incorporadas a la versión conocida), o None si hay que recargar
+    """
+    global _secuencia, _posicion_log, _identidad_log
+    if os.path.abspath(ruta_datos) != _ruta_version:
+        return None
+    firma = _firma_archivo(ruta_datos) if os.path.exists(ruta_datos) else None
+    if firma != _firma_instantanea:
+        return None
+    identidad = _identidad(ruta_log)
+    if identidad is None:
+        return [] if _posicion_log == 0 else None
+    if _posicion_log and identidad != _identidad_log:
+        return None
+    registros, posicion = _leer_cola(ruta_log, _posicion_log)
+    _posicion_log, _identidad_log = posicion, identidad
+    operaciones = []
+    for registro in registros:
+        if registro["seq"] > _secuencia:
+            operaciones.extend(_operaciones_de(registro))
+            _secuencia = registro["seq"]
+    return operaciones
+
+def _releer_version(ruta_datos, ruta_log):
+    """Vuelve a leer de disco la versión (secuencia) sin cargar los datos"""
+    global _secuencia, _secuencia_instantanea, _posicion_log, _identidad_log, _firma_instantanea, _ruta_version
+    _ruta_version = os.path.abspath(ruta_datos)
+    secuencia = 0
+    if os.path.exists(ruta_datos):
+        with open(ruta_datos, "rb") as file:
+            # La secuencia es el primer miembro de la instantánea
+            for clave, lector in LectorJSON(file).miembros():
+                if clave == "secuencia":
+                    secuencia = lector.valor()
+                break
+        _firma_instantanea = _firma_archivo(ruta_datos)
+    else:
+        _firma_instantanea = None
+    _secuencia_instantanea = secuencia
+    _posicion_log, _identidad_log = 0, _identidad(ruta_log)
+    for ruta in (ruta_log + SUFIJO_COMPACTANDO, ruta_log):
+        if os.path.exists(ruta):
+            registros, posicion = _leer_cola(ruta, 0)
+            secuencia = max([secuencia] + [registro["seq"] for registro in registros])
+            if ruta == ruta_log:
+                _posicion_log = posicion
+    _secuencia = secuencia
+
+def _avanzar_version(ruta_datos, ruta_log):
+    """
+    Lleva la versión conocida hasta la última escrita por cualquier proceso
+
+    Las operaciones ajenas que se saltan así no llegan a los datos en
+    memoria: la siguiente llamada a operaciones_nuevas pide recargar.
+    """
+    global _desincronizado
+    novedades = _leer_novedades(ruta_datos, ruta_log)
+    if novedades is None:
+        _releer_version(ruta_datos, ruta_log)
+    if novedades != []:
+        _desincronizado = True
+
+def operaciones_nuevas(ruta_datos=RUTA_DATOS, ruta_log=RUTA_LOG):
+    """
+    Operaciones que otros procesos han registrado desde la versión que conoce este proceso
+
+    Se llama dentro de bloqueo() para que nadie escriba mientras tanto; el
+    almacén compartido las aplica sobre sus datos en lugar de recargarlos.
+
+    Args:
+        ruta_datos: Ruta de la instantánea completa
+        ruta_log: Ruta del registro de cambios
+
+    Returns:
+        Lista de operaciones en orden, o None si hay que recargar los datos con cargar_datos
+    """
+    with _cerrojo:
+        if _desincronizado:
+            return None
+        return _leer_novedades(ruta_datos, ruta_log)
+
+def cargar_datos(ruta_datos=RUTA_DATOS, ruta_log=RUTA_LOG):
+    """
+    Carga la instantánea y reproduce encima el registro de cambios
+
+    Las tareas diarias y la bitácora se devuelven como SeccionDiferida: se
+    decodifican cuando se usan por primera vez, de modo que la primera vista
+    no espera a leer todo el historial.
+
+    Args:
+        ruta_datos: Ruta de la instantánea completa
+        ruta_log: Ruta del registro de cambios
+
+    Returns:
+        Diccionario con todas las tareas
+    """
+    global _secuencia, _secuencia_instantanea, _posicion_log, _identidad_log, _firma_instantanea, _desincronizado
+    global _ruta_version
+    with bloqueo(ruta_datos), _cerrojo:
+        _desincronizado = False
+        _ruta_version = os.path.abspath(ruta_datos)
+        # Los ids de los registros antiguos no se escriben aquí (una lectura no modifica
+        # el archivo): son deterministas y se guardan con la siguiente instantánea
+        datos, secuencia, _ = _leer_instantanea(ruta_datos, diferir=True)
+        _secuencia_instantanea = secuencia
+        _firma_instantanea = _firma_archivo(ruta_datos) if os.path.exists(ruta_datos) else None
+        secuencia, _, _ = _reproducir(datos, ruta_log + SUFIJO_COMPACTANDO, secuencia)
+        secuencia, _, _posicion_log = _reproducir(datos, ruta_log, secuencia)
+        _identidad_log = _identidad(ruta_log)
+        _secuencia = secuencia
+    return datos
+
+def _eliminar_registros(ruta_log):
+    """Borra el registro de cambios (ya incluido en la instantánea) y su compactación pendiente"""
+    global _posicion_log, _identidad_log
+    for ruta in (ruta_log, ruta_log + SUFIJO_COMPACTANDO):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    _posicion_log, _identidad_log = 0, None
+
+def guardar_datos(datos, ruta_datos=RUTA_DATOS, ruta_log=RUTA_LOG):
+    """
+    Escribe la instantánea completa, que pasa a contener todo el registro
+
+    Las llamadas concurrentes se agrupan: una ráfaga de guardados produce una
+    sola escritura con el estado más reciente. Antes de escribir se aplican
+    sobre los datos las operaciones que otros procesos hayan registrado
+    desde la versión conocida, de modo que la instantánea no las pierde.
+
+    Args:
+        datos: Diccionario con todas las tareas
+        ruta_datos: Ruta de la instantánea completa
+        ruta_log: Ruta del registro de cambios
+
+    Raises:
+        ConflictoVersion: Otro proceso sustituyó la instantánea; hay que recargar los datos
+    """
+    global _instantanea_pendiente
+    _instantanea_pendiente = (datos, ruta_datos, ruta_log)
+    _escritura_instantanea.solicitar(_escribir_instantanea_pendiente)
+
+def _escribir_instantanea_pendiente():
+    global _desincronizado
+    datos, ruta_datos, ruta_log = _instantanea_pendiente
+    with bloqueo(ruta_datos), _cerrojo:
+        novedades = _leer_novedades(ruta_datos, ruta_log)
+        if novedades is None and os.path.abspath(ruta_datos) != _ruta_version:
+            # Journal que este proceso no ha leído: los datos sustituyen lo que hubiera
+            _releer_version(ruta_datos, ruta_log)
+            novedades = []
+        if novedades is None:
+            raise ConflictoVersion(f"{ruta_datos} ha cambiado en otro proceso; hay que recargar antes de guardar")
+        # Fusión por registro: los cambios de otros procesos se aplican sobre los datos a guardar
+        for operacion in novedades:
+            aplicar_operacion(datos, operacion)
+        _desincronizado = _desincronizado or bool(novedades)
+        _escribir_instantanea(ruta_datos, datos, _secuencia)
+        # Las operaciones del registro ya están en la instantánea
+        _lineas_pendientes.clear()
+        _eliminar_registros(ruta_log)
+
+def registrar_operacion(operacion, ruta_datos=RUTA_DATOS, ruta_log=RUTA_LOG,
+                        umbral=UMBRAL_COMPACTACION):
+    """
+    Añade una operación al final del registro de cambios
+
+    El coste de la escritura depende del tamaño del cambio y no del tamaño
+    del journal. Las operaciones registradas a la vez desde varios hilos se
+    escriben juntas con un único fsync. Cuando el registro supera el umbral
+    se compacta en un hilo en segundo plano.
+
+    La secuencia es la versión del journal: se asigna dentro del bloqueo
+    entre procesos, a continuación de la última escrita por cualquier
+    proceso, y la línea es duradera antes de soltarlo.
+
+    Args:
+        operacion: Operación creada con nueva_operacion
+        ruta_datos: Ruta de la instantánea completa
+        ruta_log: Ruta del registro de cambios
+        umbral: Tamaño del registro (bytes) que dispara la compactación
+    """
+    _registrar({"operacion": operacion}, ruta_datos, ruta_log, umbral)
+
+def registrar_operaciones(operaciones, ruta_datos=RUTA_DATOS, ruta_log=RUTA_LOG,
+                          umbral=UMBRAL_COMPACTACION):
+    """
+    Añade un lote de operaciones al registro de cambios como una sola línea
+
+    El lote se escribe con un único fsync y es atómico: si el proceso
+    muere a mitad de la escritura, al cargar no se aplica ninguna de sus
+    operaciones.
+
+    Args:
+        operaciones: Lista de operaciones creadas con nueva_operacion
+        ruta_datos: Ruta de la instantánea completa
+        ruta_log: Ruta del registro de cambios
+        umbral: Tamaño del registro (bytes) que dispara la compactación
+    """
+    if len(operaciones) == 1:
+        registrar_operacion(operaciones[0], ruta_datos, ruta_log, umbral)
+    elif operaciones:
+        _registrar({"operaciones": list(operaciones)}, ruta_datos, ruta_log, umbral)
+
+def _registrar(contenido, ruta_datos, ruta_log, umbral):
+    global _secuencia
+    with bloqueo(ruta_datos):
+        with _cerrojo:
+            # Sin almacén compartido nadie ha incorporado lo escrito por otros procesos:
+            # al menos la secuencia debe continuar la suya
+            _avanzar_version(ruta_datos, ruta_log)
+            _secuencia += 1
+            _lineas_pendientes.append(json.dumps({"seq": _secuencia, **contenido}, default=a_json) + "\n")
+        _escritura_log.solicitar(lambda: _volcar_lineas_pendientes(ruta_log))
+    if _tamano_log >= umbral:
+        compactar_en_segundo_plano(ruta_datos, ruta_log)
+
+def _volcar_lineas_pendientes(ruta_log):
+    """Escribe de una vez las líneas acumuladas y hace un único fsync"""
+    global _tamano_log, _posicion_log, _identidad_log
+    with _cerrojo:
+        inicio = time.perf_counter()
+        lineas = "".join(_lineas_pendientes).encode()
+        _lineas_pendientes.clear()
+        with open(ruta_log, "ab") as file:
+            file.write(lineas)
+            file.flush()
+            os.fsync(file.fileno())
+            _tamano_log = _posicion_log = file.tell()
+            estado = os.fstat(file.fileno())
+            _identidad_log = (estado.st_dev, estado.st_ino)
+        _notificar_escritura("registro", ruta_log, len(lineas), inicio)
+
+def compactar(ruta_datos=RUTA_DATOS, ruta_log=RUTA_LOG):
+    """
+    Integra el registro de cambios en la instantánea
+
+    El registro actual se renombra para que las nuevas operaciones sigan
+    escribiéndose en un registro vacío mientras dura la compactación. Los
+    hilos de este proceso pueden seguir escribiendo; los demás procesos
+    esperan en el bloqueo hasta que termina.
+    """
+    with bloqueo(ruta_datos):
+        _compactar(ruta_datos, ruta_log)
+
+def _compactar(ruta_datos, ruta_log):
+    global _tamano_log, _posicion_log, _identidad_log
+    pendiente = ruta_log + SUFIJO_COMPACTANDO
+    with _cerrojo:
+        # Si quedó una compactación interrumpida, se termina primero esa
+        if not os.path.exists(pendiente):
+            if not os.path.exists(ruta_log):
+                return
+            # Lo escrito por otros procesos se incorpora a la versión conocida antes de renombrar
+            _avanzar_version(ruta_datos, ruta_log)
+            os.replace(ruta_log, pendiente)
+            _tamano_log = _posicion_log = 0
+            _identidad_log = None
+    datos, secuencia, _ = _leer_instantanea(ruta_datos)
+    secuencia, _, _ = _reproducir(datos, pendiente, secuencia)
+    temporal, indice = _volcar_temporal(ruta_datos, datos, secuencia)
+    with _cerrojo:
+        # Una instantánea más reciente (guardar_datos) ya incluye este registro
+        if secuencia > _secuencia_instantanea:
+            _publicar_instantanea(temporal, ruta_datos, secuencia, indice)
+        else:
+            os.remove(temporal)
+        if os.path.exists(pendiente):
+            os.remove(pendiente)
+
+def compactar_en_segundo_plano(ruta_datos=RUTA_DATOS, ruta_log=RUTA_LOG):
+    """Lanza la compactación en un hilo si no hay otra en curso"""
+    global _hilo_compactacion
+    with _cerrojo:
+        if _hilo_compactacion is not None and _hilo_compactacion.is_alive():
+            return
+        # Rutas absolutas: el hilo no debe depender del directorio de trabajo que haya al ejecutarse
+        _hilo_compactacion = threading.Thread(
+            target=compactar, args=(os.path.abspath(ruta_datos), os.path.abspath(ruta_log)),
+            name="compactacion-registro", daemon=True
+        )
+        _hilo_compactacion.start()
+
+def esperar_compactacion(tiempo_maximo=None):
+    """Espera a que termine la compactación en segundo plano, si hay una en curso"""
+    hilo = _hilo_compactacion
+    if hilo is not None:
+        hilo.join(tiempo_maximo)
@@ -0,0 +1,452 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from registros import ordinal_fecha
+
+# Ordinal (date.toordinal) del día 0 de datetime64[D]
+_ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
+# Origen de cada tarea en la tabla de tareas
+ORIGENES = ("diaria", "proyecto")
+
+# Columnas de cada tabla; las fechas son ordinales y 0 significa "sin fecha"
+_COLUMNAS_TAREAS = {"origen": np.int8, "proyecto": np.int32, "fecha": np.int32, "creacion": np.int32,
+                    "completada_en": np.int32, "completada": np.bool_, "prioridad": np.int16}
+_COLUMNAS_BITACORA = {"fecha": np.int32, "categoria": np.int16}
+
+class _Categorias:
+    """Códigos enteros de un campo de texto con pocos valores distintos"""
+
+    def __init__(self):
+        self.nombres = []
+        self._codigos = {}
+
+    def codigo(self, nombre):
+        if nombre is None:
+            return -1
+        codigo = self._codigos.get(nombre)
+        if codigo is None:
+            codigo = self._codigos[nombre] = len(self.nombres)
+            self.nombres.append(nombre)
+        return codigo
+
+    def categorical(self, codigos):
+        """Columna de pandas con los nombres (NaN para el código -1)"""
+        return pd.Categorical.from_codes(codigos, categories=self.nombres)
+
+class _Columnas:
+    """
+    Tabla columnar sobre arrays de NumPy
+
+    Cada registro ocupa una fila. Las filas eliminadas se marcan como no
+    vivas y se reutilizan, y los arrays crecen por duplicación, así que
+    añadir, modificar o eliminar un registro cuesta O(1).
+    """
+
+    def __init__(self, tipos, claves=(), valores=None):
+        """
+        Args:
+            tipos: Diccionario columna -> dtype
+            claves: Clave de cada fila inicial
+            valores: Diccionario columna -> lista con los valores de las filas iniciales
+        """
+        claves = list(claves)
+        self.filas = {clave: fila for fila, clave in enumerate(claves)}
+        self.tamano = len(claves)
+        capacidad = max(64, self.tamano)
+        self._libres = []
+        self._columnas = {}
+        for nombre, tipo in tipos.items():
+            columna = self._columnas[nombre] = np.zeros(capacidad, dtype=tipo)
+            if self.tamano:
+                columna[:self.tamano] = np.asarray(valores[nombre], dtype=tipo)
+        self._vivo = np.zeros(capacidad, dtype=np.bool_)
+        self._vivo[:self.tamano] = True
+
+    def poner(self, clave, valores):
+        """Añade la fila de la clave o sobrescribe la existente"""
+        fila = self.filas.get(clave)
+        if fila is None:
+            fila = self._libres.pop() if self._libres else self._nueva_fila()
+            self.filas[clave] = fila
+        for nombre, valor in valores.items():
+            self._columnas[nombre][fila] = valor
+        self._vivo[fila] = True
+
+    def quitar(self, clave):
+        fila = self.filas.pop(clave, None)
+        if fila is not None:
+            self._vivo[fila] = False
+            self._libres.append(fila)
+
+    def _nueva_fila(self):
+        if self.tamano == len(self._vivo):
+            capacidad = 2 * len(self._vivo)
+            for nombre, columna in self._columnas.items():
+                self._columnas[nombre] = np.resize(columna, capacidad)
+            self._vivo = np.resize(self._vivo, capacidad)
+            self._vivo[self.tamano:] = False
+        self.tamano += 1
+        return self.tamano - 1
+
+    def vivas(self):
+        """Diccionario columna -> array con solo las filas vivas (copia compacta)"""
+        vivo = self._vivo[:self.tamano]
+        return {nombre: columna[:self.tamano][vivo] for nombre, columna in self._columnas.items()}
+
+def _a_fechas(ordinales):
+    """Ordinales -> datetime64[D], con NaT donde no hay fecha"""
+    fechas = (ordinales.astype(np.int64) - _ORDINAL_EPOCA).astype("datetime64[D]")
+    fechas[ordinales == 0] = np.datetime64("NaT")
+    return fechas
+
+def _periodos(ordinales, periodo):
+    return pd.DatetimeIndex(_a_fechas(ordinales)).to_period(periodo)
+
+def _ordinal(fecha):
+    return None if fecha is None else fecha.toordinal()
+
+class IndiceAnalitica:
+    """
+    Tablas columnares de todas las tareas y entradas de bitácora
+
+    Se construyen en la primera consulta y después se mantienen con cada
+    operación del almacén, fila a fila, sin volver a recorrer el historial.
+    Las consultas son agregaciones vectorizadas (NumPy y group-bys de
+    pandas) y su resultado se conserva hasta el siguiente cambio, así que
+    repetir una consulta en cada rerun no cuesta nada.
+
+    Las tareas diarias y entradas de bitácora archivadas (archivado.py) se
+    suman a la tasa de completado y a la distribución por categorías a
+    partir del resumen por día del archivo, sin descomprimirlo; el resto de
+    consultas solo ve los datos.
+
+    Los DataFrames devueltos son compartidos: los llamadores no deben
+    modificarlos.
+    """
+
+    def __init__(self, datos=None, archivo=None):
+        """
+        Args:
+            datos: Diccionario del journal (se puede dar después con reconstruir)
+            archivo: archivado.Archivo cuyo resumen se suma a las estadísticas, o None
+        """
+        self._archivo = archivo
+        self._datos = None
+        self._construido = False
+        self._version = 0
+        self._resultados = {}
+        if datos is not None:
+            self.reconstruir(datos)
+
+    def reconstruir(self, datos):
+        # La construcción se aplaza hasta la primera consulta
+        self._datos = datos
+        self._construido = False
+        self._version += 1
+
+    def _asegurar(self):
+        if not self._construido:
+            self._construir()
+
+    def _construir(self):
+        self._proyectos = _Categorias()
+        self._prioridades = _Categorias()
+        self._categorias = _Categorias()
+        claves = []
+        filas = {nombre: [] for nombre in _COLUMNAS_TAREAS}
+        for id_tarea, tarea in self._datos["diarias"].items():
+            claves.append(("diarias", id_tarea))
+            for nombre, valor in self._fila_tarea(tarea, None).items():
+                filas[nombre].append(valor)
+        for nombre_proyecto, proyecto in self._datos["proyectos"].items():
+            for id_tarea, tarea in proyecto["tareas"].items():
+                claves.append(("tareas_proyecto", id_tarea))
+                for nombre, valor in self._fila_tarea(tarea, nombre_proyecto).items():
+                    filas[nombre].append(valor)
+        self._tareas = _Columnas(_COLUMNAS_TAREAS, claves, filas)
+        claves = list(self._datos["bitacora"])
+        filas = {"fecha": [], "categoria": []}
+        for entrada in self._datos["bitacora"].values():
+            for nombre, valor in self._fila_entrada(entrada).items():
+                filas[nombre].append(valor)
+        self._bitacora = _Columnas(_COLUMNAS_BITACORA, claves, filas)
+        self._construido = True
+
+    def _fila_tarea(self, tarea, proyecto):
+        if proyecto is None:
+            return {"origen": 0, "proyecto": -1, "fecha": ordinal_fecha(tarea, "fecha") or 0, "creacion": 0,
+                    "completada_en": 0, "completada": bool(tarea.get("completada", False)), "prioridad": -1}
+        creacion = ordinal_fecha(tarea, "fecha_creacion") or 0
+        return {
+            "origen": 1,
+            "proyecto": self._proyectos.codigo(proyecto),
+            # Las tareas de proyecto se sitúan en su fecha límite o, si no tienen, en la de creación
+            "fecha": ordinal_fecha(tarea, "fecha_limite") or creacion,
+            "creacion": creacion,
+            "completada_en": ordinal_fecha(tarea, "fecha_completada") or 0,
+            "completada": bool(tarea.get("completada", False)),
+            "prioridad": self._prioridades.codigo(tarea.get("prioridad")),
+        }
+
+    def _fila_entrada(self, entrada):
+        return {"fecha": ordinal_fecha(entrada, "fecha") or 0,
+                "categoria": self._categorias.codigo(entrada.get("categoria"))}
+
+    def antes_de_aplicar(self, datos, operacion):
+        """Retira las tareas de un proyecto que se va a eliminar"""
+        if not self._construido:
+            return
+        if operacion["coleccion"] == "proyectos" and operacion["op"] == "eliminar":
+            for id_tarea in datos["proyectos"][operacion["clave"]]["tareas"]:
+                self._tareas.quitar(("tareas_proyecto", id_tarea))
+
+    def despues_de_aplicar(self, datos, operacion):
+        """Actualiza la fila del registro añadido, modificado o eliminado"""
+        # Las reglas recurrentes no son tareas: cuentan sus ocurrencias guardadas como diarias
+        if not self._construido or operacion["coleccion"] == "recurrentes":
+            return
+        self._version += 1
+        coleccion = operacion["coleccion"]
+        op = operacion["op"]
+        if coleccion == "proyectos":
+            if op == "anadir":
+                for id_tarea, tarea in datos["proyectos"][operacion["clave"]]["tareas"].items():
+                    self._tareas.poner(("tareas_proyecto", id_tarea), self._fila_tarea(tarea, operacion["clave"]))
+            return
+        clave = operacion["valor"]["id"] if op == "anadir" else operacion["clave"]
+        if coleccion == "bitacora":
+            if op == "eliminar":
+                self._bitacora.quitar(clave)
+            else:
+                self._bitacora.poner(clave, self._fila_entrada(datos["bitacora"][clave]))
+        elif op == "eliminar":
+            self._tareas.quitar((coleccion, clave))
+        elif coleccion == "diarias":
+            self._tareas.poner((coleccion, clave), self._fila_tarea(datos["diarias"][clave], None))
+        else:
+            proyecto = operacion["proyecto"]
+            tarea = datos["proyectos"][proyecto]["tareas"][clave]
+            self._tareas.poner((coleccion, clave), self._fila_tarea(tarea, proyecto))
+
+    def _en_cache(self, consulta, calcular):
+        # Lo que otro proceso archiva o restaura también cambia los resultados
+        version = (self._version, self._archivo.manifiesto()["secuencia"] if self._archivo is not None else 0)
+        guardado = self._resultados.get(consulta)
+        if guardado is None or guardado[0] != version:
+            guardado = self._resultados[consulta] = (version, calcular())
+        return guardado[1]
+
+    def _resumen_archivado(self, coleccion, desde, hasta):
+        """Días del resumen del archivo dentro del rango: lista de (ordinal, resumen del día)"""
+        if self._archivo is None:
+            return []
+        dias = []
+        for fecha, resumen in self._archivo.resumen(coleccion).items():
+            ordinal = date.fromisoformat(fecha).toordinal()
+            if (desde is None or ordinal >= desde.toordinal()) and (hasta is None or ordinal <= hasta.toordinal()):
+                dias.append((ordinal, resumen))
+        return dias
+
+    def marco_tareas(self):
+        """
+        DataFrame con una fila por tarea (diarias y de proyecto)
+
+        Columnas: origen, proyecto, prioridad (categóricas), fecha, creacion,
+        completada_en (datetime64, NaT si no hay) y completada (bool).
+        """
+        self._asegurar()
+        return self._en_cache(("marco_tareas",), self._marco_tareas)
+
+    def _marco_tareas(self):
+        columnas = self._tareas.vivas()
+        return pd.DataFrame({
+            "origen": pd.Categorical.from_codes(columnas["origen"], categories=ORIGENES),
+            "proyecto": self._proyectos.categorical(columnas["proyecto"]),
+            "prioridad": self._prioridades.categorical(columnas["prioridad"]),
+            "fecha": _a_fechas(columnas["fecha"]),
+            "creacion": _a_fechas(columnas["creacion"]),
+            "completada_en": _a_fechas(columnas["completada_en"]),
+            "completada": columnas["completada"],
+        })
+
+    def marco_bitacora(self):
+        """DataFrame con una fila por entrada de bitácora: fecha (datetime64) y categoria"""
+        self._asegurar()
+        return self._en_cache(("marco_bitacora",), self._marco_bitacora)
+
+    def _marco_bitacora(self):
+        columnas = self._bitacora.vivas()
+        return pd.DataFrame({"fecha": _a_fechas(columnas["fecha"]),
+                             "categoria": self._categorias.categorical(columnas["categoria"])})
+
+    def tasa_completado(self, periodo="D", desde=None, hasta=None):
+        """
+        Tareas y tareas completadas por día, semana o mes
+
+        Args:
+            periodo: "D" (día), "W" (semana) o "M" (mes)
+            desde: Primera fecha incluida (date) o None
+            hasta: Última fecha incluida (date) o None
+
+        Returns:
+            DataFrame indexado por el inicio de cada periodo con las columnas
+            total, completadas y tasa (porcentaje con un decimal)
+        """
+        self._asegurar()
+        return self._en_cache(("tasa_completado", periodo, _ordinal(desde), _ordinal(hasta)),
+                              lambda: self._tasa_completado(periodo, desde, hasta))
+
+    def _tasa_completado(self, periodo, desde, hasta):
+        columnas = self._tareas.vivas()
+        fechas = columnas["fecha"]
+        seleccion = fechas > 0
+        if desde is not None:
+            seleccion &= fechas >= desde.toordinal()
+        if hasta is not None:
+            seleccion &= fechas <= hasta.toordinal()
+        partes = []
+        if seleccion.any():
+            completada = pd.Series(columnas["completada"][seleccion])
+            grupos = completada.groupby(_periodos(fechas[seleccion], periodo))
+            partes.append(grupos.agg(["size", "sum"]).rename(columns={"size": "total", "sum": "completadas"}))
+        archivadas = self._resumen_archivado("diarias", desde, hasta)
+        if archivadas:
+            ordinales = np.array([ordinal for ordinal, _ in archivadas], dtype=np.int32)
+            cuentas = pd.DataFrame([resumen for _, resumen in archivadas], columns=["total", "completadas"])
+            partes.append(cuentas.groupby(_periodos(ordinales, periodo)).sum())
+        if not partes:
+            return pd.DataFrame(columns=["total", "completadas", "tasa"])
+        resultado = partes[0] if len(partes) == 1 else partes[0].add(partes[1], fill_value=0)
+        resultado = resultado.astype(np.int64).sort_index()
+        resultado["tasa"] = (resultado["completadas"] / resultado["total"] * 100).round(1)
+        resultado.index = resultado.index.to_timestamp()
+        return resultado
+
+    def burndown(self, proyecto, hoy=None):
+        """
+        Tareas pendientes de un proyecto día a día
+
+        Cada tarea cuenta desde su fecha de creación hasta su fecha de
+        finalización. Las completadas antes de que se guardara esa fecha
+        cuentan como completadas el día en que se crearon.
+
+        Args:
+            proyecto: Nombre del proyecto
+            hoy: Último día de la serie si la fecha límite es anterior (por defecto date.today())
+
+        Returns:
+            DataFrame indexado por día con las columnas pendientes, completadas
+            e ideal (línea recta hasta cero en la fecha límite, NaN sin ella);
+            vacío si el proyecto no tiene tareas con fecha
+        """
+        self._asegurar()
+        hoy = hoy or date.today()
+        return self._en_cache(("burndown", proyecto, hoy.toordinal()), lambda: self._burndown(proyecto, hoy))
+
+    def _burndown(self, proyecto, hoy):
+        columnas = self._tareas.vivas()
+        codigo = self._proyectos.codigo(proyecto)
+        seleccion = (columnas["proyecto"] == codigo) & (columnas["creacion"] > 0)
+        creacion = columnas["creacion"][seleccion]
+        if not len(creacion):
+            return pd.DataFrame(columns=["pendientes", "completadas", "ideal"])
+        completada_en = np.where(columnas["completada_en"][seleccion] > 0,
+                                 columnas["completada_en"][seleccion], creacion)
+        completada_en = np.where(columnas["completada"][seleccion], completada_en, 0)
+        info = self._datos["proyectos"].get(proyecto, {})
+        limite = ordinal_fecha(info, "fecha_limite")
+        inicio = int(creacion.min())
+        fin = max(hoy.toordinal(), limite or 0, int(completada_en.max()))
+        dias = fin - inicio + 1
+        creadas = np.bincount(creacion - inicio, minlength=dias).cumsum()
+        hechas = completada_en[completada_en > 0]
+        hechas = np.bincount(np.maximum(hechas, inicio) - inicio, minlength=dias).cumsum()
+        ideal = np.full(dias, np.nan)
+        if limite is not None and limite >= inicio:
+            tramo = limite - inicio + 1
+            ideal[:tramo] = np.linspace(len(creacion), 0, tramo)
+            ideal[tramo:] = 0
+        indice = pd.date_range(date.fromordinal(inicio), periods=dias, freq="D")
+        return pd.DataFrame({"pendientes": creadas - hechas, "completadas": hechas, "ideal": ideal}, index=indice)
+
+    def atrasadas(self, hoy=None):
+        """
+        Tareas pendientes cuya fecha ya ha pasado
+
+        Args:
+            hoy: Fecha de referencia (por defecto date.today())
+
+        Returns:
+            Diccionario con "diarias" (número) y "proyectos" (Series nombre ->
+            número, solo proyectos con alguna atrasada)
+        """
+        self._asegurar()
+        hoy = hoy or date.today()
+        return self._en_cache(("atrasadas", hoy.toordinal()), lambda: self._atrasadas(hoy))
+
+    def _atrasadas(self, hoy):
+        columnas = self._tareas.vivas()
+        fechas = columnas["fecha"]
+        atrasada = ~columnas["completada"] & (fechas > 0) & (fechas < hoy.toordinal())
+        diarias = int(np.count_nonzero(atrasada & (columnas["origen"] == 0)))
+        codigos = columnas["proyecto"][atrasada & (columnas["origen"] == 1)]
+        cuentas = np.bincount(codigos, minlength=len(self._proyectos.nombres))
+        proyectos = pd.Series(cuentas, index=self._proyectos.nombres, dtype=np.int64)
+        # Los proyectos eliminados conservan su código pero ya no tienen filas
+        return {"diarias": diarias, "proyectos": proyectos[proyectos > 0].sort_values(ascending=False)}
+
+    def distribucion_categorias(self, periodo=None, desde=None, hasta=None):
+        """
+        Entradas de bitácora por categoría
+
+        Args:
+            periodo: None para el total, o "D", "W" o "M" para desglosar por periodo
+            desde: Primera fecha incluida (date) o None
+            hasta: Última fecha incluida (date) o None
+
+        Returns:
+            Series categoría -> número de entradas, o DataFrame periodo x categoría
+        """
+        self._asegurar()
+        return self._en_cache(("distribucion_categorias", periodo, _ordinal(desde), _ordinal(hasta)),
+                              lambda: self._distribucion_categorias(periodo, desde, hasta))
+
+    def _distribucion_categorias(self, periodo, desde, hasta):
+        columnas = self._bitacora.vivas()
+        fechas = columnas["fecha"]
+        seleccion = np.ones(len(fechas), dtype=np.bool_)
+        if desde is not None:
+            seleccion &= fechas >= desde.toordinal()
+        if hasta is not None:
+            seleccion &= fechas <= hasta.toordinal()
+        codigos = columnas["categoria"][seleccion]
+        # Entradas archivadas: (ordinal, categoría, número de entradas)
+        archivadas = [(ordinal, categoria, cantidad)
+                      for ordinal, categorias in self._resumen_archivado("bitacora", desde, hasta)
+                      for categoria, cantidad in categorias.items()]
+        if periodo is None:
+            cuentas = np.bincount(codigos[codigos >= 0], minlength=len(self._categorias.nombres))
+            serie = pd.Series(cuentas, index=self._categorias.nombres, dtype=np.int64)
+            if archivadas:
+                anteriores = pd.DataFrame(archivadas, columns=["fecha", "categoria", "entradas"])
+                serie = serie.add(anteriores.groupby("categoria")["entradas"].sum(), fill_value=0).astype(np.int64)
+            return serie[serie > 0].sort_values(ascending=False)
+        seleccion &= (fechas > 0) & (columnas["categoria"] >= 0)
+        if not seleccion.any() and not archivadas:
+            return pd.DataFrame()
+        tabla = None
+        if seleccion.any():
+            codigos = columnas["categoria"][seleccion]
+            tabla = pd.crosstab(_periodos(fechas[seleccion], periodo), self._categorias.categorical(codigos))
+            tabla.columns = tabla.columns.astype(object)
+        if archivadas:
+            anteriores = pd.DataFrame(archivadas, columns=["fecha", "categoria", "entradas"])
+            periodos = _periodos(anteriores["fecha"].to_numpy(dtype=np.int32), periodo)
+            anteriores = anteriores.groupby([periodos, anteriores["categoria"]])["entradas"].sum().unstack(fill_value=0)
+            tabla = anteriores if tabla is None else tabla.add(anteriores, fill_value=0)
+        tabla = tabla.fillna(0).astype(np.int64).sort_index()
+        tabla.index = tabla.index.to_timestamp()
+        return tabla
@@ -1,11 +1,21 @@
+import time
+from collections import deque
+from statistics import median
 import streamlit as st
-from funciones import cargar_tareas
+import instrumentacion
+from configuracion import NAVEGACION
+from funciones import (
+    cargar_tareas, estado_escritura, volcar_cambios, exportar_datos, importar_datos,
+    archivar_registros_antiguos, estado_archivo, iniciar_avisos, proximas_fechas_limite,
+    ultimo_archivado_automatico
+)
 
 # Importar módulos de vistas actualizados
 from diario import mostrar_vista_diaria
 from proyectos import mostrar_vista_proyectos
 from calendario import mostrar_vista_calendario
 from bitacora import mostrar_vista_bitacora
+from estadisticas import mostrar_vista_estadisticas
 
 # Configuración de la página
 st.set_page_config(
@@ -14,36 +24,153 @@ st.set_page_config(
     layout="wide"
 )
 
+# Instrumentación opcional (BULLET_JOURNAL_INSTRUMENTACION=1): mide el rerun desde aquí;
+# el panel de depuración puede pedir que se perfile el siguiente
+instrumentacion.iniciar_rerun(st.session_state.pop("perfilar_rerun", None))
+
 # Inicializar el estado de la sesión
-if 'tareas' not in st.session_state:
-    st.session_state.tareas = cargar_tareas()
+# Todas las sesiones apuntan a la misma copia de los datos del proceso; se
+# asigna en cada rerun porque solo se recarga si el archivo cambió en disco
+st.session_state.tareas = cargar_tareas()
+# Política de retención: lo antiguo pasa al archivo comprimido (una vez al día por proceso)
+archivar_registros_antiguos()
+# Avisos de fechas límite: un hilo del proceso los envía aunque nadie abra el calendario
+planificador_avisos = iniciar_avisos()
 if 'proyecto_actual' not in st.session_state:
     st.session_state.proyecto_actual = ""
 if 'pestana' not in st.session_state:
     st.session_state.pestana = "Diario"
 
+# Los cambios se escriben en segundo plano: avisar si esa escritura está fallando
+error_escritura = estado_escritura()["error"]
+if error_escritura:
+    st.warning(f"Los últimos cambios aún no se han podido guardar ({error_escritura}). Se reintentará automáticamente.")
+    st.button("Reintentar ahora", on_click=volcar_cambios)
+
+# Importar y exportar (CSV y JSONL por colección; iCalendar con las tareas con fecha)
+FORMATOS_INTERCAMBIO = {"CSV": "csv", "JSON Lines": "jsonl", "iCalendar (.ics)": "ics"}
+COLECCIONES_INTERCAMBIO = {"Tareas diarias": "diarias", "Tareas de proyectos": "tareas_proyecto", "Bitácora": "bitacora"}
+with st.sidebar.expander("📤 Importar / exportar"):
+    formato = FORMATOS_INTERCAMBIO[st.selectbox("Formato", list(FORMATOS_INTERCAMBIO), key="formato_intercambio")]
+    coleccion = None
+    if formato != "ics":
+        coleccion = COLECCIONES_INTERCAMBIO[st.selectbox("Colección", list(COLECCIONES_INTERCAMBIO), key="coleccion_intercambio")]
+
+    # El archivo se prepara bajo demanda: generarlo en cada rerun sería recorrer todos los datos
+    if st.button("Preparar exportación"):
+        st.session_state.exportacion = (formato, coleccion, exportar_datos(formato, coleccion))
+    exportacion = st.session_state.get("exportacion")
+    if exportacion and exportacion[:2] == (formato, coleccion) and exportacion[2] is not None:
+        exportacion[2].seek(0)
+        st.download_button(
+            "Descargar",
+            data=exportacion[2],
+            file_name=f"{coleccion or 'journal'}.{formato}",
+            mime={"csv": "text/csv", "jsonl": "application/x-ndjson", "ics": "text/calendar"}[formato],
+        )
+
+    archivo = st.file_uploader("Importar archivo", type=["csv", "jsonl", "ics"], key="archivo_intercambio")
+    if archivo is not None and st.button("Importar"):
+        resumen = importar_datos(archivo, formato, coleccion)
+        if resumen is not None:
+            st.success(f"Importados: {resumen['importados']}, duplicados omitidos: {resumen['duplicados']}, "
+                       f"proyectos creados: {resumen['proyectos_creados']}")
+            if resumen["errores"]:
+                st.warning(f"{resumen['errores']} registros con errores:\n\n" + "\n\n".join(resumen["mensajes"]))
+            st.session_state.tareas = cargar_tareas()
+
+# Archivo de registros antiguos: sigue visible en el calendario y en la búsqueda de la bitácora
+with st.sidebar.expander("🗄️ Archivo"):
+    archivados = estado_archivo()
+    st.caption(f"{archivados['diarias']} tareas diarias y {archivados['bitacora']} entradas de bitácora archivadas")
+    automatico = ultimo_archivado_automatico()
+    if automatico is not None:
+        fecha_automatico, movidos_automatico = automatico
+        st.caption(f"Archivado automático ({fecha_automatico}): {movidos_automatico.get('diarias', 0)} tareas "
+                   f"diarias y {movidos_automatico.get('bitacora', 0)} entradas de bitácora")
+    if st.button("Archivar ahora"):
+        movidos = archivar_registros_antiguos(forzar=True)
+        st.success(f"Archivadas {movidos.get('diarias', 0)} tareas diarias y "
+                   f"{movidos.get('bitacora', 0)} entradas de bitácora")
+
+# Próximas fechas límite y estado de los avisos en segundo plano
+if planificador_avisos is not None:
+    with st.sidebar.expander("🔔 Avisos"):
+        fechas = proximas_fechas_limite(5)
+        if fechas:
+            st.markdown("\n".join(f"- **{fecha}** {descripcion}" for fecha, descripcion in fechas))
+        else:
+            st.caption("No hay fechas límite pendientes")
+        destinos = ", ".join(getattr(destino, "nombre", type(destino).__name__) for destino in planificador_avisos.destinos)
+        st.caption(f"{planificador_avisos.enviados} avisos enviados ({destinos})")
+        for destino, error in planificador_avisos.errores.items():
+            st.warning(f"{destino}: {error}")
+
 # Título principal con estilo
 st.markdown("<h1 style='text-align: center; color: #4A90E2;'>📝 Mi Bullet Journal Digital</h1>", unsafe_allow_html=True)
 
-# Pestañas
-tabs = st.tabs(["📆 Tareas Diarias", "📋 Proyectos", "📔 Bitácora", "🗓️ Calendario"])
+# Vistas de la aplicación: clave de st.session_state.pestana -> (etiqueta, función)
+VISTAS = {
+    "Diario": ("📆 Tareas Diarias", mostrar_vista_diaria),
+    "Proyectos": ("📋 Proyectos", mostrar_vista_proyectos),
+    "Bitácora": ("📔 Bitácora", mostrar_vista_bitacora),
+    "Calendario": ("🗓️ Calendario", mostrar_vista_calendario),
+    "Estadísticas": ("📊 Estadísticas", mostrar_vista_estadisticas),
+}
 
-# Pestaña Tareas Diarias
-with tabs[0]:
-    mostrar_vista_diaria()
+# Función para ejecutar una vista midiendo cuánto tarda (últimas 20 ejecuciones por vista)
+def ejecutar_vista(nombre):
+    inicio = time.perf_counter()
+    VISTAS[nombre][1]()
+    tiempos = st.session_state.setdefault("tiempos_vistas", {})
+    tiempos.setdefault(nombre, deque(maxlen=20)).append(time.perf_counter() - inicio)
 
-# Pestaña Proyectos
-with tabs[1]:
-    mostrar_vista_proyectos()
+if NAVEGACION == "pestanas":
+    # st.tabs ejecuta el cuerpo de todas las pestañas en cada rerun
+    tabs = st.tabs([etiqueta for etiqueta, _ in VISTAS.values()])
+    for tab, nombre in zip(tabs, VISTAS):
+        with tab:
+            ejecutar_vista(nombre)
+else:
+    # Solo se ejecuta la vista seleccionada: un cambio en el Diario no reconstruye
+    # el calendario, la bitácora ni los widgets de los proyectos
+    if st.session_state.pestana not in VISTAS:
+        st.session_state.pestana = "Diario"
+    st.radio("Vista", list(VISTAS), key="pestana", horizontal=True,
+             format_func=lambda nombre: VISTAS[nombre][0], label_visibility="collapsed")
+    ejecutar_vista(st.session_state.pestana)
 
-# Pestaña Bitácora
-with tabs[2]:
-    mostrar_vista_bitacora()
-
-# Pestaña Calendario
-with tabs[3]:
-    mostrar_vista_calendario()
+# Tiempo de cada vista (mediana de sus últimas ejecuciones)
+with st.sidebar.expander("⏱️ Tiempo por vista"):
+    tiempos = st.session_state.get("tiempos_vistas", {})
+    for nombre in VISTAS:
+        if nombre in tiempos:
+            st.caption(f"{nombre}: {median(tiempos[nombre]) * 1000:.0f} ms (última {tiempos[nombre][-1] * 1000:.0f} ms)")
+    if NAVEGACION == "pestanas":
+        st.caption(f"Total por rerun: {sum(t[-1] for t in tiempos.values()) * 1000:.0f} ms")
 
 # Pie de página
 st.markdown("---")
-st.markdown("<p style='text-align: center;'>Bullet Journal Digital - Creado con Streamlit</p>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<p style='text-align: center;'>Bullet Journal Digital - Creado con Streamlit</p>", unsafe_allow_html=True)
+
+# Panel de depuración: medidas del rerun que acaba de terminar
+rerun = instrumentacion.terminar_rerun(st.session_state.get("pestana"))
+if rerun is not None:
+    if rerun.informe:
+        st.session_state.ultimo_perfil = (rerun.archivo_perfil, rerun.informe)
+    with st.sidebar.expander("🐞 Instrumentación", expanded=True):
+        st.caption(f"Rerun: {rerun.duracion * 1000:.0f} ms, {rerun.widgets} widgets, "
+                   f"{rerun.bytes_escritos} bytes escritos")
+        for nombre, (total, llamadas) in sorted(rerun.tiempos.items(), key=lambda t: -t[1][0]):
+            st.caption(f"{nombre}: {total * 1000:.1f} ms" + (f" ({llamadas} llamadas)" if llamadas > 1 else ""))
+        if instrumentacion.escrituras:
+            st.markdown("**Últimas escrituras**")
+            for tipo, tamano, segundos, hora in list(instrumentacion.escrituras)[-5:]:
+                st.caption(f"{hora} {tipo}: {tamano / 1024:.1f} KiB en {segundos * 1000:.1f} ms")
+        st.caption(f"Métricas en {instrumentacion.RUTA_METRICAS}")
+        perfilador = st.selectbox("Perfilador", instrumentacion.perfiladores_disponibles(), key="perfilador")
+        st.button("Perfilar el siguiente rerun", on_click=lambda: st.session_state.update(perfilar_rerun=perfilador))
+        if "ultimo_perfil" in st.session_state:
+            archivo, informe = st.session_state.ultimo_perfil
+            st.caption(f"Último perfil guardado en {archivo}")
+            st.code(informe, language=None)
@@ -0,0 +1,394 @@
+"""
+Archivo de registros antiguos (almacenamiento en frío)
+
+Las tareas diarias completadas y las entradas de bitácora antiguas salen
+de los datos compartidos, que las vistas, los índices y las escrituras
+recorren, y pasan a un directorio comprimido:
+
+    manifiesto.json             meses archivados: registros, versión y resumen por día
+    diarias/AAAA-MM.jsonl.gz    tareas diarias archivadas de un mes
+    bitacora/AAAA-MM.jsonl.gz   entradas de bitácora archivadas de un mes
+
+La política de retención (configuracion.RETENCION_DIARIAS_DIAS y
+RETENCION_BITACORA_DIAS) decide qué se archiva. Un mes archivado solo se
+descomprime cuando algo lo pide (el calendario al mostrar ese mes, una
+búsqueda que incluye el archivo, una restauración) y los últimos leídos
+se conservan en memoria. El resumen por día del manifiesto basta para las
+estadísticas, que así siguen contando lo archivado sin leerlo.
+
+Archivar escribe primero los meses del archivo y después elimina los
+registros de los datos con operaciones normales, así que funciona con
+cualquier backend. Si el proceso se interrumpe entre los dos pasos, el
+registro queda en los dos sitios: los datos mandan y el siguiente
+archivado lo vuelve a mover.
+
+Desde la línea de órdenes: python consola.py archivar (y restaurar).
+"""
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import almacenamiento
+from almacen_fragmentos import SIN_FECHA, _escribir_atomico, clave_fragmento
+from configuracion import RETENCION_BITACORA_DIAS, RETENCION_DIARIAS_DIAS, RUTA_ARCHIVO
+from registros import a_json
+
+MANIFIESTO = "manifiesto.json"
+
+# Colecciones que se archivan (el mes sale de su campo "fecha")
+COLECCIONES = ("diarias", "bitacora")
+
+# Meses descomprimidos que se conservan en memoria
+MESES_EN_MEMORIA = 12
+
+FORMATO = 1
+
+# Un archivo por directorio en cada proceso: ruta absoluta -> Archivo
+_archivos = {}
+_cerrojo_archivos = threading.Lock()
+
+def _manifiesto_vacio():
+    return {"formato": FORMATO, "secuencia": 0, "diarias": {}, "bitacora": {}}
+
+def _resumir(coleccion, registros):
+    """
+    Resumen de un mes para las estadísticas
+
+    Returns:
+        Diccionario fecha "AAAA-MM-DD" -> [total, completadas] (diarias) o
+        -> {categoría: entradas} (bitácora)
+    """
+    dias = {}
+    for registro in registros:
+        fecha = (registro.get("fecha") or "")[:10]
+        if coleccion == "diarias":
+            cuenta = dias.setdefault(fecha, [0, 0])
+            cuenta[0] += 1
+            cuenta[1] += bool(registro.get("completada", False))
+        elif registro.get("categoria") is not None:
+            categorias = dias.setdefault(fecha, {})
+            categorias[registro["categoria"]] = categorias.get(registro["categoria"], 0) + 1
+    return dias
+
+def _codificar_mes(registros):
+    # Sin escapar los acentos: las búsquedas descartan líneas mirando el texto sin decodificarlo
+    codificar = json.JSONEncoder(default=a_json, ensure_ascii=False).encode
+    texto = "".join(codificar(registro) + "\n" for registro in registros)
+    # mtime=0: el mismo contenido da siempre los mismos bytes
+    return gzip.compress(texto.encode(), mtime=0)
+
+class Archivo:
+    """
+    Meses archivados de un directorio
+
+    Relee el manifiesto cuando otro proceso lo cambia y conserva ya
+    descomprimidos los últimos meses leídos. Los registros devueltos son
+    diccionarios compartidos: los llamadores no deben modificarlos.
+    """
+
+    def __init__(self, ruta=RUTA_ARCHIVO, meses_en_memoria=MESES_EN_MEMORIA):
+        """
+        Args:
+            ruta: Directorio del archivo
+            meses_en_memoria: Meses descomprimidos que se conservan
+        """
+        self.ruta = ruta
+        self.meses_en_memoria = meses_en_memoria
+        self._cerrojo = threading.RLock()
+        self._manifiesto = _manifiesto_vacio()
+        self._firma = None
+        # (colección, mes) -> (versión, registros del mes)
+        self._meses = OrderedDict()
+        # (colección, id) -> registro o None, para describir referencias a registros archivados
+        self._por_id = {}
+
+    def _ruta_manifiesto(self):
+        return os.path.join(self.ruta, MANIFIESTO)
+
+    def _ruta_mes(self, coleccion, mes):
+        return os.path.join(self.ruta, coleccion, mes + ".jsonl.gz")
+
+    def manifiesto(self):
+        """Manifiesto del archivo, releído si ha cambiado en disco"""
+        with self._cerrojo:
+            try:
+                estado = os.stat(self._ruta_manifiesto())
+                firma = (estado.st_mtime_ns, estado.st_size)
+            except FileNotFoundError:
+                firma = None
+            if firma != self._firma:
+                self._manifiesto = self._leer_manifiesto()
+                self._firma = firma
+                self._por_id = {}
+            return self._manifiesto
+
+    def _leer_manifiesto(self):
+        try:
+            with open(self._ruta_manifiesto(), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return _manifiesto_vacio()
+
+    def version(self, coleccion, mes):
+        """Versión de un mes archivado (0 si no hay nada archivado de ese mes)"""
+        return self.manifiesto()[coleccion].get(mes, {}).get("version", 0)
+
+    def meses(self, coleccion):
+        """Meses "AAAA-MM" con registros archivados, ordenados"""
+        return sorted(self.manifiesto()[coleccion])
+
+    def total(self, coleccion):
+        """Número de registros archivados de una colección"""
+        return sum(resumen["registros"] for resumen in self.manifiesto()[coleccion].values())
+
+    def resumen(self, coleccion):
+        """Resumen por día de todo lo archivado de una colección (formato de _resumir), sin descomprimir"""
+        dias = {}
+        for resumen in self.manifiesto()[coleccion].values():
+            dias.update(resumen["dias"])
+        return dias
+
+    def registros_mes(self, coleccion, mes):
+        """Registros archivados de un mes (se descomprimen la primera vez)"""
+        with self._cerrojo:
+            version = self.version(coleccion, mes)
+            if not version:
+                return []
+            guardado = self._meses.get((coleccion, mes))
+            if guardado is not None and guardado[0] == version:
+                self._meses.move_to_end((coleccion, mes))
+                return guardado[1]
+            # Del más reciente al más antiguo, el orden en que se buscan
+            registros = sorted(self._leer_mes(coleccion, mes), key=lambda r: r.get("fecha") or "", reverse=True)
+            self._meses[(coleccion, mes)] = (version, registros)
+            while len(self._meses) > self.meses_en_memoria:
+                self._meses.popitem(last=False)
+            return registros
+
+    def _leer_texto(self, coleccion, mes):
+        try:
+            with gzip.open(self._ruta_mes(coleccion, mes), "rb") as file:
+                return file.read().decode()
+        except FileNotFoundError:
+            return ""
+
+    def _leer_mes(self, coleccion, mes):
+        return [json.loads(linea) for linea in self._leer_texto(coleccion, mes).splitlines() if linea.strip()]
+
+    def _candidatos(self, coleccion, mes, prefiltro):
+        """Registros del mes que pasan el prefiltro (sin decodificar los que no), del más reciente al más antiguo"""
+        with self._cerrojo:
+            guardado = self._meses.get((coleccion, mes))
+            if prefiltro is None or (guardado is not None and guardado[0] == self.version(coleccion, mes)):
+                return self.registros_mes(coleccion, mes)
+        texto = self._leer_texto(coleccion, mes)
+        if not prefiltro(texto):
+            return []
+        candidatos = [json.loads(linea) for linea in texto.splitlines() if linea.strip() and prefiltro(linea)]
+        return sorted(candidatos, key=lambda r: r.get("fecha") or "", reverse=True)
+
+    def buscar(self, coleccion, coincide, limite=None, prefiltro=None):
+        """
+        Registros archivados que cumplen una condición, de los más recientes a los más antiguos
+
+        Descomprime los meses de uno en uno y se detiene al llegar al límite.
+
+        Args:
+            coleccion: "diarias" o "bitacora"
+            coincide: Función registro -> bool
+            limite: Número máximo de resultados
+            prefiltro: Función texto -> bool que descarta, sin decodificar el JSON,
+                los meses y las líneas que no pueden coincidir (nunca debe descartar
+                una que sí coincida); los meses leídos así no se guardan en memoria
+
+        Returns:
+            Lista de registros
+        """
+        resultados = []
+        for mes in reversed(self.meses(coleccion)):
+            for registro in self._candidatos(coleccion, mes, prefiltro):
+                if coincide(registro):
+                    resultados.append(registro)
+                    if limite is not None and len(resultados) >= limite:
+                        return resultados
+        return resultados
+
+    def registro(self, coleccion, id_registro):
+        """Registro archivado por id, o None (el resultado se recuerda hasta que cambia el archivo)"""
+        with self._cerrojo:
+            self.manifiesto()
+            clave = (coleccion, id_registro)
+            if clave not in self._por_id:
+                encontrados = self.buscar(coleccion, lambda registro: registro["id"] == id_registro, 1)
+                self._por_id[clave] = encontrados[0] if encontrados else None
+            return self._por_id[clave]
+
+    def bloqueo(self):
+        """Bloqueo exclusivo entre procesos sobre el directorio del archivo"""
+        os.makedirs(self.ruta, exist_ok=True)
+        return almacenamiento.bloqueo(self._ruta_manifiesto())
+
+    def _reescribir(self, cambios):
+        """
+        Escribe los meses modificados y después el manifiesto (se llama con el bloqueo)
+
+        Args:
+            cambios: Diccionario (colección, mes) -> registros del mes (lista vacía para borrarlo)
+        """
+        manifiesto = self._leer_manifiesto()
+        # Cada reescritura da a sus meses una versión nueva, también a un mes que se vació y vuelve a llenarse
+        manifiesto["secuencia"] += 1
+        for (coleccion, mes), registros in sorted(cambios.items()):
+            ruta_mes = self._ruta_mes(coleccion, mes)
+            manifiesto[coleccion].pop(mes, None)
+            if registros:
+                _escribir_atomico(ruta_mes, _codificar_mes(registros), "archivo")
+                manifiesto[coleccion][mes] = {"registros": len(registros), "version": manifiesto["secuencia"],
+                                              "dias": _resumir(coleccion, registros)}
+        for ruta_mes in {coleccion: self._ruta_mes(coleccion, mes) for coleccion, mes in cambios}.values():
+            almacenamiento._sincronizar_directorio(ruta_mes)
+        contenido = json.dumps(manifiesto, ensure_ascii=False, sort_keys=True).encode()
+        _escribir_atomico(self._ruta_manifiesto(), contenido, "archivo")
+        almacenamiento._sincronizar_directorio(self._ruta_manifiesto())
+        # Los meses vaciados se borran cuando el manifiesto ya no los nombra
+        for (coleccion, mes), registros in cambios.items():
+            if not registros:
+                try:
+                    os.remove(self._ruta_mes(coleccion, mes))
+                except FileNotFoundError:
+                    pass
+        self.manifiesto()
+
+    def archivar(self, coleccion, registros):
+        """
+        Añade registros al archivo (un registro ya archivado con el mismo id se sustituye)
+
+        Args:
+            coleccion: "diarias" o "bitacora"
+            registros: Registros a archivar
+
+        Returns:
+            Número de registros archivados
+        """
+        por_mes = {}
+        for registro in registros:
+            por_mes.setdefault(clave_fragmento(registro), []).append(registro)
+        if not por_mes:
+            return 0
+        with self._cerrojo, self.bloqueo():
+            archivados = self._leer_manifiesto()[coleccion]
+            cambios = {}
+            for mes, nuevos in por_mes.items():
+                ids = {registro["id"] for registro in nuevos}
+                anteriores = self._leer_mes(coleccion, mes) if mes in archivados else []
+                cambios[(coleccion, mes)] = [r for r in anteriores if r["id"] not in ids] + list(nuevos)
+            self._reescribir(cambios)
+        return sum(len(nuevos) for nuevos in por_mes.values())
+
+    def retirar(self, coleccion, ids):
+        """
+        Saca registros del archivo (para devolverlos a los datos)
+
+        Returns:
+            Lista de los registros retirados
+        """
+        pendientes = set(ids)
+        retirados = []
+        with self._cerrojo, self.bloqueo():
+            manifiesto = self._leer_manifiesto()
+            cambios = {}
+            for mes in sorted(manifiesto[coleccion], reverse=True):
+                if not pendientes:
+                    break
+                registros = self._leer_mes(coleccion, mes)
+                quedan = [registro for registro in registros if registro["id"] not in pendientes]
+                if len(quedan) != len(registros):
+                    cambios[(coleccion, mes)] = quedan
+                    for registro in registros:
+                        if registro["id"] in pendientes:
+                            retirados.append(registro)
+                            pendientes.discard(registro["id"])
+            if cambios:
+                self._reescribir(cambios)
+        return retirados
+
+def obtener_archivo(ruta=RUTA_ARCHIVO):
+    """Archivo del proceso para un directorio (lo comparten el journal y los índices)"""
+    clave = os.path.abspath(ruta)
+    with _cerrojo_archivos:
+        archivo = _archivos.get(clave)
+        if archivo is None:
+            archivo = _archivos[clave] = Archivo(ruta)
+        return archivo
+
+def fechas_limite(hoy=None, dias_diarias=RETENCION_DIARIAS_DIAS, dias_bitacora=RETENCION_BITACORA_DIAS):
+    """
+    Primer día que se conserva en los datos de cada colección
+
+    Returns:
+        Diccionario colección -> fecha "AAAA-MM-DD" (sin las colecciones con retención 0)
+    """
+    hoy = hoy or date.today()
+    limites = {}
+    for coleccion, dias in (("diarias", dias_diarias), ("bitacora", dias_bitacora)):
+        if dias > 0:
+            limites[coleccion] = (hoy - timedelta(days=dias)).strftime("%Y-%m-%d")
+    return limites
+
+def _candidatas(seccion, limite, coleccion):
+    """Registros de la sección que pueden ser anteriores al límite"""
+    if not hasattr(seccion, "cargar_fragmentos"):
+        return seccion.values()
+    # Backend de fragmentos: solo los meses anteriores al límite y, en las diarias,
+    # los que tienen alguna completada (el manifiesto lo dice sin leerlos)
+    claves = []
+    for clave in seccion.fragmentos():
+        if clave == SIN_FECHA or clave > limite[:7]:
+            continue
+        resumen = seccion.metadatos(clave)
+        if coleccion == "bitacora" or resumen.get("registros", 0) > resumen.get("pendientes", 0):
+            claves.append(clave)
+    seccion.cargar_fragmentos(claves)
+    return seccion.registros_cargados()
+
+def _fecha_valida(fecha):
+    try:
+        date.fromisoformat(fecha)
+    except ValueError:
+        return False
+    return True
+
+def seleccionar(datos, hoy=None, dias_diarias=RETENCION_DIARIAS_DIAS, dias_bitacora=RETENCION_BITACORA_DIAS):
+    """
+    Registros que la política de retención manda al archivo
+
+    Las tareas diarias se archivan si están completadas y su fecha es
+    anterior al límite; las entradas de bitácora, solo por su fecha. Los
+    registros sin fecha válida, los restaurados desde el archivo y las
+    ocurrencias completadas de las tareas recurrentes (su regla las necesita
+    para no volver a generarlas como pendientes) se quedan en los datos.
+
+    Args:
+        datos: Diccionario del journal
+        hoy: Fecha de referencia (date; por defecto, hoy)
+        dias_diarias, dias_bitacora: Días que se conservan (0 = no archivar esa colección)
+
+    Returns:
+        Diccionario colección -> lista de registros
+    """
+    seleccion = {}
+    for coleccion, limite in fechas_limite(hoy, dias_diarias, dias_bitacora).items():
+        registros = []
+        for registro in _candidatas(datos[coleccion], limite, coleccion):
+            fecha = (registro.get("fecha") or "")[:10]
+            if fecha >= limite or registro.get("restaurada") or not _fecha_valida(fecha):
+                continue
+            if coleccion == "diarias" and (not registro.get("completada", False) or registro.get("recurrente")):
+                continue
+            registros.append(registro)
+        if registros:
+            seleccion[coleccion] = registros
+    return seleccion
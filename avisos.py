@@ -0,0 +1,304 @@
+"""
+Avisos de fechas límite en segundo plano
+
+Un hilo del proceso (fuera del hilo de los scripts de Streamlit) duerme
+hasta el siguiente aviso del índice de vencimientos (vencimientos.py) y lo
+envía a los destinos configurados. No recorre los datos en cada vuelta: el
+índice mantiene los avisos en un montículo con cada cambio y despierta al
+hilo cuando se programa uno nuevo. Además se despierta cada INTERVALO
+segundos para ver los cambios de otros procesos.
+
+Un destino es cualquier objeto con un método enviar(aviso); los incluidos
+son DestinoArchivo (JSON Lines), DestinoEscritorio (plyer o notify-send,
+si están disponibles) y DestinoCorreo (un servidor SMTP local). Los avisos
+enviados se recuerdan en RegistroEnviados para no repetirlos cuando el
+índice se reconstruye, la aplicación se reinicia u otro proceso vigila el
+mismo journal.
+
+Uso fuera de la aplicación:
+    python consola.py avisos            # próximas fechas límite
+    python consola.py avisos --vigilar  # envía los avisos hasta Ctrl+C
+"""
+import importlib.util
+import json
+import os
+import shutil
+import smtplib
+import subprocess
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+
+import almacenamiento
+from configuracion import (
+    AVISOS_DESTINATARIO, AVISOS_DESTINOS, AVISOS_REMITENTE, AVISOS_VENTANA_DIAS, RUTA_AVISOS,
+    RUTA_AVISOS_ENVIADOS, SMTP_PUERTO, SMTP_SERVIDOR
+)
+
+# Segundos entre vueltas cuando no hay avisos cercanos (cambios hechos por otros procesos)
+INTERVALO = 60
+
+def titulo_aviso(aviso):
+    if aviso["tipo"] == "vencida":
+        return f"Fecha límite vencida el {aviso['fecha_limite']}"
+    return f"Fecha límite el {aviso['fecha_limite']}"
+
+def texto_aviso(aviso):
+    """Texto de un aviso para mostrarlo en una línea"""
+    return f"{titulo_aviso(aviso)}: {aviso['descripcion']}"
+
+class DestinoArchivo:
+    """Añade cada aviso como una línea JSON a un archivo"""
+
+    nombre = "archivo"
+
+    def __init__(self, ruta=RUTA_AVISOS):
+        self.ruta = ruta
+
+    def enviar(self, aviso):
+        with open(self.ruta, "a", encoding="utf-8") as file:
+            file.write(json.dumps({**aviso, "texto": texto_aviso(aviso)}, ensure_ascii=False) + "\n")
+
+class DestinoEscritorio:
+    """
+    Notificación de escritorio
+
+    Usa plyer si está instalado y, si no, notify-send (Linux) u osascript
+    (macOS). Sin ninguno de ellos, enviar() lanza RuntimeError.
+    """
+
+    nombre = "escritorio"
+
+    def __init__(self):
+        self._plyer = importlib.util.find_spec("plyer") is not None
+        self._notify_send = shutil.which("notify-send")
+        self._osascript = shutil.which("osascript")
+
+    def disponible(self):
+        return bool(self._plyer or self._notify_send or self._osascript)
+
+    def enviar(self, aviso):
+        titulo, texto = titulo_aviso(aviso), aviso["descripcion"]
+        if self._plyer:
+            from plyer import notification
+            notification.notify(title=titulo, message=texto, app_name="Bullet Journal")
+        elif self._notify_send:
+            subprocess.run([self._notify_send, "--app-name=Bullet Journal", titulo, texto], check=True, timeout=10)
+        elif self._osascript:
+            orden = f"display notification {json.dumps(texto)} with title {json.dumps(titulo)}"
+            subprocess.run([self._osascript, "-e", orden], check=True, timeout=10)
+        else:
+            raise RuntimeError("no hay notificaciones de escritorio: instala plyer o notify-send")
+
+class DestinoCorreo:
+    """Envía cada aviso por correo a través de un servidor SMTP local (sin autenticación)"""
+
+    nombre = "correo"
+
+    def __init__(self, servidor=SMTP_SERVIDOR, puerto=SMTP_PUERTO, remitente=AVISOS_REMITENTE,
+                 destinatario=AVISOS_DESTINATARIO):
+        self.servidor = servidor
+        self.puerto = puerto
+        self.remitente = remitente
+        self.destinatario = destinatario
+
+    def enviar(self, aviso):
+        mensaje = EmailMessage()
+        mensaje["Subject"] = texto_aviso(aviso)
+        mensaje["From"] = self.remitente
+        mensaje["To"] = self.destinatario
+        mensaje.set_content(f"{titulo_aviso(aviso)}\n\n{aviso['descripcion']}\n")
+        with smtplib.SMTP(self.servidor, self.puerto, timeout=10) as smtp:
+            smtp.send_message(mensaje)
+
+DESTINOS = {clase.nombre: clase for clase in (DestinoArchivo, DestinoEscritorio, DestinoCorreo)}
+
+def crear_destinos(nombres=AVISOS_DESTINOS):
+    """
+    Destinos a partir de sus nombres
+
+    Args:
+        nombres: Lista o texto separado por comas ("archivo,correo")
+
+    Returns:
+        Lista de destinos
+    """
+    if isinstance(nombres, str):
+        nombres = [nombre.strip() for nombre in nombres.split(",") if nombre.strip()]
+    desconocidos = [nombre for nombre in nombres if nombre not in DESTINOS]
+    if desconocidos:
+        raise ValueError(f"destinos de avisos desconocidos: {', '.join(desconocidos)} "
+                         f"(disponibles: {', '.join(DESTINOS)})")
+    return [DESTINOS[nombre]() for nombre in nombres]
+
+class RegistroEnviados:
+    """
+    Avisos ya enviados, guardados en un archivo JSON pequeño
+
+    Se olvidan los de fechas límite que ya quedan fuera de la ventana de
+    avisos, porque esos no se vuelven a emitir. reservar() relee, anota y
+    guarda con el bloqueo del archivo, así que cada aviso lo envía un solo
+    proceso.
+    """
+
+    def __init__(self, ruta=RUTA_AVISOS_ENVIADOS, ventana_dias=AVISOS_VENTANA_DIAS):
+        self.ruta = ruta
+        self.ventana = timedelta(days=ventana_dias + 1)
+        self._enviados = {}
+        self.recargar()
+
+    @staticmethod
+    def _clave(aviso):
+        return f"{aviso['tipo']}:{aviso['coleccion']}:{aviso['clave']}:{aviso['fecha_limite']}"
+
+    def recargar(self):
+        """Lee el archivo (otro proceso puede haber enviado avisos)"""
+        try:
+            with open(self.ruta, encoding="utf-8") as file:
+                self._enviados = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self._enviados = {}
+
+    def marcar(self, aviso):
+        """Anota el aviso; devuelve False si ya se había enviado"""
+        clave = self._clave(aviso)
+        if clave in self._enviados:
+            return False
+        self._enviados[clave] = aviso["fecha_limite"]
+        return True
+
+    def guardar(self, hoy=None):
+        limite = ((hoy or date.today()) - self.ventana).isoformat()
+        self._enviados = {clave: fecha for clave, fecha in self._enviados.items() if fecha >= limite}
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as file:
+            json.dump(self._enviados, file, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+
+    def reservar(self, avisos, hoy=None):
+        """
+        Anota los avisos que ningún proceso ha enviado todavía
+
+        Returns:
+            Lista de los avisos que le toca enviar a quien llama
+        """
+        with almacenamiento.bloqueo(self.ruta):
+            self.recargar()
+            nuevos = [aviso for aviso in avisos if self.marcar(aviso)]
+            if nuevos:
+                self.guardar(hoy)
+        return nuevos
+
+class Planificador:
+    """
+    Hilo que envía los avisos de fechas límite de un journal
+
+    Cada vuelta saca del índice los avisos que ya tocan, los envía a todos
+    los destinos (un destino que falla no impide los demás; el error se
+    guarda en errores) y duerme hasta el siguiente aviso, como mucho
+    INTERVALO segundos, o hasta que el índice programa uno nuevo.
+    """
+
+    def __init__(self, journal, destinos, registro=None, intervalo=INTERVALO):
+        """
+        Args:
+            journal: nucleo.Journal cuyos vencimientos se vigilan
+            destinos: Objetos con un método enviar(aviso)
+            registro: RegistroEnviados (None = no recordar los avisos enviados)
+            intervalo: Segundos máximos entre vueltas
+        """
+        self.journal = journal
+        self.destinos = list(destinos)
+        self.registro = registro
+        self.intervalo = intervalo
+        self.enviados = 0
+        # Nombre del destino -> último error
+        self.errores = {}
+        self._despertar = threading.Event()
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Arranca el hilo (daemon) si no está ya en marcha"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._parar.clear()
+        self.journal.vigilar_vencimientos(self._despertar.set)
+        self._hilo = threading.Thread(target=self._bucle, name="avisos", daemon=True)
+        self._hilo.start()
+
+    def detener(self, espera=5):
+        self._parar.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+
+    def revisar(self, ahora=None):
+        """
+        Envía los avisos que ya tocan
+
+        Returns:
+            Instante del siguiente aviso programado, o None
+        """
+        avisos, siguiente = self.journal.vencimientos_pendientes(ahora)
+        if avisos and self.registro is not None:
+            # Se anotan antes de enviarlos: otro proceso que revise a la vez ya no los envía
+            avisos = self.registro.reservar(avisos)
+        for aviso in avisos:
+            for destino in self.destinos:
+                try:
+                    destino.enviar(aviso)
+                except Exception as e:
+                    nombre = getattr(destino, "nombre", type(destino).__name__)
+                    self.errores[nombre] = str(e)
+                    print(f"No se pudo enviar el aviso por {nombre}: {e}", file=sys.stderr)
+            self.enviados += 1
+        return siguiente
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            # Se borra antes de revisar: lo que se programe durante la vuelta la repite
+            self._despertar.clear()
+            try:
+                siguiente = self.revisar()
+            except Exception as e:
+                self.errores["planificador"] = str(e)
+                print(f"Error en los avisos de fechas límite: {e}", file=sys.stderr)
+                siguiente = None
+            espera = self.intervalo
+            if siguiente is not None:
+                espera = min(espera, max((siguiente - datetime.now()).total_seconds(), 0))
+            self._despertar.wait(espera)
+
+    def ejecutar(self):
+        """Ejecuta el bucle en el hilo actual hasta Ctrl+C (consola)"""
+        self.journal.vigilar_vencimientos(self._despertar.set)
+        try:
+            self._bucle()
+        except KeyboardInterrupt:
+            pass
+
+# Planificador único por proceso (los módulos importados sobreviven a los reruns de Streamlit)
+_cerrojo = threading.Lock()
+_planificador = None
+
+def iniciar_planificador(journal, destinos=None):
+    """
+    Arranca el planificador del proceso la primera vez y lo devuelve
+
+    Args:
+        journal: Journal cuyos vencimientos se vigilan
+        destinos: Destinos (por defecto, los de AVISOS_DESTINOS)
+    """
+    global _planificador
+    with _cerrojo:
+        if _planificador is None:
+            _planificador = Planificador(journal, crear_destinos() if destinos is None else destinos,
+                                         RegistroEnviados())
+            _planificador.iniciar()
+        return _planificador
+
+def planificador_activo():
+    """Planificador del proceso, o None si no se ha arrancado"""
+    return _planificador
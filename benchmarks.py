@@ -0,0 +1,996 @@
+"""
+Benchmarks del bullet journal
+
+Uso:
+    python benchmarks.py               # ejecuta todos
+    python benchmarks.py guardado      # ejecuta solo uno
+    python benchmarks.py carga 100     # argumentos del benchmark (tamaño en MB)
+    python benchmarks.py concurrencia 8  # número de procesos escritores
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import almacenamiento
+
+def generar_datos(num_tareas, num_proyectos=10, num_entradas=None):
+    """
+    Genera un journal sintético con el esquema de tareas.json
+
+    Args:
+        num_tareas: Número de tareas diarias
+        num_proyectos: Número de proyectos (las tareas de proyecto son num_tareas // 10)
+        num_entradas: Número de entradas de bitácora (por defecto num_tareas // 10)
+
+    Returns:
+        Diccionario con todas las tareas (colecciones indexadas por id)
+    """
+    if num_entradas is None:
+        num_entradas = num_tareas // 10
+    datos = {"diarias": [], "proyectos": {}, "bitacora": []}
+    for i in range(num_tareas):
+        datos["diarias"].append({
+            "descripcion": f"Tarea diaria número {i}",
+            "fecha": f"{2020 + i % 6}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "completada": i % 3 == 0,
+            "tipo": "diarias"
+        })
+    for p in range(num_proyectos):
+        datos["proyectos"][f"Proyecto {p}"] = {
+            "tareas": [],
+            "progreso": 0,
+            "fecha_creacion": "2024-01-01",
+            "fecha_limite": f"2025-{p % 12 + 1:02d}-15"
+        }
+    for i in range(num_tareas // 10):
+        datos["proyectos"][f"Proyecto {i % max(num_proyectos, 1)}"]["tareas"].append({
+            "descripcion": f"Tarea de proyecto {i}",
+            "fecha_creacion": "2024-01-01",
+            "fecha_limite": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "completada": i % 2 == 0,
+            "prioridad": ("Baja", "Media", "Alta")[i % 3],
+            "tipo": "proyecto"
+        })
+    for i in range(num_entradas):
+        datos["bitacora"].append({
+            "titulo": f"Nota {i}",
+            "contenido": "Observaciones sobre la cobranza y los requerimientos de pago. " * 4,
+            "fecha": f"{2020 + i % 6}-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:00:00",
+            "categoria": ("General", "Idea", "Problema", "Solución", "Logro", "Recordatorio")[i % 6],
+            "tarea_relacionada": None
+        })
+    almacenamiento.indexar_datos(datos)
+    return datos
+
+def _cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+def benchmark_guardado(tamanos=(1000, 10000, 100000), repeticiones=5):
+    """Latencia de guardado: instantánea atómica frente a una operación en el registro"""
+    print("Latencia de guardado (mediana)")
+    print(f"{'tareas':>8} {'instantánea':>14} {'operación':>12} {'ráfaga x50':>12}")
+    for tamano in tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta_datos = os.path.join(directorio, "tareas.json")
+            ruta_log = os.path.join(directorio, "tareas.log")
+            datos = generar_datos(tamano)
+            almacenamiento.guardar_datos(datos, ruta_datos, ruta_log)
+
+            t_instantanea = _cronometrar(
+                lambda: almacenamiento.guardar_datos(datos, ruta_datos, ruta_log), repeticiones)
+
+            operacion = almacenamiento.nueva_operacion("actualizar", "diarias", next(iter(datos["diarias"])),
+                                                       {"completada": True})
+            t_operacion = _cronometrar(
+                lambda: almacenamiento.registrar_operacion(operacion, ruta_datos, ruta_log), repeticiones * 4)
+
+            # Ráfaga de 50 guardados concurrentes: se agrupan en pocas escrituras
+            def rafaga():
+                hilos = [threading.Thread(target=almacenamiento.guardar_datos,
+                                          args=(datos, ruta_datos, ruta_log)) for _ in range(50)]
+                for hilo in hilos:
+                    hilo.start()
+                for hilo in hilos:
+                    hilo.join()
+            t_rafaga = _cronometrar(rafaga, 1)
+        print(f"{tamano:>8} {t_instantanea * 1000:>12.1f}ms {t_operacion * 1000:>10.2f}ms {t_rafaga * 1000:>10.1f}ms")
+
+def _progreso_recontando(proyecto):
+    # Implementación anterior: recorre todas las tareas en cada clic
+    tareas = proyecto["tareas"]
+    completadas = sum(1 for tarea in tareas.values() if tarea.get("completada", False))
+    return almacenamiento.calcular_progreso(completadas, len(tareas))
+
+def benchmark_progreso(tamanos=(100, 1000, 10000, 100000), repeticiones=200):
+    """Coste por clic al marcar una tarea: contadores incrementales frente a recuento"""
+    print("Coste de marcar una tarea de proyecto (mediana, sin E/S)")
+    print(f"{'tareas':>8} {'contadores':>12} {'recuento':>12}")
+    for tamano in tamanos:
+        datos = generar_datos(0, num_proyectos=1)
+        proyecto = datos["proyectos"]["Proyecto 0"]
+        for i in range(tamano):
+            proyecto["tareas"][f"t{i}"] = {"id": f"t{i}", "descripcion": f"Tarea {i}", "completada": i % 2 == 0}
+        almacenamiento.reconstruir_contadores(datos)
+
+        def marcar_con_contadores():
+            completada = proyecto["tareas"]["t0"]["completada"]
+            almacenamiento.aplicar_operacion(datos, almacenamiento.nueva_operacion(
+                "actualizar", "tareas_proyecto", "t0", {"completada": not completada}, "Proyecto 0"))
+            almacenamiento.aplicar_operacion(datos, almacenamiento.nueva_operacion(
+                "actualizar", "proyectos", "Proyecto 0",
+                almacenamiento.cambios_contadores(proyecto, delta_completadas=-1 if completada else 1)))
+
+        def marcar_recontando():
+            proyecto["tareas"]["t0"]["completada"] = not proyecto["tareas"]["t0"]["completada"]
+            proyecto["progreso"] = _progreso_recontando(proyecto)
+
+        t_contadores = _cronometrar(marcar_con_contadores, repeticiones)
+        t_recuento = _cronometrar(marcar_recontando, repeticiones)
+        print(f"{tamano:>8} {t_contadores * 1e6:>10.1f}µs {t_recuento * 1e6:>10.1f}µs")
+
+def benchmark_busqueda(num_entradas=100000, repeticiones=50):
+    """Latencia de consultas sobre el índice invertido de la bitácora"""
+    import random
+    from busqueda import IndiceBusqueda
+
+    aleatorio = random.Random(7)
+    from busqueda import PALABRAS_VACIAS
+
+    # Vocabulario con distribución de Zipf, como el texto real: las palabras
+    # más frecuentes son palabras vacías y detrás vienen las del dominio
+    raices = ["cobranza", "pago", "requerimiento", "cliente", "factura", "reunión", "informe",
+              "avance", "observación", "correo", "llamada", "contrato", "revisión", "plazo"]
+    vocabulario = sorted(PALABRAS_VACIAS) + raices + [f"palabra{i}" for i in range(5000)]
+    pesos = [1 / (i + 1) for i in range(len(vocabulario))]
+    datos = almacenamiento.estructura_vacia()
+    for i in range(num_entradas):
+        datos["bitacora"][str(i)] = {
+            "id": str(i),
+            "titulo": " ".join(aleatorio.choices(vocabulario, pesos, k=4)),
+            "contenido": " ".join(aleatorio.choices(vocabulario, pesos, k=60)),
+            "fecha": "2025-03-13 10:00:00",
+            "categoria": "General",
+            "tarea_relacionada": None
+        }
+
+    inicio = time.perf_counter()
+    indice = IndiceBusqueda(datos)
+    indice.buscar("")
+    print(f"Índice de búsqueda: {num_entradas} entradas construidas en {time.perf_counter() - inicio:.1f}s")
+    print(f"{'consulta':>28} {'resultados':>11} {'mediana':>10} {'máximo':>10}")
+    for consulta in ("factura", "revision plazo", "observacion cobr", "palabra12*", "palabra4999", "cliente contrato pago"):
+        # La primera consulta de cada término ordena su lista de entradas
+        indice.buscar(consulta)
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultados = indice.buscar(consulta)
+            tiempos.append(time.perf_counter() - inicio)
+        print(f"{consulta:>28} {len(resultados):>11} {statistics.median(tiempos) * 1000:>8.2f}ms "
+              f"{max(tiempos) * 1000:>8.2f}ms")
+
+def _calendario_concatenando(tareas_del_mes, mes, anio):
+    # Implementación anterior de calendario.mostrar_calendario: concatenación con +=
+    # (la hoja de estilos se omite; solo suma una copia de texto constante)
+    import calendar
+    from datetime import datetime
+    _, num_dias = calendar.monthrange(anio, mes)
+    dia_semana_inicio = datetime(anio, mes, 1).weekday()
+    calendario_html = '<table class="calendario"><tr>'
+    for dia in ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]:
+        calendario_html += f"<th>{dia}</th>"
+    calendario_html += "</tr><tr>"
+    for i in range(dia_semana_inicio):
+        calendario_html += '<td class="vacio"></td>'
+    hoy = datetime.now()
+    es_mes_actual = (hoy.month == mes and hoy.year == anio)
+    dia_actual = 1
+    dia_semana = dia_semana_inicio
+    while dia_actual <= num_dias:
+        clase_dia = "dia-actual" if es_mes_actual and dia_actual == hoy.day else ""
+        calendario_html += f'<td class="{clase_dia}">'
+        calendario_html += f'<div class="dia-numero">{dia_actual}</div>'
+        if dia_actual in tareas_del_mes:
+            for tarea in tareas_del_mes[dia_actual]:
+                clase_tarea = ""
+                if "diaria" in tarea["tipo"]:
+                    clase_tarea = "tarea-diaria"
+                elif "proyecto" in tarea["tipo"] or "deadline" in tarea["tipo"]:
+                    clase_tarea = "tarea-proyecto"
+                elif "bitacora" in tarea["tipo"]:
+                    clase_tarea = "tarea-bitacora"
+                if tarea.get("completada", False):
+                    clase_tarea += " tarea-completada"
+                calendario_html += f'<div class="tarea {clase_tarea}" title="{tarea["descripcion"]}">{tarea["descripcion"]}</div>'
+        calendario_html += '</td>'
+        dia_actual += 1
+        dia_semana = (dia_semana + 1) % 7
+        if dia_semana == 0 and dia_actual <= num_dias:
+            calendario_html += '</tr><tr>'
+    for i in range(dia_semana, 7):
+        calendario_html += '<td class="vacio"></td>'
+    calendario_html += '</tr></table>'
+    return calendario_html
+
+def benchmark_calendario(num_elementos=5000, repeticiones=50):
+    """Render del calendario de un mes: concatenación frente al renderizador con caché"""
+    from calendario_html import RenderizadorCalendario
+    from indice_fechas import IndiceFechas
+
+    datos = {"diarias": [], "proyectos": {}, "bitacora": []}
+    for i in range(num_elementos):
+        datos["diarias"].append({
+            "descripcion": f"Tarea diaria número {i} <revisar> & enviar",
+            "fecha": f"2025-03-{i % 31 + 1:02d}",
+            "completada": i % 3 == 0,
+            "tipo": "diarias"
+        })
+    almacenamiento.indexar_datos(datos)
+    indice = IndiceFechas(datos)
+    tareas_del_mes = indice.tareas_del_mes(2025, 3)
+    renderizador = RenderizadorCalendario()
+    id_tarea = next(iter(datos["diarias"]))
+
+    def tras_un_cambio():
+        # Marcar una tarea: cambia la versión de un día y solo se regenera esa celda
+        completada = datos["diarias"][id_tarea]["completada"]
+        operacion = almacenamiento.nueva_operacion("actualizar", "diarias", id_tarea, {"completada": not completada})
+        indice.antes_de_aplicar(datos, operacion)
+        almacenamiento.aplicar_operacion(datos, operacion)
+        indice.despues_de_aplicar(datos, operacion)
+        renderizador.renderizar(2025, 3, indice.tareas_del_mes(2025, 3), indice.versiones_mes(2025, 3))
+
+    t_anterior = _cronometrar(lambda: _calendario_concatenando(tareas_del_mes, 3, 2025), repeticiones)
+    t_completo = _cronometrar(lambda: renderizador.renderizar(2025, 3, tareas_del_mes), repeticiones)
+    renderizador.renderizar(2025, 3, tareas_del_mes, indice.versiones_mes(2025, 3))
+    t_cache = _cronometrar(
+        lambda: renderizador.renderizar(2025, 3, tareas_del_mes, indice.versiones_mes(2025, 3)), repeticiones)
+    t_cambio = _cronometrar(tras_un_cambio, repeticiones)
+    t_consulta = _cronometrar(lambda: IndiceFechas(datos).tareas_del_mes(2025, 3), 5)
+    print(f"Calendario de un mes con {num_elementos} elementos (mediana)")
+    print(f"{'concatenación (anterior)':>34} {t_anterior * 1000:>8.2f}ms")
+    print(f"{'join, sin caché (SQLite)':>34} {t_completo * 1000:>8.2f}ms")
+    print(f"{'caché, mes sin cambios':>34} {t_cache * 1000:>8.2f}ms")
+    print(f"{'caché, tras marcar una tarea':>34} {t_cambio * 1000:>8.2f}ms  (incluye tareas_del_mes)")
+    print(f"{'índice + tareas_del_mes sin caché':>34} {t_consulta * 1000:>8.2f}ms")
+
+class _Generada:
+    """Colección generada al vuelo: _escribir_json solo necesita recorrer values()"""
+
+    def __init__(self, generar):
+        self._generar = generar
+
+    def values(self):
+        return self._generar()
+
+def _escribir_journal(ruta, megas):
+    # Una quinta parte tareas diarias y el resto bitácora, sin tenerlo todo en memoria
+    import random
+    aleatorio = random.Random(11)
+    palabras = ["cobranza", "pago", "cliente", "factura", "reunión", "informe", "avance", "plazo",
+                "contrato", "revisión", "correo", "llamada", "requerimiento", "observación"]
+    num_diarias = megas * 1000 * 1000 // 5 // 140
+    num_entradas = megas * 1000 * 1000 * 4 // 5 // 1200
+
+    def diarias():
+        for i in range(num_diarias):
+            yield {"id": f"d{i:x}", "descripcion": f"Tarea diaria número {i}",
+                   "fecha": f"{2015 + i * 10 // num_diarias}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                   "completada": i % 3 == 0, "tipo": "diarias"}
+
+    def bitacora():
+        for i in range(num_entradas):
+            yield {"id": f"b{i:x}", "titulo": f"Nota {i}",
+                   "contenido": " ".join(aleatorio.choices(palabras, k=130)),
+                   "fecha": f"{2015 + i * 10 // num_entradas}-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:00:00",
+                   "categoria": "General", "tarea_relacionada": None}
+
+    datos = {"proyectos": {}, "diarias": _Generada(diarias), "bitacora": _Generada(bitacora)}
+    with open(ruta, "wb") as file:
+        secciones = almacenamiento._escribir_json(file, datos, 0)
+    tamano, mtime_ns = almacenamiento._firma_archivo(ruta)
+    with open(ruta + almacenamiento.SUFIJO_INDICE, "w") as file:
+        json.dump({"tamano": tamano, "mtime_ns": mtime_ns, "secciones": secciones}, file)
+    return num_diarias, num_entradas
+
+def _medir_carga(modo, ruta):
+    # Se ejecuta en un proceso aparte para que el pico de memoria sea solo el de la carga
+    import resource
+    from datetime import date
+    hoy = date.today().strftime("%Y-%m-%d")
+    inicio = time.perf_counter()
+    if modo == "json.load":
+        # Carga anterior: todo el texto y todo el árbol antes de mostrar nada
+        with open(ruta, "r") as file:
+            datos = json.load(file)
+        almacenamiento.indexar_datos(datos)
+    else:
+        datos = almacenamiento.cargar_datos(ruta, ruta + ".log")
+    # Primera vista (Registro diario): tareas de hoy y atrasadas
+    pendientes = [t for t in datos["diarias"].values() if t["fecha"] <= hoy and not t.get("completada")]
+    t_primera_vista = time.perf_counter() - inicio
+    pico_primera_vista = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    inicio = time.perf_counter()
+    len(datos["bitacora"])
+    t_bitacora = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"primera_vista": t_primera_vista, "bitacora": t_bitacora,
+                      "pico_primera_vista_mb": pico_primera_vista, "pico_mb": pico,
+                      "pendientes": len(pendientes)}))
+
+def benchmark_carga(megas=500):
+    """Tiempo hasta la primera vista y pico de memoria al cargar un journal grande"""
+    import subprocess
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "tareas.json")
+        inicio = time.perf_counter()
+        num_diarias, num_entradas = _escribir_journal(ruta, megas)
+        print(f"Journal de {os.path.getsize(ruta) / 1e6:.0f} MB ({num_diarias} tareas diarias, "
+              f"{num_entradas} entradas de bitácora) generado en {time.perf_counter() - inicio:.1f}s")
+        print(f"{'carga':>12} {'primera vista':>14} {'RSS':>8} {'+ bitácora':>11} {'RSS':>8}")
+        for modo in ("json.load", "diferida"):
+            salida = subprocess.run([sys.executable, __file__, "--medir-carga", modo, ruta],
+                                    capture_output=True, text=True, check=True).stdout
+            r = json.loads(salida)
+            print(f"{modo:>12} {r['primera_vista']:>13.2f}s {r['pico_primera_vista_mb']:>6.0f}MB "
+                  f"{r['bitacora']:>10.2f}s {r['pico_mb']:>6.0f}MB")
+
+def _registros_de_prueba(coleccion, cantidad):
+    # Mismo contenido que generar_datos, con ids como los de nuevo_id
+    for i in range(cantidad):
+        if coleccion == "diarias":
+            yield {"id": f"{i:016x}", "descripcion": f"Tarea diaria número {i}",
+                   "fecha": f"{2020 + i % 6}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                   "completada": i % 3 == 0, "tipo": "diarias"}
+        elif coleccion == "tareas_proyecto":
+            yield {"id": f"{i:016x}", "descripcion": f"Tarea de proyecto {i}", "fecha_creacion": "2024-01-01",
+                   "fecha_limite": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "completada": i % 2 == 0,
+                   "prioridad": ("Baja", "Media", "Alta")[i % 3], "tipo": "proyecto"}
+        else:
+            yield {"id": f"{i:016x}", "titulo": f"Nota {i}", "contenido": f"Observaciones sobre el pago {i}",
+                   "fecha": f"{2020 + i % 6}-{i % 12 + 1:02d}-{i % 28 + 1:02d} {i % 24:02d}:{i % 60:02d}:00",
+                   "categoria": ("General", "Idea", "Problema", "Solución", "Logro", "Recordatorio")[i % 6],
+                   "tarea_relacionada": None}
+
+def _memoria_retenida(construir):
+    """Bytes que siguen reservados después de construir (medido con tracemalloc)"""
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    resultado = construir()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultado, despues - antes
+
+def benchmark_memoria(cantidad=100000):
+    """Memoria por registro: diccionarios de json frente a registros compactos (registros.py)"""
+    from registros import a_registro
+    print(f"Memoria de {cantidad} registros por colección (decodificados desde JSON)")
+    print(f"{'colección':>16} {'dict':>10} {'compacto':>10} {'ahorro':>8} {'conversión':>11} {'lectura':>12}")
+    for coleccion in ("diarias", "tareas_proyecto", "bitacora"):
+        texto = json.dumps(list(_registros_de_prueba(coleccion, cantidad)))
+        diccionarios, bytes_dict = _memoria_retenida(lambda: json.loads(texto))
+        compactos, bytes_compacto = _memoria_retenida(
+            lambda: [a_registro(coleccion, registro) for registro in json.loads(texto)])
+        t_conversion = _cronometrar(lambda: [a_registro(coleccion, registro) for registro in diccionarios], 3)
+        # La conversión no pierde nada: vuelve a dar exactamente los mismos diccionarios
+        assert [registro.a_dict() for registro in compactos] == diccionarios
+        campo = "fecha_limite" if coleccion == "tareas_proyecto" else "fecha"
+        t_dict = _cronometrar(lambda: [registro[campo] for registro in diccionarios], 3)
+        t_compacto = _cronometrar(lambda: [registro[campo] for registro in compactos], 3)
+        print(f"{coleccion:>16} {bytes_dict / cantidad:>8.0f} B {bytes_compacto / cantidad:>8.0f} B "
+              f"{1 - bytes_compacto / bytes_dict:>7.0%} {t_conversion * 1e6 / cantidad:>9.2f}µs "
+              f"{t_dict * 1e9 / cantidad:>4.0f}/{t_compacto * 1e9 / cantidad:<4.0f}ns")
+        del diccionarios, compactos
+
+def benchmark_estadisticas(num_tareas=500000, repeticiones=5):
+    """Consultas de la pestaña Estadísticas sobre un historial de varios años"""
+    from datetime import date
+    from analitica import IndiceAnalitica
+    datos = generar_datos(num_tareas)
+    hoy = date(2025, 6, 1)
+    inicio = time.perf_counter()
+    indice = IndiceAnalitica(datos)
+    indice.atrasadas(hoy)
+    t_construccion = time.perf_counter() - inicio
+
+    def consultas():
+        for periodo in ("D", "W", "M"):
+            indice.tasa_completado(periodo)
+        indice.burndown("Proyecto 0", hoy)
+        indice.atrasadas(hoy)
+        indice.distribucion_categorias()
+        indice.distribucion_categorias("M")
+
+    id_tarea = next(iter(datos["diarias"]))
+
+    def tras_un_cambio():
+        completada = datos["diarias"][id_tarea]["completada"]
+        operacion = almacenamiento.nueva_operacion("actualizar", "diarias", id_tarea, {"completada": not completada})
+        indice.antes_de_aplicar(datos, operacion)
+        almacenamiento.aplicar_operacion(datos, operacion)
+        indice.despues_de_aplicar(datos, operacion)
+        consultas()
+
+    t_consultas = _cronometrar(tras_un_cambio, repeticiones)
+    t_cache = _cronometrar(consultas, repeticiones)
+    print(f"Estadísticas sobre {num_tareas} tareas diarias, {num_tareas // 10} de proyecto "
+          f"y {num_tareas // 10} entradas de bitácora (mediana)")
+    print(f"{'construcción de las tablas':>32} {t_construccion * 1000:>9.1f}ms")
+    print(f"{'todas las consultas tras un cambio':>32} {t_consultas * 1000:>9.1f}ms")
+    print(f"{'todas las consultas sin cambios':>32} {t_cache * 1000:>9.3f}ms")
+
+def benchmark_lote(cantidad=1000, repeticiones=3):
+    """Importar muchas tareas: una escritura por tarea frente a un lote"""
+    from almacen_compartido import AlmacenCompartido
+    directorio_original = os.getcwd()
+
+    def operaciones():
+        return [almacenamiento.nueva_operacion("anadir", "diarias", valor={
+            "id": almacenamiento.nuevo_id(), "descripcion": f"Tarea importada {i}",
+            "fecha": "2024-01-01", "completada": False, "tipo": "diarias"}) for i in range(cantidad)]
+
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            almacen = AlmacenCompartido(almacenamiento, indices={})
+            almacen.guardar()
+
+            def una_a_una():
+                for operacion in operaciones():
+                    almacen.aplicar(operacion)
+
+            def en_lote():
+                with almacen.lote():
+                    for operacion in operaciones():
+                        almacen.aplicar(operacion)
+
+            t_una_a_una = _cronometrar(una_a_una, repeticiones)
+            t_lote = _cronometrar(en_lote, repeticiones)
+            recargados = len(almacenamiento.cargar_datos()["diarias"])
+            almacenamiento.esperar_compactacion()
+        finally:
+            os.chdir(directorio_original)
+    print(f"Añadir {cantidad} tareas (mediana)")
+    print(f"{'una escritura por tarea':>24} {t_una_a_una * 1000:>9.1f}ms")
+    print(f"{'un lote':>24} {t_lote * 1000:>9.1f}ms")
+    print(f"{'tareas tras recargar':>24} {recargados} (esperadas {cantidad * repeticiones * 2})")
+
+def benchmark_escritura_diferida(cantidad=1000):
+    """Latencia de un cambio desde la interfaz: escritura inmediata frente a diferida"""
+    from almacen_compartido import AlmacenCompartido
+    directorio_original = os.getcwd()
+    print(f"Latencia por cambio ({cantidad} cambios, mediana y p99)")
+    for espera in (0, 0.25):
+        with tempfile.TemporaryDirectory() as directorio:
+            os.chdir(directorio)
+            try:
+                almacen = AlmacenCompartido(almacenamiento, indices={}, espera=espera)
+                almacen.aplicar(almacenamiento.nueva_operacion("anadir", "diarias", valor={
+                    "id": "t", "descripcion": "Tarea", "fecha": "2024-01-01", "completada": False,
+                    "tipo": "diarias"}))
+                almacen.flush()
+                tiempos = []
+                for i in range(cantidad):
+                    operacion = almacenamiento.nueva_operacion("actualizar", "diarias", "t", {"completada": i % 2 == 0})
+                    inicio = time.perf_counter()
+                    almacen.aplicar(operacion)
+                    tiempos.append(time.perf_counter() - inicio)
+                antiguedad = almacen.metricas_escritura()["antiguedad"]
+                inicio = time.perf_counter()
+                almacen.flush()
+                t_flush = time.perf_counter() - inicio
+                completada = almacenamiento.cargar_datos()["diarias"]["t"]["completada"]
+            finally:
+                os.chdir(directorio_original)
+        tiempos.sort()
+        nombre = "inmediata" if not espera else f"diferida ({espera * 1000:.0f} ms)"
+        print(f"{nombre:>16} {statistics.median(tiempos) * 1e6:>9.1f}µs {tiempos[int(len(tiempos) * 0.99)] * 1e6:>9.1f}µs"
+              f"   pendiente {antiguedad * 1000:.0f} ms, flush {t_flush * 1000:.1f} ms, "
+              f"en disco {'correcto' if completada == ((cantidad - 1) % 2 == 0) else 'ERROR'}")
+
+def _escritor_concurrente(directorio, numero, operaciones, espera_ms):
+    # Se ejecuta en un proceso aparte: un escritor más sobre el mismo journal.
+    # Con escritura diferida no se llama a flush(): lo pendiente se escribe al salir (atexit)
+    from almacen_compartido import AlmacenCompartido
+    os.chdir(directorio)
+    almacen = AlmacenCompartido(almacenamiento, indices={}, espera=int(espera_ms) / 1000)
+    nueva = almacenamiento.nueva_operacion
+    numero = int(numero)
+
+    def progreso(datos, delta_completadas=0, delta_total=0):
+        cambios = almacenamiento.cambios_contadores(datos["proyectos"]["Compartido"], delta_completadas, delta_total)
+        return nueva("actualizar", "proyectos", "Compartido", cambios)
+
+    def alternar(id_tarea):
+        def construir(datos):
+            completada = datos["proyectos"]["Compartido"]["tareas"][id_tarea]["completada"]
+            return [nueva("actualizar", "tareas_proyecto", id_tarea, {"completada": not completada}, "Compartido"),
+                    progreso(datos, delta_completadas=-1 if completada else 1)]
+        return construir
+
+    for i in range(int(operaciones)):
+        almacen.aplicar(nueva("anadir", "diarias", valor={
+            "id": f"p{numero}-{i}", "descripcion": f"Escritor {numero}, tarea {i}",
+            "fecha": "2024-01-01", "completada": False, "tipo": "diarias"}))
+        tarea = {"id": f"t{numero}-{i}", "descripcion": f"Escritor {numero}, tarea {i}",
+                 "fecha_creacion": "2024-01-01", "fecha_limite": "", "completada": False,
+                 "prioridad": "Media", "tipo": "proyecto"}
+        almacen.actualizar(lambda datos: [nueva("anadir", "tareas_proyecto", valor=tarea, proyecto="Compartido"),
+                                          progreso(datos, delta_total=1)])
+        # Cada escritor modifica su propio campo del mismo registro
+        almacen.aplicar(nueva("actualizar", "diarias", "compartida", {f"campo_p{numero}": i}))
+        if i % 3 == 0:
+            almacen.actualizar(alternar(f"t{numero}-{i}"))
+        if i % 5 == 0 and i:
+            almacen.actualizar(alternar(f"t{numero}-{i - 5}"))
+        if i % 50 == 25:
+            almacen.guardar()
+        if i % 70 == 60:
+            almacenamiento.compactar()
+
+def benchmark_concurrencia(procesos=8, operaciones=200):
+    """Prueba de estrés: varios procesos escriben a la vez sobre el mismo journal"""
+    for espera_ms in (0, 20):
+        print("Escritura inmediata" if not espera_ms else f"Escritura diferida ({espera_ms} ms)")
+        _prueba_concurrencia(procesos, operaciones, espera_ms)
+
+def _prueba_concurrencia(procesos, operaciones, espera_ms):
+    import subprocess
+    from almacen_compartido import AlmacenCompartido
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            almacen = AlmacenCompartido(almacenamiento, indices={})
+            almacen.aplicar(almacenamiento.nueva_operacion("anadir", "proyectos", "Compartido", {
+                "tareas": {}, "progreso": 0, "completadas": 0, "total": 0,
+                "fecha_creacion": "2024-01-01", "fecha_limite": ""}))
+            almacen.aplicar(almacenamiento.nueva_operacion("anadir", "diarias", valor={
+                "id": "compartida", "descripcion": "Registro compartido", "fecha": "2024-01-01",
+                "completada": False, "tipo": "diarias"}))
+            almacen.guardar()
+        finally:
+            os.chdir(directorio_original)
+        inicio = time.perf_counter()
+        escritores = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--escritor",
+                                        directorio, str(numero), str(operaciones), str(espera_ms)])
+                      for numero in range(procesos)]
+        fallos = sum(escritor.wait() != 0 for escritor in escritores)
+        duracion = time.perf_counter() - inicio
+
+        datos = almacenamiento.cargar_datos(os.path.join(directorio, almacenamiento.RUTA_DATOS),
+                                            os.path.join(directorio, almacenamiento.RUTA_LOG))
+    proyecto = datos["proyectos"]["Compartido"]
+    tareas = proyecto["tareas"]
+    faltan_diarias = sum(f"p{n}-{i}" not in datos["diarias"] for n in range(procesos) for i in range(operaciones))
+    faltan_tareas = sum(f"t{n}-{i}" not in tareas for n in range(procesos) for i in range(operaciones))
+    completadas = sum(1 for tarea in tareas.values() if tarea["completada"])
+    compartida = datos["diarias"]["compartida"]
+    campos = sum(compartida.get(f"campo_p{n}") == operaciones - 1 for n in range(procesos))
+    # Cada iteración hace 3 operaciones más las de alternar (2 cada una)
+    total_operaciones = procesos * sum(3 + 2 * (i % 3 == 0) + 2 * (i % 5 == 0 and i > 0) for i in range(operaciones))
+    print(f"{procesos} procesos x {operaciones} iteraciones: {total_operaciones} operaciones en {duracion:.2f}s "
+          f"({total_operaciones / duracion:.0f} op/s)")
+    print(f"{'procesos fallidos':>28} {fallos}")
+    print(f"{'tareas diarias perdidas':>28} {faltan_diarias}")
+    print(f"{'tareas de proyecto perdidas':>28} {faltan_tareas}")
+    print(f"{'contador total':>28} {proyecto['total']} (real {len(tareas)})")
+    print(f"{'contador completadas':>28} {proyecto['completadas']} (real {completadas})")
+    print(f"{'campos del registro común':>28} {campos} de {procesos}")
+    correcto = (not fallos and not faltan_diarias and not faltan_tareas and campos == procesos
+                and proyecto["total"] == len(tareas) and proyecto["completadas"] == completadas)
+    print("correcto" if correcto else "ERROR: se han perdido cambios")
+
+def benchmark_intercambio(cantidad=1_000_000):
+    """Importar y exportar un millón de filas en CSV, JSON Lines e iCalendar"""
+    import resource
+    import intercambio
+    from almacen_compartido import AlmacenCompartido
+    directorio_original = os.getcwd()
+    print(f"Intercambio de {cantidad} tareas diarias")
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            with open("entrada.csv", "w", encoding="utf-8", newline="") as archivo:
+                archivo.write("descripcion,fecha,completada\n")
+                for i in range(cantidad):
+                    archivo.write(f"Tarea importada {i},2024-{i % 12 + 1:02d}-{i % 28 + 1:02d},{i % 3 == 0}\n")
+            almacen = AlmacenCompartido(almacenamiento, indices={})
+            inicio = time.perf_counter()
+            with open("entrada.csv", encoding="utf-8", newline="") as archivo:
+                resumen = intercambio.importar(almacen, archivo, "csv", "diarias")
+            print(f"{'importar csv':>16} {time.perf_counter() - inicio:>8.2f}s "
+                  f"({resumen['importados']} importadas, {resumen['errores']} errores)")
+            datos = almacen.datos()
+            for formato in ("csv", "jsonl", "ics"):
+                inicio = time.perf_counter()
+                tamano = 0
+                with open(os.devnull, "w", encoding="utf-8", newline="") as salida:
+                    for bloque in intercambio.exportar(datos, formato, "diarias"):
+                        salida.write(bloque)
+                        tamano += len(bloque)
+                print(f"{'exportar ' + formato:>16} {time.perf_counter() - inicio:>8.2f}s ({tamano / 1e6:.0f} MB)")
+            inicio = time.perf_counter()
+            with open("salida.jsonl", "w", encoding="utf-8") as salida:
+                for bloque in intercambio.exportar(datos, "jsonl", "diarias"):
+                    salida.write(bloque)
+            with open("salida.jsonl", encoding="utf-8") as archivo:
+                resumen = intercambio.importar(almacen, archivo, "jsonl", "diarias")
+            print(f"{'reimportar jsonl':>16} {time.perf_counter() - inicio:>8.2f}s "
+                  f"({resumen['duplicados']} duplicados omitidos)")
+        finally:
+            os.chdir(directorio_original)
+    # Pico de memoria del proceso: lo ocupan los datos cargados, no los archivos
+    print(f"{'memoria máxima':>16} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:>8.0f} MB")
+
+def benchmark_consola(repeticiones=20, cantidad=1000):
+    """Arranque en frío de consola.py (proceso nuevo por orden) frente al objetivo de 100 ms"""
+    import compileall
+    import subprocess
+    consola = os.path.join(os.path.dirname(os.path.abspath(__file__)), "consola.py")
+    # Como en una instalación normal, el bytecode ya está compilado (aunque PYTHONDONTWRITEBYTECODE lo impida)
+    compileall.compile_dir(os.path.dirname(consola), maxlevels=0, quiet=1)
+    entorno = dict(os.environ, PYTHONPATH=os.path.dirname(consola), BULLET_JOURNAL_BACKEND="json")
+    print(f"Arranque de consola.py con {cantidad} tareas diarias ({repeticiones} ejecuciones, mediana y máximo)")
+    with tempfile.TemporaryDirectory() as directorio:
+        almacenamiento.guardar_datos({"diarias": {r["id"]: r for r in _registros_de_prueba("diarias", cantidad)},
+                                      "proyectos": {}, "bitacora": {}}, os.path.join(directorio, "tareas.json"),
+                                     os.path.join(directorio, "tareas.json.log"))
+        for orden in (["listar", "--pendientes"], ["buscar", "número 7"], ["anadir", "Tarea desde la consola"]):
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                subprocess.run([sys.executable, consola] + orden, cwd=directorio, env=entorno,
+                               stdout=subprocess.DEVNULL, check=True)
+                tiempos.append(time.perf_counter() - inicio)
+            mediana = statistics.median(tiempos)
+            # La consola no debe importar numpy ni pandas (solo las estadísticas los usan)
+            importados = subprocess.run([sys.executable, "-X", "importtime", consola] + orden, cwd=directorio,
+                                        env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                        text=True, check=True).stderr.splitlines()
+            pesados = sorted({linea.rsplit("|", 1)[-1].strip() for linea in importados} & {"numpy", "pandas"})
+            print(f"{' '.join(orden):>32} {mediana * 1000:>7.1f}ms {max(tiempos) * 1000:>7.1f}ms "
+                  f"{'ok' if mediana < 0.1 else 'por encima de 100 ms'}"
+                  f"{', importa ' + ' y '.join(pesados) if pesados else ''}")
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        print(f"{'(intérprete vacío)':>32} {(time.perf_counter() - inicio) * 1000:>7.1f}ms")
+
+def benchmark_consultas_consola(num_tareas=10000):
+    """Consultas con índice desde Journal.para_consola() (sin índices construidos de antemano), en cada backend"""
+    from datetime import date
+
+    import almacen_fragmentos
+    import almacen_sqlite
+    from nucleo import Journal
+
+    datos = generar_datos(num_tareas)
+    pendiente = next(tarea["id"] for tarea in datos["diarias"].values() if not tarea["completada"])
+    consultas = {
+        "tareas_del_mes": lambda journal: journal.tareas_del_mes(3, 2024),
+        "calendario_del_mes": lambda journal: journal.calendario_del_mes(3, 2024),
+        "fechas_invalidas": lambda journal: journal.fechas_invalidas(),
+        "buscar_entradas_bitacora": lambda journal: journal.buscar_entradas_bitacora("cobranza", "Idea", 10),
+        "buscar_tareas_pendientes": lambda journal: journal.buscar_tareas_pendientes("número", 10),
+        "describir_tarea": lambda journal: journal.describir_tarea(pendiente),
+        "proximas_fechas_limite": lambda journal: journal.proximas_fechas_limite(5, date(2025, 1, 1)),
+        "tasa_completado": lambda journal: journal.tasa_completado("M"),
+        "burndown_proyecto": lambda journal: journal.burndown_proyecto("Proyecto 0", date(2025, 12, 31)),
+        "tareas_atrasadas": lambda journal: journal.tareas_atrasadas(date(2025, 1, 1)),
+        "distribucion_categorias": lambda journal: journal.distribucion_categorias(),
+    }
+    print(f"{num_tareas} tareas diarias; primera consulta de un journal de consola (crea el índice)")
+    print(f"{'consulta':>26} " + " ".join(f"{backend:>12}" for backend in ("json", "sqlite", "fragmentos")))
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            backends = (almacenamiento, almacen_sqlite, almacen_fragmentos)
+            for backend in backends:
+                backend.guardar_datos(datos)
+            for nombre, consulta in consultas.items():
+                columnas = []
+                for backend in backends:
+                    journal = Journal.para_consola(backend)
+                    inicio = time.perf_counter()
+                    try:
+                        consulta(journal)
+                        columnas.append(f"{(time.perf_counter() - inicio) * 1000:>10.1f}ms")
+                    except Exception as e:
+                        columnas.append(f"{type(e).__name__:>12}")
+                print(f"{nombre:>26} " + " ".join(columnas))
+            almacenamiento.esperar_compactacion()
+        finally:
+            os.chdir(anterior)
+
+def _opciones_recorriendo(datos):
+    """Opciones del selector de la bitácora como se montaban antes: todas las pendientes en cada rerun"""
+    opciones = ["Ninguna"]
+    for tarea in datos["diarias"].values():
+        if not tarea.get("completada", False):
+            opciones.append(f"Diaria: {tarea['descripcion']}")
+    for nombre, proyecto in datos["proyectos"].items():
+        for tarea in proyecto["tareas"].values():
+            if not tarea.get("completada", False):
+                opciones.append(f"Proyecto {nombre}: {tarea['descripcion']}")
+    return opciones
+
+def benchmark_selector_bitacora(num_tareas=100000, repeticiones=20):
+    """Selector de tarea relacionada: todas las pendientes frente a las N mejores del índice"""
+    from pendientes import IndicePendientes
+    datos = generar_datos(num_tareas)
+    inicio = time.perf_counter()
+    indice = IndicePendientes(datos)
+    print(f"Índice de pendientes: {len(indice)} tareas construidas en {time.perf_counter() - inicio:.2f}s")
+    opciones = _cronometrar(lambda: _opciones_recorriendo(datos), repeticiones)
+    print(f"{'todas las pendientes':>28} {len(_opciones_recorriendo(datos)):>8} opciones {opciones * 1000:>8.2f}ms")
+    for consulta in ("", "tarea", "proyecto 7", "numero 1234", "diaria tarea 99"):
+        tiempo = _cronometrar(lambda: indice.buscar(consulta, 20), repeticiones)
+        print(f"{repr(consulta):>28} {len(indice.buscar(consulta, 20)):>8} opciones {tiempo * 1000:>8.2f}ms")
+
+def _repartir_por_meses(datos, meses=72):
+    """
+    Reparte las tareas diarias y la bitácora en orden por los meses de 2020 a 2025
+
+    Como en un journal real, las tareas de los meses anteriores están
+    completadas y en el último quedan pendientes.
+    """
+    for coleccion in ("diarias", "bitacora"):
+        registros = datos[coleccion]
+        for indice, registro in enumerate(registros.values()):
+            mes = indice * meses // len(registros)
+            fecha = f"{2020 + mes // 12}-{mes % 12 + 1:02d}-{indice % 28 + 1:02d}"
+            if coleccion == "diarias":
+                registro["fecha"] = fecha
+                registro["completada"] = mes < meses - 1 or indice % 3 == 0
+            else:
+                registro["fecha"] = fecha + " 10:00:00"
+    return datos
+
+def benchmark_fragmentos(num_tareas=300000, repeticiones=5):
+    """Journal de varios años: tareas.json entero frente a fragmentos por mes y por proyecto"""
+    import almacen_fragmentos
+    from almacen_compartido import AlmacenCompartido
+    from nucleo import Journal
+
+    datos = _repartir_por_meses(generar_datos(num_tareas))
+    ultimo_mes = "2025-12"
+    pendiente = next(tarea["id"] for tarea in datos["diarias"].values() if not tarea["completada"])
+    hoy = ultimo_mes + "-28"
+    print(f"{num_tareas} tareas diarias, {len(datos['bitacora'])} entradas de bitácora (mediana)")
+    print(f"{'backend':>12} {'primera vista':>14} {'completar':>11} {'escrito':>10}")
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            almacenamiento.guardar_datos(datos)
+            almacen_fragmentos.guardar_datos(datos)
+            del datos
+            for backend in (almacenamiento, almacen_fragmentos):
+                # Primera vista: cargar y filtrar las tareas de hoy y las atrasadas
+                def primera_vista():
+                    journal = Journal(AlmacenCompartido(backend, indices={}), backend)
+                    journal.filtrar_tareas_diarias(hoy, hoy, pendientes_hasta=hoy)
+                    return journal
+                t_vista = _cronometrar(primera_vista, repeticiones)
+                journal = primera_vista()
+                escrito = []
+                almacenamiento.observadores_escritura.append(lambda tipo, ruta, tamano, segundos: escrito.append(tamano))
+                t_completar = _cronometrar(lambda: journal.completar_tarea(pendiente), repeticiones)
+                almacenamiento.observadores_escritura.pop()
+                print(f"{backend.__name__:>12} {t_vista * 1000:>12.0f}ms {t_completar * 1000:>9.2f}ms "
+                      f"{sum(escrito) / repeticiones / 1024:>8.1f}KB")
+            almacenamiento.esperar_compactacion()
+        finally:
+            os.chdir(anterior)
+
+def benchmark_archivado(num_tareas=300000, repeticiones=5):
+    """Seis años de historial: datos completos frente a datos con lo antiguo en el archivo"""
+    from datetime import date
+    from almacen_compartido import AlmacenCompartido
+    from archivado import Archivo
+    from indice_fechas import IndiceFechas
+    from nucleo import Journal
+
+    datos = _repartir_por_meses(generar_datos(num_tareas))
+    hoy = "2025-12-28"
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            almacenamiento.guardar_datos(datos)
+            del datos
+
+            def primera_vista():
+                # Cargar y filtrar "Todas" en el registro diario, como la vista sin filtros
+                journal = Journal(AlmacenCompartido(almacenamiento, indices={}), almacenamiento)
+                journal.filtrar_tareas_diarias()
+                return journal
+
+            def medir(etiqueta):
+                t_vista = _cronometrar(primera_vista, repeticiones)
+                datos = primera_vista().datos
+                print(f"{etiqueta:>10} {len(datos['diarias']):>9} {len(datos['bitacora']):>9} "
+                      f"{os.path.getsize(almacenamiento.RUTA_DATOS) / 2**20:>9.1f}MB {t_vista * 1000:>10.0f}ms")
+
+            print(f"{num_tareas} tareas diarias en 72 meses; retención de 30 días (diarias) y 180 (bitácora)")
+            print(f"{'datos':>10} {'diarias':>9} {'bitácora':>9} {'tareas.json':>11} {'vista':>12}")
+            medir("antes")
+            journal = Journal.para_consola(almacenamiento)
+            journal._archivo = Archivo("archivo")
+            inicio = time.perf_counter()
+            movidos = journal.archivar(hoy=date.fromisoformat(hoy), dias_diarias=30, dias_bitacora=180)
+            t_archivar = time.perf_counter() - inicio
+            almacenamiento.compactar()
+            medir("después")
+            comprimido = sum(os.path.getsize(os.path.join(raiz, nombre))
+                             for raiz, _, nombres in os.walk("archivo") for nombre in nombres)
+            print(f"Archivados {movidos.get('diarias', 0)} tareas y {movidos.get('bitacora', 0)} entradas "
+                  f"en {t_archivar:.1f}s; archivo comprimido: {comprimido / 2**20:.1f}MB")
+
+            # Calendario de un mes archivado: la primera vez descomprime el mes, después está en memoria
+            indice = IndiceFechas(primera_vista().datos, archivo=Archivo("archivo"))
+            indice.tareas_del_mes(2025, 12)
+            inicio = time.perf_counter()
+            indice.tareas_del_mes(2023, 5)
+            print(f"Calendario de un mes archivado: {(time.perf_counter() - inicio) * 1000:.1f}ms la primera vez, "
+                  f"{_cronometrar(lambda: indice.tareas_del_mes(2023, 5), repeticiones) * 1000:.2f}ms después")
+            for consulta, limite in (("número 299", 20), ("número 12345", 20), ("no existe", 20)):
+                journal._archivo = Archivo("archivo")
+                inicio = time.perf_counter()
+                encontradas = journal.buscar_tareas(consulta, limite=limite, archivadas=True)
+                print(f"Buscar {consulta!r} incluyendo el archivo: {len(encontradas)} resultados en "
+                      f"{(time.perf_counter() - inicio) * 1000:.0f}ms")
+            almacenamiento.esperar_compactacion()
+        finally:
+            os.chdir(anterior)
+def benchmark_recurrentes(num_reglas=100, repeticiones=5):
+    """Tareas recurrentes desde el año 2000: reglas expandidas al ver frente a ocurrencias guardadas"""
+    import recurrencia
+    from almacen_compartido import AlmacenCompartido
+    from indice_fechas import IndiceFechas
+    from nucleo import Journal
+
+    hoy = "2025-06-16"
+    frecuencias = [regla for regla in recurrencia.FRECUENCIAS.values() if regla]
+    reglas = almacenamiento.estructura_vacia()
+    for numero in range(num_reglas):
+        regla = {"id": almacenamiento.nuevo_id(), "descripcion": f"Recurrente número {numero}",
+                 "regla": frecuencias[numero % len(frecuencias)], "inicio": "2000-01-01", "omitidas": []}
+        reglas["recurrentes"][regla["id"]] = regla
+    # La alternativa: guardar cada ocurrencia hasta 2030 como una tarea diaria
+    inicio = time.perf_counter()
+    guardadas = almacenamiento.estructura_vacia()
+    for tarea in recurrencia.expandir(list(reglas["recurrentes"].values()), "2000-01-01", "2030-12-31"):
+        tarea.pop("recurrente")
+        tarea["completada"] = tarea["fecha"] < hoy
+        guardadas["diarias"][tarea["id"]] = tarea
+    t_expandir_todo = time.perf_counter() - inicio
+    print(f"{num_reglas} reglas desde 2000-01-01 (diaria, laborables, semanal y mensual); "
+          f"guardadas hasta 2030 serían {len(guardadas['diarias'])} tareas ({t_expandir_todo:.1f}s en generarlas)")
+    print(f"{'datos':>12} {'archivo':>9} {'vista de hoy':>13} {'mes del calendario':>19}")
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        os.chdir(directorio)
+        try:
+            for etiqueta, datos in (("guardadas", guardadas), ("reglas", reglas)):
+                almacenamiento.guardar_datos(datos, "tareas.json", "tareas.log")
+
+                def primera_vista():
+                    # Cargar y filtrar las tareas de hoy y las atrasadas, como al abrir el registro diario
+                    journal = Journal(AlmacenCompartido(almacenamiento, indices={}), almacenamiento)
+                    journal.filtrar_tareas_diarias(hoy, hoy, pendientes_hasta=hoy)
+                    return journal
+
+                t_vista = _cronometrar(primera_vista, repeticiones)
+                indice = IndiceFechas(primera_vista().datos)
+                indice.tareas_del_mes(2025, 5)
+                t_mes = _cronometrar(lambda: IndiceFechas(indice._datos).tareas_del_mes(2025, 6), repeticiones)
+                print(f"{etiqueta:>12} {os.path.getsize('tareas.json') / 2**20:>7.1f}MB {t_vista * 1000:>11.1f}ms "
+                      f"{t_mes * 1000:>17.1f}ms")
+            almacenamiento.esperar_compactacion()
+        finally:
+            os.chdir(anterior)
+
+
+def _avisos_recorriendo(datos, ahora, antelacion, ventana):
+    """Avisos de una vuelta sin índice: recorrer todos los proyectos y tareas buscando fechas cercanas"""
+    from vencimientos import _fecha, proyecto_terminado
+    hoy = ahora.date()
+    avisos = []
+    for nombre, proyecto in datos["proyectos"].items():
+        registros = [(proyecto, not proyecto_terminado(proyecto))]
+        registros.extend((tarea, not tarea["completada"]) for tarea in proyecto["tareas"].values())
+        for registro, pendiente in registros:
+            fecha = _fecha(registro.get("fecha_limite")) if pendiente else None
+            if fecha is not None and hoy - ventana <= fecha <= hoy + antelacion:
+                avisos.append((fecha, nombre))
+    return avisos
+
+def benchmark_avisos(num_tareas=1000000, repeticiones=20):
+    """Vuelta del planificador de avisos: montículo de vencimientos frente a recorrer todas las fechas"""
+    from datetime import datetime, timedelta
+    from vencimientos import IndiceVencimientos
+
+    datos = generar_datos(num_tareas, num_proyectos=100, num_entradas=0)
+    almacenamiento.reconstruir_contadores(datos)
+    ahora = datetime(2025, 6, 9, 12)
+    inicio = time.perf_counter()
+    indice = IndiceVencimientos(datos)
+    # Lo anterior al día de la prueba (fechas de hace meses) se descarta al arrancar
+    indice.vencidos(ahora - timedelta(days=1))
+    print(f"{len(indice)} fechas límite pendientes ({num_tareas // 10} tareas de proyecto); "
+          f"índice construido en {time.perf_counter() - inicio:.2f}s")
+    recorrido = _cronometrar(lambda: _avisos_recorriendo(datos, ahora, indice.antelacion, indice.ventana), repeticiones)
+    print(f"{'recorriendo todo':>22} {recorrido * 1000:>10.2f}ms por vuelta")
+    # La primera vuelta saca los avisos del día; las siguientes solo miran la cima
+    emitidos = len(indice.vencidos(ahora))
+    vuelta = _cronometrar(lambda: (indice.vencidos(ahora), indice.proximo()), repeticiones)
+    print(f"{'montículo':>22} {vuelta * 1000:>10.4f}ms por vuelta ({emitidos} avisos en la primera)")
+    # Un cambio de fecha límite: una inserción en el montículo
+    proyecto = next(iter(datos["proyectos"]))
+    tareas = list(datos["proyectos"][proyecto]["tareas"])
+
+    def cambiar(numero=iter(range(10 ** 9))):
+        id_tarea = tareas[next(numero) % len(tareas)]
+        operacion = almacenamiento.nueva_operacion("actualizar", "tareas_proyecto", id_tarea,
+                                                   {"fecha_limite": "2025-07-01"}, proyecto)
+        almacenamiento.aplicar_operacion(datos, operacion)
+        indice.despues_de_aplicar(datos, operacion)
+
+    print(f"{'cambio de fecha':>22} {_cronometrar(cambiar, repeticiones) * 1000:>10.4f}ms")
+
+BENCHMARKS = {
+    "guardado": benchmark_guardado,
+    "progreso": benchmark_progreso,
+    "busqueda": benchmark_busqueda,
+    "calendario": benchmark_calendario,
+    "carga": benchmark_carga,
+    "memoria": benchmark_memoria,
+    "estadisticas": benchmark_estadisticas,
+    "concurrencia": benchmark_concurrencia,
+    "lote": benchmark_lote,
+    "escritura_diferida": benchmark_escritura_diferida,
+    "intercambio": benchmark_intercambio,
+    "consola": benchmark_consola,
+    "consultas_consola": benchmark_consultas_consola,
+    "selector_bitacora": benchmark_selector_bitacora,
+    "fragmentos": benchmark_fragmentos,
+    "archivado": benchmark_archivado,
+    "recurrentes": benchmark_recurrentes,
+    "avisos": benchmark_avisos,
+}
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--medir-carga"]:
+        _medir_carga(*sys.argv[2:4])
+        sys.exit(0)
+    if sys.argv[1:2] == ["--escritor"]:
+        _escritor_concurrente(*sys.argv[2:6])
+        sys.exit(0)
+    seleccion = sys.argv[1:] or list(BENCHMARKS)
+    if len(seleccion) > 1 and seleccion[1].isdigit():
+        import inspect
+        benchmark = BENCHMARKS[seleccion[0]]
+        argumento = int(seleccion[1])
+        # Los que reciben una tupla de tamaños (guardado, progreso) miden solo el indicado
+        primero = next(iter(inspect.signature(benchmark).parameters.values()))
+        if isinstance(primero.default, tuple):
+            argumento = (argumento,)
+        benchmark(argumento)
+        sys.exit(0)
+    for nombre in seleccion:
+        BENCHMARKS[nombre]()
+        print()
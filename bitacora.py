@@ -1,8 +1,14 @@
 import streamlit as st
-from funciones import agregar_entrada_bitacora, editar_entrada_bitacora, eliminar_entrada_bitacora
-import pandas as pd
-from datetime import datetime
+from configuracion import OPCIONES_TAREA_RELACIONADA
+from funciones import (
+    agregar_entrada_bitacora, editar_entrada_bitacora, eliminar_entrada_bitacora,
+    categorias_bitacora, filtrar_entradas_bitacora, buscar_entradas_bitacora,
+    buscar_tareas_pendientes, describir_tarea, meses_bitacora,
+    buscar_entradas_archivadas, estado_archivo, restaurar_archivados
+)
+from instrumentacion import medir
 
+@medir
 def mostrar_vista_bitacora():
     """
     Función principal que muestra la vista de bitácora
@@ -19,28 +25,25 @@ def mostrar_vista_bitacora():
 def mostrar_formulario_nueva_entrada():
     """
     Muestra el formulario para añadir una nueva entrada a la bitácora
+
+    El selector de tarea relacionada solo ofrece las mejores coincidencias
+    del índice de tareas pendientes con lo escrito en el buscador, así que
+    su coste no crece con el número de tareas. La entrada guarda el id.
     """
+    st.subheader("Nueva Entrada")
+
+    # Fuera del formulario para que filtrar el selector no espere al envío
+    consulta_tarea = st.text_input("🔍 Buscar tarea relacionada", key="buscar_tarea_relacionada",
+                                   placeholder="Escribe parte de la descripción o del proyecto")
+    coincidencias = dict(buscar_tareas_pendientes(consulta_tarea, OPCIONES_TAREA_RELACIONADA))
+
     with st.form("form_bitacora", clear_on_submit=True):
-        st.subheader("Nueva Entrada")
-        
         titulo = st.text_input("Título", key="titulo_bitacora")
-        
-        # Lista de tareas diarias y de proyectos para asociar
-        opciones_tareas = ["Ninguna"]
-        
-        # Añadir tareas diarias
-        for i, tarea in enumerate(st.session_state.tareas["diarias"]):
-            if not tarea.get("completada", False):
-                opciones_tareas.append(f"Diaria: {tarea['descripcion']}")
-        
-        # Añadir tareas de proyectos
-        for proyecto_nombre, proyecto_info in st.session_state.tareas["proyectos"].items():
-            for i, tarea in enumerate(proyecto_info["tareas"]):
-                if not tarea.get("completada", False):
-                    opciones_tareas.append(f"Proyecto {proyecto_nombre}: {tarea['descripcion']}")
-        
-        # Selector de tarea relacionada
-        tarea_relacionada = st.selectbox("Tarea relacionada", opciones_tareas, key="tarea_relacionada")
+
+        # Selector de tarea relacionada (None = ninguna)
+        tarea_relacionada = st.selectbox("Tarea relacionada", [None] + list(coincidencias),
+                                         format_func=lambda id_tarea: coincidencias.get(id_tarea, "Ninguna"),
+                                         key="tarea_relacionada")
         
         # Categoría
         categoria = st.selectbox("Categoría", ["General", "Idea", "Problema", "Solución", "Logro", "Recordatorio"], key="categoria_bitacora")
@@ -52,49 +55,60 @@ def mostrar_formulario_nueva_entrada():
     
     # Procesar formulario
     if submitted:
-        tarea_rel = None if tarea_relacionada == "Ninguna" else tarea_relacionada
-        if agregar_entrada_bitacora(titulo, contenido, categoria, tarea_rel):
+        if agregar_entrada_bitacora(titulo, contenido, categoria, tarea_relacionada):
             st.success("Entrada añadida a la bitácora correctamente")
 
 def mostrar_entradas_bitacora():
     """
     Muestra las entradas existentes en la bitácora
     """
-    if not st.session_state.tareas["bitacora"]:
+    if not st.session_state.tareas["bitacora"] and not estado_archivo()["bitacora"]:
         st.info("No hay entradas en la bitácora. Crea una para comenzar.")
         return
     
     # Opciones de filtrado
     st.subheader("Entradas")
     
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
         # Filtro por categoría
-        todas_categorias = ["Todas"] + list(set(entrada["categoria"] for entrada in st.session_state.tareas["bitacora"]))
+        todas_categorias = ["Todas"] + categorias_bitacora()
         filtro_categoria = st.selectbox("Filtrar por categoría", todas_categorias, key="filtro_categoria")
     
     with col2:
         # Ordenar por fecha
         orden = st.selectbox("Ordenar por", ["Más recientes primero", "Más antiguas primero"], key="orden_bitacora")
+
+    with col3:
+        # Por defecto el mes más reciente: con el backend de fragmentos solo se lee ese mes
+        meses = meses_bitacora()
+        filtro_mes = st.selectbox("Mes", meses + ["Todos"], key="mes_bitacora")
     
-    # Aplicar filtros
-    entradas_filtradas = st.session_state.tareas["bitacora"]
-    if filtro_categoria != "Todas":
-        entradas_filtradas = [e for e in entradas_filtradas if e["categoria"] == filtro_categoria]
+    # Búsqueda de texto en títulos, contenidos y tareas relacionadas
+    consulta = st.text_input("🔍 Buscar en la bitácora", key="buscar_bitacora",
+                             placeholder="Palabras o inicio de palabra (p. ej. cobr*)")
+    # El archivo solo se descomprime si se pide
+    incluir_archivo = st.checkbox("Buscar también en el archivo", key="buscar_archivo_bitacora")
     
-    # Ordenar
-    entradas_filtradas = sorted(
-        entradas_filtradas, 
-        key=lambda x: datetime.strptime(x["fecha"], "%Y-%m-%d %H:%M:%S"),
-        reverse=(orden == "Más recientes primero")
-    )
+    # Aplicar filtros y ordenar (por relevancia si hay búsqueda)
+    categoria = None if filtro_categoria == "Todas" else filtro_categoria
+    if consulta.strip():
+        entradas_filtradas = buscar_entradas_bitacora(consulta, categoria)
+        if not entradas_filtradas:
+            st.info("No hay entradas que coincidan con la búsqueda")
+    else:
+        entradas_filtradas = filtrar_entradas_bitacora(
+            categoria,
+            recientes_primero=(orden == "Más recientes primero"),
+            mes=None if filtro_mes == "Todos" else filtro_mes
+        )
     
     # Mostrar entradas
-    for i, entrada in enumerate(entradas_filtradas):
+    for entrada in entradas_filtradas:
         with st.expander(f"📝 {entrada['titulo']} - {entrada['fecha'][:10]} ({entrada['categoria']})"):
             st.markdown(f"**{entrada['titulo']}**")
             if entrada.get("tarea_relacionada"):
-                st.markdown(f"*Relacionada con:* {entrada['tarea_relacionada']}")
+                st.markdown(f"*Relacionada con:* {describir_tarea(entrada['tarea_relacionada'], entrada['fecha'])}")
             
             st.markdown("---")
             st.markdown(entrada['contenido'])
@@ -102,20 +116,24 @@ def mostrar_entradas_bitacora():
             
             col1, col2 = st.columns([1, 5])
             with col1:
-                if st.button("🗑️ Eliminar", key=f"eliminar_bitacora_{i}"):
-                    if eliminar_entrada_bitacora(i):
+                if st.button("🗑️ Eliminar", key=f"eliminar_bitacora_{entrada['id']}"):
+                    if eliminar_entrada_bitacora(entrada["id"]):
                         st.success("Entrada eliminada correctamente")
                         st.experimental_rerun()
             
             with col2:
-                if st.button("✏️ Editar", key=f"editar_bitacora_{i}"):
-                    st.session_state.editar_bitacora_index = i
+                if st.button("✏️ Editar", key=f"editar_bitacora_{entrada['id']}"):
+                    st.session_state.editar_bitacora_id = entrada["id"]
                     st.session_state.editar_bitacora_titulo = entrada['titulo']
                     st.session_state.editar_bitacora_contenido = entrada['contenido']
                     st.session_state.editar_bitacora_categoria = entrada['categoria']
     
+    # Entradas archivadas que coinciden con la búsqueda (solo lectura; se pueden restaurar)
+    if consulta.strip() and incluir_archivo:
+        mostrar_entradas_archivadas(consulta, categoria)
+
     # Formulario de edición si está en modo edición
-    if 'editar_bitacora_index' in st.session_state:
+    if 'editar_bitacora_id' in st.session_state:
         with st.form("form_editar_bitacora"):
             st.subheader("Editar Entrada")
             
@@ -132,17 +150,40 @@ def mostrar_entradas_bitacora():
                 guardar = st.form_submit_button("Guardar Cambios")
         
         if cancelar:
-            del st.session_state.editar_bitacora_index
+            del st.session_state.editar_bitacora_id
             del st.session_state.editar_bitacora_titulo
             del st.session_state.editar_bitacora_contenido
             del st.session_state.editar_bitacora_categoria
             st.experimental_rerun()
         
         if guardar:
-            if editar_entrada_bitacora(st.session_state.editar_bitacora_index, nuevo_titulo, nuevo_contenido, nueva_categoria):
+            if editar_entrada_bitacora(st.session_state.editar_bitacora_id, nuevo_titulo, nuevo_contenido, nueva_categoria):
                 st.success("Entrada actualizada correctamente")
-                del st.session_state.editar_bitacora_index
+                del st.session_state.editar_bitacora_id
                 del st.session_state.editar_bitacora_titulo
                 del st.session_state.editar_bitacora_contenido
                 del st.session_state.editar_bitacora_categoria
                 st.experimental_rerun()
+
+def mostrar_entradas_archivadas(consulta, categoria=None):
+    """
+    Muestra las entradas archivadas que coinciden con la búsqueda
+
+    Args:
+        consulta: Texto buscado
+        categoria: Solo las de esa categoría (None = todas)
+    """
+    archivadas = buscar_entradas_archivadas(consulta, categoria)
+    st.subheader("Archivadas")
+    if not archivadas:
+        st.info("No hay entradas archivadas que coincidan con la búsqueda")
+        return
+    for entrada in archivadas:
+        with st.expander(f"🗄️ {entrada['titulo']} - {entrada['fecha'][:10]} ({entrada['categoria']})"):
+            if entrada.get("tarea_relacionada"):
+                st.markdown(f"*Relacionada con:* {describir_tarea(entrada['tarea_relacionada'], entrada['fecha'])}")
+            st.markdown(entrada['contenido'])
+            if st.button("♻️ Restaurar", key=f"restaurar_bitacora_{entrada['id']}"):
+                if restaurar_archivados("bitacora", [entrada["id"]]):
+                    st.success("Entrada restaurada en la bitácora")
+                    st.rerun()
@@ -0,0 +1,251 @@
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+from bisect import bisect_left, insort
+
+# Campos indexados de cada entrada de bitácora y su peso en la puntuación
+CAMPOS = {"titulo": 3.0, "contenido": 1.0, "tarea_relacionada": 1.5}
+
+# Máximo de términos en que se expande un prefijo
+MAX_EXPANSIONES = 64
+
+# Las coincidencias por prefijo puntúan algo menos que las exactas
+FACTOR_PREFIJO = 0.8
+
+# Palabras vacías del español que no aportan a la búsqueda
+PALABRAS_VACIAS = frozenset("""
+a al algo como con de del e el en entre era es esa ese eso esta este esto ha hay la las le les lo
+los mas me mi muy no nos o para pero por que se sin sobre su sus te tu un una uno unos unas y ya
+""".split())
+
+_PALABRA = re.compile(r"[a-z0-9]+")
+
+def normalizar(texto):
+    """Pasa a minúsculas y elimina tildes y diéresis ("Solución" -> "solucion")"""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+def tokenizar(texto):
+    """Divide un texto en términos normalizados, sin palabras vacías"""
+    if not texto:
+        return []
+    return [t for t in _PALABRA.findall(normalizar(texto)) if t not in PALABRAS_VACIAS]
+
+class _TerminoConsulta:
+    """Término de una consulta: recorrido por peso descendente y acceso directo por entrada"""
+
+    def __init__(self, indice, termino, prefijo):
+        total = len(indice._entradas) or 1
+        if prefijo:
+            expansiones = indice._expandir(termino)
+        else:
+            expansiones = [termino] if termino in indice._postings else []
+        self._fuentes = []
+        for expansion in expansiones:
+            postings = indice._postings[expansion]
+            idf = math.log(1 + total / len(postings))
+            if expansion != termino:
+                idf *= FACTOR_PREFIJO
+            self._fuentes.append((postings, indice._ordenadas_de(expansion), idf))
+        self.frecuencia = sum(len(postings) for postings, _, _ in self._fuentes)
+        if len(self._fuentes) == 1:
+            self.peso = self._peso_unico
+
+    def recorrido(self):
+        """Itera (peso, clave) de mayor a menor peso"""
+        iteradores = [((-negativo * idf, clave) for negativo, clave in ordenadas)
+                      for _, ordenadas, idf in self._fuentes]
+        if len(iteradores) == 1:
+            return iteradores[0]
+        return heapq.merge(*iteradores, key=lambda par: -par[0])
+
+    def _peso_unico(self, clave):
+        postings, _, idf = self._fuentes[0]
+        peso = postings.get(clave)
+        return None if peso is None else peso * idf
+
+    def peso(self, clave):
+        """Peso de la entrada para este término, o None si no lo contiene"""
+        mejor = None
+        for postings, _, idf in self._fuentes:
+            peso = postings.get(clave)
+            if peso is not None and (mejor is None or peso * idf > mejor):
+                mejor = peso * idf
+        return mejor
+
+class IndiceBusqueda:
+    """
+    Índice invertido sobre el título, el contenido y la tarea relacionada de la bitácora
+
+    Cada término apunta a las entradas que lo contienen con un peso que combina
+    la frecuencia en cada campo y la longitud de la entrada; además se guarda
+    (a partir de la primera consulta que lo usa) la lista de entradas del
+    término ordenada por peso. Las consultas exigen todos los
+    términos, tratan el último (o los que acaban en "*") como prefijo y se
+    ordenan por tf-idf con el algoritmo de umbral de Fagin, que se detiene en
+    cuanto ninguna entrada sin ver puede entrar entre las mejores.
+
+    El índice se construye la primera vez que se busca y después se mantiene
+    con cada operación del almacén.
+    """
+
+    def __init__(self, datos=None):
+        self._datos = None
+        self._construido = False
+        self._postings = {}
+        self._ordenadas = {}
+        self._terminos = []
+        self._entradas = {}
+        self._terminos_entrada = {}
+        if datos is not None:
+            self.reconstruir(datos)
+
+    def reconstruir(self, datos):
+        # La construcción se aplaza hasta la primera búsqueda
+        self._datos = datos
+        self._construido = False
+
+    def _construir(self):
+        self._postings = {}
+        self._entradas = {}
+        self._terminos_entrada = {}
+        self._ordenadas = {}
+        for entrada in self._datos["bitacora"].values():
+            self._agregar(entrada, construyendo=True)
+        self._terminos = sorted(self._postings)
+        self._construido = True
+
+    def _ordenadas_de(self, termino):
+        """Entradas del término ordenadas por peso descendente (se ordenan al primer uso)"""
+        ordenadas = self._ordenadas.get(termino)
+        if ordenadas is None:
+            ordenadas = self._ordenadas[termino] = sorted(
+                (-peso, clave) for clave, peso in self._postings[termino].items())
+        return ordenadas
+
+    def _agregar(self, entrada, construyendo=False):
+        clave = id(entrada)
+        frecuencias = {}
+        longitud = 0
+        for campo, peso_campo in CAMPOS.items():
+            terminos = tokenizar(entrada.get(campo))
+            longitud += len(terminos)
+            for termino, veces in Counter(terminos).items():
+                frecuencias[termino] = frecuencias.get(termino, 0.0) + veces * peso_campo
+        norma = math.sqrt(longitud) if longitud else 1.0
+        for termino, frecuencia in frecuencias.items():
+            peso = frecuencia / norma
+            postings = self._postings.get(termino)
+            if postings is None:
+                postings = self._postings[termino] = {}
+                if not construyendo:
+                    insort(self._terminos, termino)
+            postings[clave] = peso
+            ordenadas = self._ordenadas.get(termino)
+            if ordenadas is not None:
+                insort(ordenadas, (-peso, clave))
+        self._entradas[clave] = entrada
+        self._terminos_entrada[clave] = tuple(frecuencias)
+
+    def _quitar(self, entrada):
+        clave = id(entrada)
+        for termino in self._terminos_entrada.pop(clave, ()):
+            postings = self._postings[termino]
+            peso = postings.pop(clave)
+            ordenadas = self._ordenadas.get(termino)
+            if ordenadas is not None:
+                ordenadas.pop(bisect_left(ordenadas, (-peso, clave)))
+            if not postings:
+                del self._postings[termino]
+                self._ordenadas.pop(termino, None)
+                self._terminos.pop(bisect_left(self._terminos, termino))
+        self._entradas.pop(clave, None)
+
+    def antes_de_aplicar(self, datos, operacion):
+        if not self._construido or operacion["coleccion"] != "bitacora" or operacion["op"] == "anadir":
+            return
+        if operacion["op"] == "actualizar" and not CAMPOS.keys() & operacion["valor"].keys():
+            return
+        self._quitar(datos["bitacora"][operacion["clave"]])
+
+    def despues_de_aplicar(self, datos, operacion):
+        if not self._construido or operacion["coleccion"] != "bitacora" or operacion["op"] == "eliminar":
+            return
+        if operacion["op"] == "anadir":
+            self._agregar(datos["bitacora"][operacion["valor"]["id"]])
+        elif CAMPOS.keys() & operacion["valor"].keys():
+            self._agregar(datos["bitacora"][operacion["clave"]])
+
+    def _expandir(self, prefijo):
+        """Términos del vocabulario que empiezan por el prefijo (con tope)"""
+        inicio = bisect_left(self._terminos, prefijo)
+        expansiones = []
+        for termino in self._terminos[inicio:inicio + MAX_EXPANSIONES]:
+            if not termino.startswith(prefijo):
+                break
+            expansiones.append(termino)
+        return expansiones
+
+    def buscar(self, consulta, limite=20, filtro=None):
+        """
+        Busca entradas que contengan todos los términos de la consulta
+
+        Args:
+            consulta: Texto libre; el último término (y los que acaban en "*") admite prefijos
+            limite: Número máximo de resultados
+            filtro: Función que recibe una entrada y devuelve si puede aparecer (se aplica antes del límite)
+
+        Returns:
+            Lista de tuplas (entrada, puntuacion) ordenadas de mayor a menor puntuación
+        """
+        if self._datos is not None and not self._construido:
+            self._construir()
+        palabras = consulta.split()
+        terminos = []
+        for i, palabra in enumerate(palabras):
+            prefijo = palabra.endswith("*") or i == len(palabras) - 1
+            for termino in _PALABRA.findall(normalizar(palabra)):
+                if termino not in PALABRAS_VACIAS or prefijo:
+                    terminos.append(_TerminoConsulta(self, termino, prefijo))
+        if not terminos or any(t.frecuencia == 0 for t in terminos):
+            return []
+        # Las entradas candidatas salen del término más selectivo
+        terminos.sort(key=lambda t: t.frecuencia)
+
+        siguientes = [t.recorrido().__next__ for t in terminos]
+        pesos = [t.peso for t in terminos]
+        umbrales = [math.inf] * len(terminos)
+        mejores = []
+        vistas = set()
+        while True:
+            for j, siguiente in enumerate(siguientes):
+                try:
+                    umbrales[j], clave = siguiente()
+                except StopIteration:
+                    # Todas las entradas con este término ya se han visto
+                    return self._resultados(mejores)
+                if clave in vistas:
+                    continue
+                vistas.add(clave)
+                if filtro is not None and not filtro(self._entradas[clave]):
+                    continue
+                puntuacion = 0.0
+                for peso_de in pesos:
+                    peso = peso_de(clave)
+                    if peso is None:
+                        break
+                    puntuacion += peso
+                else:
+                    if len(mejores) < limite:
+                        heapq.heappush(mejores, (puntuacion, clave))
+                    elif puntuacion > mejores[0][0]:
+                        heapq.heapreplace(mejores, (puntuacion, clave))
+            if len(mejores) == limite and mejores[0][0] >= sum(umbrales):
+                return self._resultados(mejores)
+
+    def _resultados(self, mejores):
+        return [(self._entradas[clave], puntuacion) for puntuacion, clave in sorted(mejores, reverse=True)]
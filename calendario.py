@@ -2,7 +2,15 @@ import streamlit as st
 from datetime import datetime
 import calendar
 from collections import defaultdict
+from calendario_html import RenderizadorCalendario
+from funciones import consultar_calendario_del_mes, fechas_invalidas
+from indice_fechas import IndiceFechas
+from instrumentacion import medir
 
+# HTML de los meses ya generados, compartido por las sesiones del proceso
+_renderizador = RenderizadorCalendario()
+
+@medir
 def mostrar_vista_calendario():
     """
     Función principal que muestra la vista de calendario
@@ -20,10 +28,17 @@ def mostrar_vista_calendario():
         año_seleccionado = st.selectbox("Año", range(año_actual-1, año_actual+3), index=1)
     
     # Recopilar tareas para el mes seleccionado
-    tareas_del_mes = recopilar_tareas_del_mes(st.session_state.tareas, mes_seleccionado, año_seleccionado)
+    tareas_del_mes, versiones = consultar_calendario_del_mes(mes_seleccionado, año_seleccionado)
+    
+    # Avisar de los registros con fechas que no se pudieron interpretar
+    invalidas = fechas_invalidas()
+    if invalidas:
+        with st.expander(f"⚠️ {len(invalidas)} registros con fecha no válida no aparecen en el calendario"):
+            for descripcion, fecha in invalidas:
+                st.text(f"{descripcion}: {fecha!r}")
     
     # Mostrar el calendario
-    mostrar_calendario(tareas_del_mes, mes_seleccionado, año_seleccionado)
+    mostrar_calendario(tareas_del_mes, mes_seleccionado, año_seleccionado, versiones)
     
     # Mostrar leyenda
     mostrar_leyenda()
@@ -31,7 +46,8 @@ def mostrar_vista_calendario():
     # Mostrar estadísticas
     mostrar_estadisticas(tareas_del_mes)
 
-def mostrar_calendario(tareas_del_mes, mes_seleccionado, año_seleccionado):
+@medir
+def mostrar_calendario(tareas_del_mes, mes_seleccionado, año_seleccionado, versiones=None):
     """
     Muestra un calendario mensual con las tareas correspondientes
     
@@ -39,137 +55,9 @@ def mostrar_calendario(tareas_del_mes, mes_seleccionado, año_seleccionado):
         tareas_del_mes: Diccionario con las tareas organizadas por día
         mes_seleccionado: Número del mes (1-12)
         año_seleccionado: Año
+        versiones: Versiones del mes en el índice de fechas (permiten reutilizar el HTML)
     """
-    # Obtener el número de días del mes seleccionado
-    _, num_dias = calendar.monthrange(año_seleccionado, mes_seleccionado)
-    
-    # Obtener el día de la semana del primer día del mes (0 = lunes, 6 = domingo)
-    primer_dia = datetime(año_seleccionado, mes_seleccionado, 1)
-    dia_semana_inicio = primer_dia.weekday()
-    
-    # Títulos de los días de la semana
-    dias_semana = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
-    
-    # Crear tabla de calendario
-    calendario_html = """
-    <style>
-    .calendario {
-        width: 100%;
-        border-collapse: collapse;
-    }
-    .calendario th {
-        background-color: #4682B4;
-        color: white;
-        text-align: center;
-        padding: 10px;
-        border: 1px solid #ddd;
-    }
-    .calendario td {
-        height: 100px;
-        width: 14.28%;
-        vertical-align: top;
-        border: 1px solid #ddd;
-        padding: 5px;
-    }
-    .calendario td.dia-actual {
-        background-color: #e6f7ff;
-    }
-    .calendario .dia-numero {
-        font-weight: bold;
-        margin-bottom: 5px;
-    }
-    .calendario .tarea {
-        font-size: 0.8em;
-        margin-bottom: 3px;
-        overflow: hidden;
-        text-overflow: ellipsis;
-        white-space: nowrap;
-    }
-    .calendario .tarea-diaria {
-        color: #1E90FF;
-    }
-    .calendario .tarea-proyecto {
-        color: #DC143C;
-    }
-    .calendario .tarea-bitacora {
-        color: #32CD32;
-    }
-    .calendario .tarea-completada {
-        text-decoration: line-through;
-        color: #888;
-    }
-    .calendario .vacio {
-        background-color: #f5f5f5;
-    }
-    </style>
-    <table class="calendario">
-    <tr>
-    """
-    
-    # Añadir encabezados de días de la semana
-    for dia in dias_semana:
-        calendario_html += f"<th>{dia}</th>"
-    
-    calendario_html += "</tr><tr>"
-    
-    # Añadir espacios en blanco para los días anteriores al primer día del mes
-    for i in range(dia_semana_inicio):
-        calendario_html += '<td class="vacio"></td>'
-    
-    # Día actual
-    hoy = datetime.now()
-    es_mes_actual = (hoy.month == mes_seleccionado and hoy.year == año_seleccionado)
-    
-    # Llenar el calendario con los días del mes
-    dia_actual = 1
-    dia_semana = dia_semana_inicio
-    
-    while dia_actual <= num_dias:
-        # Verificar si es el día actual
-        clase_dia = "dia-actual" if es_mes_actual and dia_actual == hoy.day else ""
-        
-        # Iniciar celda del día
-        calendario_html += f'<td class="{clase_dia}">'
-        calendario_html += f'<div class="dia-numero">{dia_actual}</div>'
-        
-        # Añadir tareas del día si existen
-        if dia_actual in tareas_del_mes:
-            for tarea in tareas_del_mes[dia_actual]:
-                # Determinar la clase CSS según el tipo de tarea
-                clase_tarea = ""
-                if "diaria" in tarea["tipo"]:
-                    clase_tarea = "tarea-diaria"
-                elif "proyecto" in tarea["tipo"] or "deadline" in tarea["tipo"]:
-                    clase_tarea = "tarea-proyecto"
-                elif "bitacora" in tarea["tipo"]:
-                    clase_tarea = "tarea-bitacora"
-                
-                # Añadir clase para tareas completadas
-                if tarea.get("completada", False):
-                    clase_tarea += " tarea-completada"
-                
-                # Añadir la tarea al calendario
-                calendario_html += f'<div class="tarea {clase_tarea}" title="{tarea["descripcion"]}">{tarea["descripcion"]}</div>'
-        
-        # Cerrar celda del día
-        calendario_html += '</td>'
-        
-        # Avanzar al siguiente día
-        dia_actual += 1
-        dia_semana = (dia_semana + 1) % 7
-        
-        # Si llegamos al domingo, cerrar la fila actual y comenzar una nueva
-        if dia_semana == 0 and dia_actual <= num_dias:
-            calendario_html += '</tr><tr>'
-    
-    # Añadir espacios en blanco para los días después del último día del mes
-    for i in range(dia_semana, 7):
-        calendario_html += '<td class="vacio"></td>'
-    
-    # Cerrar la tabla
-    calendario_html += '</tr></table>'
-    
-    # Mostrar el calendario
+    calendario_html = _renderizador.renderizar(año_seleccionado, mes_seleccionado, tareas_del_mes, versiones)
     st.markdown(calendario_html, unsafe_allow_html=True)
 
 def mostrar_leyenda():
@@ -240,6 +128,10 @@ def recopilar_tareas_del_mes(tareas, mes_seleccionado, año_seleccionado):
     """
     Recopila todas las tareas para el mes y año seleccionados
     
+    Construye un índice de fechas temporal sobre los datos recibidos; la vista
+    usa en su lugar el índice del almacén compartido (consultar_tareas_del_mes),
+    que se mantiene con cada cambio y no recorre todo el historial.
+    
     Args:
         tareas: Diccionario con todas las tareas
         mes_seleccionado: Número del mes (1-12)
@@ -248,93 +140,4 @@ def recopilar_tareas_del_mes(tareas, mes_seleccionado, año_seleccionado):
     Returns:
         Diccionario con las tareas organizadas por día del mes
     """
-    from funciones import agregar_a_tareas_del_mes
-    
-    tareas_del_mes = {}
-    
-    # Recopilar tareas diarias
-    for tarea in tareas["diarias"]:
-        # Convertir fecha a objeto datetime
-        try:
-            fecha = datetime.strptime(tarea["fecha"], "%Y-%m-%d")
-            if fecha.month == mes_seleccionado and fecha.year == año_seleccionado:
-                dia = fecha.day
-                if dia not in tareas_del_mes:
-                    tareas_del_mes[dia] = []
-                
-                # Crear copia de la tarea para el calendario
-                tarea_calendario = {
-                    "descripcion": tarea["descripcion"],
-                    "tipo": "diaria",
-                    "completada": tarea.get("completada", False)
-                }
-                
-                tareas_del_mes[dia].append(tarea_calendario)
-        except:
-            pass
-    
-    # Recopilar tareas de proyectos (fechas límite)
-    for proyecto_nombre, proyecto_info in tareas["proyectos"].items():
-        # Fecha límite del proyecto
-        if proyecto_info["fecha_limite"]:
-            try:
-                fecha = datetime.strptime(proyecto_info["fecha_limite"], "%Y-%m-%d")
-                if fecha.month == mes_seleccionado and fecha.year == año_seleccionado:
-                    dia = fecha.day
-                    if dia not in tareas_del_mes:
-                        tareas_del_mes[dia] = []
-                    
-                    # Crear descripción para el calendario
-                    tarea_calendario = {
-                        "descripcion": f"Fecha límite: {proyecto_nombre}",
-                        "tipo": "deadline-proyecto",
-                        "completada": False
-                    }
-                    
-                    tareas_del_mes[dia].append(tarea_calendario)
-            except:
-                pass
-        
-        # Tareas de proyecto con fechas límite
-        for tarea in proyecto_info["tareas"]:
-            if tarea["fecha_limite"]:
-                try:
-                    fecha = datetime.strptime(tarea["fecha_limite"], "%Y-%m-%d")
-                    if fecha.month == mes_seleccionado and fecha.year == año_seleccionado:
-                        dia = fecha.day
-                        if dia not in tareas_del_mes:
-                            tareas_del_mes[dia] = []
-                        
-                        # Crear descripción para el calendario
-                        tarea_calendario = {
-                            "descripcion": f"{tarea['descripcion']} ({proyecto_nombre})",
-                            "tipo": f"tarea-proyecto: {tarea['prioridad']}",
-                            "completada": tarea.get("completada", False)
-                        }
-                        
-                        tareas_del_mes[dia].append(tarea_calendario)
-                except:
-                    pass
-    
-    # Recopilar entradas de bitácora
-    for entrada in tareas["bitacora"]:
-        fecha_str = entrada["fecha"].split()[0]  # Obtener solo la parte de la fecha (sin hora)
-        try:
-            fecha = datetime.strptime(fecha_str, "%Y-%m-%d")
-            if fecha.month == mes_seleccionado and fecha.year == año_seleccionado:
-                dia = fecha.day
-                if dia not in tareas_del_mes:
-                    tareas_del_mes[dia] = []
-                
-                # Crear descripción para el calendario
-                tarea_calendario = {
-                    "descripcion": f"Nota: {entrada['titulo']}",
-                    "tipo": "bitacora",
-                    "completada": False  # Las notas no se completan
-                }
-                
-                tareas_del_mes[dia].append(tarea_calendario)
-        except:
-            pass
-    
-    return tareas_del_mes
+    return IndiceFechas(tareas).tareas_del_mes(año_seleccionado, mes_seleccionado)
@@ -0,0 +1,143 @@
+import calendar
+import threading
+from collections import OrderedDict
+from datetime import date
+from html import escape
+
+# Hoja de estilos del calendario (constante: no se reconstruye en cada rerun)
+ESTILOS = """<style>
+.calendario { width: 100%; border-collapse: collapse; }
+.calendario th { background-color: #4682B4; color: white; text-align: center; padding: 10px; border: 1px solid #ddd; }
+.calendario td { height: 100px; width: 14.28%; vertical-align: top; border: 1px solid #ddd; padding: 5px; }
+.calendario td.dia-actual { background-color: #e6f7ff; }
+.calendario .dia-numero { font-weight: bold; margin-bottom: 5px; }
+.calendario .tarea { font-size: 0.8em; margin-bottom: 3px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }
+.calendario .tarea-diaria { color: #1E90FF; }
+.calendario .tarea-proyecto { color: #DC143C; }
+.calendario .tarea-bitacora { color: #32CD32; }
+.calendario .tarea-completada { text-decoration: line-through; color: #888; }
+.calendario .vacio { background-color: #f5f5f5; }
+</style>"""
+
+DIAS_SEMANA = ("Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom")
+
+_CABECERA = '<table class="calendario"><tr>' + "".join(f"<th>{dia}</th>" for dia in DIAS_SEMANA) + "</tr><tr>"
+
+_VACIO = '<td class="vacio"></td>'
+
+# Meses cuyo HTML se conserva
+MAX_MESES = 24
+
+_clases = {}
+
+def _clase_tarea(tipo, completada):
+    """Clase CSS según el tipo de tarea (mismo criterio que la vista original)"""
+    clase = _clases.get((tipo, completada))
+    if clase is None:
+        clase = _clases[(tipo, completada)] = _calcular_clase(tipo, completada)
+    return clase
+
+def _calcular_clase(tipo, completada):
+    if "diaria" in tipo:
+        clase = "tarea-diaria"
+    elif "proyecto" in tipo or "deadline" in tipo:
+        clase = "tarea-proyecto"
+    elif "bitacora" in tipo:
+        clase = "tarea-bitacora"
+    else:
+        clase = ""
+    return clase + " tarea-completada" if completada else clase
+
+def celda_dia(dia, tareas, es_hoy=False):
+    """
+    HTML de la celda de un día, con las descripciones escapadas
+
+    Args:
+        dia: Número del día
+        tareas: Elementos del día (formato de tareas_del_mes) o None
+        es_hoy: Resaltar la celda como día actual
+
+    Returns:
+        Texto HTML de la celda
+    """
+    partes = ['<td class="dia-actual">' if es_hoy else '<td class="">', f'<div class="dia-numero">{dia}</div>']
+    partes.extend(
+        f'<div class="tarea {_clase_tarea(tarea["tipo"], tarea.get("completada", False))}" title="{d}">{d}</div>'
+        for tarea in tareas or () for d in (escape(tarea["descripcion"]),)
+    )
+    partes.append("</td>")
+    return "".join(partes)
+
+class RenderizadorCalendario:
+    """
+    Genera el HTML del calendario mensual y lo conserva entre reruns
+
+    Cada mes se guarda junto con la versión que tenía en el índice de fechas:
+    si no ha cambiado se devuelve tal cual, y si ha cambiado solo se
+    regeneran las celdas de los días cuya versión es distinta. Sin versiones
+    (backend SQLite) el mes se genera completo en cada llamada.
+    """
+
+    def __init__(self, max_meses=MAX_MESES):
+        self._max_meses = max_meses
+        self._meses = OrderedDict()
+        self._cerrojo = threading.Lock()
+
+    def renderizar(self, anio, mes, tareas_del_mes, versiones=None, hoy=None):
+        """
+        Devuelve el HTML del mes (estilos incluidos)
+
+        Args:
+            anio: Año
+            mes: Número del mes (1-12)
+            tareas_del_mes: Diccionario día -> elementos (IndiceFechas.tareas_del_mes)
+            versiones: IndiceFechas.versiones_mes del mismo momento, o None para no cachear
+            hoy: Fecha actual (por defecto date.today())
+
+        Returns:
+            Texto HTML listo para st.markdown
+        """
+        hoy = hoy or date.today()
+        dia_hoy = hoy.day if (hoy.year, hoy.month) == (anio, mes) else None
+        if versiones is None:
+            celdas = {dia: celda_dia(dia, tareas_del_mes.get(dia), dia == dia_hoy)
+                      for dia in range(1, calendar.monthrange(anio, mes)[1] + 1)}
+            return self._componer(anio, mes, celdas)
+
+        version, versiones_dias = versiones
+        with self._cerrojo:
+            cache = self._meses.get((anio, mes))
+            if cache is not None:
+                self._meses.move_to_end((anio, mes))
+                if cache["version"] == version and cache["dia_hoy"] == dia_hoy:
+                    return cache["html"]
+            else:
+                cache = self._meses[(anio, mes)] = {"celdas": {}}
+                if len(self._meses) > self._max_meses:
+                    self._meses.popitem(last=False)
+            celdas = cache["celdas"]
+            for dia, version_dia in enumerate(versiones_dias, 1):
+                clave = (version_dia, dia == dia_hoy)
+                guardada = celdas.get(dia)
+                if guardada is None or guardada[0] != clave:
+                    celdas[dia] = (clave, celda_dia(dia, tareas_del_mes.get(dia), dia == dia_hoy))
+            cache["version"] = version
+            cache["dia_hoy"] = dia_hoy
+            cache["html"] = self._componer(anio, mes, {dia: celda for dia, (_, celda) in celdas.items()})
+            return cache["html"]
+
+    def _componer(self, anio, mes, celdas):
+        """Une las celdas en la tabla: huecos iniciales, semanas y huecos finales"""
+        inicio = date(anio, mes, 1).weekday()
+        partes = [ESTILOS, _CABECERA, _VACIO * inicio]
+        dia_semana = inicio
+        num_dias = len(celdas)
+        for dia in range(1, num_dias + 1):
+            partes.append(celdas[dia])
+            dia_semana = (dia_semana + 1) % 7
+            if dia_semana == 0 and dia < num_dias:
+                partes.append("</tr><tr>")
+        if dia_semana:
+            partes.append(_VACIO * (7 - dia_semana))
+        partes.append("</tr></table>")
+        return "".join(partes)
@@ -0,0 +1,63 @@
+import os
+
+# Configuración de la aplicación; cada valor se puede sobrescribir con una
+# variable de entorno BULLET_JOURNAL_<NOMBRE>
+
+# Backend de almacenamiento: "json" (tareas.json + registro de cambios), "sqlite"
+# o "fragmentos" (un archivo por mes y por proyecto, ver almacen_fragmentos.py)
+BACKEND = os.environ.get("BULLET_JOURNAL_BACKEND", "json")
+
+# Ruta de la base de datos del backend SQLite
+RUTA_SQLITE = os.environ.get("BULLET_JOURNAL_SQLITE", "tareas.db")
+
+# Directorio del backend de fragmentos
+RUTA_FRAGMENTOS = os.environ.get("BULLET_JOURNAL_FRAGMENTOS", "tareas.d")
+
+# Archivo de registros antiguos (ver archivado.py): directorio y política de retención.
+# Se archivan las tareas diarias completadas hace más de RETENCION_DIARIAS_DIAS días y las
+# entradas de bitácora de hace más de RETENCION_BITACORA_DIAS (0 = no archivar esa colección).
+# Sin ARCHIVADO_AUTOMATICO solo se archiva con "Archivar ahora" (o consola.py archivar); con "1"
+# la aplicación lo hace al arrancar y una vez al día
+RUTA_ARCHIVO = os.environ.get("BULLET_JOURNAL_ARCHIVO", "archivo")
+RETENCION_DIARIAS_DIAS = int(os.environ.get("BULLET_JOURNAL_RETENCION_DIARIAS_DIAS", "30"))
+RETENCION_BITACORA_DIAS = int(os.environ.get("BULLET_JOURNAL_RETENCION_BITACORA_DIAS", "180"))
+ARCHIVADO_AUTOMATICO = os.environ.get("BULLET_JOURNAL_ARCHIVADO_AUTOMATICO", "0") == "1"
+
+# Número de tareas diarias por página en la vista de registro diario
+TAMANO_PAGINA_DIARIAS = int(os.environ.get("BULLET_JOURNAL_TAMANO_PAGINA_DIARIAS", "25"))
+
+# Máximo de tareas que ofrece el selector de tarea relacionada de la bitácora
+OPCIONES_TAREA_RELACIONADA = int(os.environ.get("BULLET_JOURNAL_OPCIONES_TAREA_RELACIONADA", "20"))
+
+# Escritura diferida: los cambios se escriben cuando pasan ESPERA_ESCRITURA_MS sin
+# cambios nuevos o, como mucho, LATENCIA_MAXIMA_ESCRITURA_MS después del primero
+# (0 = escribir cada cambio antes de volver)
+ESPERA_ESCRITURA_MS = int(os.environ.get("BULLET_JOURNAL_ESPERA_ESCRITURA_MS", "250"))
+LATENCIA_MAXIMA_ESCRITURA_MS = int(os.environ.get("BULLET_JOURNAL_LATENCIA_MAXIMA_ESCRITURA_MS", "2000"))
+
+# Navegación: "perezosa" ejecuta solo la vista seleccionada (st.session_state.pestana);
+# "pestanas" usa st.tabs, que ejecuta todas las vistas en cada rerun
+NAVEGACION = os.environ.get("BULLET_JOURNAL_NAVEGACION", "perezosa")
+
+# Instrumentación (tiempos, widgets y bytes escritos por rerun): desactivada por defecto;
+# con "1" se muestra un panel de depuración y cada rerun se añade a RUTA_METRICAS (JSON Lines)
+INSTRUMENTACION = os.environ.get("BULLET_JOURNAL_INSTRUMENTACION", "0") == "1"
+RUTA_METRICAS = os.environ.get("BULLET_JOURNAL_METRICAS", "metricas.jsonl")
+
+# Avisos de fechas límite (ver avisos.py), desactivados por defecto: con AVISOS = "1" un hilo en segundo
+# plano avisa AVISOS_ANTELACION_DIAS días antes de cada fecha límite pendiente (a la AVISOS_HORA) y al
+# día siguiente si ha vencido; los avisos con más de AVISOS_VENTANA_DIAS días de retraso se omiten.
+# AVISOS_DESTINOS es una lista separada por comas de "archivo" (JSON Lines en RUTA_AVISOS), "escritorio"
+# (plyer o notify-send) y "correo" (servidor SMTP local, p. ej. python -m aiosmtpd -n -l localhost:1025).
+# Los avisos ya enviados se recuerdan en RUTA_AVISOS_ENVIADOS para no repetirlos al reiniciar
+AVISOS = os.environ.get("BULLET_JOURNAL_AVISOS", "0") == "1"
+AVISOS_DESTINOS = os.environ.get("BULLET_JOURNAL_AVISOS_DESTINOS", "archivo")
+AVISOS_ANTELACION_DIAS = int(os.environ.get("BULLET_JOURNAL_AVISOS_ANTELACION_DIAS", "1"))
+AVISOS_HORA = int(os.environ.get("BULLET_JOURNAL_AVISOS_HORA", "9"))
+AVISOS_VENTANA_DIAS = int(os.environ.get("BULLET_JOURNAL_AVISOS_VENTANA_DIAS", "7"))
+RUTA_AVISOS = os.environ.get("BULLET_JOURNAL_AVISOS_ARCHIVO", "avisos.jsonl")
+RUTA_AVISOS_ENVIADOS = os.environ.get("BULLET_JOURNAL_AVISOS_ENVIADOS", "avisos_enviados.json")
+SMTP_SERVIDOR = os.environ.get("BULLET_JOURNAL_SMTP_SERVIDOR", "localhost")
+SMTP_PUERTO = int(os.environ.get("BULLET_JOURNAL_SMTP_PUERTO", "1025"))
+AVISOS_REMITENTE = os.environ.get("BULLET_JOURNAL_AVISOS_REMITENTE", "bullet-journal@localhost")
+AVISOS_DESTINATARIO = os.environ.get("BULLET_JOURNAL_AVISOS_DESTINATARIO", "yo@localhost")
@@ -0,0 +1,273 @@
+"""
+Bullet journal desde la línea de órdenes
+
+Trabaja sobre los mismos archivos que la aplicación (con el backend de
+configuracion.py) sin cargar Streamlit, así que arranca en unas decenas de
+milisegundos y se puede usar en scripts y tareas programadas. Los ids se
+muestran abreviados; basta con un prefijo que no sea ambiguo.
+
+Uso:
+    python consola.py anadir "Comprar pan"
+    python consola.py anadir "Revisar presupuesto" -p Casa --fecha 2024-06-01 --prioridad Alta
+    python consola.py listar --pendientes
+    python consola.py listar -p Casa
+    python consola.py listar --proyectos
+    python consola.py completar 3f2a
+    python consola.py recurrente "Envio de SMS y CORREOS COBRANZA" --regla laborables
+    python consola.py completar 9c41@2024-06-03
+    python consola.py buscar pan --archivo
+    python consola.py archivar --dias-diarias 30
+    python consola.py restaurar 3f2a
+    python consola.py avisos --vigilar --destino archivo,escritorio
+"""
+import argparse
+import sys
+
+import recurrencia
+from nucleo import Journal
+
+# Caracteres de id que se muestran en los listados
+LARGO_ID = 8
+
+# Nombres cortos de las reglas predefinidas (cualquier otro texto se interpreta como RRULE)
+REGLAS = {"diaria": recurrencia.FRECUENCIAS["Diaria"], "laborables": recurrencia.FRECUENCIAS["Días laborables"],
+          "semanal": recurrencia.FRECUENCIAS["Semanal"], "mensual": recurrencia.FRECUENCIAS["Mensual"]}
+
+def _id_corto(id_tarea):
+    # Las ocurrencias de las tareas recurrentes conservan la fecha: "<regla>@AAAA-MM-DD"
+    ocurrencia = recurrencia.separar_ocurrencia(id_tarea)
+    if ocurrencia is not None:
+        return f"{ocurrencia[0][:LARGO_ID]}@{ocurrencia[1]}"
+    return id_tarea[:LARGO_ID]
+
+def _linea(tarea, proyecto=None):
+    marca = "x" if tarea.get("completada", False) else " "
+    fecha = tarea.get("fecha") or tarea.get("fecha_limite") or ""
+    linea = f"{_id_corto(tarea['id'])}  [{marca}] {fecha:<10}  {tarea['descripcion']}"
+    if proyecto is not None:
+        linea += f"  ({proyecto})"
+    return linea
+
+def _linea_regla(regla):
+    return f"{regla['id'][:LARGO_ID]}  {regla['inicio']}  {recurrencia.describir_regla(regla)}  {regla['descripcion']}"
+
+def _resolver_id(ids, prefijo):
+    """Id completo a partir de un prefijo (como en git); None si no hay ninguno"""
+    if prefijo in ids:
+        return prefijo
+    encontrados = [id_tarea for id_tarea in ids if id_tarea.startswith(prefijo)]
+    if len(encontrados) > 1:
+        raise ValueError(f"el id {prefijo!r} es ambiguo: " + ", ".join(sorted(encontrados)[:5]))
+    return encontrados[0] if encontrados else None
+
+def _buscar_tarea(datos, prefijo, proyecto=None):
+    """
+    Localiza una tarea por id (o prefijo) en las diarias o en los proyectos
+
+    Returns:
+        Tupla (id, proyecto o None) o None si no existe
+    """
+    if proyecto is not None:
+        if proyecto not in datos["proyectos"]:
+            raise ValueError(f"no existe el proyecto {proyecto!r}")
+        id_tarea = _resolver_id(datos["proyectos"][proyecto]["tareas"], prefijo)
+        return (id_tarea, proyecto) if id_tarea else None
+    encontradas = []
+    id_tarea = _resolver_id(datos["diarias"], prefijo)
+    if id_tarea:
+        encontradas.append((id_tarea, None))
+    for nombre, datos_proyecto in datos["proyectos"].items():
+        id_tarea = _resolver_id(datos_proyecto["tareas"], prefijo)
+        if id_tarea:
+            encontradas.append((id_tarea, nombre))
+    if len(encontradas) > 1:
+        raise ValueError(f"el id {prefijo!r} es ambiguo: " + ", ".join(id_tarea for id_tarea, _ in encontradas))
+    return encontradas[0] if encontradas else None
+
+def _anadir(journal, argumentos):
+    descripcion = " ".join(argumentos.descripcion).strip()
+    if not descripcion:
+        raise ValueError("la descripción está vacía")
+    if argumentos.proyecto is None:
+        tarea = journal.anadir_tarea(descripcion, argumentos.fecha)
+    else:
+        if argumentos.proyecto not in journal.datos["proyectos"]:
+            if not argumentos.crear:
+                raise ValueError(f"no existe el proyecto {argumentos.proyecto!r} (usa --crear para crearlo)")
+            journal.crear_proyecto(argumentos.proyecto)
+        tarea = journal.anadir_tarea_proyecto(argumentos.proyecto, descripcion, argumentos.fecha, argumentos.prioridad)
+    print(_linea(tarea, argumentos.proyecto))
+    return 0
+
+def _completar_ocurrencia(journal, prefijo, completada):
+    """Completa la ocurrencia "<prefijo de la regla>@AAAA-MM-DD" de una tarea recurrente"""
+    prefijo_regla, fecha = recurrencia.separar_ocurrencia(prefijo)
+    id_regla = _resolver_id(journal.datos["recurrentes"], prefijo_regla)
+    id_tarea = recurrencia.id_ocurrencia(id_regla, fecha) if id_regla else None
+    if id_tarea is None or not journal.completar_tarea(id_tarea, completada):
+        raise ValueError(f"no hay ninguna ocurrencia con id {prefijo!r}")
+    tarea = journal.datos["diarias"].get(id_tarea)
+    print(_linea(tarea if tarea is not None else recurrencia.tarea_ocurrencia(journal.datos["recurrentes"][id_regla], fecha)))
+
+def _completar(journal, argumentos):
+    completada = not argumentos.pendiente
+    for prefijo in argumentos.ids:
+        if argumentos.proyecto is None and recurrencia.separar_ocurrencia(prefijo) is not None:
+            _completar_ocurrencia(journal, prefijo, completada)
+            continue
+        encontrada = _buscar_tarea(journal.datos, prefijo, argumentos.proyecto)
+        if encontrada is None:
+            raise ValueError(f"no hay ninguna tarea con id {prefijo!r}")
+        id_tarea, proyecto = encontrada
+        if proyecto is None:
+            journal.completar_tarea(id_tarea, completada)
+            print(_linea(journal.datos["diarias"][id_tarea]))
+        else:
+            journal.completar_tarea_proyecto(proyecto, id_tarea, completada)
+            print(_linea(journal.datos["proyectos"][proyecto]["tareas"][id_tarea], proyecto))
+    return 0
+
+def _listar(journal, argumentos):
+    completada = False if argumentos.pendientes else None
+    if argumentos.proyectos:
+        for nombre, proyecto in sorted(journal.datos["proyectos"].items()):
+            limite = f"  límite {proyecto['fecha_limite']}" if proyecto.get("fecha_limite") else ""
+            print(f"{nombre}: {proyecto['completadas']}/{proyecto['total']} ({proyecto['progreso']}%){limite}")
+        return 0
+    if argumentos.proyecto is not None:
+        if argumentos.proyecto not in journal.datos["proyectos"]:
+            raise ValueError(f"no existe el proyecto {argumentos.proyecto!r}")
+        tareas = journal.filtrar_tareas_proyecto(argumentos.proyecto, completada)
+        for tarea in sorted(tareas, key=lambda tarea: (tarea.get("fecha_limite") or "9999", tarea["descripcion"])):
+            print(_linea(tarea, argumentos.proyecto))
+        return 0
+    for tarea in journal.filtrar_tareas_diarias(argumentos.desde, argumentos.hasta, completada):
+        print(_linea(tarea))
+    return 0
+
+def _buscar(journal, argumentos):
+    completada = False if argumentos.pendientes else None
+    resultados = journal.buscar_tareas(" ".join(argumentos.texto), completada, argumentos.limite, argumentos.archivo)
+    for tarea, proyecto in resultados:
+        print(_linea(tarea, proyecto))
+    return 0 if resultados else 1
+
+def _recurrente(journal, argumentos):
+    descripcion = " ".join(argumentos.descripcion).strip()
+    if not descripcion:
+        raise ValueError("la descripción está vacía")
+    regla = journal.anadir_recurrente(descripcion, REGLAS.get(argumentos.regla, argumentos.regla), argumentos.inicio)
+    print(_linea_regla(regla))
+    return 0
+
+def _recurrentes(journal, argumentos):
+    if argumentos.eliminar:
+        id_regla = _resolver_id(journal.datos["recurrentes"], argumentos.eliminar)
+        if id_regla is None or not journal.eliminar_recurrente(id_regla):
+            raise ValueError(f"no hay ninguna tarea recurrente con id {argumentos.eliminar!r}")
+        return 0
+    for regla in journal.tareas_recurrentes():
+        print(_linea_regla(regla))
+    return 0
+
+def _archivar(journal, argumentos):
+    movidos = journal.archivar(dias_diarias=argumentos.dias_diarias, dias_bitacora=argumentos.dias_bitacora)
+    print(f"Archivadas {movidos.get('diarias', 0)} tareas diarias y {movidos.get('bitacora', 0)} entradas de bitácora")
+    for coleccion, total in journal.estado_archivo().items():
+        print(f"{coleccion}: {total} en el archivo")
+    return 0
+
+def _restaurar(journal, argumentos):
+    for prefijo in argumentos.ids:
+        # Basta con saber si hay más de una para avisar de que el prefijo es ambiguo
+        encontradas = journal.archivo.buscar("diarias", lambda tarea: tarea["id"].startswith(prefijo), 2)
+        if not encontradas:
+            raise ValueError(f"no hay ninguna tarea archivada con id {prefijo!r}")
+        if len(encontradas) > 1:
+            raise ValueError(f"el id {prefijo!r} es ambiguo: " + ", ".join(tarea["id"] for tarea in encontradas))
+        journal.restaurar_archivados("diarias", [encontradas[0]["id"]])
+        print(_linea(encontradas[0]))
+    return 0
+
+def _avisos(journal, argumentos):
+    if not argumentos.vigilar:
+        for fecha, descripcion in journal.proximas_fechas_limite(argumentos.limite):
+            print(f"{fecha}  {descripcion}")
+        return 0
+    # Sin Streamlit: el planificador corre en este proceso hasta Ctrl+C
+    import avisos
+    destinos = avisos.crear_destinos(argumentos.destino) if argumentos.destino else avisos.crear_destinos()
+    avisos.Planificador(journal, destinos, avisos.RegistroEnviados()).ejecutar()
+    return 0
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="consola.py", description="Bullet journal desde la línea de órdenes")
+    ordenes = parser.add_subparsers(dest="orden", required=True)
+
+    anadir = ordenes.add_parser("anadir", help="Añade una tarea diaria (o a un proyecto con -p)")
+    anadir.add_argument("descripcion", nargs="+")
+    anadir.add_argument("-p", "--proyecto")
+    anadir.add_argument("-f", "--fecha", help="Fecha AAAA-MM-DD (fecha límite en un proyecto)")
+    anadir.add_argument("--prioridad", choices=("Alta", "Media", "Baja"), default="Media")
+    anadir.add_argument("--crear", action="store_true", help="Crea el proyecto si no existe")
+    anadir.set_defaults(ejecutar=_anadir)
+
+    completar = ordenes.add_parser("completar", help="Marca tareas como completadas")
+    completar.add_argument("ids", nargs="+", help="Ids o prefijos de id")
+    completar.add_argument("-p", "--proyecto")
+    completar.add_argument("--pendiente", action="store_true", help="Las vuelve a marcar como pendientes")
+    completar.set_defaults(ejecutar=_completar)
+
+    listar = ordenes.add_parser("listar", help="Lista las tareas diarias, las de un proyecto o los proyectos")
+    listar.add_argument("-p", "--proyecto")
+    listar.add_argument("--proyectos", action="store_true", help="Lista los proyectos y su progreso")
+    listar.add_argument("--pendientes", action="store_true")
+    listar.add_argument("--desde", help="Fecha AAAA-MM-DD")
+    listar.add_argument("--hasta", help="Fecha AAAA-MM-DD")
+    listar.set_defaults(ejecutar=_listar)
+
+    buscar = ordenes.add_parser("buscar", help="Busca texto en las tareas")
+    buscar.add_argument("texto", nargs="+")
+    buscar.add_argument("--pendientes", action="store_true")
+    buscar.add_argument("-n", "--limite", type=int)
+    buscar.add_argument("--archivo", action="store_true", help="Busca también en las tareas archivadas")
+    buscar.set_defaults(ejecutar=_buscar)
+
+    recurrente = ordenes.add_parser("recurrente", help="Añade una tarea recurrente")
+    recurrente.add_argument("descripcion", nargs="+")
+    recurrente.add_argument("-r", "--regla", default="diaria",
+                            help="diaria, laborables, semanal, mensual o una regla RRULE (FREQ=MONTHLY;BYDAY=-1FR)")
+    recurrente.add_argument("-i", "--inicio", help="Fecha AAAA-MM-DD desde la que se repite (por defecto, hoy)")
+    recurrente.set_defaults(ejecutar=_recurrente)
+
+    recurrentes = ordenes.add_parser("recurrentes", help="Lista las tareas recurrentes")
+    recurrentes.add_argument("--eliminar", metavar="ID", help="Elimina la tarea recurrente con ese id o prefijo")
+    recurrentes.set_defaults(ejecutar=_recurrentes)
+
+    archivar = ordenes.add_parser("archivar", help="Mueve al archivo las completadas y las notas antiguas")
+    archivar.add_argument("--dias-diarias", type=int, help="Días de tareas completadas que se conservan")
+    archivar.add_argument("--dias-bitacora", type=int, help="Días de entradas de bitácora que se conservan")
+    archivar.set_defaults(ejecutar=_archivar)
+
+    restaurar = ordenes.add_parser("restaurar", help="Devuelve tareas diarias archivadas a los datos")
+    restaurar.add_argument("ids", nargs="+", help="Ids o prefijos de id")
+    restaurar.set_defaults(ejecutar=_restaurar)
+
+    avisos = ordenes.add_parser("avisos", help="Lista las próximas fechas límite o envía sus avisos")
+    avisos.add_argument("-n", "--limite", type=int, default=10)
+    avisos.add_argument("--vigilar", action="store_true", help="Envía los avisos hasta Ctrl+C")
+    avisos.add_argument("--destino", help="Destinos separados por comas (archivo, escritorio, correo)")
+    avisos.set_defaults(ejecutar=_avisos)
+    return parser
+
+def main(argumentos=None):
+    argumentos = crear_parser().parse_args(argumentos)
+    journal = Journal.para_consola()
+    try:
+        return argumentos.ejecutar(journal, argumentos)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
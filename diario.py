@@ -1,13 +1,22 @@
 import streamlit as st
-from funciones import anadir_tarea, completar_tarea, eliminar_tarea
+from datetime import date
+from configuracion import TAMANO_PAGINA_DIARIAS
+from funciones import (
+    anadir_tarea, completar_tarea, eliminar_tarea, filtrar_tareas_diarias,
+    anadir_tareas, completar_tareas, eliminar_tareas,
+    anadir_recurrente, eliminar_recurrente, tareas_recurrentes
+)
+from instrumentacion import medir
+from recurrencia import FRECUENCIAS, describir_regla, regla_de
 
+@medir
 def mostrar_vista_diaria():
     """
     Función principal que muestra la vista de tareas diarias
     """
     st.header("Registro Diario")
     st.markdown("Añade tus tareas diarias y marca las que vayas completando.")
-    
+
     # Formulario para añadir tarea diaria
     with st.form("form_tarea_diaria", clear_on_submit=True):
         tarea_diaria = st.text_input("Nueva tarea diaria", key="input_diaria")
@@ -16,25 +25,199 @@ def mostrar_vista_diaria():
             submit_diaria = st.form_submit_button("Añadir tarea")
         with col2:
             fecha_diaria = st.date_input("Fecha", key="fecha_diaria")
-    
+
     if submit_diaria:
         if anadir_tarea("diarias", tarea_diaria, fecha_diaria.strftime("%Y-%m-%d")):
             st.success("Tarea añadida correctamente")
-    
-    # Mostrar tareas diarias
-    if st.session_state.tareas["diarias"]:
-        for i, tarea in enumerate(st.session_state.tareas["diarias"]):
-            col1, col2, col3 = st.columns([0.1, 3, 0.5])
+
+    # Varias tareas a la vez (se guardan en una sola escritura)
+    with st.expander("Añadir varias tareas"):
+        with st.form("form_tareas_diarias", clear_on_submit=True):
+            texto = st.text_area("Una tarea por línea", key="input_diarias")
+            col1, col2 = st.columns([3, 1])
             with col1:
-                completada = st.checkbox("", value=tarea.get("completada", False), key=f"check_diaria_{i}", 
-                                       on_change=completar_tarea, args=("diarias", i))
+                submit_diarias = st.form_submit_button("Añadir tareas")
             with col2:
-                texto = tarea["descripcion"]
-                if completada:
-                    texto = f"~~{texto}~~"
-                st.markdown(f"{texto} - *{tarea['fecha']}*")
-            with col3:
-                st.button("🗑️", key=f"eliminar_diaria_{i}", help="Eliminar tarea", 
-                       on_click=eliminar_tarea, args=("diarias", i))
+                fecha_diarias = st.date_input("Fecha", key="fecha_diarias")
+
+    if submit_diarias:
+        descripciones = [linea.strip() for linea in texto.splitlines() if linea.strip()]
+        anadidas = anadir_tareas("diarias", descripciones, fecha_diarias.strftime("%Y-%m-%d"))
+        if anadidas:
+            st.success(f"{anadidas} tareas añadidas correctamente")
+
+    mostrar_recurrentes()
+
+    # Mostrar tareas diarias (las ocurrencias de las recurrentes se generan al filtrar)
+    if st.session_state.tareas["diarias"] or st.session_state.tareas["recurrentes"]:
+        mostrar_lista_diarias()
     else:
         st.info("No hay tareas diarias pendientes")
+
+def mostrar_recurrentes():
+    """
+    Muestra el formulario de tareas recurrentes y las reglas guardadas
+
+    Cada regla se guarda una sola vez; sus ocurrencias aparecen en la lista
+    y en el calendario para las fechas que se muestran.
+    """
+    with st.expander("Tareas recurrentes"):
+        with st.form("form_tarea_recurrente", clear_on_submit=True):
+            descripcion = st.text_input("Nueva tarea recurrente", key="input_recurrente")
+            col1, col2 = st.columns(2)
+            with col1:
+                frecuencia = st.selectbox("Repetir", list(FRECUENCIAS), key="frecuencia_recurrente")
+            with col2:
+                inicio = st.date_input("Desde", key="inicio_recurrente")
+            regla = st.text_input("Regla (solo con «Regla RRULE»)", key="regla_recurrente",
+                                  placeholder="FREQ=MONTHLY;BYDAY=-1FR")
+            submit_recurrente = st.form_submit_button("Añadir tarea recurrente")
+
+        if submit_recurrente and descripcion:
+            if anadir_recurrente(descripcion, regla_de(frecuencia, regla), inicio.strftime("%Y-%m-%d")):
+                st.success("Tarea recurrente añadida correctamente")
+
+        for regla in tareas_recurrentes():
+            col1, col2 = st.columns([3, 0.5])
+            with col1:
+                st.markdown(f"🔁 {regla['descripcion']} - *{describir_regla(regla)}, desde {regla['inicio']}*")
+            with col2:
+                st.button("🗑️", key=f"eliminar_recurrente_{regla['id']}", help="Eliminar tarea recurrente",
+                          on_click=eliminar_recurrente, args=(regla["id"],))
+
+def mostrar_lista_diarias():
+    """
+    Muestra las tareas diarias filtradas y paginadas
+
+    Los filtros se aplican antes de crear los widgets y solo se crean los de
+    la página visible, así que el coste no crece con el historial.
+    """
+    hoy = date.today().strftime("%Y-%m-%d")
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        vista = st.radio("Mostrar", ["Hoy y atrasadas", "Rango de fechas", "Todas"], horizontal=True, key="vista_diarias")
+    with col2:
+        estado = st.selectbox("Estado", ["Todas", "Pendientes", "Completadas"], key="estado_diarias")
+    with col3:
+        opciones_pagina = sorted({10, 25, 50, 100, TAMANO_PAGINA_DIARIAS})
+        tamano_pagina = st.selectbox("Por página", opciones_pagina,
+                                     index=opciones_pagina.index(TAMANO_PAGINA_DIARIAS), key="tamano_pagina_diarias")
+
+    completada = {"Todas": None, "Pendientes": False, "Completadas": True}[estado]
+    if vista == "Hoy y atrasadas":
+        tareas = filtrar_tareas_diarias(hoy, hoy, completada, pendientes_hasta=hoy)
+    elif vista == "Rango de fechas":
+        col1, col2 = st.columns(2)
+        with col1:
+            desde = st.date_input("Desde", key="desde_diarias")
+        with col2:
+            hasta = st.date_input("Hasta", key="hasta_diarias")
+        tareas = filtrar_tareas_diarias(desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d"), completada)
+    else:
+        tareas = filtrar_tareas_diarias(completada=completada)
+
+    if not tareas:
+        st.info("No hay tareas diarias para este filtro")
+        return
+
+    # Paginación
+    paginas = (len(tareas) - 1) // tamano_pagina + 1
+    if paginas > 1:
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key="pagina_diarias")
+    else:
+        pagina = 1
+    inicio = (min(pagina, paginas) - 1) * tamano_pagina
+    st.caption(f"{len(tareas)} tareas · página {min(pagina, paginas)} de {paginas}")
+
+    mostrar_acciones_en_bloque(tareas, tareas[inicio:inicio + tamano_pagina])
+
+    for tarea in tareas[inicio:inicio + tamano_pagina]:
+        col1, col2, col3 = st.columns([0.1, 3, 0.5])
+        with col1:
+            completada = st.checkbox("", value=tarea.get("completada", False), key=f"check_diaria_{tarea['id']}",
+                                   on_change=completar_tarea, args=("diarias", tarea["id"]))
+        with col2:
+            texto = tarea["descripcion"]
+            if completada:
+                texto = f"~~{texto}~~"
+            # Marcar las tareas pendientes de días anteriores
+            if not tarea.get("completada", False) and tarea["fecha"] < hoy:
+                texto = f"{texto} ⏰"
+            if tarea.get("recurrente"):
+                texto = f"🔁 {texto}"
+            st.markdown(f"{texto} - *{tarea['fecha']}*")
+        with col3:
+            st.button("🗑️", key=f"eliminar_diaria_{tarea['id']}", help="Eliminar tarea",
+                   on_click=eliminar_tarea, args=("diarias", tarea["id"]))
+
+def aplicar_accion_en_bloque(accion, ids_tareas=None):
+    """
+    Aplica una acción a varias tareas diarias en una sola escritura
+
+    Args:
+        accion: "completar", "pendiente" o "eliminar"
+        ids_tareas: Tareas afectadas; por defecto, las seleccionadas
+    """
+    if ids_tareas is None:
+        ids_tareas = list(st.session_state.get("seleccion_diarias", []))
+    if accion == "completar":
+        completar_tareas("diarias", ids_tareas, True)
+    elif accion == "pendiente":
+        completar_tareas("diarias", ids_tareas, False)
+    elif accion == "eliminar":
+        eliminar_tareas("diarias", ids_tareas)
+    # Las casillas se vuelven a crear con el estado guardado
+    for id_tarea in ids_tareas:
+        st.session_state.pop(f"check_diaria_{id_tarea}", None)
+    st.session_state["seleccion_diarias"] = []
+
+def seleccionar_pagina(ids_tareas):
+    """Marca como seleccionadas todas las tareas de la página"""
+    st.session_state["seleccion_diarias"] = list(ids_tareas)
+
+def mostrar_acciones_en_bloque(tareas, pagina):
+    """
+    Muestra las acciones sobre varias tareas diarias a la vez
+
+    La selección se hace entre las tareas de la página visible; las
+    acciones "filtradas" se aplican a todas las tareas del filtro actual.
+
+    Args:
+        tareas: Todas las tareas que cumplen el filtro
+        pagina: Tareas de la página visible
+    """
+    descripciones = {tarea["id"]: f"{tarea['descripcion']} ({tarea['fecha']})" for tarea in pagina}
+    # La selección solo conserva las tareas que siguen visibles
+    st.session_state["seleccion_diarias"] = [id_tarea for id_tarea in st.session_state.get("seleccion_diarias", [])
+                                             if id_tarea in descripciones]
+    filtradas = [tarea["id"] for tarea in tareas]
+
+    with st.expander("Acciones sobre varias tareas"):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            seleccion = st.multiselect("Tareas seleccionadas", list(descripciones), format_func=descripciones.get,
+                                       key="seleccion_diarias")
+        with col2:
+            st.button("Seleccionar página", key="seleccionar_pagina_diarias",
+                      on_click=seleccionar_pagina, args=(list(descripciones),))
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.button("✅ Completar", key="completar_diarias_en_bloque", disabled=not seleccion,
+                      on_click=aplicar_accion_en_bloque, args=("completar",))
+        with col2:
+            st.button("↩️ Marcar pendientes", key="pendientes_diarias_en_bloque", disabled=not seleccion,
+                      on_click=aplicar_accion_en_bloque, args=("pendiente",))
+        with col3:
+            st.button("🗑️ Eliminar", key="eliminar_diarias_en_bloque", disabled=not seleccion,
+                      on_click=aplicar_accion_en_bloque, args=("eliminar",))
+
+        st.caption(f"Con el filtro actual: {len(filtradas)} tareas")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("✅ Completar todas las filtradas", key="completar_filtradas_diarias",
+                      on_click=aplicar_accion_en_bloque, args=("completar", filtradas))
+        with col2:
+            st.button("🗑️ Eliminar todas las filtradas", key="eliminar_filtradas_diarias",
+                      on_click=aplicar_accion_en_bloque, args=("eliminar", filtradas))
@@ -0,0 +1,120 @@
+import streamlit as st
+from datetime import date, timedelta
+from funciones import tasa_completado, burndown_proyecto, tareas_atrasadas, distribucion_categorias
+from instrumentacion import medir
+
+# Agrupaciones disponibles (frecuencias de pandas)
+PERIODOS = {"Día": "D", "Semana": "W", "Mes": "M"}
+
+# Meses de historial que se pueden mostrar (0 = todo)
+HISTORIALES = [3, 12, 36, 0]
+
+@medir
+def mostrar_vista_estadisticas():
+    """
+    Función principal que muestra la vista de estadísticas
+
+    Los cálculos se hacen sobre las tablas columnares del almacén y se
+    conservan hasta el siguiente cambio, así que la vista responde igual
+    con años de historial.
+    """
+    st.header("Estadísticas")
+    st.markdown("Consulta tu ritmo de trabajo, el avance de los proyectos y el uso de la bitácora.")
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        periodo = st.radio("Agrupar por", list(PERIODOS), index=1, horizontal=True, key="periodo_estadisticas")
+    with col2:
+        meses = st.selectbox("Historial", HISTORIALES, index=1, key="historial_estadisticas",
+                             format_func=lambda m: f"Últimos {m} meses" if m else "Todo")
+
+    hoy = date.today()
+    desde = hoy - timedelta(days=30 * meses) if meses else None
+
+    mostrar_atrasadas(hoy)
+    mostrar_tasa_completado(PERIODOS[periodo], desde, hoy)
+    mostrar_burndown(hoy)
+    mostrar_categorias(PERIODOS[periodo], desde, hoy)
+
+def mostrar_atrasadas(hoy):
+    """
+    Muestra cuántas tareas pendientes tienen la fecha vencida
+
+    Args:
+        hoy: Fecha de referencia
+    """
+    atrasadas = tareas_atrasadas(hoy)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Tareas diarias atrasadas", atrasadas["diarias"])
+    with col2:
+        st.metric("Tareas de proyecto atrasadas", int(atrasadas["proyectos"].sum()))
+    if len(atrasadas["proyectos"]):
+        with st.expander("Atrasadas por proyecto"):
+            st.bar_chart(atrasadas["proyectos"])
+
+def mostrar_tasa_completado(periodo, desde, hasta):
+    """
+    Muestra las tareas programadas y el porcentaje completado por periodo
+
+    Args:
+        periodo: "D", "W" o "M"
+        desde: Primera fecha incluida o None
+        hasta: Última fecha incluida
+    """
+    st.subheader("Tareas completadas")
+    tasa = tasa_completado(periodo, desde, hasta)
+    if tasa.empty:
+        st.info("No hay tareas con fecha en este periodo")
+        return
+    total = int(tasa["total"].sum())
+    completadas = int(tasa["completadas"].sum())
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Tareas en el periodo", total)
+    with col2:
+        st.metric("Completadas", f"{completadas} ({completadas / total * 100:.1f}%)")
+    st.line_chart(tasa["tasa"])
+    st.bar_chart(tasa[["completadas", "total"]])
+
+def mostrar_burndown(hoy):
+    """
+    Muestra el burndown del proyecto seleccionado
+
+    Args:
+        hoy: Último día de la serie
+    """
+    st.subheader("Burndown de proyectos")
+    proyectos = list(st.session_state.tareas["proyectos"].keys())
+    if not proyectos:
+        st.info("No hay proyectos creados")
+        return
+    proyecto = st.selectbox("Proyecto", proyectos,
+                            index=proyectos.index(st.session_state.proyecto_actual) if st.session_state.proyecto_actual in proyectos else 0,
+                            key="proyecto_estadisticas")
+    burndown = burndown_proyecto(proyecto, hoy)
+    if burndown.empty:
+        st.info("El proyecto no tiene tareas con fecha de creación")
+        return
+    columnas = ["pendientes", "ideal"] if burndown["ideal"].notna().any() else ["pendientes"]
+    st.line_chart(burndown[columnas])
+
+def mostrar_categorias(periodo, desde, hasta):
+    """
+    Muestra la distribución de las entradas de bitácora por categoría
+
+    Args:
+        periodo: "D", "W" o "M"
+        desde: Primera fecha incluida o None
+        hasta: Última fecha incluida
+    """
+    st.subheader("Bitácora por categoría")
+    totales = distribucion_categorias(None, desde, hasta)
+    if totales.empty:
+        st.info("No hay entradas de bitácora en este periodo")
+        return
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.dataframe(totales.rename("Entradas"))
+    with col2:
+        st.bar_chart(distribucion_categorias(periodo, desde, hasta))
@@ -1,196 +1,344 @@
+import io
+import tempfile
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-import json
-import os
+from almacenamiento import estructura_vacia, nueva_operacion
+from nucleo import Journal, cargar_backend
+from configuracion import ARCHIVADO_AUTOMATICO, AVISOS
+from instrumentacion import medir
 
-# Función para cargar tareas desde un archivo
+# Backend de almacenamiento seleccionado en la configuración
+backend = cargar_backend()
+
+# Las operaciones viven en nucleo.Journal (sin Streamlit); estas funciones las
+# envuelven para las vistas: muestran los errores con st.error y mantienen el
+# estado de la sesión. El journal se crea en el primer uso y se comparte
+# entre sesiones, como el almacén sobre el que trabaja.
+_journal = None
+
+def obtener_journal():
+    global _journal
+    if _journal is None:
+        _journal = Journal(backend=backend)
+    return _journal
+
+# Función para cargar tareas (copia compartida por todas las sesiones del proceso)
+@medir
 def cargar_tareas():
     try:
-        if os.path.exists("tareas.json"):
-            with open("tareas.json", "r") as file:
-                datos = json.load(file)
-                # Asegurar que existe la estructura para proyectos y bitácora
-                if "proyectos" not in datos:
-                    datos["proyectos"] = {}
-                if "bitacora" not in datos:
-                    datos["bitacora"] = []
-                return datos
-        else:
-            return {"diarias": [], "proyectos": {}, "bitacora": []}
+        return obtener_journal().datos
     except Exception as e:
         st.error(f"Error al cargar las tareas: {e}")
-        return {"diarias": [], "proyectos": {}, "bitacora": []}
+        return estructura_vacia()
+
+# Función para guardar la instantánea completa de los datos compartidos
+# (el argumento se mantiene por compatibilidad: siempre es la copia compartida)
+@medir
+def guardar_tareas(tareas=None):
+    try:
+        obtener_journal().guardar()
+    except Exception as e:
+        st.error(f"Error al guardar las tareas: {e}")
 
-# Función para guardar tareas en un archivo
-def guardar_tareas(tareas):
+# Función para ejecutar una modificación del journal mostrando los errores en la interfaz
+def _modificar(metodo, *args, por_defecto=None, **kwargs):
     try:
-        with open("tareas.json", "w") as file:
-            json.dump(tareas, file)
+        return getattr(obtener_journal(), metodo)(*args, **kwargs)
     except Exception as e:
         st.error(f"Error al guardar las tareas: {e}")
+        return por_defecto
+
+# Función para aplicar un cambio a los datos compartidos y añadirlo al registro en disco
+def aplicar_cambio(op, coleccion, clave=None, valor=None, proyecto=None):
+    operacion = nueva_operacion(op, coleccion, clave, valor, proyecto)
+    _modificar("actualizar", lambda datos: operacion, por_defecto=[])
+
+# Función para calcular cambios sobre el estado más reciente y aplicarlos
+# construir recibe los datos (con los cambios de otros procesos ya incorporados) y
+# devuelve una operación, una lista de operaciones o None; todo ocurre bajo el bloqueo
+def aplicar_cambios_calculados(construir):
+    return _modificar("actualizar", construir, por_defecto=[])
+
+# Función para escribir ya los cambios pendientes de la escritura diferida
+def volcar_cambios():
+    _modificar("volcar")
+
+# Función para consultar el estado de la escritura diferida (pendientes, antigüedad, errores)
+def estado_escritura():
+    return obtener_journal().estado_escritura()
+
+# Función para agrupar varios cambios en una sola escritura (with lote_de_cambios(): ...)
+# Dentro del bloque los cambios se aplican en memoria; se persisten juntos al salir
+def lote_de_cambios():
+    return obtener_journal().lote()
+
+# Función para archivar lo que manda la política de retención (ver archivado.py)
+# La aplicación la llama en cada rerun: sin forzar, archiva como mucho una vez al día por proceso
+# (y solo con ARCHIVADO_AUTOMATICO); devuelve los registros archivados por colección
+_ultimo_archivado = None
+_archivado_automatico = None
+
+def archivar_registros_antiguos(forzar=False):
+    global _ultimo_archivado, _archivado_automatico
+    hoy = datetime.now().date()
+    if not forzar and (not ARCHIVADO_AUTOMATICO or _ultimo_archivado == hoy):
+        return {}
+    _ultimo_archivado = hoy
+    movidos = _modificar("archivar", por_defecto={})
+    if not forzar:
+        _archivado_automatico = (hoy, movidos)
+    return movidos
+
+# Función para consultar el último archivado automático del proceso: (fecha, registros por colección) o None
+def ultimo_archivado_automatico():
+    return _archivado_automatico
+
+# Función para consultar cuántos registros hay archivados por colección
+def estado_archivo():
+    return obtener_journal().estado_archivo()
+
+# Función para devolver registros archivados a los datos
+def restaurar_archivados(coleccion, ids):
+    return _modificar("restaurar_archivados", coleccion, ids, por_defecto=0)
+
+# Función para arrancar el planificador de avisos de fechas límite (ver avisos.py)
+# La aplicación la llama en cada rerun: el hilo se crea una sola vez por proceso y solo con AVISOS
+def iniciar_avisos():
+    if not AVISOS:
+        return None
+    try:
+        from avisos import iniciar_planificador
+        return iniciar_planificador(obtener_journal())
+    except Exception as e:
+        st.error(f"No se pudieron iniciar los avisos de fechas límite: {e}")
+        return None
+
+# Función para consultar las fechas límite pendientes más cercanas (fecha, descripción)
+def proximas_fechas_limite(limite=10):
+    return obtener_journal().proximas_fechas_limite(limite)
+
+# Función para exportar una colección ("csv"/"jsonl") o el calendario ("ics") a un archivo temporal
+# El archivo se escribe por bloques; se devuelve abierto y al principio, listo para descargarlo
+def exportar_datos(formato, coleccion=None):
+    archivo = tempfile.TemporaryFile()
+    try:
+        obtener_journal().exportar(archivo, formato, coleccion)
+    except Exception as e:
+        archivo.close()
+        st.error(f"Error al exportar: {e}")
+        return None
+    archivo.seek(0)
+    return archivo
+
+# Función para importar un archivo subido (CSV/JSONL en una colección, o iCalendar)
+# Todo el archivo se aplica con una sola escritura; devuelve el resumen de la importación
+def importar_datos(archivo, formato, coleccion=None):
+    lineas = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    try:
+        return obtener_journal().importar(lineas, formato, coleccion)
+    except Exception as e:
+        st.error(f"Error al importar: {e}")
+        return None
+    finally:
+        lineas.detach()
 
 # Función para añadir tarea
 def anadir_tarea(tipo, tarea, fecha=None):
     if tarea:
-        nueva_tarea = {
-            "descripcion": tarea,
-            "fecha": fecha if fecha else datetime.now().strftime("%Y-%m-%d"),
-            "completada": False,
-            "tipo": tipo
-        }
-        
         if tipo == "diarias":
-            st.session_state.tareas["diarias"].append(nueva_tarea)
-        
-        guardar_tareas(st.session_state.tareas)
+            _modificar("anadir_tarea", tarea, fecha)
         return True
     return False
 
-# Función para marcar una tarea como completada
-def completar_tarea(tipo, indice):
+# Función para añadir varias tareas diarias en una sola escritura
+def anadir_tareas(tipo, descripciones, fecha=None):
+    if tipo != "diarias":
+        return 0
+    return _modificar("anadir_tareas", descripciones, fecha, por_defecto=0)
+
+# Función para marcar varias tareas diarias como completadas (o pendientes) en una sola escritura
+def completar_tareas(tipo, ids_tareas, completada=True):
+    if tipo != "diarias":
+        return 0
+    return _modificar("completar_tareas", ids_tareas, completada, por_defecto=0)
+
+# Función para eliminar varias tareas diarias en una sola escritura
+# (ids explícitos, o todas las que cumplen el filtro: fn(tarea) -> bool)
+def eliminar_tareas(tipo, ids_tareas=None, filtro=None):
+    if tipo != "diarias":
+        return 0
+    return _modificar("eliminar_tareas", ids_tareas, filtro, por_defecto=0)
+
+# Función para marcar una tarea como completada (invierte el estado actual)
+def completar_tarea(tipo, id_tarea):
     if tipo == "diarias":
-        # Asegurar que existe la clave "completada"
-        if "completada" not in st.session_state.tareas["diarias"][indice]:
-            st.session_state.tareas["diarias"][indice]["completada"] = False
-        
-        # Invertir el estado actual
-        st.session_state.tareas["diarias"][indice]["completada"] = not st.session_state.tareas["diarias"][indice]["completada"]
-    
-    guardar_tareas(st.session_state.tareas)
+        _modificar("completar_tarea", id_tarea)
 
 # Función para eliminar una tarea
-def eliminar_tarea(tipo, indice):
+def eliminar_tarea(tipo, id_tarea):
     if tipo == "diarias":
-        st.session_state.tareas["diarias"].pop(indice)
-    
-    guardar_tareas(st.session_state.tareas)
+        _modificar("eliminar_tarea", id_tarea)
+
+# Función para añadir una tarea recurrente (regla RRULE, ver recurrencia.py)
+# Sus ocurrencias aparecen en la lista de diarias y en el calendario solo para las fechas que se muestran
+def anadir_recurrente(descripcion, regla, inicio=None):
+    try:
+        return obtener_journal().anadir_recurrente(descripcion, regla, inicio)
+    except ValueError as e:
+        st.error(f"Regla de recurrencia no válida: {e}")
+    except Exception as e:
+        st.error(f"Error al guardar las tareas: {e}")
+    return None
+
+# Función para eliminar una tarea recurrente (sus ocurrencias completadas se conservan)
+def eliminar_recurrente(id_regla):
+    return _modificar("eliminar_recurrente", id_regla, por_defecto=False)
+
+# Función para obtener las tareas recurrentes ordenadas por descripción
+def tareas_recurrentes():
+    return obtener_journal().tareas_recurrentes()
 
 # Función para crear un nuevo proyecto
 def crear_proyecto(nombre):
-    if nombre and nombre not in st.session_state.tareas["proyectos"]:
-        st.session_state.tareas["proyectos"][nombre] = {
-            "tareas": [],
-            "progreso": 0,
-            "fecha_creacion": datetime.now().strftime("%Y-%m-%d"),
-            "fecha_limite": ""
-        }
-        guardar_tareas(st.session_state.tareas)
+    if _modificar("crear_proyecto", nombre, por_defecto=False):
         st.session_state.proyecto_actual = nombre
         return True
     return False
 
 # Función para añadir tarea a un proyecto
 def anadir_tarea_proyecto(proyecto, tarea, fecha_limite=None):
-    if tarea and proyecto in st.session_state.tareas["proyectos"]:
-        nueva_tarea = {
-            "descripcion": tarea,
-            "fecha_creacion": datetime.now().strftime("%Y-%m-%d"),
-            "fecha_limite": fecha_limite if fecha_limite else "",
-            "completada": False,
-            "prioridad": "Media",  # Por defecto prioridad media
-            "tipo": "proyecto"
-        }
-        
-        st.session_state.tareas["proyectos"][proyecto]["tareas"].append(nueva_tarea)
-        
-        # Actualizar el progreso del proyecto
-        actualizar_progreso_proyecto(proyecto)
-        
-        guardar_tareas(st.session_state.tareas)
-        return True
-    return False
+    return _modificar("anadir_tarea_proyecto", proyecto, tarea, fecha_limite) is not None
+
+# Función para marcar una tarea de proyecto como completada (invierte el estado actual)
+def completar_tarea_proyecto(proyecto, id_tarea):
+    _modificar("completar_tarea_proyecto", proyecto, id_tarea)
+
+# Función para añadir varias tareas a un proyecto en una sola escritura
+def anadir_tareas_proyecto(proyecto, descripciones, fecha_limite=None, prioridad="Media"):
+    return _modificar("anadir_tareas_proyecto", proyecto, descripciones, fecha_limite, prioridad, por_defecto=0)
 
-# Función para marcar una tarea de proyecto como completada
-def completar_tarea_proyecto(proyecto, indice):
-    if proyecto in st.session_state.tareas["proyectos"]:
-        # Asegurar que existe la clave "completada"
-        if "completada" not in st.session_state.tareas["proyectos"][proyecto]["tareas"][indice]:
-            st.session_state.tareas["proyectos"][proyecto]["tareas"][indice]["completada"] = False
-            
-        # Invertir el estado actual
-        st.session_state.tareas["proyectos"][proyecto]["tareas"][indice]["completada"] = not st.session_state.tareas["proyectos"][proyecto]["tareas"][indice]["completada"]
-        
-        # Actualizar el progreso del proyecto
-        actualizar_progreso_proyecto(proyecto)
-        
-        guardar_tareas(st.session_state.tareas)
-
-# Función para actualizar el progreso de un proyecto
-def actualizar_progreso_proyecto(proyecto):
-    if proyecto in st.session_state.tareas["proyectos"]:
-        tareas = st.session_state.tareas["proyectos"][proyecto]["tareas"]
-        if tareas:
-            completadas = sum(1 for tarea in tareas if tarea.get("completada", False))
-            total = len(tareas)
-            progreso = (completadas / total) * 100 if total > 0 else 0
-            st.session_state.tareas["proyectos"][proyecto]["progreso"] = round(progreso, 1)
-        else:
-            st.session_state.tareas["proyectos"][proyecto]["progreso"] = 0
+# Función para marcar varias tareas de un proyecto como completadas (o pendientes) en una sola escritura
+def completar_tareas_proyecto(proyecto, ids_tareas, completada=True):
+    return _modificar("completar_tareas_proyecto", proyecto, ids_tareas, completada, por_defecto=0)
+
+# Función para cambiar la prioridad de varias tareas de un proyecto en una sola escritura
+def cambiar_prioridad_tareas_proyecto(proyecto, ids_tareas, prioridad):
+    return _modificar("cambiar_prioridad_tareas_proyecto", proyecto, ids_tareas, prioridad, por_defecto=0)
+
+# Función para eliminar varias tareas de un proyecto en una sola escritura
+# (ids explícitos, o todas las que cumplen el filtro: fn(tarea) -> bool)
+def eliminar_tareas_proyecto(proyecto, ids_tareas=None, filtro=None):
+    return _modificar("eliminar_tareas_proyecto", proyecto, ids_tareas, filtro, por_defecto=0)
+
+# Función para mover tareas de un proyecto a otro en una sola escritura (conservan su id)
+def mover_tareas_proyecto(origen, destino, ids_tareas):
+    return _modificar("mover_tareas_proyecto", origen, destino, ids_tareas, por_defecto=0)
+
+# Función para actualizar los contadores y el progreso de un proyecto en O(1)
+def actualizar_progreso_proyecto(proyecto, delta_completadas=0, delta_total=0):
+    _modificar("actualizar_progreso_proyecto", proyecto, delta_completadas, delta_total)
 
 # Función para cambiar la prioridad de una tarea de proyecto
-def cambiar_prioridad_tarea_proyecto(proyecto, indice, prioridad):
-    if proyecto in st.session_state.tareas["proyectos"]:
-        st.session_state.tareas["proyectos"][proyecto]["tareas"][indice]["prioridad"] = prioridad
-        guardar_tareas(st.session_state.tareas)
+def cambiar_prioridad_tarea_proyecto(proyecto, id_tarea, prioridad):
+    _modificar("cambiar_prioridad_tarea_proyecto", proyecto, id_tarea, prioridad)
 
 # Función para establecer fecha límite del proyecto
 def establecer_fecha_limite_proyecto(proyecto, fecha):
-    if proyecto in st.session_state.tareas["proyectos"]:
-        st.session_state.tareas["proyectos"][proyecto]["fecha_limite"] = fecha
-        guardar_tareas(st.session_state.tareas)
+    _modificar("establecer_fecha_limite_proyecto", proyecto, fecha)
 
 # Función para eliminar una tarea de proyecto
-def eliminar_tarea_proyecto(proyecto, indice):
-    if proyecto in st.session_state.tareas["proyectos"]:
-        st.session_state.tareas["proyectos"][proyecto]["tareas"].pop(indice)
-        actualizar_progreso_proyecto(proyecto)
-        guardar_tareas(st.session_state.tareas)
+def eliminar_tarea_proyecto(proyecto, id_tarea):
+    _modificar("eliminar_tarea_proyecto", proyecto, id_tarea)
 
 # Función para eliminar un proyecto completo
 def eliminar_proyecto(proyecto):
-    if proyecto in st.session_state.tareas["proyectos"]:
-        del st.session_state.tareas["proyectos"][proyecto]
+    if _modificar("eliminar_proyecto", proyecto, por_defecto=False):
         if st.session_state.proyecto_actual == proyecto:
             st.session_state.proyecto_actual = ""
-        guardar_tareas(st.session_state.tareas)
 
 # Función para agregar entrada a la bitácora
 def agregar_entrada_bitacora(titulo, contenido, categoria="General", tarea_relacionada=None):
     if titulo and contenido:
-        nueva_entrada = {
-            "titulo": titulo,
-            "contenido": contenido,
-            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "categoria": categoria,
-            "tarea_relacionada": tarea_relacionada
-        }
-        
-        st.session_state.tareas["bitacora"].append(nueva_entrada)
-        guardar_tareas(st.session_state.tareas)
+        _modificar("agregar_entrada_bitacora", titulo, contenido, categoria, tarea_relacionada)
         return True
     return False
 
 # Función para editar entrada de bitácora
-def editar_entrada_bitacora(indice, titulo, contenido, categoria):
-    if indice >= 0 and indice < len(st.session_state.tareas["bitacora"]):
-        entrada = st.session_state.tareas["bitacora"][indice]
-        entrada["titulo"] = titulo
-        entrada["contenido"] = contenido
-        entrada["categoria"] = categoria
-        entrada["editado"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        guardar_tareas(st.session_state.tareas)
-        return True
-    return False
+def editar_entrada_bitacora(id_entrada, titulo, contenido, categoria):
+    return _modificar("editar_entrada_bitacora", id_entrada, titulo, contenido, categoria, por_defecto=False)
 
 # Función para eliminar entrada de bitácora
-def eliminar_entrada_bitacora(indice):
-    if indice >= 0 and indice < len(st.session_state.tareas["bitacora"]):
-        st.session_state.tareas["bitacora"].pop(indice)
-        guardar_tareas(st.session_state.tareas)
-        return True
-    return False
+def eliminar_entrada_bitacora(id_entrada):
+    return _modificar("eliminar_entrada_bitacora", id_entrada, por_defecto=False)
+
+# Función para filtrar las tareas diarias (antes de crear widgets)
+# Las fechas "%Y-%m-%d" se comparan como texto, sin convertirlas a datetime.
+# pendientes_hasta añade las tareas pendientes anteriores a esa fecha (atrasadas).
+def filtrar_tareas_diarias(desde=None, hasta=None, completada=None, pendientes_hasta=None):
+    return obtener_journal().filtrar_tareas_diarias(desde, hasta, completada, pendientes_hasta)
+
+# Función para consultar las tareas de un mes (para el calendario)
+def consultar_tareas_del_mes(mes, anio):
+    return obtener_journal().tareas_del_mes(mes, anio)
+
+# Función para consultar las tareas de un mes junto con sus versiones (para reutilizar
+# el HTML del calendario); las versiones son None con el backend SQLite
+@medir
+def consultar_calendario_del_mes(mes, anio):
+    return obtener_journal().calendario_del_mes(mes, anio)
+
+# Función para obtener los registros cuya fecha no se pudo interpretar
+def fechas_invalidas():
+    return obtener_journal().fechas_invalidas()
+
+# Función para obtener las categorías usadas en la bitácora
+def categorias_bitacora():
+    return obtener_journal().categorias_bitacora()
+
+# Función para filtrar y ordenar las entradas de la bitácora
+def filtrar_entradas_bitacora(categoria=None, recientes_primero=True, mes=None):
+    return obtener_journal().filtrar_entradas_bitacora(categoria, recientes_primero, mes)
+
+# Función para obtener los meses con entradas de bitácora (del más reciente al más antiguo)
+def meses_bitacora():
+    return obtener_journal().meses_bitacora()
+
+# Función para buscar texto en la bitácora (resultados ordenados por relevancia)
+def buscar_entradas_bitacora(consulta, categoria=None, limite=50):
+    return obtener_journal().buscar_entradas_bitacora(consulta, categoria, limite)
+
+# Función para buscar en las entradas de bitácora archivadas (de las más recientes a las más antiguas)
+def buscar_entradas_archivadas(consulta, categoria=None, limite=50):
+    return obtener_journal().buscar_entradas_archivadas(consulta, categoria, limite)
+
+# Función para buscar tareas pendientes para el selector de tarea relacionada (ids y etiquetas)
+def buscar_tareas_pendientes(consulta="", limite=20):
+    return obtener_journal().buscar_tareas_pendientes(consulta, limite)
+
+# Función para mostrar la tarea relacionada de una entrada (por id o texto antiguo)
+def describir_tarea(referencia, fecha=None):
+    return obtener_journal().describir_tarea(referencia, fecha)
+
+# Función para consultar las tareas y las completadas por día ("D"), semana ("W") o mes ("M")
+# Las consultas de estadísticas devuelven resultados compartidos: no se deben modificar
+def tasa_completado(periodo="D", desde=None, hasta=None):
+    return obtener_journal().tasa_completado(periodo, desde, hasta)
+
+# Función para consultar el burndown (tareas pendientes día a día) de un proyecto
+def burndown_proyecto(proyecto, hoy=None):
+    return obtener_journal().burndown_proyecto(proyecto, hoy)
+
+# Función para contar las tareas pendientes cuya fecha ya ha pasado
+def tareas_atrasadas(hoy=None):
+    return obtener_journal().tareas_atrasadas(hoy)
+
+# Función para contar las entradas de bitácora por categoría (en total o por periodo)
+def distribucion_categorias(periodo=None, desde=None, hasta=None):
+    return obtener_journal().distribucion_categorias(periodo, desde, hasta)
+
+# Función para filtrar las tareas de un proyecto por estado
+def filtrar_tareas_proyecto(proyecto, completada=None):
+    return obtener_journal().filtrar_tareas_proyecto(proyecto, completada)
 
 # Función para agregar tarea al diccionario de tareas del mes (para el calendario)
 def agregar_a_tareas_del_mes(tareas_del_mes, fecha_str, tarea, tipo, mes_seleccionado, año_seleccionado, completada=False):
@@ -201,7 +349,7 @@ def agregar_a_tareas_del_mes(tareas_del_mes, fecha_str, tarea, tipo, mes_selecci
             if dia not in tareas_del_mes:
                 tareas_del_mes[dia] = []
             tareas_del_mes[dia].append({
-                "descripcion": tarea, 
+                "descripcion": tarea,
                 "tipo": tipo,
                 "completada": completada
             })
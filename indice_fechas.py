@@ -0,0 +1,418 @@
+import calendar
+import logging
+from datetime import date
+
+import recurrencia
+
+registro_log = logging.getLogger(__name__)
+
+# Orden en que aparecen los elementos dentro de un día del calendario
+_ORDEN_TIPOS = {"diaria": 0, "deadline-proyecto": 1, "tarea-proyecto": 1, "bitacora": 2}
+
+# Campo de fecha que sitúa cada colección en el calendario
+CAMPO_FECHA = {"diarias": "fecha", "tareas_proyecto": "fecha_limite", "bitacora": "fecha", "proyectos": "fecha_limite"}
+
+_TIPO_COLECCION = {"diarias": "diaria", "tareas_proyecto": "tarea-proyecto", "bitacora": "bitacora"}
+
+# Colecciones que pueden tener meses en el archivo
+_COLECCIONES_ARCHIVADAS = ("diarias", "bitacora")
+
+def _fecha_elemento(tipo, registro):
+    if tipo == "diaria":
+        return registro.get("fecha", "")
+    if tipo == "bitacora":
+        return registro.get("fecha", "")[:10]
+    return registro.get("fecha_limite", "")
+
+def _cargados(seccion):
+    """Registros ya leídos de una sección repartida por meses (almacen_fragmentos), o todos"""
+    cargados = getattr(seccion, "registros_cargados", None)
+    return cargados() if cargados is not None else seccion.values()
+
+def _parsear(texto):
+    """Convierte "AAAA-MM-DD" en (anio, mes, dia); None si no hay fecha"""
+    if not texto:
+        return None
+    fecha = date.fromisoformat(texto)
+    return fecha.year, fecha.month, fecha.day
+
+def _registro_objetivo(datos, operacion):
+    coleccion = operacion["coleccion"]
+    # Al añadir, el registro guardado es la versión compacta del valor de la operación
+    clave = operacion["valor"]["id"] if operacion["op"] == "anadir" else operacion["clave"]
+    if coleccion == "tareas_proyecto":
+        return datos["proyectos"][operacion["proyecto"]]["tareas"][clave]
+    return datos[coleccion][clave]
+
+class IndiceFechas:
+    """
+    Índice (año, mes) -> día -> elementos del calendario
+
+    Se construye una vez al cargar los datos y se mantiene con cada operación
+    del almacén, así que consultar un mes cuesta lo que ese mes contiene. Los
+    elementos guardan una referencia al registro, de modo que los cambios que
+    no mueven la fecha (completar, cambiar prioridad) no tocan el índice.
+
+    Cada mes y cada día llevan un número de versión que aumenta con cualquier
+    cambio en lo que muestran; el calendario lo usa para reutilizar el HTML
+    ya generado.
+
+    Como el índice de búsqueda, se construye en la primera consulta: cargar
+    los datos no obliga a decodificar las secciones diferidas. Con el backend
+    de fragmentos solo se indexan los meses leídos; consultar un mes lee sus
+    fragmentos y los que se leen por otros motivos se indexan al leerse. Lo
+    mismo ocurre con los meses del archivo (archivado.py), que se añaden la
+    primera vez que se consulta el mes y se renuevan si el archivo cambia.
+
+    Las ocurrencias de las tareas recurrentes (recurrencia.py) no se
+    indexan: se generan para cada mes la primera vez que se consulta y se
+    descartan cuando cambia alguna regla, que cambia la versión de todos los
+    meses.
+    """
+
+    def __init__(self, datos=None, archivo=None):
+        """
+        Args:
+            datos: Diccionario del journal (se puede dar después con reconstruir)
+            archivo: archivado.Archivo cuyos meses se muestran también, o None
+        """
+        self._archivo = archivo
+        # (anio, mes) -> (versiones del archivo, elementos añadidos desde el archivo)
+        self._archivados = {}
+        self._datos = None
+        self._construido = False
+        self._meses = {}
+        self._fechas_invalidas = []
+        self._reloj = 0
+        self._version_base = 0
+        self._versiones = {}
+        self._consultas = {}
+        # (anio, mes) -> día -> ocurrencias de las reglas recurrentes
+        self._ocurrencias = {}
+        if datos is not None:
+            self.reconstruir(datos)
+
+    def reconstruir(self, datos):
+        # La construcción se aplaza hasta la primera consulta
+        self._datos = datos
+        for coleccion in ("diarias", "bitacora"):
+            al_cargar = getattr(datos[coleccion], "al_cargar", None)
+            if al_cargar is not None and self._al_cargar not in al_cargar:
+                al_cargar.append(self._al_cargar)
+        self._construido = False
+        self._meses = {}
+        self._archivados = {}
+        self._fechas_invalidas = []
+        self._renovar_versiones()
+
+    def _renovar_versiones(self):
+        # Todo lo generado antes queda con una versión menor
+        self._reloj += 1
+        self._version_base = self._reloj
+        self._versiones = {}
+        self._consultas = {}
+        self._ocurrencias = {}
+
+    def _asegurar(self):
+        if self._datos is not None and not self._construido:
+            self._construir()
+
+    def _construir(self):
+        """Indexa todos los registros e informa una sola vez de las fechas mal formadas"""
+        datos = self._datos
+        for tarea in _cargados(datos["diarias"]):
+            self._agregar("diaria", tarea)
+        for nombre, proyecto in datos["proyectos"].items():
+            self._agregar_proyecto(nombre, proyecto)
+        for entrada in _cargados(datos["bitacora"]):
+            self._agregar("bitacora", entrada)
+        self._construido = True
+        if self._fechas_invalidas:
+            registro_log.warning(
+                "%d registros con fecha mal formada no aparecen en el calendario: %s",
+                len(self._fechas_invalidas),
+                ", ".join(f"{descripcion!r} ({fecha!r})" for descripcion, fecha in self._fechas_invalidas[:10])
+            )
+
+    def _al_cargar(self, coleccion, registros):
+        """Indexa los registros de los fragmentos que se acaban de leer"""
+        if not self._construido:
+            return
+        for registro in registros:
+            self._agregar(_TIPO_COLECCION[coleccion], registro)
+
+    def _cargar_mes(self, anio, mes):
+        """Lee los fragmentos del mes, si las secciones están repartidas por meses, y lo archivado del mes"""
+        if self._datos is None:
+            return
+        for coleccion in ("diarias", "bitacora"):
+            cargar = getattr(self._datos[coleccion], "cargar_fragmentos", None)
+            if cargar is not None:
+                cargar([f"{anio:04d}-{mes:02d}"])
+        if self._archivo is not None:
+            self._cargar_archivado(anio, mes)
+
+    def _cargar_archivado(self, anio, mes):
+        """Añade los registros archivados del mes, o los renueva si el archivo ha cambiado"""
+        clave = f"{anio:04d}-{mes:02d}"
+        versiones = tuple(self._archivo.version(coleccion, clave) for coleccion in _COLECCIONES_ARCHIVADAS)
+        anterior = self._archivados.get((anio, mes))
+        if (anterior[0] if anterior is not None else (0,) * len(versiones)) == versiones:
+            return
+        for tipo, registro in anterior[1] if anterior is not None else ():
+            self._quitar(tipo, registro)
+        elementos = []
+        for coleccion, version in zip(_COLECCIONES_ARCHIVADAS, versiones):
+            if not version:
+                continue
+            tipo = _TIPO_COLECCION[coleccion]
+            for registro in self._archivo.registros_mes(coleccion, clave):
+                # Un registro que sigue en los datos (archivado interrumpido) se muestra una sola vez
+                if registro["id"] not in self._datos[coleccion]:
+                    self._agregar(tipo, registro)
+                    elementos.append((tipo, registro))
+        self._archivados[(anio, mes)] = (versiones, elementos)
+
+    @property
+    def fechas_invalidas(self):
+        """Lista de (descripción, fecha) de los registros con fecha mal formada"""
+        self._asegurar()
+        return self._fechas_invalidas
+
+    def _agregar(self, tipo, registro, proyecto=None):
+        texto = _fecha_elemento(tipo, registro)
+        try:
+            fecha = _parsear(texto)
+        except ValueError:
+            self._fechas_invalidas.append((registro.get("descripcion") or registro.get("titulo") or proyecto, texto))
+            return
+        if fecha is None:
+            return
+        anio, mes, dia = fecha
+        self._meses.setdefault((anio, mes), {}).setdefault(dia, []).append((tipo, registro, proyecto))
+        self._tocar(anio, mes, dia)
+
+    def _quitar(self, tipo, registro):
+        try:
+            fecha = _parsear(_fecha_elemento(tipo, registro))
+        except ValueError:
+            return
+        if fecha is None:
+            return
+        anio, mes, dia = fecha
+        self._tocar(anio, mes, dia)
+        dias = self._meses.get((anio, mes), {})
+        elementos = dias.get(dia, [])
+        for i, (tipo_elemento, registro_elemento, _) in enumerate(elementos):
+            if tipo_elemento == tipo and registro_elemento is registro:
+                elementos.pop(i)
+                break
+        if not elementos and dia in dias:
+            del dias[dia]
+
+    def _tocar(self, anio, mes, dia):
+        self._reloj += 1
+        self._versiones[(anio, mes)] = self._reloj
+        self._versiones[(anio, mes, dia)] = self._reloj
+
+    def _tocar_registro(self, tipo, registro):
+        try:
+            fecha = _parsear(_fecha_elemento(tipo, registro))
+        except ValueError:
+            return
+        if fecha is not None:
+            self._tocar(*fecha)
+
+    def versiones_mes(self, anio, mes):
+        """
+        Versiones del mes y de cada uno de sus días
+
+        Cambian siempre que cambia algo de lo que muestran (añadir, quitar,
+        completar o editar un elemento).
+
+        Returns:
+            Tupla (versión del mes, tupla con la versión de cada día desde el 1)
+        """
+        self._asegurar()
+        self._cargar_mes(anio, mes)
+        base = self._version_base
+        dias = tuple(self._versiones.get((anio, mes, dia), base)
+                     for dia in range(1, calendar.monthrange(anio, mes)[1] + 1))
+        return self._versiones.get((anio, mes), base), dias
+
+    def _agregar_proyecto(self, nombre, proyecto):
+        self._agregar("deadline-proyecto", proyecto, nombre)
+        for tarea in proyecto["tareas"].values():
+            self._agregar("tarea-proyecto", tarea, nombre)
+
+    def antes_de_aplicar(self, datos, operacion):
+        """Retira del índice los registros que la operación va a mover o eliminar"""
+        if not self._construido:
+            return
+        coleccion = operacion["coleccion"]
+        op = operacion["op"]
+        if coleccion == "recurrentes":
+            # Una regla puede tener ocurrencias en cualquier mes
+            self._renovar_versiones()
+            return
+        if op == "anadir":
+            return
+        if op == "actualizar" and CAMPO_FECHA[coleccion] not in operacion["valor"]:
+            # El registro no se mueve, pero su día puede mostrarse distinto
+            if coleccion != "proyectos":
+                self._tocar_registro(_TIPO_COLECCION[coleccion], _registro_objetivo(datos, operacion))
+            return
+        if coleccion == "proyectos":
+            proyecto = datos["proyectos"][operacion["clave"]]
+            self._quitar("deadline-proyecto", proyecto)
+            if op == "eliminar":
+                for tarea in proyecto["tareas"].values():
+                    self._quitar("tarea-proyecto", tarea)
+            return
+        self._quitar(_TIPO_COLECCION[coleccion], _registro_objetivo(datos, operacion))
+
+    def despues_de_aplicar(self, datos, operacion):
+        """Añade al índice los registros nuevos o con la fecha cambiada"""
+        if not self._construido:
+            return
+        coleccion = operacion["coleccion"]
+        op = operacion["op"]
+        if op == "eliminar" or coleccion == "recurrentes":
+            return
+        if op == "actualizar" and CAMPO_FECHA[coleccion] not in operacion["valor"]:
+            return
+        if coleccion == "proyectos":
+            proyecto = datos["proyectos"][operacion["clave"]]
+            if op == "anadir":
+                self._agregar_proyecto(operacion["clave"], proyecto)
+            else:
+                self._agregar("deadline-proyecto", proyecto, operacion["clave"])
+            return
+        self._agregar(_TIPO_COLECCION[coleccion], _registro_objetivo(datos, operacion), operacion.get("proyecto"))
+
+    def elementos(self):
+        """
+        Recorre todos los elementos del calendario en orden de fecha
+
+        Son los mismos que muestra tareas_del_mes, con el registro original
+        en lugar del resumen para la vista (exportación a iCalendar).
+
+        Yields:
+            Tuplas (fecha, tipo, registro, proyecto) con tipo "diaria",
+            "tarea-proyecto", "deadline-proyecto" o "bitacora"
+        """
+        self._asegurar()
+        for coleccion in ("diarias", "bitacora"):
+            # Exportar necesita todos los meses
+            getattr(self._datos[coleccion], "materializar", lambda: None)()
+        for anio, mes in sorted(self._meses):
+            dias = self._meses[(anio, mes)]
+            for dia in sorted(dias):
+                fecha = date(anio, mes, dia)
+                for tipo, registro, proyecto in sorted(dias[dia], key=lambda e: _ORDEN_TIPOS[e[0]]):
+                    yield fecha, tipo, registro, proyecto
+
+    def diarias_del_dia(self, anio, mes, dia):
+        """Tareas diarias guardadas de un día, sin las archivadas ni las ocurrencias recurrentes"""
+        self._asegurar()
+        cargar = getattr(self._datos["diarias"], "cargar_fragmentos", None)
+        if cargar is not None:
+            cargar([f"{anio:04d}-{mes:02d}"])
+        archivados = self._archivados.get((anio, mes))
+        excluidos = {id(registro) for _, registro in archivados[1]} if archivados is not None else ()
+        return [registro for tipo, registro, _ in self._meses.get((anio, mes), {}).get(dia, ())
+                if tipo == "diaria" and id(registro) not in excluidos]
+
+    def tareas_del_mes(self, anio, mes):
+        """
+        Devuelve las tareas del mes con el formato de calendario.recopilar_tareas_del_mes
+
+        Args:
+            anio: Año
+            mes: Número del mes (1-12)
+
+        Returns:
+            Diccionario con las tareas organizadas por día del mes (compartido:
+            los llamadores no deben modificarlo)
+        """
+        self._asegurar()
+        self._cargar_mes(anio, mes)
+        # Los días cuya versión no ha cambiado reutilizan la lista ya construida
+        dias_guardados = self._consultas.setdefault((anio, mes), {})
+        meses = self._meses.get((anio, mes), {})
+        ocurrencias = self._ocurrencias_mes(anio, mes)
+        tareas_del_mes = {}
+        for dia in meses.keys() | ocurrencias.keys():
+            elementos = meses.get(dia, [])
+            version = self._versiones.get((anio, mes, dia), self._version_base)
+            guardado = dias_guardados.get(dia)
+            if guardado is None or guardado[0] != version:
+                # Una ocurrencia completada ya está en el día como tarea diaria con su mismo id
+                guardadas = {registro["id"] for tipo, registro, _ in elementos if tipo == "diaria"}
+                elementos = elementos + [("diaria", tarea, None) for tarea in ocurrencias.get(dia, ())
+                                         if tarea["id"] not in guardadas]
+                guardado = dias_guardados[dia] = (version, [
+                    _elemento_calendario(tipo, registro, proyecto)
+                    for tipo, registro, proyecto in sorted(elementos, key=lambda e: _ORDEN_TIPOS[e[0]])
+                ])
+            tareas_del_mes[dia] = guardado[1]
+        return tareas_del_mes
+
+    def _ocurrencias_mes(self, anio, mes):
+        """Ocurrencias de las reglas recurrentes en el mes, por día (se generan una vez por versión de las reglas)"""
+        ocurrencias = self._ocurrencias.get((anio, mes))
+        if ocurrencias is None:
+            ocurrencias = self._ocurrencias[(anio, mes)] = {}
+            reglas = self._datos.get("recurrentes") if self._datos is not None else None
+            if reglas:
+                ultimo = calendar.monthrange(anio, mes)[1]
+                for tarea in recurrencia.expandir(list(reglas.values()), f"{anio:04d}-{mes:02d}-01",
+                                                  f"{anio:04d}-{mes:02d}-{ultimo:02d}"):
+                    ocurrencias.setdefault(int(tarea["fecha"][8:10]), []).append(tarea)
+        return ocurrencias
+
+def anadir_archivados(tareas_del_mes, archivo, anio, mes):
+    """
+    Añade lo archivado de un mes a unas tareas del mes calculadas sin el índice (backend SQLite)
+
+    Returns:
+        Las mismas tareas del mes, con los registros archivados al final de cada día
+    """
+    clave = f"{anio:04d}-{mes:02d}"
+    for coleccion in _COLECCIONES_ARCHIVADAS:
+        tipo = _TIPO_COLECCION[coleccion]
+        for registro in archivo.registros_mes(coleccion, clave):
+            dia = date.fromisoformat(_fecha_elemento(tipo, registro)).day
+            tareas_del_mes.setdefault(dia, []).append(_elemento_calendario(tipo, registro, None))
+    return tareas_del_mes
+
+def anadir_ocurrencias(tareas_del_mes, reglas, anio, mes, guardadas):
+    """
+    Añade las ocurrencias pendientes de las tareas recurrentes a unas tareas del mes calculadas sin el índice
+
+    Args:
+        reglas: Registros de la colección "recurrentes"
+        guardadas: Ids de las tareas diarias guardadas (las ocurrencias completadas no se repiten)
+
+    Returns:
+        Las mismas tareas del mes, con las ocurrencias al final de cada día
+    """
+    ultimo = calendar.monthrange(anio, mes)[1]
+    for tarea in recurrencia.expandir(list(reglas), f"{anio:04d}-{mes:02d}-01", f"{anio:04d}-{mes:02d}-{ultimo:02d}",
+                                      guardadas):
+        tareas_del_mes.setdefault(int(tarea["fecha"][8:10]), []).append(_elemento_calendario("diaria", tarea, None))
+    return tareas_del_mes
+
+def _elemento_calendario(tipo, registro, proyecto):
+    if tipo == "diaria":
+        return {"descripcion": registro["descripcion"], "tipo": "diaria", "completada": registro.get("completada", False)}
+    if tipo == "deadline-proyecto":
+        return {"descripcion": f"Fecha límite: {proyecto}", "tipo": "deadline-proyecto", "completada": False}
+    if tipo == "tarea-proyecto":
+        return {
+            "descripcion": f"{registro['descripcion']} ({proyecto})",
+            "tipo": f"tarea-proyecto: {registro['prioridad']}",
+            "completada": registro.get("completada", False)
+        }
+    # Las notas no se completan
+    return {"descripcion": f"Nota: {registro['titulo']}", "tipo": "bitacora", "completada": False}
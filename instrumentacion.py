@@ -0,0 +1,222 @@
+"""
+Instrumentación opcional de los reruns
+
+Con BULLET_JOURNAL_INSTRUMENTACION=1 (configuracion.INSTRUMENTACION) se mide,
+en cada rerun, el tiempo de las funciones marcadas con @medir (carga,
+guardado, consulta y render del calendario y cada vista), el número de
+widgets creados y los bytes que se escriben en disco. Cada rerun y cada
+escritura se añaden como una línea a RUTA_METRICAS (JSON Lines) y app.py
+los muestra en un panel de depuración, desde el que también se puede
+perfilar un único rerun con cProfile o, si está instalado, pyinstrument.
+
+Desactivada, @medir devuelve la función sin envolver: no cuesta nada.
+
+Los tiempos son inclusivos (mostrar_vista_calendario incluye a
+mostrar_calendario). Streamlit ejecuta cada sesión en su propio hilo, así
+que el rerun en curso se guarda por hilo; las escrituras diferidas ocurren
+en otro hilo y solo se registran como escrituras del proceso.
+"""
+import functools
+import importlib.util
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from configuracion import INSTRUMENTACION, RUTA_METRICAS
+
+ACTIVA = INSTRUMENTACION
+
+# Funciones de Streamlit que crean widgets (las que no existan en la versión instalada se omiten)
+WIDGETS = (
+    "button", "checkbox", "toggle", "radio", "selectbox", "multiselect", "select_slider", "slider",
+    "text_input", "text_area", "number_input", "date_input", "time_input", "color_picker",
+    "file_uploader", "download_button", "form_submit_button",
+)
+
+# Rerun en curso de cada hilo
+_local = threading.local()
+_cerrojo = threading.Lock()
+# Últimas escrituras del proceso (tipo, bytes, segundos, hora)
+escrituras = deque(maxlen=50)
+_instalada = False
+
+class Rerun:
+    """Medidas de un rerun: tiempos por función, widgets creados y bytes escritos"""
+
+    def __init__(self, perfilador=None):
+        self.inicio = time.perf_counter()
+        self.duracion = None
+        self.tiempos = {}
+        self.widgets = 0
+        self.bytes_escritos = 0
+        self.perfilador = perfilador
+        self.perfil = None
+        # Informe en texto y archivo guardado, si se perfiló el rerun
+        self.informe = None
+        self.archivo_perfil = None
+
+    def anotar(self, nombre, segundos):
+        total, llamadas = self.tiempos.get(nombre, (0.0, 0))
+        self.tiempos[nombre] = (total + segundos, llamadas + 1)
+
+    def a_dict(self):
+        return {
+            "duracion_ms": round(self.duracion * 1000, 2),
+            "tiempos_ms": {nombre: {"ms": round(total * 1000, 2), "llamadas": llamadas}
+                           for nombre, (total, llamadas) in self.tiempos.items()},
+            "widgets": self.widgets,
+            "bytes_escritos": self.bytes_escritos,
+        }
+
+def rerun_actual():
+    """Rerun que se está midiendo en este hilo, o None"""
+    return getattr(_local, "rerun", None)
+
+def medir(funcion):
+    """
+    Decorador: suma el tiempo de cada llamada al rerun en curso
+
+    Si la instrumentación está desactivada devuelve la misma función.
+    """
+    if not ACTIVA:
+        return funcion
+    nombre = funcion.__name__
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        rerun = getattr(_local, "rerun", None)
+        if rerun is None:
+            return funcion(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            rerun.anotar(nombre, time.perf_counter() - inicio)
+
+    return envoltura
+
+def _registrar_metrica(registro):
+    linea = json.dumps(registro, ensure_ascii=False) + "\n"
+    with _cerrojo:
+        with open(RUTA_METRICAS, "a", encoding="utf-8") as file:
+            file.write(linea)
+
+def _observar_escritura(tipo, ruta, tamano, segundos):
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun.bytes_escritos += tamano
+    hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    escrituras.append((tipo, tamano, segundos, hora))
+    _registrar_metrica({"evento": "escritura", "fecha": hora, "tipo": tipo, "ruta": ruta,
+                        "bytes": tamano, "ms": round(segundos * 1000, 2),
+                        "hilo": threading.current_thread().name})
+
+def _contar_widgets(funcion):
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        rerun = getattr(_local, "rerun", None)
+        if rerun is not None:
+            rerun.widgets += 1
+        return funcion(*args, **kwargs)
+
+    return envoltura
+
+def _instalar():
+    """
+    Envuelve las funciones de widgets de st y de DeltaGenerator (columnas,
+    formularios, sidebar) y se suscribe a las escrituras del almacenamiento
+    """
+    global _instalada
+    with _cerrojo:
+        if _instalada:
+            return
+        try:
+            import streamlit as st
+            from streamlit.delta_generator import DeltaGenerator
+        except ImportError:
+            # Fuera de la aplicación (scripts, benchmarks) no hay widgets que contar
+            st = DeltaGenerator = None
+        for nombre in WIDGETS if st is not None else ():
+            if hasattr(DeltaGenerator, nombre):
+                setattr(DeltaGenerator, nombre, _contar_widgets(getattr(DeltaGenerator, nombre)))
+            # st.button y similares son métodos ya ligados al contenedor principal
+            if hasattr(st, nombre):
+                setattr(st, nombre, _contar_widgets(getattr(st, nombre)))
+        import almacenamiento
+        almacenamiento.observadores_escritura.append(_observar_escritura)
+        _instalada = True
+
+def perfiladores_disponibles():
+    """Perfiladores que se pueden usar en este entorno"""
+    disponibles = ["cProfile"]
+    if importlib.util.find_spec("pyinstrument") is not None:
+        disponibles.append("pyinstrument")
+    return disponibles
+
+def _iniciar_perfil(perfilador):
+    if perfilador == "pyinstrument":
+        from pyinstrument import Profiler
+        perfil = Profiler()
+        perfil.start()
+    else:
+        import cProfile
+        perfil = cProfile.Profile()
+        perfil.enable()
+    return perfil
+
+def _terminar_perfil(perfilador, perfil):
+    """Detiene el perfil, lo guarda junto a las métricas y devuelve el informe en texto"""
+    base = os.path.splitext(RUTA_METRICAS)[0] + datetime.now().strftime("-perfil-%Y%m%d-%H%M%S")
+    if perfilador == "pyinstrument":
+        perfil.stop()
+        with open(base + ".html", "w", encoding="utf-8") as file:
+            file.write(perfil.output_html())
+        return perfil.output_text(unicode=True, color=False), base + ".html"
+    import pstats
+    perfil.disable()
+    perfil.dump_stats(base + ".prof")
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(40)
+    return salida.getvalue(), base + ".prof"
+
+def iniciar_rerun(perfilador=None):
+    """
+    Empieza a medir el rerun de este hilo
+
+    Args:
+        perfilador: "cProfile" o "pyinstrument" para perfilar este rerun, o None
+    """
+    if not ACTIVA:
+        return
+    _instalar()
+    rerun = _local.rerun = Rerun(perfilador)
+    if perfilador:
+        rerun.perfil = _iniciar_perfil(perfilador)
+
+def terminar_rerun(vista=None):
+    """
+    Termina de medir el rerun de este hilo y lo añade al archivo de métricas
+
+    Args:
+        vista: Vista que se ha mostrado (se guarda con la métrica)
+
+    Returns:
+        El Rerun medido (con .informe y .archivo_perfil si se perfiló) o None
+    """
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+    rerun.duracion = time.perf_counter() - rerun.inicio
+    if rerun.perfil is not None:
+        rerun.informe, rerun.archivo_perfil = _terminar_perfil(rerun.perfilador, rerun.perfil)
+    registro = {"evento": "rerun", "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "vista": vista}
+    registro.update(rerun.a_dict())
+    if rerun.archivo_perfil:
+        registro["perfil"] = rerun.archivo_perfil
+    _registrar_metrica(registro)
+    return rerun
@@ -0,0 +1,626 @@
+"""
+Importación y exportación del journal en CSV, JSONL e iCalendar
+
+Todo funciona como generadores: las exportaciones producen el archivo por
+bloques y las importaciones leen línea a línea, así que la memoria no
+depende del tamaño del archivo.
+
+Uso:
+    python intercambio.py exportar csv diarias -o diarias.csv
+    python intercambio.py exportar jsonl bitacora            # a la salida estándar
+    python intercambio.py exportar ics -o journal.ics
+    python intercambio.py importar csv tareas_proyecto tareas.csv
+    python intercambio.py importar ics calendario.ics
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+from almacenamiento import nueva_operacion, nuevo_id
+from indice_fechas import IndiceFechas
+from registros import CLASES, Registro
+
+# Formatos disponibles y si necesitan indicar la colección
+FORMATOS = ("csv", "jsonl", "ics")
+COLECCIONES = ("diarias", "tareas_proyecto", "bitacora")
+
+# Columnas de cada colección (las tareas de proyecto llevan delante el nombre del proyecto)
+COLUMNAS = {
+    "diarias": tuple(CLASES["diarias"].CAMPOS),
+    "tareas_proyecto": ("proyecto",) + tuple(CLASES["tareas_proyecto"].CAMPOS),
+    "bitacora": tuple(CLASES["bitacora"].CAMPOS),
+}
+
+# Campos que debe traer cada registro importado
+OBLIGATORIOS = {"diarias": ("descripcion",), "tareas_proyecto": ("proyecto", "descripcion"), "bitacora": ("titulo",)}
+
+# Registros por bloque al exportar
+TAMANO_BLOQUE = 10000
+
+# Sufijo de los UID de iCalendar generados por la aplicación
+DOMINIO_UID = "@bullet-journal"
+
+# Prioridad de iCalendar (1 = máxima, 9 = mínima) de cada prioridad de tarea
+PRIORIDADES_ICS = {"Alta": 1, "Media": 5, "Baja": 9}
+
+_VERDADEROS = {"true", "1", "sí", "si", "yes", "x", "verdadero"}
+_FALSOS = {"false", "0", "no", "", "falso"}
+
+def _registros(datos, coleccion):
+    """Recorre los registros de una colección como (registro, proyecto)"""
+    if coleccion == "tareas_proyecto":
+        for nombre, proyecto in datos["proyectos"].items():
+            for tarea in proyecto["tareas"].values():
+                yield tarea, nombre
+    else:
+        for registro in datos[coleccion].values():
+            yield registro, None
+
+def _copia(registro):
+    return registro.a_dict() if isinstance(registro, Registro) else dict(registro)
+
+# ---------------------------------------------------------------- exportación
+
+def copiar(datos, formato, coleccion=None, indice=None):
+    """
+    Copia de lo que se va a exportar, para serializarla fuera del cerrojo del almacén
+
+    Solo copia los registros (sin serializarlos), así que el cerrojo se
+    retiene mucho menos que la exportación entera; exportar(copia=...) la
+    escribe después mientras las demás sesiones siguen trabajando.
+
+    Args:
+        datos: Diccionario con todas las tareas
+        formato: "csv", "jsonl" o "ics"
+        coleccion: Colección a exportar (no se usa con "ics")
+        indice: IndiceFechas de los datos, para "ics"
+
+    Returns:
+        Lista de (registro, proyecto) o, con "ics", de (fecha, tipo, registro, proyecto)
+    """
+    if formato == "ics":
+        if indice is None:
+            indice = IndiceFechas(datos)
+        return [(fecha, tipo, _copia(registro), proyecto) for fecha, tipo, registro, proyecto in indice.elementos()
+                if tipo != "bitacora"]
+    if coleccion not in COLECCIONES:
+        raise ValueError(f"Colección desconocida: {coleccion}")
+    return [(_copia(registro), proyecto) for registro, proyecto in _registros(datos, coleccion)]
+
+def exportar_csv(datos, coleccion, registros=None):
+    """
+    Exporta una colección a CSV
+
+    Args:
+        datos: Diccionario con todas las tareas
+        coleccion: "diarias", "tareas_proyecto" o "bitacora"
+        registros: Copia hecha con copiar() (por defecto se recorren los datos)
+
+    Yields:
+        Bloques de texto CSV (el primero empieza con la cabecera)
+    """
+    columnas = COLUMNAS[coleccion]
+    campos = columnas[1:] if coleccion == "tareas_proyecto" else columnas
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(columnas)
+    filas = []
+    for registro, proyecto in registros if registros is not None else _registros(datos, coleccion):
+        fila = [registro.get(campo) for campo in campos]
+        if proyecto is not None:
+            fila.insert(0, proyecto)
+        filas.append(fila)
+        if len(filas) == TAMANO_BLOQUE:
+            escritor.writerows(filas)
+            filas.clear()
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    escritor.writerows(filas)
+    yield buffer.getvalue()
+
+def exportar_jsonl(datos, coleccion, registros=None):
+    """
+    Exporta una colección a JSON Lines (un registro completo por línea)
+
+    Args:
+        datos: Diccionario con todas las tareas
+        coleccion: "diarias", "tareas_proyecto" o "bitacora"
+        registros: Copia hecha con copiar() (por defecto se recorren los datos)
+
+    Yields:
+        Bloques de líneas JSON
+    """
+    lineas = []
+    for registro, proyecto in registros if registros is not None else _registros(datos, coleccion):
+        registro = _copia(registro) if registros is None else registro
+        if proyecto is not None:
+            registro = {"proyecto": proyecto, **registro}
+        lineas.append(json.dumps(registro, ensure_ascii=False))
+        if len(lineas) == TAMANO_BLOQUE:
+            yield "\n".join(lineas) + "\n"
+            lineas.clear()
+    if lineas:
+        yield "\n".join(lineas) + "\n"
+
+def _escapar_ics(texto):
+    return (str(texto).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def _plegar_ics(linea):
+    """Divide las líneas de más de 75 octetos como exige RFC 5545"""
+    if len(linea) <= 75 and linea.isascii():
+        return linea + "\r\n"
+    partes = []
+    actual = ""
+    tamano = 0
+    for caracter in linea:
+        octetos = len(caracter.encode())
+        if tamano + octetos > (75 if not partes else 74):
+            partes.append(actual)
+            actual, tamano = "", 0
+        actual += caracter
+        tamano += octetos
+    partes.append(actual)
+    return "\r\n ".join(partes) + "\r\n"
+
+def _componente_ics(fecha, tipo, registro, proyecto, marca):
+    dia = fecha.strftime("%Y%m%d")
+    if tipo == "deadline-proyecto":
+        lineas = [
+            "BEGIN:VEVENT",
+            f"UID:proyecto-{_escapar_ics(proyecto)}{DOMINIO_UID}",
+            f"DTSTAMP:{marca}",
+            f"DTSTART;VALUE=DATE:{dia}",
+            f"DTEND;VALUE=DATE:{(fecha + timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{_escapar_ics(f'Fecha límite: {proyecto}')}",
+            f"X-BULLET-JOURNAL-TIPO:{tipo}",
+            f"X-BULLET-JOURNAL-PROYECTO:{_escapar_ics(proyecto)}",
+            "END:VEVENT",
+        ]
+    else:
+        completada = registro.get("completada", False)
+        lineas = [
+            "BEGIN:VTODO",
+            f"UID:{_escapar_ics(registro.get('id', nuevo_id()))}{DOMINIO_UID}",
+            f"DTSTAMP:{marca}",
+            f"DUE;VALUE=DATE:{dia}",
+            f"SUMMARY:{_escapar_ics(registro['descripcion'])}",
+            f"STATUS:{'COMPLETED' if completada else 'NEEDS-ACTION'}",
+            f"X-BULLET-JOURNAL-TIPO:{tipo}",
+        ]
+        if tipo == "tarea-proyecto":
+            lineas.append(f"PRIORITY:{PRIORIDADES_ICS.get(registro.get('prioridad'), 5)}")
+            lineas.append(f"CATEGORIES:{_escapar_ics(proyecto)}")
+            lineas.append(f"X-BULLET-JOURNAL-PROYECTO:{_escapar_ics(proyecto)}")
+        lineas.append("END:VTODO")
+    return "".join(_plegar_ics(linea) for linea in lineas)
+
+def exportar_ics(datos, indice=None, elementos=None):
+    """
+    Exporta a iCalendar las tareas con fecha y las fechas límite de los proyectos
+
+    Recorre el mismo índice de fechas que alimenta el calendario
+    (recopilar_tareas_del_mes): las tareas diarias y de proyecto son VTODO
+    con vencimiento ese día y las fechas límite de proyecto, eventos de día
+    completo. Las entradas de bitácora no se exportan.
+
+    Args:
+        datos: Diccionario con todas las tareas
+        indice: IndiceFechas ya construido sobre los datos (por defecto se construye uno)
+        elementos: Copia hecha con copiar() (en lugar del índice)
+
+    Yields:
+        Bloques de texto iCalendar (líneas terminadas en CRLF)
+    """
+    if elementos is None:
+        elementos = (IndiceFechas(datos) if indice is None else indice).elementos()
+    marca = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Bullet Journal Digital//ES\r\nCALSCALE:GREGORIAN\r\n"
+    componentes = []
+    for fecha, tipo, registro, proyecto in elementos:
+        if tipo == "bitacora":
+            continue
+        componentes.append(_componente_ics(fecha, tipo, registro, proyecto, marca))
+        if len(componentes) == TAMANO_BLOQUE:
+            yield "".join(componentes)
+            componentes.clear()
+    componentes.append("END:VCALENDAR\r\n")
+    yield "".join(componentes)
+
+def exportar(datos, formato, coleccion=None, indice=None, copia=None):
+    """
+    Exporta en el formato indicado
+
+    Args:
+        datos: Diccionario con todas las tareas
+        formato: "csv", "jsonl" o "ics"
+        coleccion: Colección a exportar (no se usa con "ics")
+        indice: IndiceFechas de los datos, para "ics"
+        copia: Lo devuelto por copiar(), que se exporta en lugar de recorrer los datos
+
+    Yields:
+        Bloques de texto
+    """
+    if formato == "ics":
+        return exportar_ics(datos, indice, copia)
+    if coleccion not in COLECCIONES:
+        raise ValueError(f"Colección desconocida: {coleccion}")
+    if formato == "csv":
+        return exportar_csv(datos, coleccion, copia)
+    if formato == "jsonl":
+        return exportar_jsonl(datos, coleccion, copia)
+    raise ValueError(f"Formato desconocido: {formato}")
+
+# ---------------------------------------------------------------- importación
+
+def leer_csv(lineas, coleccion):
+    """
+    Lee filas de un CSV con las columnas de la colección (las que falten se completan)
+
+    Yields:
+        Tuplas (número de línea, diccionario con los valores en texto)
+    """
+    # csv.reader + zip en lugar de DictReader: la mitad de coste por fila
+    lector = csv.reader(lineas)
+    cabecera = [columna.strip() for columna in next(lector, ())]
+    faltan = [campo for campo in OBLIGATORIOS[coleccion] if campo not in cabecera]
+    if faltan:
+        raise ValueError(f"Faltan columnas obligatorias en el CSV: {', '.join(faltan)}")
+    for fila in lector:
+        if fila:
+            yield lector.line_num, dict(zip(cabecera, fila))
+
+def leer_jsonl(lineas):
+    """
+    Lee un objeto JSON por línea (las líneas en blanco se ignoran)
+
+    Yields:
+        Tuplas (número de línea, diccionario) o (número de línea, ValueError) si la línea no es válida
+    """
+    for numero, linea in enumerate(lineas, 1):
+        if not linea.strip():
+            continue
+        try:
+            registro = json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, ValueError(f"JSON no válido: {e.msg}")
+            continue
+        if not isinstance(registro, dict):
+            yield numero, ValueError("cada línea debe ser un objeto JSON")
+            continue
+        yield numero, registro
+
+def _desescapar_ics(texto):
+    resultado = []
+    i = 0
+    while i < len(texto):
+        caracter = texto[i]
+        if caracter == "\\" and i + 1 < len(texto):
+            siguiente = texto[i + 1]
+            resultado.append("\n" if siguiente in "nN" else siguiente)
+            i += 2
+            continue
+        resultado.append(caracter)
+        i += 1
+    return "".join(resultado)
+
+def _lineas_desplegadas(lineas):
+    """Une las líneas plegadas de iCalendar (las que empiezan por espacio o tabulador)"""
+    actual = None
+    for linea in lineas:
+        linea = linea.rstrip("\r\n")
+        if linea[:1] in (" ", "\t") and actual is not None:
+            actual += linea[1:]
+            continue
+        if actual is not None:
+            yield actual
+        actual = linea
+    if actual is not None:
+        yield actual
+
+def leer_ics(lineas):
+    """
+    Lee los VTODO y VEVENT de un archivo iCalendar
+
+    Los componentes exportados por la aplicación conservan su tipo y su
+    proyecto (propiedades X-BULLET-JOURNAL-*). Los de otros calendarios con
+    fecha se importan como tareas diarias.
+
+    Yields:
+        Tuplas (número de componente, (tipo, registro, proyecto)) o
+        (número de componente, ValueError) si no se puede importar
+    """
+    numero = 0
+    propiedades = None
+    componente = None
+    for linea in _lineas_desplegadas(lineas):
+        nombre, _, valor = linea.partition(":")
+        nombre, _, parametros = nombre.partition(";")
+        nombre = nombre.upper()
+        if nombre == "BEGIN" and valor.upper() in ("VTODO", "VEVENT"):
+            componente, propiedades = valor.upper(), {}
+            numero += 1
+        elif nombre == "END" and componente is not None and valor.upper() == componente:
+            try:
+                yield numero, _elemento_ics(componente, propiedades)
+            except ValueError as e:
+                yield numero, e
+            componente = propiedades = None
+        elif propiedades is not None:
+            propiedades.setdefault(nombre, _desescapar_ics(valor))
+
+def _fecha_ics(texto):
+    texto = texto.strip()
+    try:
+        return date(int(texto[:4]), int(texto[4:6]), int(texto[6:8])).isoformat()
+    except ValueError:
+        raise ValueError(f"fecha no válida: {texto!r}") from None
+
+def _elemento_ics(componente, propiedades):
+    tipo = propiedades.get("X-BULLET-JOURNAL-TIPO", "diaria")
+    proyecto = propiedades.get("X-BULLET-JOURNAL-PROYECTO")
+    texto_fecha = propiedades.get("DUE") or propiedades.get("DTSTART")
+    if not texto_fecha:
+        raise ValueError("el componente no tiene fecha (DUE o DTSTART)")
+    fecha = _fecha_ics(texto_fecha)
+    if tipo == "deadline-proyecto":
+        if not proyecto:
+            raise ValueError("fecha límite sin proyecto")
+        return tipo, {"fecha_limite": fecha}, proyecto
+    uid = propiedades.get("UID", "")
+    registro = {
+        "descripcion": propiedades.get("SUMMARY", ""),
+        "completada": propiedades.get("STATUS", "").upper() == "COMPLETED",
+    }
+    if uid.endswith(DOMINIO_UID):
+        registro["id"] = uid[:-len(DOMINIO_UID)]
+    if tipo == "tarea-proyecto" and proyecto:
+        registro["fecha_limite"] = fecha
+        prioridad = propiedades.get("PRIORITY", "5").strip()
+        registro["prioridad"] = next((nombre for nombre, valor in PRIORIDADES_ICS.items()
+                                      if str(valor) == prioridad), "Media")
+        return "tarea-proyecto", registro, proyecto
+    registro["fecha"] = fecha
+    return "diaria", registro, None
+
+def _booleano(valor):
+    if valor is True or valor is False:
+        return valor
+    if valor is None:
+        return False
+    texto = str(valor).strip().lower()
+    if texto in _VERDADEROS:
+        return True
+    if texto in _FALSOS:
+        return False
+    raise ValueError(f"valor no válido para completada: {valor!r}")
+
+# Fechas ya validadas (texto leído -> "AAAA-MM-DD"): en un archivo grande se repiten mucho
+_fechas_validas = {}
+
+def _fecha(valor, campo, obligatoria=False):
+    if valor is None or valor == "":
+        if obligatoria:
+            raise ValueError(f"falta {campo}")
+        return ""
+    fecha = _fechas_validas.get(valor)
+    if fecha is not None:
+        return fecha
+    try:
+        fecha = date.fromisoformat(str(valor).strip()).isoformat()
+    except ValueError:
+        raise ValueError(f"fecha no válida en {campo}: {valor!r}") from None
+    if len(_fechas_validas) > 100000:
+        _fechas_validas.clear()
+    _fechas_validas[valor] = fecha
+    return fecha
+
+def _instante(valor, campo):
+    try:
+        return datetime.fromisoformat(str(valor).strip()).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise ValueError(f"fecha no válida en {campo}: {valor!r}") from None
+
+def normalizar(coleccion, registro, hoy=None, ahora=None):
+    """
+    Valida un registro importado y completa los campos que falten
+
+    Args:
+        coleccion: "diarias", "tareas_proyecto" o "bitacora"
+        registro: Diccionario leído del archivo (valores en texto si viene de CSV)
+        hoy: Fecha "AAAA-MM-DD" por defecto
+        ahora: Fecha y hora "AAAA-MM-DD HH:MM:SS" por defecto
+
+    Returns:
+        Tupla (registro con el esquema de tareas.json, proyecto o None)
+
+    Raises:
+        ValueError: El registro no se puede importar
+    """
+    hoy = hoy or date.today().isoformat()
+    ahora = ahora or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for campo in OBLIGATORIOS[coleccion]:
+        if not registro.get(campo):
+            raise ValueError(f"falta {campo}")
+    # Los campos desconocidos se conservan (solo en JSONL; en CSV no hay más columnas)
+    limpio = {clave: valor for clave, valor in registro.items()
+              if clave != "proyecto" and valor is not None and valor != ""}
+    limpio["id"] = str(registro.get("id") or nuevo_id())
+    if coleccion == "diarias":
+        limpio["fecha"] = _fecha(registro.get("fecha") or hoy, "fecha", obligatoria=True)
+        limpio["completada"] = _booleano(registro.get("completada"))
+        limpio.setdefault("tipo", "diarias")
+        return limpio, None
+    if coleccion == "tareas_proyecto":
+        limpio["fecha_creacion"] = _fecha(registro.get("fecha_creacion") or hoy, "fecha_creacion")
+        limpio["fecha_limite"] = _fecha(registro.get("fecha_limite"), "fecha_limite")
+        limpio["completada"] = _booleano(registro.get("completada"))
+        if limpio.get("fecha_completada"):
+            limpio["fecha_completada"] = _fecha(limpio["fecha_completada"], "fecha_completada")
+        limpio["prioridad"] = registro.get("prioridad") or "Media"
+        if limpio["prioridad"] not in PRIORIDADES_ICS:
+            raise ValueError(f"prioridad no válida: {limpio['prioridad']!r}")
+        limpio.setdefault("tipo", "proyecto")
+        return limpio, str(registro["proyecto"])
+    limpio["contenido"] = registro.get("contenido") or ""
+    limpio["fecha"] = _instante(registro.get("fecha") or ahora, "fecha")
+    limpio["categoria"] = registro.get("categoria") or "General"
+    limpio["tarea_relacionada"] = registro.get("tarea_relacionada") or None
+    if limpio.get("editado"):
+        limpio["editado"] = _instante(limpio["editado"], "editado")
+    return limpio, None
+
+def _nuevo_proyecto(hoy):
+    return {"tareas": {}, "progreso": 0, "completadas": 0, "total": 0, "fecha_creacion": hoy, "fecha_limite": ""}
+
+def nuevo_resumen():
+    """Contadores de una importación"""
+    return {"importados": 0, "duplicados": 0, "proyectos_creados": 0, "errores": 0, "mensajes": []}
+
+def _anotar_error(resumen, numero, error, maximo=20):
+    resumen["errores"] += 1
+    if len(resumen["mensajes"]) < maximo:
+        resumen["mensajes"].append(f"{numero}: {error}")
+
+def operaciones_importacion(datos, elementos, coleccion=None, resumen=None):
+    """
+    Convierte registros leídos de un archivo en operaciones del journal
+
+    Se consume de una en una, después de aplicar la anterior: los ids que ya
+    existen (por ejemplo, al importar dos veces el mismo archivo) se
+    omiten y los proyectos que no existen se crean.
+
+    Args:
+        datos: Diccionario con todas las tareas (se consulta, no se modifica)
+        elementos: Salida de leer_csv o leer_jsonl (con coleccion) o de leer_ics (sin ella)
+        coleccion: Colección de destino de CSV/JSONL
+        resumen: Diccionario de nuevo_resumen() que se va actualizando
+
+    Yields:
+        Operaciones creadas con nueva_operacion
+    """
+    resumen = resumen if resumen is not None else nuevo_resumen()
+    hoy = date.today().isoformat()
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for numero, elemento in elementos:
+        if isinstance(elemento, ValueError):
+            _anotar_error(resumen, numero, elemento)
+            continue
+        try:
+            if coleccion is None:
+                tipo, registro, proyecto = elemento
+                if tipo == "deadline-proyecto":
+                    if proyecto not in datos["proyectos"]:
+                        resumen["proyectos_creados"] += 1
+                        yield nueva_operacion("anadir", "proyectos", proyecto, _nuevo_proyecto(hoy))
+                    yield nueva_operacion("actualizar", "proyectos", proyecto, registro)
+                    resumen["importados"] += 1
+                    continue
+                destino = "tareas_proyecto" if tipo == "tarea-proyecto" else "diarias"
+                registro, proyecto = normalizar(destino, dict(registro, proyecto=proyecto), hoy, ahora)
+            else:
+                destino = coleccion
+                registro, proyecto = normalizar(coleccion, elemento, hoy, ahora)
+        except ValueError as e:
+            _anotar_error(resumen, numero, e)
+            continue
+        if destino == "tareas_proyecto":
+            if proyecto not in datos["proyectos"]:
+                resumen["proyectos_creados"] += 1
+                yield nueva_operacion("anadir", "proyectos", proyecto, _nuevo_proyecto(hoy))
+            existentes = datos["proyectos"][proyecto]["tareas"]
+        else:
+            existentes = datos[destino]
+        if registro["id"] in existentes:
+            resumen["duplicados"] += 1
+            continue
+        resumen["importados"] += 1
+        yield nueva_operacion("anadir", destino, valor=registro, proyecto=proyecto)
+
+def leer(lineas, formato, coleccion=None):
+    """
+    Lee un archivo en el formato indicado
+
+    Args:
+        lineas: Iterable de líneas de texto (un archivo abierto con newline="")
+        formato: "csv", "jsonl" o "ics"
+        coleccion: Colección de destino de CSV/JSONL
+
+    Returns:
+        Generador de elementos para operaciones_importacion
+    """
+    if formato == "ics":
+        return leer_ics(lineas)
+    if coleccion not in COLECCIONES:
+        raise ValueError(f"Colección desconocida: {coleccion}")
+    if formato == "csv":
+        return leer_csv(lineas, coleccion)
+    if formato == "jsonl":
+        return leer_jsonl(lineas)
+    raise ValueError(f"Formato desconocido: {formato}")
+
+def importar(almacen, lineas, formato, coleccion=None):
+    """
+    Importa un archivo en el almacén compartido con una única escritura
+
+    Args:
+        almacen: AlmacenCompartido de destino
+        lineas: Iterable de líneas de texto
+        formato: "csv", "jsonl" o "ics"
+        coleccion: Colección de destino de CSV/JSONL (no se usa con "ics")
+
+    Returns:
+        Resumen con los registros importados, duplicados, proyectos creados y errores
+    """
+    resumen = nuevo_resumen()
+    elementos = leer(lineas, formato, None if formato == "ics" else coleccion)
+    almacen.aplicar_y_guardar(
+        lambda datos: operaciones_importacion(datos, elementos, None if formato == "ics" else coleccion, resumen))
+    return resumen
+
+# ---------------------------------------------------------------- línea de órdenes
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Importa y exporta el bullet journal en CSV, JSONL o iCalendar")
+    ordenes = parser.add_subparsers(dest="orden", required=True)
+    exportacion = ordenes.add_parser("exportar", help="Escribe una colección (o el calendario) en un archivo")
+    exportacion.add_argument("formato", choices=FORMATOS)
+    exportacion.add_argument("coleccion", nargs="?", choices=COLECCIONES, help="Colección (no se usa con ics)")
+    exportacion.add_argument("-o", "--salida", default="-", help="Archivo de salida (por defecto, la salida estándar)")
+    importacion = ordenes.add_parser("importar", help="Añade al journal los registros de un archivo")
+    importacion.add_argument("formato", choices=FORMATOS)
+    importacion.add_argument("coleccion", nargs="?", choices=COLECCIONES, help="Colección (no se usa con ics)")
+    importacion.add_argument("entrada", help="Archivo de entrada ('-' para la entrada estándar)")
+    argumentos = parser.parse_args(argumentos)
+    if argumentos.formato != "ics" and argumentos.coleccion is None:
+        parser.error(f"el formato {argumentos.formato} necesita la colección ({', '.join(COLECCIONES)})")
+
+    from nucleo import Journal
+    almacen = Journal.para_consola().almacen
+
+    if argumentos.orden == "exportar":
+        # newline="": los bloques ya traen sus finales de línea (CRLF en iCalendar)
+        if argumentos.salida == "-":
+            salida = open(sys.stdout.fileno(), "w", encoding="utf-8", newline="", closefd=False)
+        else:
+            salida = open(argumentos.salida, "w", encoding="utf-8", newline="")
+        with salida as archivo:
+            for bloque in exportar(almacen.datos(), argumentos.formato, argumentos.coleccion):
+                archivo.write(bloque)
+        return 0
+
+    entrada = sys.stdin if argumentos.entrada == "-" else open(argumentos.entrada, encoding="utf-8-sig", newline="")
+    with entrada:
+        resumen = importar(almacen, entrada, argumentos.formato, argumentos.coleccion)
+    print(f"Importados: {resumen['importados']}, duplicados omitidos: {resumen['duplicados']}, "
+          f"proyectos creados: {resumen['proyectos_creados']}, errores: {resumen['errores']}", file=sys.stderr)
+    for mensaje in resumen["mensajes"]:
+        print(f"  {mensaje}", file=sys.stderr)
+    return 1 if resumen["errores"] and not resumen["importados"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
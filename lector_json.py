@@ -0,0 +1,188 @@
+import codecs
+import json
+import re
+from json.scanner import make_scanner
+
+# Bytes que se leen del archivo en cada bloque
+TAMANO_BLOQUE = 1 << 20
+
+_ESPACIOS = re.compile(r"[ \t\n\r]*")
+
+class LectorJSON:
+    """
+    Lector incremental de un documento JSON
+
+    Lee el archivo por bloques y decodifica cada valor con json.JSONDecoder,
+    de modo que nunca tiene en memoria más texto que el bloque actual (o el
+    elemento más grande). Los arrays y objetos se pueden recorrer elemento a
+    elemento con elementos() y miembros() en lugar de decodificarlos enteros.
+    """
+
+    def __init__(self, archivo, fin=None, tamano_bloque=TAMANO_BLOQUE):
+        """
+        Args:
+            archivo: Archivo abierto en modo binario, situado donde empieza la lectura
+            fin: Posición (en bytes) donde termina la lectura, o None hasta el final
+            tamano_bloque: Bytes por lectura
+        """
+        self._archivo = archivo
+        self._restantes = None if fin is None else fin - archivo.tell()
+        self._tamano_bloque = tamano_bloque
+        self._decodificador_utf8 = codecs.getincrementaldecoder("utf-8")()
+        # El escáner de json (en C) devuelve (valor, fin) sin capas intermedias
+        self._escanear = make_scanner(json.JSONDecoder())
+        self._texto = ""
+        self._pos = 0
+        self._agotado = False
+
+    def _leer_bloque(self):
+        """Añade un bloque al buffer; devuelve False si ya no quedan datos"""
+        if self._agotado:
+            return False
+        tamano = self._tamano_bloque
+        if self._restantes is not None:
+            tamano = min(tamano, self._restantes)
+        datos = self._archivo.read(tamano) if tamano > 0 else b""
+        if self._restantes is not None:
+            self._restantes -= len(datos)
+        final = not datos
+        self._texto = self._texto[self._pos:] + self._decodificador_utf8.decode(datos, final)
+        self._pos = 0
+        self._agotado = final
+        return True
+
+    def _caracter(self):
+        """Siguiente carácter significativo (sin consumirlo), o "" al final"""
+        while True:
+            texto = self._texto
+            pos = self._pos = _ESPACIOS.match(texto, self._pos).end()
+            if pos < len(texto):
+                return texto[pos]
+            if not self._leer_bloque():
+                return ""
+
+    def _esperar(self, caracter):
+        if self._caracter() != caracter:
+            raise ValueError(f"Se esperaba {caracter!r} en la posición {self._pos} del bloque")
+        self._pos += 1
+
+    def valor(self):
+        """Decodifica el siguiente valor completo"""
+        self._caracter()
+        while True:
+            try:
+                valor, fin = self._escanear(self._texto, self._pos)
+            except (StopIteration, json.JSONDecodeError):
+                # El valor continúa en el bloque siguiente
+                if not self._leer_bloque():
+                    raise ValueError(f"JSON incompleto o no válido en la posición {self._pos} del bloque")
+                continue
+            # Un número al final del buffer podría seguir en el bloque siguiente
+            if (not self._agotado and self._texto[self._pos] in "-0123456789"
+                    and (fin == len(self._texto) or self._texto[fin] in ".eE+-0123456789")):
+                self._leer_bloque()
+                continue
+            self._pos = fin
+            return valor
+
+    def _separador(self, cierre):
+        """Consume "," o el cierre; devuelve False al llegar al cierre"""
+        caracter = self._caracter()
+        self._pos += 1
+        if caracter == cierre:
+            return False
+        if caracter != ",":
+            raise ValueError(f"Se esperaba ',' o {cierre!r} y se encontró {caracter!r}")
+        return True
+
+    def elementos(self):
+        """Recorre un array elemento a elemento"""
+        self._esperar("[")
+        if self._caracter() == "]":
+            self._pos += 1
+            return
+        escanear = self._escanear
+        espacios = _ESPACIOS.match
+        while True:
+            # Camino rápido: elementos completos dentro del bloque actual
+            texto, pos = self._texto, self._pos
+            while True:
+                try:
+                    valor, fin = escanear(texto, espacios(texto, pos).end())
+                except (StopIteration, ValueError):
+                    break
+                separador = espacios(texto, fin).end()
+                if separador >= len(texto):
+                    break
+                caracter = texto[separador]
+                if caracter == ",":
+                    pos = self._pos = separador + 1
+                    yield valor
+                elif caracter == "]":
+                    self._pos = separador + 1
+                    yield valor
+                    return
+                else:
+                    raise ValueError(f"Se esperaba ',' o ']' y se encontró {caracter!r}")
+            # El elemento sigue en el bloque siguiente
+            self._pos = pos
+            yield self.valor()
+            if not self._separador("]"):
+                return
+
+    def miembros(self):
+        """Recorre un objeto como pares (clave, lector situado en el valor)"""
+        self._esperar("{")
+        if self._caracter() == "}":
+            self._pos += 1
+            return
+        while True:
+            clave = self.valor()
+            self._esperar(":")
+            # El llamador decide cómo leer el valor (valor(), elementos()...)
+            yield clave, self
+            if not self._separador("}"):
+                return
+
+def elementos_por_lineas(archivo, fin, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recorre un array escrito con un elemento por línea, entre las posiciones actual y fin
+
+    Es el formato de las secciones de la instantánea: como json nunca deja
+    un salto de línea sin escapar dentro de un valor, cada bloque se corta
+    en el último salto de línea y se decodifica de una vez, mucho más rápido
+    que elemento a elemento.
+
+    Args:
+        archivo: Archivo abierto en modo binario, situado en el "[" del array
+        fin: Posición (en bytes) justo después del "]"
+        tamano_bloque: Bytes por lectura
+    """
+    restantes = fin - archivo.tell()
+    pendiente = b""
+    inicio = True
+    while restantes > 0:
+        bloque = archivo.read(min(tamano_bloque, restantes))
+        if not bloque:
+            raise ValueError("El archivo termina antes que la sección")
+        restantes -= len(bloque)
+        datos = pendiente + bloque
+        if restantes > 0:
+            corte = datos.rfind(b"\n")
+            if corte < 0:
+                pendiente = datos
+                continue
+            datos, pendiente = datos[:corte], datos[corte + 1:]
+        datos = datos.strip()
+        if inicio:
+            if not datos.startswith(b"["):
+                raise ValueError("La sección no empieza por '['")
+            datos = datos[1:]
+            inicio = False
+        if restantes == 0:
+            if not datos.endswith(b"]"):
+                raise ValueError("La sección no termina en ']'")
+            datos = datos[:-1]
+        datos = datos.strip().rstrip(b",")
+        if datos:
+            yield from json.loads(b"[" + datos + b"]")
@@ -0,0 +1,1073 @@
+"""
+Operaciones del bullet journal sin depender de Streamlit
+
+Journal reúne todo lo que la aplicación hace con los datos (añadir,
+completar, mover y eliminar tareas, la bitácora y las consultas) sobre un
+AlmacenCompartido. Las vistas de Streamlit lo usan a través de funciones.py,
+que solo añade los mensajes de error y el estado de la sesión; los scripts,
+las tareas programadas y la consola (consola.py) lo usan directamente.
+
+Los errores de almacenamiento se propagan como excepciones.
+
+Ejemplo:
+    from nucleo import Journal
+    journal = Journal()
+    tarea = journal.anadir_tarea("Comprar pan")
+    journal.completar_tarea(tarea["id"])
+"""
+from datetime import date, datetime
+
+import recurrencia
+from almacenamiento import cambios_contadores, nueva_operacion, nuevo_id
+
+def cargar_backend(nombre=None):
+    """
+    Devuelve el módulo de almacenamiento configurado
+
+    Args:
+        nombre: "json", "sqlite" o "fragmentos" (por defecto, configuracion.BACKEND)
+    """
+    if nombre is None:
+        from configuracion import BACKEND as nombre
+    if nombre == "sqlite":
+        import almacen_sqlite as backend
+    elif nombre == "fragmentos":
+        import almacen_fragmentos as backend
+    else:
+        import almacenamiento as backend
+    return backend
+
+def _hoy():
+    return datetime.now().strftime("%Y-%m-%d")
+
+def _ahora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _nuevo_proyecto():
+    return {
+        "tareas": {},
+        "progreso": 0,
+        "completadas": 0,
+        "total": 0,
+        "fecha_creacion": _hoy(),
+        "fecha_limite": ""
+    }
+
+def _operacion_progreso(datos, proyecto, delta_completadas=0, delta_total=0):
+    """Operación que actualiza los contadores y el progreso de un proyecto en O(1)"""
+    cambios = cambios_contadores(datos["proyectos"][proyecto], delta_completadas, delta_total)
+    return nueva_operacion("actualizar", "proyectos", proyecto, cambios)
+
+def _existe_tarea_proyecto(datos, proyecto, id_tarea):
+    proyectos = datos["proyectos"]
+    return proyecto in proyectos and id_tarea in proyectos[proyecto]["tareas"]
+
+def _guardada(diarias, id_tarea, fecha):
+    """
+    Tarea diaria guardada de una ocurrencia, o None
+
+    Con el backend de fragmentos solo se lee el mes de la ocurrencia: buscar
+    un id que no está leería todos los meses.
+    """
+    cargar = getattr(diarias, "cargar_fragmentos", None)
+    if cargar is None:
+        return diarias.get(id_tarea)
+    cargar([fecha[:7]])
+    return dict.get(diarias, id_tarea)
+
+def _tarea_diaria(datos, id_tarea):
+    """
+    Tarea diaria por su id, que puede ser el de una ocurrencia de una tarea recurrente
+
+    Returns:
+        Tupla (tarea guardada o None, (id de la regla, fecha) si es una ocurrencia o None)
+    """
+    ocurrencia = recurrencia.separar_ocurrencia(id_tarea)
+    if ocurrencia is None:
+        return datos["diarias"].get(id_tarea), None
+    return _guardada(datos["diarias"], id_tarea, ocurrencia[1]), ocurrencia
+
+def _es_ocurrencia(datos, ocurrencia):
+    """Indica si la regla existe y genera (sin omitirla) la ocurrencia (id de la regla, fecha)"""
+    regla = datos["recurrentes"].get(ocurrencia[0])
+    return regla is not None and recurrencia.es_ocurrencia(regla, ocurrencia[1])
+
+def _guardar_ocurrencia(datos, ocurrencia, completada):
+    """Operación que guarda una ocurrencia completada como tarea diaria, o None"""
+    # Una ocurrencia sin guardar ya está pendiente
+    if not completada or not _es_ocurrencia(datos, ocurrencia):
+        return None
+    tarea = recurrencia.tarea_ocurrencia(datos["recurrentes"][ocurrencia[0]], ocurrencia[1])
+    tarea["completada"] = True
+    return nueva_operacion("anadir", "diarias", valor=tarea)
+
+def _omitir_ocurrencias(datos, ocurrencias):
+    """Operaciones que añaden las fechas de unas ocurrencias eliminadas a las omitidas de su regla"""
+    por_regla = {}
+    for id_regla, fecha in ocurrencias:
+        if id_regla in datos["recurrentes"]:
+            por_regla.setdefault(id_regla, set()).add(fecha)
+    operaciones = []
+    for id_regla, fechas in por_regla.items():
+        omitidas = datos["recurrentes"][id_regla].get("omitidas") or []
+        if not fechas <= set(omitidas):
+            operaciones.append(nueva_operacion("actualizar", "recurrentes", id_regla,
+                                               {"omitidas": sorted(fechas.union(omitidas))}))
+    return operaciones
+
+class Journal:
+    """
+    Operaciones del journal sobre un almacén compartido
+
+    Cada modificación se calcula dentro de AlmacenCompartido.actualizar(),
+    sobre el estado más reciente y bajo el bloqueo entre procesos, así que
+    varias instancias (la aplicación, la consola, un script) pueden trabajar
+    a la vez sobre los mismos archivos.
+
+    Las consultas que el backend sabe resolver por sí mismo (SQLite) se le
+    delegan; el resto recorre los datos en memoria o los índices del almacén.
+    """
+
+    def __init__(self, almacen=None, backend=None):
+        """
+        Args:
+            almacen: AlmacenCompartido sobre el que trabajar (por defecto, el del proceso)
+            backend: Módulo de almacenamiento (por defecto, el de la configuración)
+        """
+        self.backend = backend if backend is not None else cargar_backend()
+        if almacen is None:
+            from almacen_compartido import obtener_almacen
+            almacen = obtener_almacen(self.backend)
+        self.almacen = almacen
+        self._archivo = None
+
+    @classmethod
+    def para_consola(cls, backend=None):
+        """
+        Journal para un proceso de vida corta (scripts, cron, consola)
+
+        No construye índices derivados hasta que una consulta los necesita y
+        escribe cada cambio antes de volver, sin hilo de escritura diferida.
+        """
+        from almacen_compartido import AlmacenCompartido
+        backend = backend if backend is not None else cargar_backend()
+        return cls(AlmacenCompartido(backend, indices={}), backend)
+
+    @property
+    def datos(self):
+        """Diccionario con todas las tareas (compartido: no se debe modificar directamente)"""
+        return self.almacen.datos()
+
+    # ------------------------------------------------------------ persistencia
+
+    def actualizar(self, construir):
+        """
+        Calcula operaciones sobre el estado más reciente y las persiste
+
+        Args:
+            construir: Función que recibe los datos y devuelve una operación,
+                una lista de operaciones o None
+
+        Returns:
+            Lista de operaciones aplicadas
+        """
+        return self.almacen.actualizar(construir)
+
+    def guardar(self):
+        """Escribe la instantánea completa de los datos"""
+        self.almacen.guardar()
+
+    def volcar(self):
+        """Escribe ya los cambios pendientes de la escritura diferida"""
+        self.almacen.flush()
+
+    def estado_escritura(self):
+        """Pendientes, antigüedad y último error de la escritura diferida"""
+        return self.almacen.metricas_escritura()
+
+    def lote(self):
+        """Agrupa los cambios del bloque with en una sola escritura"""
+        return self.almacen.lote()
+
+    # ------------------------------------------------------------ archivo
+
+    @property
+    def archivo(self):
+        """Archivo de registros antiguos (archivado.Archivo del directorio configurado)"""
+        if self._archivo is None:
+            from archivado import obtener_archivo
+            self._archivo = obtener_archivo()
+        return self._archivo
+
+    def archivar(self, hoy=None, dias_diarias=None, dias_bitacora=None):
+        """
+        Mueve al archivo lo que manda la política de retención
+
+        Los registros se escriben en el archivo antes de eliminarlos de los
+        datos, dentro de la misma actualización.
+
+        Args:
+            hoy: Fecha de referencia (date; por defecto, hoy)
+            dias_diarias, dias_bitacora: Días que se conservan (por defecto, los de la configuración)
+
+        Returns:
+            Diccionario colección -> registros archivados
+        """
+        import archivado
+        dias_diarias = archivado.RETENCION_DIARIAS_DIAS if dias_diarias is None else dias_diarias
+        dias_bitacora = archivado.RETENCION_BITACORA_DIAS if dias_bitacora is None else dias_bitacora
+        archivados = {}
+
+        def construir(datos):
+            operaciones = []
+            for coleccion, registros in archivado.seleccionar(datos, hoy, dias_diarias, dias_bitacora).items():
+                archivados[coleccion] = self.archivo.archivar(coleccion, registros)
+                operaciones += [nueva_operacion("eliminar", coleccion, registro["id"]) for registro in registros]
+            return operaciones or None
+
+        if self.actualizar(construir):
+            # Los registros ya están en el archivo: su eliminación no debe quedarse pendiente
+            self.volcar()
+        return archivados
+
+    def restaurar_archivados(self, coleccion, ids):
+        """
+        Devuelve registros archivados a los datos
+
+        Se añaden a los datos antes de quitarlos del archivo, marcados con
+        "restaurada" para que la política de retención no los vuelva a archivar.
+
+        Returns:
+            Número de registros restaurados
+        """
+        ids = set(ids)
+        registros = self.archivo.buscar(coleccion, lambda registro: registro["id"] in ids, len(ids))
+        if not registros:
+            return 0
+        self.actualizar(lambda datos: [nueva_operacion("anadir", coleccion, valor=dict(registro, restaurada=_hoy()))
+                                       for registro in registros if registro["id"] not in datos[coleccion]])
+        self.volcar()
+        return len(self.archivo.retirar(coleccion, [registro["id"] for registro in registros]))
+
+    def estado_archivo(self):
+        """Registros archivados por colección"""
+        return {coleccion: self.archivo.total(coleccion) for coleccion in ("diarias", "bitacora")}
+
+    # ------------------------------------------------------------ tareas diarias
+
+    def anadir_tarea(self, descripcion, fecha=None):
+        """
+        Añade una tarea diaria
+
+        Args:
+            descripcion: Texto de la tarea
+            fecha: Fecha "AAAA-MM-DD" (por defecto, hoy)
+
+        Returns:
+            La tarea añadida o None si la descripción está vacía
+        """
+        if not descripcion:
+            return None
+        tarea = {
+            "id": nuevo_id(),
+            "descripcion": descripcion,
+            "fecha": fecha if fecha else _hoy(),
+            "completada": False,
+            "tipo": "diarias"
+        }
+        self.actualizar(lambda datos: nueva_operacion("anadir", "diarias", valor=tarea))
+        return tarea
+
+    def anadir_tareas(self, descripciones, fecha=None):
+        """Añade varias tareas diarias en una sola escritura; devuelve cuántas"""
+        fecha = fecha if fecha else _hoy()
+        operaciones = [
+            nueva_operacion("anadir", "diarias", valor={
+                "id": nuevo_id(),
+                "descripcion": descripcion,
+                "fecha": fecha,
+                "completada": False,
+                "tipo": "diarias"
+            })
+            for descripcion in descripciones if descripcion
+        ]
+        if not operaciones:
+            return 0
+        return len(self.actualizar(lambda datos: operaciones))
+
+    def completar_tarea(self, id_tarea, completada=None):
+        """
+        Marca una tarea diaria como completada o pendiente
+
+        Args:
+            id_tarea: Id de la tarea (o de una ocurrencia de una tarea recurrente)
+            completada: Estado nuevo (por defecto, el contrario del actual)
+
+        Returns:
+            True si la tarea existe
+        """
+        def construir(datos):
+            tarea, ocurrencia = _tarea_diaria(datos, id_tarea)
+            if tarea is None:
+                # Completar una ocurrencia de una tarea recurrente la guarda como tarea diaria
+                return _guardar_ocurrencia(datos, ocurrencia, completada is not False) if ocurrencia else None
+            nuevo = not tarea.get("completada", False) if completada is None else completada
+            return nueva_operacion("actualizar", "diarias", id_tarea, {"completada": nuevo})
+
+        return bool(self.actualizar(construir))
+
+    def completar_tareas(self, ids_tareas, completada=True):
+        """Marca varias tareas diarias (u ocurrencias) en una sola escritura; devuelve cuántas cambiaron"""
+        def construir(datos):
+            operaciones = []
+            for id_tarea in ids_tareas:
+                tarea, ocurrencia = _tarea_diaria(datos, id_tarea)
+                if tarea is None:
+                    operacion = _guardar_ocurrencia(datos, ocurrencia, completada) if ocurrencia else None
+                    if operacion is not None:
+                        operaciones.append(operacion)
+                elif tarea.get("completada", False) != completada:
+                    operaciones.append(nueva_operacion("actualizar", "diarias", id_tarea, {"completada": completada}))
+            return operaciones
+
+        return len(self.actualizar(construir))
+
+    def eliminar_tarea(self, id_tarea):
+        """Elimina una tarea diaria o una ocurrencia de una tarea recurrente; devuelve True si existía"""
+        return bool(self.eliminar_tareas([id_tarea]))
+
+    def eliminar_tareas(self, ids_tareas=None, filtro=None):
+        """
+        Elimina varias tareas diarias en una sola escritura
+
+        Eliminar una ocurrencia de una tarea recurrente (guardada o no) añade
+        su fecha a las omitidas de la regla, para que no vuelva a generarse.
+
+        Args:
+            ids_tareas: Ids a eliminar (pueden ser de ocurrencias)
+            filtro: Si no se dan ids, se eliminan las tareas guardadas con filtro(tarea) verdadero (o todas)
+
+        Returns:
+            Número de tareas eliminadas
+        """
+        eliminadas = 0
+
+        def construir(datos):
+            nonlocal eliminadas
+            eliminadas = 0
+            operaciones = []
+            ocurrencias = []
+            if ids_tareas is not None:
+                for id_tarea in dict.fromkeys(ids_tareas):
+                    tarea, ocurrencia = _tarea_diaria(datos, id_tarea)
+                    if tarea is not None:
+                        operaciones.append(nueva_operacion("eliminar", "diarias", id_tarea))
+                        if ocurrencia is not None:
+                            ocurrencias.append(ocurrencia)
+                    elif ocurrencia is not None and _es_ocurrencia(datos, ocurrencia):
+                        ocurrencias.append(ocurrencia)
+                        eliminadas += 1
+            else:
+                for id_tarea, tarea in datos["diarias"].items():
+                    if filtro is None or filtro(tarea):
+                        operaciones.append(nueva_operacion("eliminar", "diarias", id_tarea))
+                        ocurrencia = recurrencia.separar_ocurrencia(id_tarea)
+                        if ocurrencia is not None:
+                            ocurrencias.append(ocurrencia)
+            eliminadas += len(operaciones)
+            return operaciones + _omitir_ocurrencias(datos, ocurrencias)
+
+        self.actualizar(construir)
+        return eliminadas
+
+    # ------------------------------------------------------------ tareas recurrentes
+
+    def anadir_recurrente(self, descripcion, regla, inicio=None):
+        """
+        Añade una tarea recurrente (ver recurrencia.py)
+
+        Args:
+            descripcion: Texto de la tarea
+            regla: Regla RRULE, por ejemplo recurrencia.FRECUENCIAS["Días laborables"]
+            inicio: Fecha "AAAA-MM-DD" desde la que se repite (por defecto, hoy)
+
+        Returns:
+            La regla añadida o None si la descripción está vacía
+
+        Raises:
+            ValueError: Si la regla no es válida
+        """
+        if not descripcion:
+            return None
+        inicio = inicio if inicio else _hoy()
+        # Una regla que no se puede interpretar no llega a guardarse
+        recurrencia.interpretar(regla, inicio)
+        registro = {"id": nuevo_id(), "descripcion": descripcion, "regla": regla, "inicio": inicio, "omitidas": []}
+        self.actualizar(lambda datos: nueva_operacion("anadir", "recurrentes", valor=registro))
+        return registro
+
+    def eliminar_recurrente(self, id_regla):
+        """
+        Elimina una tarea recurrente; devuelve True si existía
+
+        Sus ocurrencias completadas se conservan como tareas diarias.
+        """
+        def construir(datos):
+            if id_regla not in datos["recurrentes"]:
+                return None
+            return nueva_operacion("eliminar", "recurrentes", id_regla)
+
+        return bool(self.actualizar(construir))
+
+    def tareas_recurrentes(self):
+        """Reglas de las tareas recurrentes, ordenadas por descripción"""
+        return sorted(self.datos["recurrentes"].values(), key=lambda regla: regla["descripcion"].casefold())
+
+    # ------------------------------------------------------------ proyectos
+
+    def crear_proyecto(self, nombre):
+        """Crea un proyecto vacío; devuelve False si el nombre está vacío o ya existe"""
+        def construir(datos):
+            if not nombre or nombre in datos["proyectos"]:
+                return None
+            return nueva_operacion("anadir", "proyectos", nombre, _nuevo_proyecto())
+
+        return bool(self.actualizar(construir))
+
+    def eliminar_proyecto(self, nombre):
+        """Elimina un proyecto con todas sus tareas; devuelve True si existía"""
+        def construir(datos):
+            if nombre not in datos["proyectos"]:
+                return None
+            return nueva_operacion("eliminar", "proyectos", nombre)
+
+        return bool(self.actualizar(construir))
+
+    def establecer_fecha_limite_proyecto(self, proyecto, fecha):
+        """Cambia la fecha límite de un proyecto (solo escribe si cambia)"""
+        def construir(datos):
+            if proyecto not in datos["proyectos"] or datos["proyectos"][proyecto]["fecha_limite"] == fecha:
+                return None
+            return nueva_operacion("actualizar", "proyectos", proyecto, {"fecha_limite": fecha})
+
+        # La vista la llama en cada rerun: se descarta sin bloquear si no cambia
+        proyectos = self.datos["proyectos"]
+        if proyecto in proyectos and proyectos[proyecto]["fecha_limite"] != fecha:
+            self.actualizar(construir)
+
+    def actualizar_progreso_proyecto(self, proyecto, delta_completadas=0, delta_total=0):
+        """Suma a los contadores de un proyecto y recalcula su progreso en O(1)"""
+        def construir(datos):
+            if proyecto not in datos["proyectos"]:
+                return None
+            return _operacion_progreso(datos, proyecto, delta_completadas, delta_total)
+
+        self.actualizar(construir)
+
+    def anadir_tarea_proyecto(self, proyecto, descripcion, fecha_limite=None, prioridad="Media"):
+        """
+        Añade una tarea a un proyecto
+
+        Args:
+            proyecto: Nombre del proyecto
+            descripcion: Texto de la tarea
+            fecha_limite: Fecha "AAAA-MM-DD" o None
+            prioridad: "Alta", "Media" o "Baja"
+
+        Returns:
+            La tarea añadida o None si la descripción está vacía o el proyecto no existe
+        """
+        if not descripcion:
+            return None
+        tarea = {
+            "id": nuevo_id(),
+            "descripcion": descripcion,
+            "fecha_creacion": _hoy(),
+            "fecha_limite": fecha_limite if fecha_limite else "",
+            "completada": False,
+            "prioridad": prioridad,
+            "tipo": "proyecto"
+        }
+
+        def construir(datos):
+            if proyecto not in datos["proyectos"]:
+                return None
+            # La tarea y el progreso del proyecto se registran juntos
+            return [nueva_operacion("anadir", "tareas_proyecto", valor=tarea, proyecto=proyecto),
+                    _operacion_progreso(datos, proyecto, delta_total=1)]
+
+        return tarea if self.actualizar(construir) else None
+
+    def anadir_tareas_proyecto(self, proyecto, descripciones, fecha_limite=None, prioridad="Media"):
+        """Añade varias tareas a un proyecto en una sola escritura; devuelve cuántas"""
+        tareas = [{
+            "id": nuevo_id(),
+            "descripcion": descripcion,
+            "fecha_creacion": _hoy(),
+            "fecha_limite": fecha_limite if fecha_limite else "",
+            "completada": False,
+            "prioridad": prioridad,
+            "tipo": "proyecto"
+        } for descripcion in descripciones if descripcion]
+
+        def construir(datos):
+            if proyecto not in datos["proyectos"] or not tareas:
+                return None
+            return [nueva_operacion("anadir", "tareas_proyecto", valor=tarea, proyecto=proyecto) for tarea in tareas] + \
+                   [_operacion_progreso(datos, proyecto, delta_total=len(tareas))]
+
+        return len(tareas) if self.actualizar(construir) else 0
+
+    def completar_tarea_proyecto(self, proyecto, id_tarea, completada=None):
+        """
+        Marca una tarea de proyecto como completada o pendiente
+
+        Args:
+            proyecto: Nombre del proyecto
+            id_tarea: Id de la tarea
+            completada: Estado nuevo (por defecto, el contrario del actual)
+
+        Returns:
+            True si la tarea existe
+        """
+        encontrada = []
+
+        def construir(datos):
+            if not _existe_tarea_proyecto(datos, proyecto, id_tarea):
+                return None
+            encontrada.append(id_tarea)
+            actual = datos["proyectos"][proyecto]["tareas"][id_tarea].get("completada", False)
+            nuevo = not actual if completada is None else completada
+            if nuevo == actual:
+                return None
+            # La fecha de finalización alimenta el burndown de las estadísticas
+            return [nueva_operacion("actualizar", "tareas_proyecto", id_tarea, {
+                        "completada": nuevo,
+                        "fecha_completada": _hoy() if nuevo else None
+                    }, proyecto),
+                    _operacion_progreso(datos, proyecto, delta_completadas=1 if nuevo else -1)]
+
+        self.actualizar(construir)
+        return bool(encontrada)
+
+    def completar_tareas_proyecto(self, proyecto, ids_tareas, completada=True):
+        """Marca varias tareas de un proyecto en una sola escritura; devuelve cuántas cambiaron"""
+        def construir(datos):
+            if proyecto not in datos["proyectos"]:
+                return None
+            tareas = datos["proyectos"][proyecto]["tareas"]
+            ids = [id_tarea for id_tarea in ids_tareas
+                   if id_tarea in tareas and tareas[id_tarea].get("completada", False) != completada]
+            if not ids:
+                return None
+            fecha = _hoy() if completada else None
+            return [nueva_operacion("actualizar", "tareas_proyecto", id_tarea,
+                                    {"completada": completada, "fecha_completada": fecha}, proyecto)
+                    for id_tarea in ids] + \
+                   [_operacion_progreso(datos, proyecto, delta_completadas=len(ids) if completada else -len(ids))]
+
+        return max(len(self.actualizar(construir)) - 1, 0)
+
+    def cambiar_prioridad_tarea_proyecto(self, proyecto, id_tarea, prioridad):
+        """Cambia la prioridad de una tarea de proyecto; devuelve True si la tarea existe"""
+        def construir(datos):
+            if not _existe_tarea_proyecto(datos, proyecto, id_tarea):
+                return None
+            return nueva_operacion("actualizar", "tareas_proyecto", id_tarea, {"prioridad": prioridad}, proyecto)
+
+        return bool(self.actualizar(construir))
+
+    def cambiar_prioridad_tareas_proyecto(self, proyecto, ids_tareas, prioridad):
+        """Cambia la prioridad de varias tareas de un proyecto en una sola escritura; devuelve cuántas"""
+        def construir(datos):
+            if proyecto not in datos["proyectos"]:
+                return None
+            tareas = datos["proyectos"][proyecto]["tareas"]
+            return [nueva_operacion("actualizar", "tareas_proyecto", id_tarea, {"prioridad": prioridad}, proyecto)
+                    for id_tarea in ids_tareas
+                    if id_tarea in tareas and tareas[id_tarea].get("prioridad") != prioridad]
+
+        return len(self.actualizar(construir))
+
+    def eliminar_tarea_proyecto(self, proyecto, id_tarea):
+        """Elimina una tarea de proyecto; devuelve True si existía"""
+        def construir(datos):
+            if not _existe_tarea_proyecto(datos, proyecto, id_tarea):
+                return None
+            completada = datos["proyectos"][proyecto]["tareas"][id_tarea].get("completada", False)
+            return [nueva_operacion("eliminar", "tareas_proyecto", id_tarea, proyecto=proyecto),
+                    _operacion_progreso(datos, proyecto, delta_completadas=-1 if completada else 0, delta_total=-1)]
+
+        return bool(self.actualizar(construir))
+
+    def eliminar_tareas_proyecto(self, proyecto, ids_tareas=None, filtro=None):
+        """
+        Elimina varias tareas de un proyecto en una sola escritura
+
+        Args:
+            proyecto: Nombre del proyecto
+            ids_tareas: Ids a eliminar
+            filtro: Si no se dan ids, se eliminan las tareas con filtro(tarea) verdadero (o todas)
+
+        Returns:
+            Número de tareas eliminadas
+        """
+        def construir(datos):
+            if proyecto not in datos["proyectos"]:
+                return None
+            tareas = datos["proyectos"][proyecto]["tareas"]
+            if ids_tareas is not None:
+                ids = [id_tarea for id_tarea in ids_tareas if id_tarea in tareas]
+            else:
+                ids = [id_tarea for id_tarea, tarea in tareas.items() if filtro is None or filtro(tarea)]
+            if not ids:
+                return None
+            completadas = sum(1 for id_tarea in ids if tareas[id_tarea].get("completada", False))
+            return [nueva_operacion("eliminar", "tareas_proyecto", id_tarea, proyecto=proyecto) for id_tarea in ids] + \
+                   [_operacion_progreso(datos, proyecto, delta_completadas=-completadas, delta_total=-len(ids))]
+
+        return max(len(self.actualizar(construir)) - 1, 0)
+
+    def mover_tareas_proyecto(self, origen, destino, ids_tareas):
+        """Mueve tareas de un proyecto a otro en una sola escritura (conservan su id); devuelve cuántas"""
+        def construir(datos):
+            proyectos = datos["proyectos"]
+            if origen == destino or origen not in proyectos or destino not in proyectos:
+                return None
+            tareas = proyectos[origen]["tareas"]
+            ids = [id_tarea for id_tarea in ids_tareas if id_tarea in tareas]
+            if not ids:
+                return None
+            completadas = sum(1 for id_tarea in ids if tareas[id_tarea].get("completada", False))
+            operaciones = []
+            for id_tarea in ids:
+                operaciones.append(nueva_operacion("eliminar", "tareas_proyecto", id_tarea, proyecto=origen))
+                operaciones.append(nueva_operacion("anadir", "tareas_proyecto", valor=dict(tareas[id_tarea]), proyecto=destino))
+            operaciones.append(_operacion_progreso(datos, origen, delta_completadas=-completadas, delta_total=-len(ids)))
+            operaciones.append(_operacion_progreso(datos, destino, delta_completadas=completadas, delta_total=len(ids)))
+            return operaciones
+
+        return max((len(self.actualizar(construir)) - 2) // 2, 0)
+
+    # ------------------------------------------------------------ bitácora
+
+    def agregar_entrada_bitacora(self, titulo, contenido, categoria="General", tarea_relacionada=None):
+        """Añade una entrada a la bitácora; devuelve la entrada o None si falta el título o el contenido"""
+        if not (titulo and contenido):
+            return None
+        entrada = {
+            "id": nuevo_id(),
+            "titulo": titulo,
+            "contenido": contenido,
+            "fecha": _ahora(),
+            "categoria": categoria,
+            "tarea_relacionada": tarea_relacionada
+        }
+        self.actualizar(lambda datos: nueva_operacion("anadir", "bitacora", valor=entrada))
+        return entrada
+
+    def editar_entrada_bitacora(self, id_entrada, titulo, contenido, categoria):
+        """Modifica una entrada de la bitácora; devuelve True si existía"""
+        def construir(datos):
+            if id_entrada not in datos["bitacora"]:
+                return None
+            return nueva_operacion("actualizar", "bitacora", id_entrada, {
+                "titulo": titulo,
+                "contenido": contenido,
+                "categoria": categoria,
+                "editado": _ahora()
+            })
+
+        return bool(self.actualizar(construir))
+
+    def eliminar_entrada_bitacora(self, id_entrada):
+        """Elimina una entrada de la bitácora; devuelve True si existía"""
+        def construir(datos):
+            if id_entrada not in datos["bitacora"]:
+                return None
+            return nueva_operacion("eliminar", "bitacora", id_entrada)
+
+        return bool(self.actualizar(construir))
+
+    # ------------------------------------------------------------ consultas
+
+    def filtrar_tareas_diarias(self, desde=None, hasta=None, completada=None, pendientes_hasta=None):
+        """
+        Tareas diarias ordenadas por fecha
+
+        Las fechas "%Y-%m-%d" se comparan como texto, sin convertirlas a datetime.
+
+        Incluye las ocurrencias pendientes de las tareas recurrentes, que se
+        generan solo para el rango pedido (sin fin, hasta hoy; sin inicio,
+        desde el inicio de cada regla). Las que no se completaron en su día
+        no se arrastran como atrasadas.
+
+        Args:
+            desde, hasta: Rango de fechas "AAAA-MM-DD" (incluidas)
+            completada: Solo las completadas (True) o las pendientes (False)
+            pendientes_hasta: Añade las pendientes anteriores a esa fecha (atrasadas)
+        """
+        resultado = None
+        datos = self.datos
+        diarias = datos["diarias"]
+        reglas = list(datos["recurrentes"].values()) if completada is not True else []
+        if desde is not None and desde == hasta and pendientes_hasta in (None, desde):
+            # Vista por defecto (un día y sus atrasadas): de los índices, sin recorrer todas las tareas
+            resultado = self._diarias_del_dia(desde, completada, pendientes_hasta is not None)
+        inicio_ocurrencias = desde or min((regla["inicio"] for regla in reglas), default=None)
+        fin_ocurrencias = hasta or _hoy()
+        if not reglas or inicio_ocurrencias > fin_ocurrencias:
+            inicio_ocurrencias = None
+        if resultado is not None:
+            guardadas = diarias if not hasattr(diarias, "cargar_fragmentos") else dict.keys(diarias)
+        elif hasattr(diarias, "cargar_fragmentos") and (desde or hasta or completada is False):
+            # Backend de fragmentos: las pendientes siempre están leídas; del resto basta con los meses
+            # del rango y, para saber qué ocurrencias ya están guardadas, con los de las ocurrencias
+            rangos = []
+            if completada is not False:
+                rangos.append((desde, hasta))
+            if inicio_ocurrencias is not None:
+                rangos.append((inicio_ocurrencias, fin_ocurrencias))
+            if rangos:
+                with self.almacen.cerrojo:
+                    diarias.cargar_fragmentos([
+                        clave for clave in diarias.fragmentos()
+                        if any((inicio is None or clave >= inicio[:7]) and (fin is None or clave <= fin[:7])
+                               for inicio, fin in rangos)
+                    ])
+            tareas = diarias.registros_cargados()
+            guardadas = dict.keys(diarias)
+        else:
+            tareas = diarias.values()
+            guardadas = diarias
+        if resultado is None:
+            resultado = []
+            for tarea in tareas:
+                fecha = tarea["fecha"]
+                hecha = tarea.get("completada", False)
+                if completada is not None and hecha != completada:
+                    continue
+                en_rango = (desde is None or fecha >= desde) and (hasta is None or fecha <= hasta)
+                atrasada = pendientes_hasta is not None and not hecha and fecha < pendientes_hasta
+                if en_rango or atrasada:
+                    resultado.append(tarea)
+        if inicio_ocurrencias is not None:
+            resultado += recurrencia.expandir(reglas, inicio_ocurrencias, fin_ocurrencias, guardadas)
+        resultado.sort(key=lambda tarea: tarea["fecha"])
+        return resultado
+
+    def _diarias_del_dia(self, fecha, completada, con_atrasadas):
+        """
+        Tareas diarias de un día y, si se piden, las pendientes anteriores, sacadas de los índices
+
+        Returns:
+            Lista sin ordenar, o None si no hay índices o la fecha no es "AAAA-MM-DD"
+        """
+        indices = self.almacen.indices
+        if "fechas" not in indices or "pendientes" not in indices:
+            return None
+        try:
+            dia = date.fromisoformat(fecha)
+        except ValueError:
+            return None
+        with self.almacen.cerrojo:
+            resultado = [tarea for tarea in self.almacen.indice("fechas").diarias_del_dia(dia.year, dia.month, dia.day)
+                         if completada is None or tarea.get("completada", False) == completada]
+            if con_atrasadas and completada is not True:
+                resultado += [tarea for tarea in self.almacen.indice("pendientes").diarias_pendientes()
+                              if tarea["fecha"] < fecha]
+        return resultado
+
+    def filtrar_tareas_proyecto(self, proyecto, completada=None):
+        """Tareas de un proyecto, opcionalmente solo las completadas o las pendientes"""
+        if hasattr(self.backend, "tareas_proyecto"):
+            return self.backend.tareas_proyecto(proyecto, completada)
+        return [
+            tarea for tarea in self.datos["proyectos"][proyecto]["tareas"].values()
+            if completada is None or tarea.get("completada", False) == completada
+        ]
+
+    def buscar_tareas(self, consulta, completada=None, limite=None, archivadas=False):
+        """
+        Busca texto en las tareas diarias y de proyecto (sin distinguir mayúsculas)
+
+        Args:
+            consulta: Texto a buscar en la descripción
+            completada: Solo las completadas (True) o las pendientes (False)
+            limite: Número máximo de resultados
+            archivadas: Añade al final las tareas diarias archivadas (de las más recientes a las más antiguas)
+
+        Returns:
+            Lista de tuplas (tarea, proyecto o None), las diarias primero
+        """
+        consulta = consulta.casefold()
+        resultados = []
+        datos = self.datos
+        candidatas = [((tarea, None) for tarea in datos["diarias"].values())]
+        candidatas += [((tarea, nombre) for tarea in proyecto["tareas"].values())
+                       for nombre, proyecto in datos["proyectos"].items()]
+        for grupo in candidatas:
+            for tarea, proyecto in grupo:
+                if completada is not None and tarea.get("completada", False) != completada:
+                    continue
+                if consulta in tarea["descripcion"].casefold():
+                    resultados.append((tarea, proyecto))
+                    if limite is not None and len(resultados) >= limite:
+                        return resultados
+        if archivadas:
+            restantes = None if limite is None else limite - len(resultados)
+            resultados += [(tarea, None) for tarea in self.archivo.buscar("diarias", lambda tarea: (
+                (completada is None or tarea.get("completada", False) == completada)
+                and consulta in tarea["descripcion"].casefold()), restantes,
+                prefiltro=lambda texto: consulta in texto.casefold())]
+        return resultados
+
+    def categorias_bitacora(self):
+        """Categorías usadas en la bitácora, ordenadas"""
+        if hasattr(self.backend, "categorias_bitacora"):
+            return self.backend.categorias_bitacora()
+        bitacora = self.datos["bitacora"]
+        if hasattr(bitacora, "cargar_fragmentos"):
+            # Los meses sin leer aportan las categorías que anota el manifiesto
+            categorias = {entrada["categoria"] for entrada in bitacora.registros_cargados()}
+            for clave in bitacora.fragmentos():
+                if not bitacora.cargado(clave):
+                    categorias.update(bitacora.metadatos(clave).get("categorias", ()))
+            return sorted(categorias)
+        return sorted(set(entrada["categoria"] for entrada in bitacora.values()))
+
+    def meses_bitacora(self):
+        """Meses "AAAA-MM" con entradas de bitácora, del más reciente al más antiguo"""
+        bitacora = self.datos["bitacora"]
+        if hasattr(bitacora, "fragmentos"):
+            return [clave for clave in reversed(bitacora.fragmentos()) if clave[:4].isdigit()]
+        entradas = self.backend.entradas_bitacora() if hasattr(self.backend, "entradas_bitacora") else bitacora.values()
+        return sorted({entrada["fecha"][:7] for entrada in entradas}, reverse=True)
+
+    def filtrar_entradas_bitacora(self, categoria=None, recientes_primero=True, mes=None):
+        """
+        Entradas de la bitácora de una categoría (o todas), ordenadas por fecha
+
+        Args:
+            categoria: Solo las de esa categoría
+            recientes_primero: Orden de fecha descendente
+            mes: Solo las de ese mes "AAAA-MM" (con el backend de fragmentos, solo se lee ese mes)
+        """
+        if hasattr(self.backend, "entradas_bitacora"):
+            entradas = self.backend.entradas_bitacora(categoria, recientes_primero)
+            return entradas if mes is None else [e for e in entradas if e["fecha"].startswith(mes)]
+        bitacora = self.datos["bitacora"]
+        if mes is not None and hasattr(bitacora, "cargar_fragmentos"):
+            with self.almacen.cerrojo:
+                bitacora.cargar_fragmentos([mes])
+            entradas = bitacora.registros_cargados()
+        else:
+            entradas = bitacora.values()
+        if mes is not None:
+            entradas = [e for e in entradas if e["fecha"].startswith(mes)]
+        if categoria is not None:
+            entradas = [e for e in entradas if e["categoria"] == categoria]
+        # El formato "%Y-%m-%d %H:%M:%S" se ordena igual como texto que como fecha
+        return sorted(entradas, key=lambda e: e["fecha"], reverse=recientes_primero)
+
+    def buscar_entradas_bitacora(self, consulta, categoria=None, limite=50):
+        """Busca texto en la bitácora; resultados ordenados por relevancia"""
+        filtro = None if categoria is None else lambda entrada: entrada["categoria"] == categoria
+        with self.almacen.cerrojo:
+            resultados = self.almacen.indice("busqueda").buscar(consulta, limite, filtro)
+        return [entrada for entrada, _ in resultados]
+
+    def buscar_entradas_archivadas(self, consulta, categoria=None, limite=50):
+        """
+        Entradas de bitácora archivadas con todas las palabras de la consulta (como inicio de palabra)
+
+        Se recorre el archivo de las más recientes a las más antiguas y se
+        para al llegar al límite, así que rara vez se descomprime todo.
+        """
+        from busqueda import CAMPOS, normalizar, tokenizar
+        palabras = tokenizar(consulta)
+        if not palabras:
+            return []
+
+        def coincide(entrada):
+            if categoria is not None and entrada.get("categoria") != categoria:
+                return False
+            terminos = set()
+            for campo in CAMPOS:
+                terminos.update(tokenizar(entrada.get(campo)))
+            return all(any(termino.startswith(palabra) for termino in terminos) for palabra in palabras)
+
+        def prefiltro(texto):
+            # Una palabra que empieza por la de la consulta la contiene
+            texto = normalizar(texto)
+            return all(palabra in texto for palabra in palabras)
+
+        return self.archivo.buscar("bitacora", coincide, limite, prefiltro)
+
+    def _pendientes(self):
+        return self.almacen.indice("pendientes")
+
+    def buscar_tareas_pendientes(self, consulta="", limite=20):
+        """
+        Tareas pendientes para el selector de tarea relacionada de la bitácora
+
+        Returns:
+            Lista de tuplas (id, etiqueta) de las mejores coincidencias
+        """
+        with self.almacen.cerrojo:
+            indice = self._pendientes()
+            return [(id_tarea, indice.describir(id_tarea)) for id_tarea in indice.buscar(consulta, limite)]
+
+    def describir_tarea(self, referencia, fecha=None):
+        """
+        Texto de la tarea relacionada de una entrada de bitácora
+
+        Las entradas nuevas guardan el id de la tarea; las antiguas, el texto
+        "Diaria: ..." o "Proyecto X: ...", que se devuelve tal cual.
+
+        Args:
+            referencia: Campo tarea_relacionada de la entrada
+            fecha: Fecha de la entrada (con el backend de fragmentos, la tarea se busca antes en ese mes)
+        """
+        if not referencia:
+            return None
+        with self.almacen.cerrojo:
+            descripcion = self._pendientes().describir(referencia)
+            if descripcion is None and " " not in referencia:
+                tarea = self._tarea_completada(referencia, fecha)
+                if tarea is not None:
+                    from pendientes import etiqueta
+                    descripcion = etiqueta(tarea)
+        return descripcion or referencia
+
+    def _tarea_completada(self, id_tarea, fecha=None):
+        """
+        Tarea diaria que no está pendiente, guardada o archivada, o None (se llama con el cerrojo)
+
+        Con el backend de fragmentos buscar un id que no está leería todos los
+        meses: antes se leen el de la ocurrencia y el de la fecha y se mira el archivo.
+        """
+        diarias = self.datos["diarias"]
+        cargar = getattr(diarias, "cargar_fragmentos", None)
+        if cargar is None:
+            tarea = diarias.get(id_tarea)
+            return tarea if tarea is not None else self.archivo.registro("diarias", id_tarea)
+        ocurrencia = recurrencia.separar_ocurrencia(id_tarea)
+        cargar([texto[:7] for texto in (ocurrencia and ocurrencia[1], fecha) if texto])
+        tarea = dict.get(diarias, id_tarea)
+        if tarea is None:
+            tarea = self.archivo.registro("diarias", id_tarea)
+        # Sin rastro en esos meses ni en el archivo: se leen los demás
+        return tarea if tarea is not None else diarias.get(id_tarea)
+
+    def _vencimientos(self):
+        return self.almacen.indice("vencimientos")
+
+    def vigilar_vencimientos(self, funcion):
+        """Llama a funcion (sin argumentos) cada vez que se programa un aviso de fecha límite nuevo"""
+        with self.almacen.cerrojo:
+            indice = self._vencimientos()
+            if funcion not in indice.al_programar:
+                indice.al_programar.append(funcion)
+
+    def vencimientos_pendientes(self, ahora=None):
+        """
+        Avisos de fechas límite que ya tocan (ver vencimientos.py)
+
+        Cada aviso se devuelve una sola vez: se saca del índice.
+
+        Returns:
+            Tupla (avisos, instante del siguiente aviso o None)
+        """
+        with self.almacen.cerrojo:
+            indice = self._vencimientos()
+            return indice.vencidos(ahora), indice.proximo()
+
+    def proximas_fechas_limite(self, limite=10, hoy=None):
+        """Fechas límite pendientes más cercanas: lista de tuplas (fecha, descripción)"""
+        with self.almacen.cerrojo:
+            return self._vencimientos().proximas_fechas(limite, hoy)
+
+    def tareas_del_mes(self, mes, anio):
+        """Tareas de un mes organizadas por día (formato de calendario.recopilar_tareas_del_mes)"""
+        if hasattr(self.backend, "tareas_del_mes"):
+            return self._con_ocurrencias(self._con_archivadas(self.backend.tareas_del_mes(mes, anio), mes, anio),
+                                         mes, anio)
+        # Los índices se construyen en la primera consulta: bajo el cerrojo del almacén
+        with self.almacen.cerrojo:
+            return self.almacen.indice("fechas").tareas_del_mes(anio, mes)
+
+    def calendario_del_mes(self, mes, anio):
+        """Tareas de un mes y sus versiones por día (None si el backend no las lleva)"""
+        if hasattr(self.backend, "tareas_del_mes"):
+            return self.tareas_del_mes(mes, anio), None
+        with self.almacen.cerrojo:
+            indice = self.almacen.indice("fechas")
+            return indice.tareas_del_mes(anio, mes), indice.versiones_mes(anio, mes)
+
+    def _con_archivadas(self, tareas_del_mes, mes, anio):
+        """Añade lo archivado del mes a las tareas que devuelve el backend (el índice de fechas ya lo incluye)"""
+        from indice_fechas import anadir_archivados
+        return anadir_archivados(tareas_del_mes, self.archivo, anio, mes)
+
+    def _con_ocurrencias(self, tareas_del_mes, mes, anio):
+        """Añade las ocurrencias pendientes del mes a las tareas que devuelve el backend (el índice de fechas ya las incluye)"""
+        from indice_fechas import anadir_ocurrencias
+        datos = self.datos
+        return anadir_ocurrencias(tareas_del_mes, datos["recurrentes"].values(), anio, mes, datos["diarias"])
+
+    def fechas_invalidas(self):
+        """Registros cuya fecha no se pudo interpretar"""
+        with self.almacen.cerrojo:
+            return self.almacen.indice("fechas").fechas_invalidas
+
+    def _analitica(self):
+        return self.almacen.indice("analitica")
+
+    def tasa_completado(self, periodo="D", desde=None, hasta=None):
+        """Tareas y completadas por día ("D"), semana ("W") o mes ("M")"""
+        with self.almacen.cerrojo:
+            return self._analitica().tasa_completado(periodo, desde, hasta)
+
+    def burndown_proyecto(self, proyecto, hoy=None):
+        """Tareas pendientes de un proyecto día a día"""
+        with self.almacen.cerrojo:
+            return self._analitica().burndown(proyecto, hoy)
+
+    def tareas_atrasadas(self, hoy=None):
+        """Número de tareas pendientes cuya fecha ya ha pasado"""
+        with self.almacen.cerrojo:
+            return self._analitica().atrasadas(hoy)
+
+    def distribucion_categorias(self, periodo=None, desde=None, hasta=None):
+        """Entradas de bitácora por categoría (en total o por periodo)"""
+        with self.almacen.cerrojo:
+            return self._analitica().distribucion_categorias(periodo, desde, hasta)
+
+    # ------------------------------------------------------------ intercambio
+
+    def exportar(self, archivo, formato, coleccion=None):
+        """
+        Escribe una colección ("csv"/"jsonl") o el calendario ("ics") en un archivo binario
+
+        Args:
+            archivo: Archivo abierto en modo binario
+            formato: "csv", "jsonl" o "ics"
+            coleccion: Colección a exportar (no se usa con "ics")
+        """
+        import intercambio
+        # Con el cerrojo solo se copian los registros: serializar y escribir un journal grande
+        # no debe bloquear a las demás sesiones del proceso
+        with self.almacen.cerrojo:
+            datos = self.datos
+            indice = None
+            if formato == "ics" and not hasattr(self.backend, "tareas_del_mes"):
+                indice = self.almacen.indice("fechas") if "fechas" in self.almacen.indices else None
+            copia = intercambio.copiar(datos, formato, coleccion, indice)
+        for bloque in intercambio.exportar(datos, formato, coleccion, copia=copia):
+            archivo.write(bloque.encode("utf-8"))
+
+    def importar(self, lineas, formato, coleccion=None):
+        """Importa un archivo de texto con una sola escritura; devuelve el resumen de la importación"""
+        import intercambio
+        return intercambio.importar(self.almacen, lineas, formato, coleccion)
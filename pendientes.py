@@ -0,0 +1,228 @@
+import heapq
+from bisect import bisect_left, insort
+from itertools import islice
+
+from busqueda import tokenizar
+
+# Con más candidatas que estas se recorren por antigüedad en lugar de ordenarlas todas
+RECORRIDO_ORDENADO = 2000
+
+
+# Colecciones de tareas (las entradas de bitácora no se enlazan entre sí)
+_COLECCIONES = ("diarias", "tareas_proyecto")
+
+def etiqueta(tarea, proyecto=None):
+    """Texto con que se muestra una tarea en el selector ("Diaria: ..." o "Proyecto X: ...")"""
+    if proyecto is None:
+        return f"Diaria: {tarea['descripcion']}"
+    return f"Proyecto {proyecto}: {tarea['descripcion']}"
+
+def _clave(operacion):
+    return operacion["valor"]["id"] if operacion["op"] == "anadir" else operacion["clave"]
+
+class IndicePendientes:
+    """
+    Tareas pendientes (diarias y de proyecto) para el selector de la bitácora
+
+    Guarda los términos de la etiqueta de cada tarea pendiente y, por
+    término, las pendientes que lo contienen (con el vocabulario ordenado
+    para expandir prefijos), de modo que el selector parte de las tareas de
+    la palabra más selectiva y muestra las mejores N en lugar de montar una
+    opción por cada tarea en cada rerun. También conserva la ubicación de
+    todas las tareas (pendientes o no) para describir las entradas de
+    bitácora que las referencian por id.
+
+    Como los demás índices, se construye en la primera consulta y después se
+    mantiene con cada operación del almacén.
+    """
+
+    def __init__(self, datos=None):
+        self._datos = None
+        self._construido = False
+        # id -> (proyecto o None, tarea)
+        self._tareas = {}
+        # id -> términos de la etiqueta, solo de las pendientes
+        self._pendientes = {}
+        # id -> número de orden de llegada (a igualdad, las más recientes primero)
+        self._orden = {}
+        self._contador = 0
+        # término -> ids de pendientes, y vocabulario ordenado
+        self._postings = {}
+        self._terminos = []
+        if datos is not None:
+            self.reconstruir(datos)
+
+    def reconstruir(self, datos):
+        # La construcción se aplaza hasta la primera consulta
+        self._datos = datos
+        self._construido = False
+
+    def _asegurar(self):
+        if self._datos is not None and not self._construido:
+            self._construir()
+
+    def _construir(self):
+        self._tareas = {}
+        self._pendientes = {}
+        self._orden = {}
+        self._postings = {}
+        # Con el backend de fragmentos todas las pendientes están en los meses ya leídos
+        diarias = self._datos["diarias"]
+        for tarea in getattr(diarias, "registros_cargados", diarias.values)():
+            self._agregar(tarea)
+        for nombre, proyecto in self._datos["proyectos"].items():
+            self._agregar_proyecto(nombre, proyecto)
+        self._terminos = sorted(self._postings)
+        self._construido = True
+
+    def _agregar(self, tarea, proyecto=None):
+        id_tarea = tarea["id"]
+        self._tareas[id_tarea] = (proyecto, tarea)
+        # Una tarea renombrada o completada sale con sus términos anteriores
+        self._quitar_pendiente(id_tarea)
+        if tarea.get("completada", False):
+            return
+        terminos = tuple(dict.fromkeys(tokenizar(etiqueta(tarea, proyecto))))
+        self._pendientes[id_tarea] = terminos
+        self._orden[id_tarea] = self._contador = self._contador + 1
+        for termino in terminos:
+            postings = self._postings.get(termino)
+            if postings is None:
+                postings = self._postings[termino] = set()
+                if self._construido:
+                    insort(self._terminos, termino)
+            postings.add(id_tarea)
+
+    def _quitar_pendiente(self, id_tarea):
+        self._orden.pop(id_tarea, None)
+        for termino in self._pendientes.pop(id_tarea, ()):
+            postings = self._postings[termino]
+            postings.discard(id_tarea)
+            if not postings:
+                del self._postings[termino]
+                self._terminos.pop(bisect_left(self._terminos, termino))
+
+    def _quitar(self, id_tarea):
+        self._tareas.pop(id_tarea, None)
+        self._quitar_pendiente(id_tarea)
+
+    def _agregar_proyecto(self, nombre, proyecto):
+        for tarea in proyecto["tareas"].values():
+            self._agregar(tarea, nombre)
+
+    def antes_de_aplicar(self, datos, operacion):
+        """Retira las tareas que la operación va a eliminar"""
+        if not self._construido or operacion["op"] != "eliminar":
+            return
+        coleccion = operacion["coleccion"]
+        if coleccion == "proyectos":
+            for id_tarea in datos["proyectos"][operacion["clave"]]["tareas"]:
+                self._quitar(id_tarea)
+        elif coleccion in _COLECCIONES:
+            self._quitar(operacion["clave"])
+
+    def despues_de_aplicar(self, datos, operacion):
+        """Añade las tareas nuevas y actualiza las completadas o renombradas"""
+        if not self._construido or operacion["op"] == "eliminar":
+            return
+        coleccion = operacion["coleccion"]
+        if coleccion == "proyectos":
+            if operacion["op"] == "anadir":
+                self._agregar_proyecto(operacion["clave"], datos["proyectos"][operacion["clave"]])
+            return
+        if coleccion not in _COLECCIONES:
+            return
+        if operacion["op"] == "actualizar" and not {"completada", "descripcion"} & operacion["valor"].keys():
+            return
+        id_tarea = _clave(operacion)
+        if coleccion == "diarias":
+            self._agregar(datos["diarias"][id_tarea])
+        else:
+            proyecto = operacion["proyecto"]
+            self._agregar(datos["proyectos"][proyecto]["tareas"][id_tarea], proyecto)
+
+    def __len__(self):
+        self._asegurar()
+        return len(self._pendientes)
+
+    def diarias_pendientes(self):
+        """Tareas diarias pendientes (las atrasadas de la vista diaria salen de aquí)"""
+        self._asegurar()
+        tareas = self._tareas
+        return [tarea for proyecto, tarea in map(tareas.__getitem__, self._pendientes) if proyecto is None]
+
+    def _expandir(self, prefijo):
+        """Términos del vocabulario que empiezan por el prefijo"""
+        inicio = bisect_left(self._terminos, prefijo)
+        fin = bisect_left(self._terminos, prefijo + "\uffff", inicio)
+        return self._terminos[inicio:fin]
+
+    def buscar(self, consulta="", limite=20):
+        """
+        Mejores tareas pendientes para lo que se ha escrito en el selector
+
+        Cada palabra de la consulta debe ser el principio de alguna palabra
+        de la etiqueta ("pint cas" encuentra "Proyecto Casa: Pintar la
+        pared"). Las coincidencias de palabras completas van primero y, a
+        igualdad, las tareas más recientes. Sin consulta devuelve las últimas
+        pendientes añadidas.
+
+        Args:
+            consulta: Texto escrito por el usuario
+            limite: Número máximo de resultados
+
+        Returns:
+            Lista de ids de tareas pendientes, de mejor a peor
+        """
+        self._asegurar()
+        palabras = tokenizar(consulta)
+        if not palabras:
+            return list(islice(reversed(self._pendientes), limite))
+
+        # Se parte de la palabra con menos tareas y se comprueban las demás en cada candidata
+        mejor = None
+        for palabra in palabras:
+            listas = [self._postings[termino] for termino in self._expandir(palabra)]
+            total = sum(map(len, listas))
+            if not total:
+                return []
+            if mejor is None or total < mejor[0]:
+                mejor = (total, listas, palabra)
+        candidatas = mejor[1][0] if len(mejor[1]) == 1 else set().union(*mejor[1])
+
+        restantes = [palabra for palabra in palabras if palabra is not mejor[2]]
+        if restantes:
+            candidatas = [id_tarea for id_tarea in candidatas
+                          if all(any(termino.startswith(palabra) for termino in self._pendientes[id_tarea])
+                                 for palabra in restantes)]
+        exactas = [self._postings.get(palabra, ()) for palabra in palabras]
+
+        def incompletas(id_tarea):
+            return sum(id_tarea not in exacta for exacta in exactas)
+
+        if len(candidatas) <= RECORRIDO_ORDENADO:
+            orden = self._orden
+            return heapq.nsmallest(limite, candidatas, key=lambda id_tarea: (incompletas(id_tarea), -orden[id_tarea]))
+        # Muchas candidatas: se recorren de la más reciente a la más antigua y se
+        # para en cuanto hay `limite` con el mínimo posible de palabras incompletas
+        minimo = sum(not exacta for exacta in exactas)
+        niveles = {}
+        for id_tarea in reversed(self._pendientes):
+            if id_tarea not in candidatas:
+                continue
+            nivel = niveles.setdefault(incompletas(id_tarea), [])
+            if len(nivel) < limite:
+                nivel.append(id_tarea)
+            if len(niveles.get(minimo, ())) >= limite:
+                break
+        resultados = [id_tarea for nivel in sorted(niveles) for id_tarea in niveles[nivel]]
+        return resultados[:limite]
+
+    def describir(self, id_tarea):
+        """Etiqueta de una tarea (pendiente o no) por su id, o None si no existe"""
+        self._asegurar()
+        encontrada = self._tareas.get(id_tarea)
+        if encontrada is None:
+            return None
+        proyecto, tarea = encontrada
+        return etiqueta(tarea, proyecto)
@@ -3,9 +3,13 @@ from datetime import datetime
 from funciones import (
     crear_proyecto, anadir_tarea_proyecto, completar_tarea_proyecto,
     cambiar_prioridad_tarea_proyecto, establecer_fecha_limite_proyecto,
-    eliminar_tarea_proyecto, eliminar_proyecto
+    eliminar_tarea_proyecto, eliminar_proyecto, filtrar_tareas_proyecto,
+    anadir_tareas_proyecto, completar_tareas_proyecto, cambiar_prioridad_tareas_proyecto,
+    eliminar_tareas_proyecto, mover_tareas_proyecto
 )
+from instrumentacion import medir
 
+@medir
 def mostrar_vista_proyectos():
     """
     Función principal que muestra la vista de gestión de proyectos
@@ -95,6 +99,123 @@ def mostrar_formulario_nueva_tarea(proyecto_seleccionado):
         if anadir_tarea_proyecto(proyecto_seleccionado, tarea_proyecto, fecha_tarea.strftime("%Y-%m-%d")):
             st.success("Tarea añadida al proyecto correctamente")
 
+    # Varias tareas a la vez (se guardan en una sola escritura)
+    with st.expander("Añadir varias tareas"):
+        with st.form("form_tareas_proyecto", clear_on_submit=True):
+            texto = st.text_area("Una tarea por línea", key="input_tareas_proyecto")
+            col1, col2 = st.columns(2)
+            with col1:
+                prioridad = st.selectbox("Prioridad", ["Baja", "Media", "Alta"], index=1, key="prioridad_tareas")
+            with col2:
+                fecha_tareas = st.date_input("Fecha límite (opcional)", value=None, key="fecha_tareas_proyecto")
+            submit_tareas = st.form_submit_button("Añadir tareas")
+
+    if submit_tareas:
+        descripciones = [linea.strip() for linea in texto.splitlines() if linea.strip()]
+        anadidas = anadir_tareas_proyecto(proyecto_seleccionado, descripciones,
+                                          fecha_tareas.strftime("%Y-%m-%d") if fecha_tareas else None, prioridad)
+        if anadidas:
+            st.success(f"{anadidas} tareas añadidas al proyecto")
+
+def cambiar_prioridad_seleccionada(proyecto_seleccionado, id_tarea):
+    """
+    Aplica la prioridad elegida en el selector de una tarea
+
+    El valor se lee del estado del widget al ejecutarse el callback, no al
+    crear el selector.
+
+    Args:
+        proyecto_seleccionado: Nombre del proyecto
+        id_tarea: Id de la tarea
+    """
+    prioridad = st.session_state[f"prioridad_select_{id_tarea}"]
+    cambiar_prioridad_tarea_proyecto(proyecto_seleccionado, id_tarea, prioridad)
+
+def _olvidar_widgets_tareas(ids_tareas):
+    """
+    Descarta el estado de los widgets de las tareas modificadas en bloque
+
+    Así se vuelven a crear con los valores guardados y no con los que
+    tenían antes de la acción.
+    """
+    for id_tarea in ids_tareas:
+        st.session_state.pop(f"check_proyecto_{id_tarea}", None)
+        st.session_state.pop(f"prioridad_select_{id_tarea}", None)
+
+def aplicar_accion_en_bloque(proyecto_seleccionado, accion):
+    """
+    Aplica una acción a todas las tareas seleccionadas en una sola escritura
+
+    Args:
+        proyecto_seleccionado: Nombre del proyecto
+        accion: "completar", "pendiente", "prioridad", "mover", "eliminar" o "eliminar_completadas"
+    """
+    clave = f"seleccion_proyecto_{proyecto_seleccionado}"
+    ids_tareas = list(st.session_state.get(clave, []))
+    if accion == "completar":
+        completar_tareas_proyecto(proyecto_seleccionado, ids_tareas, True)
+    elif accion == "pendiente":
+        completar_tareas_proyecto(proyecto_seleccionado, ids_tareas, False)
+    elif accion == "prioridad":
+        cambiar_prioridad_tareas_proyecto(proyecto_seleccionado, ids_tareas, st.session_state["prioridad_en_bloque"])
+    elif accion == "mover":
+        mover_tareas_proyecto(proyecto_seleccionado, st.session_state["destino_en_bloque"], ids_tareas)
+    elif accion == "eliminar":
+        eliminar_tareas_proyecto(proyecto_seleccionado, ids_tareas)
+    elif accion == "eliminar_completadas":
+        eliminar_tareas_proyecto(proyecto_seleccionado, filtro=lambda tarea: tarea.get("completada", False))
+    _olvidar_widgets_tareas(ids_tareas)
+    st.session_state[clave] = []
+
+def seleccionar_todas(clave, ids_tareas):
+    """Marca como seleccionadas todas las tareas visibles"""
+    st.session_state[clave] = list(ids_tareas)
+
+def mostrar_acciones_en_bloque(proyecto_seleccionado, tareas):
+    """
+    Muestra las acciones sobre varias tareas seleccionadas a la vez
+
+    Args:
+        proyecto_seleccionado: Nombre del proyecto
+        tareas: Tareas visibles con el filtro actual
+    """
+    descripciones = {tarea["id"]: tarea["descripcion"] for tarea in tareas}
+    clave = f"seleccion_proyecto_{proyecto_seleccionado}"
+    # La selección solo conserva las tareas que siguen visibles
+    st.session_state[clave] = [id_tarea for id_tarea in st.session_state.get(clave, []) if id_tarea in descripciones]
+
+    with st.expander("Acciones sobre varias tareas"):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            seleccion = st.multiselect("Tareas seleccionadas", list(descripciones), format_func=descripciones.get, key=clave)
+        with col2:
+            st.button("Seleccionar todas", key="seleccionar_todas_proyecto",
+                      on_click=seleccionar_todas, args=(clave, list(descripciones)))
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.button("✅ Completar", key="completar_en_bloque", disabled=not seleccion,
+                      on_click=aplicar_accion_en_bloque, args=(proyecto_seleccionado, "completar"))
+            st.button("↩️ Marcar pendientes", key="pendientes_en_bloque", disabled=not seleccion,
+                      on_click=aplicar_accion_en_bloque, args=(proyecto_seleccionado, "pendiente"))
+        with col2:
+            st.selectbox("Prioridad", ["Baja", "Media", "Alta"], index=1, key="prioridad_en_bloque")
+            st.button("Cambiar prioridad", key="cambiar_prioridad_en_bloque", disabled=not seleccion,
+                      on_click=aplicar_accion_en_bloque, args=(proyecto_seleccionado, "prioridad"))
+        with col3:
+            otros = [nombre for nombre in st.session_state.tareas["proyectos"] if nombre != proyecto_seleccionado]
+            st.selectbox("Mover a", otros, key="destino_en_bloque")
+            st.button("Mover", key="mover_en_bloque", disabled=not (seleccion and otros),
+                      on_click=aplicar_accion_en_bloque, args=(proyecto_seleccionado, "mover"))
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("🗑️ Eliminar seleccionadas", key="eliminar_en_bloque", disabled=not seleccion,
+                      on_click=aplicar_accion_en_bloque, args=(proyecto_seleccionado, "eliminar"))
+        with col2:
+            st.button("🗑️ Eliminar todas las completadas", key="eliminar_completadas_proyecto",
+                      on_click=aplicar_accion_en_bloque, args=(proyecto_seleccionado, "eliminar_completadas"))
+
 def mostrar_tareas_proyecto(proyecto_seleccionado, proyecto):
     """
     Muestra las tareas de un proyecto con opciones para filtrar y gestionar
@@ -110,15 +231,15 @@ def mostrar_tareas_proyecto(proyecto_seleccionado, proyecto):
     
     # Mostrar tareas según el filtro
     if proyecto["tareas"]:
-        for i, tarea in enumerate(proyecto["tareas"]):
-            # Aplicar filtro
-            if (filtro_estado == "Pendientes" and tarea.get("completada", False)) or (filtro_estado == "Completadas" and not tarea.get("completada", False)):
-                continue
-                
+        completada_filtro = {"Todas": None, "Pendientes": False, "Completadas": True}[filtro_estado]
+        tareas = filtrar_tareas_proyecto(proyecto_seleccionado, completada_filtro)
+        mostrar_acciones_en_bloque(proyecto_seleccionado, tareas)
+        for tarea in tareas:
+            id_tarea = tarea["id"]
             col1, col2, col3, col4 = st.columns([0.1, 3, 1, 0.5])
             with col1:
-                completada = st.checkbox("", value=tarea.get("completada", False), key=f"check_proyecto_{i}", 
-                                      on_change=completar_tarea_proyecto, args=(proyecto_seleccionado, i))
+                completada = st.checkbox("", value=tarea.get("completada", False), key=f"check_proyecto_{id_tarea}", 
+                                      on_change=completar_tarea_proyecto, args=(proyecto_seleccionado, id_tarea))
             with col2:
                 texto = tarea["descripcion"]
                 if completada:
@@ -136,11 +257,11 @@ def mostrar_tareas_proyecto(proyecto_seleccionado, proyecto):
             with col3:
                 nueva_prioridad = st.selectbox("", ["Baja", "Media", "Alta"], 
                                              index=["Baja", "Media", "Alta"].index(tarea["prioridad"]),
-                                             key=f"prioridad_select_{i}",
-                                             on_change=cambiar_prioridad_tarea_proyecto,
-                                             args=(proyecto_seleccionado, i, ["Baja", "Media", "Alta"][st.session_state[f"prioridad_select_{i}"]]))
+                                             key=f"prioridad_select_{id_tarea}",
+                                             on_change=cambiar_prioridad_seleccionada,
+                                             args=(proyecto_seleccionado, id_tarea))
             with col4:
-                st.button("🗑️", key=f"eliminar_tarea_proyecto_{i}", help="Eliminar tarea", 
-                       on_click=eliminar_tarea_proyecto, args=(proyecto_seleccionado, i))
+                st.button("🗑️", key=f"eliminar_tarea_proyecto_{id_tarea}", help="Eliminar tarea", 
+                       on_click=eliminar_tarea_proyecto, args=(proyecto_seleccionado, id_tarea))
     else:
         st.info("No hay tareas en este proyecto. Añade una para comenzar.")
\ No newline at end of file
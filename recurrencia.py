@@ -0,0 +1,319 @@
+"""
+Tareas recurrentes
+
+Una tarea recurrente se guarda una sola vez en la colección "recurrentes"
+como una regla (un subconjunto de RRULE, RFC 5545) y una fecha de inicio:
+
+    {"id": ..., "descripcion": "Envio de SMS y CORREOS COBRANZA",
+     "regla": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR", "inicio": "2024-01-01",
+     "omitidas": ["2024-05-01"]}
+
+Sus ocurrencias no se guardan: se generan solo para el rango de fechas que
+se está viendo (un mes del calendario, el día de hoy en la lista de
+diarias), saltando directamente al primer periodo del rango, así que una
+regla que abarca años no cuesta nada hasta que se mira.
+
+Cada ocurrencia tiene un id estable, "<id de la regla>@AAAA-MM-DD". Al
+completarla se guarda como una tarea diaria normal con ese mismo id y el
+campo "recurrente" (la excepción de esa ocurrencia): a partir de ahí se
+completa, se desmarca o aparece en las estadísticas como cualquier otra.
+Eliminar una ocurrencia añade su fecha a "omitidas".
+
+Partes de RRULE admitidas: FREQ (DAILY, WEEKLY, MONTHLY, YEARLY),
+INTERVAL, BYDAY (con ordinal en MONTHLY: 1MO, -1FR), BYMONTHDAY (negativo
+desde el final del mes), COUNT y UNTIL.
+"""
+import calendar
+from datetime import date, timedelta
+from functools import lru_cache
+
+# Reglas predefinidas que ofrece la interfaz (None: la regla se escribe a mano)
+FRECUENCIAS = {
+    "Diaria": "FREQ=DAILY",
+    "Días laborables": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "Semanal": "FREQ=WEEKLY",
+    "Mensual": "FREQ=MONTHLY",
+    "Regla RRULE": None,
+}
+
+DIAS_SEMANA = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Separa el id de la regla de la fecha en el id de una ocurrencia
+SEPARADOR = "@"
+
+# Periodos seguidos sin ninguna ocurrencia tras los que se da una regla por agotada
+# (por ejemplo, BYMONTHDAY=31 con FREQ=MONTHLY;INTERVAL=2 desde febrero)
+_PERIODOS_VACIOS = 1000
+
+def id_ocurrencia(id_regla, fecha):
+    """Id de la ocurrencia de una regla en una fecha "AAAA-MM-DD" """
+    return f"{id_regla}{SEPARADOR}{fecha}"
+
+def separar_ocurrencia(id_tarea):
+    """
+    Descompone el id de una ocurrencia
+
+    Returns:
+        Tupla (id de la regla, fecha "AAAA-MM-DD"), o None si no es el id de una ocurrencia
+    """
+    id_regla, separador, fecha = str(id_tarea).rpartition(SEPARADOR)
+    if not separador or not id_regla or len(fecha) != 10:
+        return None
+    return id_regla, fecha
+
+def _fecha_until(texto):
+    texto = texto.split("T")[0]
+    if len(texto) == 8 and texto.isdigit():
+        texto = f"{texto[:4]}-{texto[4:6]}-{texto[6:]}"
+    return date.fromisoformat(texto)
+
+def _dia_semana(texto):
+    """"MO" -> (None, 0), "-1FR" -> (-1, 4)"""
+    codigo = texto[-2:]
+    if codigo not in DIAS_SEMANA:
+        raise ValueError(f"Día de la semana no válido en BYDAY: {texto!r}")
+    ordinal = texto[:-2]
+    if ordinal in ("", "+"):
+        return None, DIAS_SEMANA.index(codigo)
+    numero = int(ordinal)
+    if numero == 0 or abs(numero) > 5:
+        raise ValueError(f"Ordinal no válido en BYDAY: {texto!r}")
+    return numero, DIAS_SEMANA.index(codigo)
+
+class Regla:
+    """
+    Regla de recurrencia interpretada, con su fecha de inicio
+
+    Las ocurrencias se calculan por periodos (día, semana empezando en
+    lunes, mes o año) contados desde el periodo del inicio: el rango pedido
+    se traduce directamente a índices de periodo, sin recorrer los
+    anteriores. Con COUNT, la última ocurrencia se calcula una vez al
+    interpretar la regla y después se trata como UNTIL.
+    """
+
+    def __init__(self, texto, inicio):
+        """
+        Args:
+            texto: Regla "FREQ=...;..." (sin el prefijo "RRULE:", que también se admite)
+            inicio: Fecha de la primera ocurrencia posible (date o "AAAA-MM-DD")
+
+        Raises:
+            ValueError: Si la regla no es válida o usa partes no admitidas
+        """
+        self.inicio = date.fromisoformat(inicio) if isinstance(inicio, str) else inicio
+        partes = {}
+        for parte in texto.strip().removeprefix("RRULE:").split(";"):
+            if not parte:
+                continue
+            clave, igual, valor = parte.partition("=")
+            if not igual or not valor:
+                raise ValueError(f"Parte de la regla no válida: {parte!r}")
+            partes[clave.strip().upper()] = valor.strip().upper()
+        self.frecuencia = partes.pop("FREQ", None)
+        if self.frecuencia not in ("DAILY", "WEEKLY", "MONTHLY", "YEARLY"):
+            raise ValueError(f"FREQ no admitida: {self.frecuencia!r}")
+        self.intervalo = int(partes.pop("INTERVAL", 1))
+        if self.intervalo < 1:
+            raise ValueError("INTERVAL debe ser mayor que cero")
+        self.dias_semana = [_dia_semana(dia) for dia in partes.pop("BYDAY").split(",")] if "BYDAY" in partes else []
+        if any(ordinal is not None for ordinal, _ in self.dias_semana) and self.frecuencia != "MONTHLY":
+            raise ValueError("BYDAY con ordinal solo se admite con FREQ=MONTHLY")
+        self.dias_mes = [int(dia) for dia in partes.pop("BYMONTHDAY").split(",")] if "BYMONTHDAY" in partes else []
+        if any(dia == 0 or abs(dia) > 31 for dia in self.dias_mes):
+            raise ValueError("BYMONTHDAY debe estar entre 1 y 31 (o -31 y -1)")
+        if self.frecuencia == "YEARLY" and (self.dias_semana or self.dias_mes):
+            raise ValueError("FREQ=YEARLY solo se repite en el día y mes del inicio")
+        self.fin = _fecha_until(partes.pop("UNTIL")) if "UNTIL" in partes else None
+        cuenta = int(partes.pop("COUNT")) if "COUNT" in partes else None
+        if partes:
+            raise ValueError(f"Partes de la regla no admitidas: {', '.join(sorted(partes))}")
+        if cuenta is not None:
+            if self.fin is not None:
+                raise ValueError("COUNT y UNTIL no se pueden usar juntos")
+            if cuenta < 1:
+                raise ValueError("COUNT debe ser mayor que cero")
+            self.fin = self._ultima(cuenta)
+
+    def _indice(self, fecha):
+        """Índice del periodo que contiene la fecha, contado desde el del inicio"""
+        if self.frecuencia == "DAILY":
+            return (fecha - self.inicio).days
+        if self.frecuencia == "WEEKLY":
+            return ((fecha - timedelta(fecha.weekday())) - (self.inicio - timedelta(self.inicio.weekday()))).days // 7
+        if self.frecuencia == "MONTHLY":
+            return (fecha.year - self.inicio.year) * 12 + fecha.month - self.inicio.month
+        return fecha.year - self.inicio.year
+
+    def _periodo(self, indice):
+        """Fechas candidatas del periodo, en orden (sin recortar al inicio ni al fin)"""
+        inicio = self.inicio
+        if self.frecuencia == "DAILY":
+            fecha = inicio + timedelta(indice)
+            if self.dias_semana and fecha.weekday() not in {dia for _, dia in self.dias_semana}:
+                return []
+            if self.dias_mes and not self._es_dia_mes(fecha):
+                return []
+            return [fecha]
+        if self.frecuencia == "WEEKLY":
+            lunes = inicio - timedelta(inicio.weekday()) + timedelta(weeks=indice)
+            dias = sorted({dia for _, dia in self.dias_semana}) if self.dias_semana else [inicio.weekday()]
+            fechas = [lunes + timedelta(dia) for dia in dias]
+            return [fecha for fecha in fechas if self._es_dia_mes(fecha)] if self.dias_mes else fechas
+        if self.frecuencia == "MONTHLY":
+            anio, mes = divmod(inicio.year * 12 + inicio.month - 1 + indice, 12)
+            return self._dias_del_mes(anio, mes + 1)
+        anio = inicio.year + indice
+        if inicio.month == 2 and inicio.day == 29 and not calendar.isleap(anio):
+            return []
+        return [date(anio, inicio.month, inicio.day)]
+
+    def _es_dia_mes(self, fecha):
+        ultimo = calendar.monthrange(fecha.year, fecha.month)[1]
+        return any(fecha.day == (dia if dia > 0 else ultimo + dia + 1) for dia in self.dias_mes)
+
+    def _dias_del_mes(self, anio, mes):
+        ultimo = calendar.monthrange(anio, mes)[1]
+        dias = set()
+        for dia in self.dias_mes:
+            dia = dia if dia > 0 else ultimo + dia + 1
+            # Como en RFC 5545, un día que el mes no tiene (31 de abril) no genera ocurrencia
+            if 1 <= dia <= ultimo:
+                dias.add(dia)
+        if self.dias_semana:
+            primero = date(anio, mes, 1).weekday()
+            por_semana = set()
+            for ordinal, dia_semana in self.dias_semana:
+                coinciden = list(range(1 + (dia_semana - primero) % 7, ultimo + 1, 7))
+                if ordinal is None:
+                    por_semana.update(coinciden)
+                elif -len(coinciden) <= ordinal <= len(coinciden) and ordinal:
+                    por_semana.add(coinciden[ordinal - 1 if ordinal > 0 else ordinal])
+            # BYMONTHDAY y BYDAY juntos se combinan como intersección
+            dias = dias & por_semana if self.dias_mes else por_semana
+        elif not self.dias_mes:
+            if self.inicio.day > ultimo:
+                return []
+            dias = {self.inicio.day}
+        return [date(anio, mes, dia) for dia in sorted(dias)]
+
+    def _ultima(self, cuenta):
+        """Fecha de la ocurrencia número `cuenta` (o la última posible)"""
+        indice = 0
+        vacios = 0
+        ultima = self.inicio
+        while vacios < _PERIODOS_VACIOS:
+            fechas = [fecha for fecha in self._periodo(indice) if fecha >= self.inicio]
+            vacios = 0 if fechas else vacios + 1
+            for fecha in fechas:
+                ultima = fecha
+                cuenta -= 1
+                if cuenta == 0:
+                    return fecha
+            indice += self.intervalo
+        return ultima
+
+    def ocurrencias(self, desde, hasta):
+        """
+        Fechas de las ocurrencias dentro del rango (incluido), en orden
+
+        Args:
+            desde, hasta: Fechas (date) del rango
+
+        Yields:
+            Fechas (date)
+        """
+        desde = max(desde, self.inicio)
+        if self.fin is not None:
+            hasta = min(hasta, self.fin)
+        if desde > hasta:
+            return
+        # Primer periodo de la regla (múltiplo del intervalo) que llega al rango
+        indice = -(-self._indice(desde) // self.intervalo) * self.intervalo
+        ultimo = self._indice(hasta)
+        while indice <= ultimo:
+            for fecha in self._periodo(indice):
+                if desde <= fecha <= hasta:
+                    yield fecha
+            indice += self.intervalo
+
+@lru_cache(maxsize=256)
+def interpretar(texto, inicio):
+    """
+    Regla interpretada (compartida: las reglas se interpretan una vez)
+
+    Args:
+        texto: Regla RRULE
+        inicio: Fecha de inicio "AAAA-MM-DD"
+
+    Raises:
+        ValueError: Si la regla no es válida
+    """
+    return Regla(texto, inicio)
+
+def regla_de(frecuencia, texto=None):
+    """
+    Regla RRULE de una frecuencia de la interfaz
+
+    Args:
+        frecuencia: Clave de FRECUENCIAS
+        texto: Regla escrita a mano (frecuencia "Regla RRULE")
+    """
+    regla = FRECUENCIAS[frecuencia]
+    return regla if regla is not None else (texto or "").strip()
+
+def describir_regla(regla):
+    """Texto breve de la regla para mostrarla ("Días laborables" o la propia regla)"""
+    texto = regla["regla"]
+    for nombre, predefinida in FRECUENCIAS.items():
+        if predefinida == texto:
+            return nombre
+    return texto
+
+def tarea_ocurrencia(regla, fecha):
+    """Tarea diaria (pendiente) de la ocurrencia de una regla en una fecha "AAAA-MM-DD" """
+    return {
+        "id": id_ocurrencia(regla["id"], fecha),
+        "descripcion": regla["descripcion"],
+        "fecha": fecha,
+        "completada": False,
+        "tipo": "diarias",
+        "recurrente": regla["id"],
+    }
+
+def expandir(reglas, desde, hasta, materializadas=()):
+    """
+    Ocurrencias pendientes de las reglas dentro de un rango de fechas
+
+    Las ocurrencias omitidas y las ya guardadas como tarea diaria (las
+    completadas) no se devuelven: la tarea guardada ya aparece por sí misma.
+
+    Args:
+        reglas: Registros de la colección "recurrentes"
+        desde, hasta: Rango "AAAA-MM-DD" (incluido)
+        materializadas: Ids de ocurrencias guardadas como tarea diaria (cualquier contenedor con `in`)
+
+    Returns:
+        Lista de tareas diarias de las ocurrencias, en orden de fecha
+    """
+    if not reglas or desde > hasta:
+        return []
+    inicio, fin = date.fromisoformat(desde), date.fromisoformat(hasta)
+    tareas = []
+    for regla in reglas:
+        omitidas = regla.get("omitidas") or ()
+        for fecha in interpretar(regla["regla"], regla["inicio"]).ocurrencias(inicio, fin):
+            fecha = fecha.isoformat()
+            if fecha not in omitidas and id_ocurrencia(regla["id"], fecha) not in materializadas:
+                tareas.append(tarea_ocurrencia(regla, fecha))
+    tareas.sort(key=lambda tarea: tarea["fecha"])
+    return tareas
+
+def es_ocurrencia(regla, fecha):
+    """Indica si la regla tiene una ocurrencia (no omitida) en la fecha "AAAA-MM-DD" """
+    if fecha in (regla.get("omitidas") or ()):
+        return False
+    try:
+        dia = date.fromisoformat(fecha)
+    except ValueError:
+        return False
+    return any(True for _ in interpretar(regla["regla"], regla["inicio"]).ocurrencias(dia, dia))
@@ -0,0 +1,260 @@
+from collections.abc import MutableMapping
+from datetime import date
+
+# Marca de campo ausente (distinto de un campo con valor None)
+_AUSENTE = object()
+
+class _Ordinal(int):
+    """Fecha "AAAA-MM-DD" guardada como su ordinal (date.toordinal)"""
+    __slots__ = ()
+
+class _Instante(int):
+    """Fecha "AAAA-MM-DD HH:MM:SS" guardada como segundos desde el ordinal 0"""
+    __slots__ = ()
+
+# Cada fecha distinta se guarda una sola vez: los registros comparten el ordinal
+_ordinales = {}
+_textos = {}
+
+def _codificar_fecha(texto):
+    if type(texto) is not str:
+        return texto
+    ordinal = _ordinales.get(texto)
+    if ordinal is not None:
+        return ordinal
+    if len(texto) != 10:
+        return texto
+    try:
+        fecha = date.fromisoformat(texto)
+    except ValueError:
+        return texto
+    # Solo se convierte lo que vuelve a escribirse exactamente igual
+    if fecha.isoformat() != texto:
+        return texto
+    ordinal = _ordinales[texto] = _Ordinal(fecha.toordinal())
+    _textos[ordinal] = texto
+    return ordinal
+
+def _texto_fecha(ordinal):
+    texto = _textos.get(ordinal)
+    if texto is None:
+        # Registro copiado de otro proceso (pickle): la tabla aún no tiene esa fecha
+        texto = _textos[ordinal] = date.fromordinal(ordinal).isoformat()
+    return texto
+
+# Textos de hora precalculados: decodificar un instante no formatea números
+_HORAS_MINUTOS = [f" {horas:02d}:{minutos:02d}:" for horas in range(24) for minutos in range(60)]
+_SEGUNDOS = [f"{segundos:02d}" for segundos in range(60)]
+
+def _texto_instante(instante):
+    dias, segundos = divmod(instante, 86400)
+    minutos, segundos = divmod(segundos, 60)
+    return _texto_fecha(dias) + _HORAS_MINUTOS[minutos] + _SEGUNDOS[segundos]
+
+def _codificar_instante(texto):
+    if type(texto) is not str or len(texto) != 19 or texto[10] != " ":
+        return texto
+    ordinal = _codificar_fecha(texto[:10])
+    if type(ordinal) is not _Ordinal:
+        return texto
+    try:
+        horas, minutos, segundos = int(texto[11:13]), int(texto[14:16]), int(texto[17:19])
+    except ValueError:
+        return texto
+    if not (0 <= horas < 24 and 0 <= minutos < 60 and 0 <= segundos < 60):
+        return texto
+    instante = _Instante(ordinal * 86400 + horas * 3600 + minutos * 60 + segundos)
+    return instante if _texto_instante(instante) == texto else texto
+
+# tipo, prioridad y categoría toman pocos valores: todos los registros comparten el mismo texto
+_internados = {}
+
+def _internar(valor):
+    if type(valor) is not str:
+        return valor
+    return _internados.setdefault(valor, valor)
+
+def _decodificar(valor):
+    tipo = type(valor)
+    if tipo is _Ordinal:
+        return _texto_fecha(valor)
+    if tipo is _Instante:
+        return _texto_instante(valor)
+    return valor
+
+class Registro(MutableMapping):
+    """
+    Registro compacto con la interfaz de un diccionario
+
+    Los campos conocidos se guardan en __slots__ (sin diccionario por
+    instancia), los textos de valores repetidos se internan y las fechas
+    se guardan como enteros. Los campos desconocidos van a un diccionario
+    aparte, así que convertir desde y hacia el esquema de tareas.json no
+    pierde nada. Un campo ausente es un slot sin asignar.
+    """
+
+    __slots__ = ("_extra",)
+
+    # Campo -> función que lo codifica al guardarlo, o None si se guarda tal cual (en el orden del esquema)
+    CAMPOS = {}
+
+    def __init__(self, campos=(), **otros):
+        self._extra = None
+        self.update(campos, **otros)
+
+    @classmethod
+    def desde_dict(cls, registro):
+        """Crea el registro a partir de un diccionario con el esquema de tareas.json"""
+        nuevo = cls.__new__(cls)
+        nuevo._extra = None
+        campos = cls.CAMPOS
+        for clave, valor in registro.items():
+            codificar = campos.get(clave, _AUSENTE)
+            if codificar is None:
+                setattr(nuevo, clave, valor)
+            elif codificar is not _AUSENTE:
+                setattr(nuevo, clave, codificar(valor))
+            else:
+                if nuevo._extra is None:
+                    nuevo._extra = {}
+                nuevo._extra[clave] = valor
+        return nuevo
+
+    def a_dict(self):
+        """Diccionario con el esquema de tareas.json (campos conocidos primero)"""
+        resultado = {}
+        for nombre in self.CAMPOS:
+            valor = getattr(self, nombre, _AUSENTE)
+            if valor is not _AUSENTE:
+                resultado[nombre] = _decodificar(valor)
+        if self._extra:
+            resultado.update(self._extra)
+        return resultado
+
+    def __getitem__(self, clave):
+        if clave in self.CAMPOS:
+            valor = getattr(self, clave, _AUSENTE)
+            if valor is not _AUSENTE:
+                return _decodificar(valor)
+        elif self._extra is not None and clave in self._extra:
+            return self._extra[clave]
+        raise KeyError(clave)
+
+    def get(self, clave, defecto=None):
+        if clave in self.CAMPOS:
+            valor = getattr(self, clave, _AUSENTE)
+            return defecto if valor is _AUSENTE else _decodificar(valor)
+        if self._extra is not None:
+            return self._extra.get(clave, defecto)
+        return defecto
+
+    def __contains__(self, clave):
+        if clave in self.CAMPOS:
+            return hasattr(self, clave)
+        return self._extra is not None and clave in self._extra
+
+    def __setitem__(self, clave, valor):
+        codificar = self.CAMPOS.get(clave, _AUSENTE)
+        if codificar is None:
+            setattr(self, clave, valor)
+        elif codificar is not _AUSENTE:
+            setattr(self, clave, codificar(valor))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[clave] = valor
+
+    def __delitem__(self, clave):
+        if clave in self.CAMPOS:
+            if not hasattr(self, clave):
+                raise KeyError(clave)
+            delattr(self, clave)
+        elif self._extra is not None and clave in self._extra:
+            del self._extra[clave]
+        else:
+            raise KeyError(clave)
+
+    def __iter__(self):
+        for nombre in self.CAMPOS:
+            if hasattr(self, nombre):
+                yield nombre
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for nombre in self.CAMPOS if hasattr(self, nombre)) + len(self._extra or ())
+
+    def copy(self):
+        return type(self).desde_dict(self.a_dict())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.a_dict()!r})"
+
+class TareaDiaria(Registro):
+    __slots__ = ("id", "descripcion", "fecha", "completada", "tipo")
+    CAMPOS = {"id": None, "descripcion": None, "fecha": _codificar_fecha,
+              "completada": None, "tipo": _internar}
+
+class TareaProyecto(Registro):
+    __slots__ = ("id", "descripcion", "fecha_creacion", "fecha_limite", "completada", "prioridad", "tipo",
+                 "fecha_completada")
+    CAMPOS = {"id": None, "descripcion": None, "fecha_creacion": _codificar_fecha,
+              "fecha_limite": _codificar_fecha, "completada": None, "prioridad": _internar,
+              "tipo": _internar, "fecha_completada": _codificar_fecha}
+
+class EntradaBitacora(Registro):
+    __slots__ = ("id", "titulo", "contenido", "fecha", "categoria", "tarea_relacionada", "editado")
+    CAMPOS = {"id": None, "titulo": None, "contenido": None,
+              "fecha": _codificar_instante, "categoria": _internar,
+              "tarea_relacionada": None, "editado": _codificar_instante}
+
+class ReglaRecurrente(Registro):
+    __slots__ = ("id", "descripcion", "regla", "inicio", "omitidas")
+    CAMPOS = {"id": None, "descripcion": None, "regla": _internar, "inicio": _codificar_fecha, "omitidas": None}
+
+# Clase de registro de cada colección
+CLASES = {"diarias": TareaDiaria, "tareas_proyecto": TareaProyecto, "bitacora": EntradaBitacora,
+          "recurrentes": ReglaRecurrente}
+
+def a_registro(coleccion, registro):
+    """
+    Convierte un diccionario de la colección en su registro compacto
+
+    Args:
+        coleccion: "diarias", "tareas_proyecto", "bitacora" o "recurrentes"
+        registro: Diccionario con el esquema de tareas.json (un Registro se devuelve tal cual)
+
+    Returns:
+        Registro de la clase de la colección
+    """
+    if not isinstance(registro, dict):
+        return registro
+    return CLASES[coleccion].desde_dict(registro)
+
+def ordinal_fecha(registro, campo):
+    """
+    Día de una fecha del registro como ordinal (date.toordinal)
+
+    En los registros compactos lee directamente el entero guardado, sin
+    pasar por el texto. Admite también diccionarios y fechas con hora.
+
+    Returns:
+        Ordinal del día, o None si el campo falta o no es una fecha válida
+    """
+    if isinstance(registro, dict):
+        texto = registro.get(campo)
+        valor = _codificar_instante(texto) if type(texto) is str and len(texto) == 19 else _codificar_fecha(texto)
+    else:
+        valor = getattr(registro, campo, None)
+    tipo = type(valor)
+    if tipo is _Ordinal:
+        return valor
+    if tipo is _Instante:
+        return valor // 86400
+    return None
+
+def a_json(objeto):
+    """Función default de json: serializa los registros con el esquema de tareas.json"""
+    if isinstance(objeto, Registro):
+        return objeto.a_dict()
+    raise TypeError(f"Object of type {type(objeto).__name__} is not JSON serializable")
@@ -0,0 +1,236 @@
+"""
+Índice de vencimientos: avisos de fechas límite en un montículo
+
+Cada fecha límite pendiente (de un proyecto sin terminar o de una tarea de
+proyecto sin completar) programa dos avisos: "proxima", AVISOS_ANTELACION_DIAS
+días antes a la AVISOS_HORA, y "vencida", al empezar el día siguiente al
+límite. Los avisos se guardan en un montículo ordenado por instante, así que
+el planificador (avisos.py) solo mira la cima en cada vuelta: su coste no
+depende del número de tareas.
+
+Un cambio no busca en el montículo las entradas anteriores: cada fecha
+límite lleva una generación y las entradas de otra generación se descartan
+al llegar a la cima (o al compactar, cuando son más de la mitad).
+
+Como los demás índices, se construye en la primera consulta y después se
+mantiene con cada operación del almacén.
+"""
+import heapq
+from datetime import date, datetime, time, timedelta
+
+from configuracion import AVISOS_ANTELACION_DIAS, AVISOS_HORA, AVISOS_VENTANA_DIAS
+
+# Cambios de un proyecto o de una tarea que pueden mover o anular su fecha límite
+_CAMPOS_PROYECTO = {"fecha_limite", "completadas", "total"}
+_CAMPOS_TAREA = {"fecha_limite", "completada"}
+
+def _fecha(texto):
+    """Fecha de un texto "AAAA-MM-DD..." o None si está vacío o no es válido"""
+    if not texto:
+        return None
+    try:
+        return date.fromisoformat(texto[:10])
+    except (TypeError, ValueError):
+        return None
+
+def proyecto_terminado(proyecto):
+    """Un proyecto está terminado cuando tiene tareas y todas están completadas"""
+    total = proyecto.get("total", 0)
+    return total > 0 and proyecto.get("completadas", 0) >= total
+
+class IndiceVencimientos:
+    """
+    Próximos avisos de fechas límite de proyectos y tareas de proyecto
+
+    Las claves son ("proyectos", nombre) y ("tareas_proyecto", id); de cada
+    una se guarda la fecha límite vigente, su generación y el proyecto.
+    """
+
+    def __init__(self, datos=None, antelacion_dias=AVISOS_ANTELACION_DIAS, hora=AVISOS_HORA,
+                 ventana_dias=AVISOS_VENTANA_DIAS):
+        """
+        Args:
+            datos: Datos sobre los que construir el índice (por defecto, en la primera reconstrucción)
+            antelacion_dias: Días antes de la fecha límite en que se avisa
+            hora: Hora del día del aviso previo
+            ventana_dias: Los avisos con más de estos días de retraso ya no se emiten
+        """
+        self.antelacion = timedelta(days=antelacion_dias)
+        self.hora = time(hora)
+        self.ventana = timedelta(days=ventana_dias)
+        self._datos = None
+        self._construido = False
+        # (colección, clave) -> (fecha límite, generación, proyecto)
+        self._vigentes = {}
+        # Entradas (instante, generación, tipo, colección, clave)
+        self._monticulo = []
+        self._generacion = 0
+        # Funciones que se llaman al programar un aviso nuevo (el planificador se despierta)
+        self.al_programar = []
+        if datos is not None:
+            self.reconstruir(datos)
+
+    def reconstruir(self, datos):
+        # La construcción se aplaza hasta la primera consulta
+        self._datos = datos
+        self._construido = False
+
+    def _asegurar(self):
+        if self._datos is not None and not self._construido:
+            self._construir()
+
+    def _construir(self):
+        self._vigentes = {}
+        self._monticulo = []
+        for nombre, proyecto in self._datos["proyectos"].items():
+            self._programar_proyecto(nombre, proyecto)
+        heapq.heapify(self._monticulo)
+        self._construido = True
+        self._avisar()
+
+    def _avisar(self):
+        for funcion in self.al_programar:
+            funcion()
+
+    def _programar(self, clave, fecha, proyecto):
+        """Programa los avisos de una fecha límite (None la retira); devuelve si hay avisos nuevos"""
+        vigente = self._vigentes.get(clave)
+        if fecha is None:
+            if vigente is not None:
+                del self._vigentes[clave]
+                self._compactar()
+            return False
+        if vigente is not None and vigente[0] == fecha:
+            return False
+        self._generacion += 1
+        self._vigentes[clave] = (fecha, self._generacion, proyecto)
+        entradas = (
+            (datetime.combine(fecha - self.antelacion, self.hora), self._generacion, "proxima") + clave,
+            (datetime.combine(fecha + timedelta(days=1), time()), self._generacion, "vencida") + clave,
+        )
+        if self._construido:
+            for entrada in entradas:
+                heapq.heappush(self._monticulo, entrada)
+            self._compactar()
+        else:
+            # Durante la construcción se añaden todas y se ordenan al final
+            self._monticulo.extend(entradas)
+        return True
+
+    def _programar_tarea(self, proyecto, tarea):
+        fecha = None if tarea.get("completada", False) else _fecha(tarea.get("fecha_limite"))
+        return self._programar(("tareas_proyecto", tarea["id"]), fecha, proyecto)
+
+    def _programar_proyecto(self, nombre, proyecto, con_tareas=True):
+        fecha = None if proyecto_terminado(proyecto) else _fecha(proyecto.get("fecha_limite"))
+        nuevos = self._programar(("proyectos", nombre), fecha, nombre)
+        if con_tareas:
+            for tarea in proyecto["tareas"].values():
+                nuevos = self._programar_tarea(nombre, tarea) or nuevos
+        return nuevos
+
+    def _compactar(self):
+        # Cada fecha vigente tiene como mucho dos entradas: con más del doble sobran la mitad
+        if len(self._monticulo) <= 4 * len(self._vigentes) + 64:
+            return
+        self._monticulo = [entrada for entrada in self._monticulo if self._es_vigente(entrada)]
+        heapq.heapify(self._monticulo)
+
+    def _es_vigente(self, entrada):
+        vigente = self._vigentes.get(entrada[3:])
+        return vigente is not None and vigente[1] == entrada[1]
+
+    def antes_de_aplicar(self, datos, operacion):
+        """Retira las fechas de lo que la operación va a eliminar"""
+        if not self._construido or operacion["op"] != "eliminar":
+            return
+        coleccion = operacion["coleccion"]
+        if coleccion == "proyectos":
+            self._programar(("proyectos", operacion["clave"]), None, None)
+            for id_tarea in datos["proyectos"][operacion["clave"]]["tareas"]:
+                self._programar(("tareas_proyecto", id_tarea), None, None)
+        elif coleccion == "tareas_proyecto":
+            self._programar(("tareas_proyecto", operacion["clave"]), None, None)
+
+    def despues_de_aplicar(self, datos, operacion):
+        """Programa las fechas nuevas o cambiadas y retira las de lo terminado"""
+        if not self._construido or operacion["op"] == "eliminar":
+            return
+        coleccion = operacion["coleccion"]
+        actualizar = operacion["op"] == "actualizar"
+        if coleccion == "proyectos":
+            if actualizar and not _CAMPOS_PROYECTO & operacion["valor"].keys():
+                return
+            nombre = operacion["clave"]
+            nuevos = self._programar_proyecto(nombre, datos["proyectos"][nombre], con_tareas=not actualizar)
+        elif coleccion == "tareas_proyecto":
+            if actualizar and not _CAMPOS_TAREA & operacion["valor"].keys():
+                return
+            proyecto = operacion["proyecto"]
+            id_tarea = operacion["clave"] if actualizar else operacion["valor"]["id"]
+            nuevos = self._programar_tarea(proyecto, datos["proyectos"][proyecto]["tareas"][id_tarea])
+        else:
+            return
+        if nuevos:
+            self._avisar()
+
+    def __len__(self):
+        self._asegurar()
+        return len(self._vigentes)
+
+    def _descripcion(self, coleccion, clave, proyecto):
+        if coleccion == "proyectos":
+            return f"Proyecto {clave}"
+        return f"{self._datos['proyectos'][proyecto]['tareas'][clave]['descripcion']} (proyecto {proyecto})"
+
+    def vencidos(self, ahora=None):
+        """
+        Saca del montículo los avisos cuyo instante ya ha llegado
+
+        Los que llevan más de la ventana de retraso (p. ej. fechas límite
+        antiguas al arrancar) se descartan sin emitirse.
+
+        Args:
+            ahora: Instante de referencia (por defecto, el actual)
+
+        Returns:
+            Lista de avisos (diccionarios con tipo, coleccion, clave, proyecto,
+            descripcion, fecha_limite e instante), del más antiguo al más reciente
+        """
+        self._asegurar()
+        ahora = ahora or datetime.now()
+        limite = ahora - self.ventana
+        avisos = []
+        while self._monticulo and self._monticulo[0][0] <= ahora:
+            entrada = heapq.heappop(self._monticulo)
+            if not self._es_vigente(entrada) or entrada[0] < limite:
+                continue
+            instante, _, tipo, coleccion, clave = entrada
+            fecha, _, proyecto = self._vigentes[(coleccion, clave)]
+            avisos.append({
+                "tipo": tipo, "coleccion": coleccion, "clave": clave, "proyecto": proyecto,
+                "descripcion": self._descripcion(coleccion, clave, proyecto),
+                "fecha_limite": fecha.isoformat(), "instante": instante.isoformat(timespec="minutes"),
+            })
+        return avisos
+
+    def proximo(self):
+        """Instante del siguiente aviso programado, o None si no hay ninguno"""
+        self._asegurar()
+        while self._monticulo and not self._es_vigente(self._monticulo[0]):
+            heapq.heappop(self._monticulo)
+        return self._monticulo[0][0] if self._monticulo else None
+
+    def proximas_fechas(self, limite=10, hoy=None):
+        """
+        Fechas límite pendientes más cercanas (incluidas las vencidas dentro de la ventana)
+
+        Returns:
+            Lista de tuplas (fecha "AAAA-MM-DD", descripción), de la más cercana a la más lejana
+        """
+        self._asegurar()
+        desde = (hoy or date.today()) - self.ventana
+        candidatas = ((fecha, clave, proyecto) for clave, (fecha, _, proyecto) in self._vigentes.items()
+                      if fecha >= desde)
+        return [(fecha.isoformat(), self._descripcion(*clave, proyecto))
+                for fecha, clave, proyecto in heapq.nsmallest(limite, candidatas, key=lambda candidata: candidata[0])]